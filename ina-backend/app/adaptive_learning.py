@@ -6,7 +6,7 @@ from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime, timedelta
 from collections import defaultdict, deque
 from dataclasses import dataclass, asdict
-from sentence_transformers import SentenceTransformer
+from app.embedding_registry import get_encoder
 from sklearn.cluster import KMeans
 from sklearn.metrics.pairwise import cosine_similarity
 import sqlite3
@@ -60,7 +60,7 @@ class AdaptiveLearningSystem:
     def __init__(self, db_path: str = "adaptive_learning.db",
                  model_name: str = 'intfloat/multilingual-e5-small'):
         self.db_path = db_path
-        self.model = SentenceTransformer(model_name)
+        self.model = get_encoder(model_name)
         
         # Sistemas de aprendizaje
         self.learning_buffer = deque(maxlen=1000)  # Buffer de eventos recientes
@@ -0,0 +1,83 @@
+# app/aho_corasick.py - Autómata Aho-Corasick para buscar muchas palabras clave en una sola pasada
+from collections import deque
+from typing import Dict, Hashable, Iterable, Iterator, List, Set, Tuple
+
+
+class AhoCorasick:
+    """
+    Autómata de búsqueda multi-patrón.
+
+    Se agregan las palabras con add(palabra, valor) y se llama a build() una vez; luego
+    iter_matches(texto) recorre el texto una sola vez (costo lineal en el largo del texto
+    más las coincidencias) sin importar cuántas palabras haya en el autómata.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, Hashable]]] = [[]]  # (largo de la palabra, valor)
+        self._built = False
+        self.size = 0
+
+    def add(self, word: str, value: Hashable = None) -> None:
+        if not word:
+            return
+        state = 0
+        for char in word:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((len(word), word if value is None else value))
+        self.size += 1
+        self._built = False
+
+    def build(self) -> 'AhoCorasick':
+        """Calcular los enlaces de falla (BFS) y propagar las salidas por ellos"""
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                if self._fail[next_state] == next_state:
+                    self._fail[next_state] = 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+        self._built = True
+        return self
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, Hashable]]:
+        """Coincidencias como (inicio, fin, valor), en orden de posición final"""
+        if not self._built:
+            self.build()
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, value in output[state]:
+                yield end - length, end, value
+
+    def find_values(self, text: str) -> Set[Hashable]:
+        """Conjunto de valores cuyas palabras aparecen en el texto"""
+        return {value for _, _, value in self.iter_matches(text)}
+
+    @classmethod
+    def from_words(cls, words: Iterable[str]) -> 'AhoCorasick':
+        automaton = cls()
+        for word in words:
+            automaton.add(word)
+        return automaton.build()
@@ -0,0 +1,198 @@
+# app/batch_encoder.py - Micro-batching de embeddings: agrupa encodes concurrentes en una sola pasada
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "32"))
+BATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+
+# Límites superiores de cada bucket de los histogramas
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+WAIT_MS_BUCKETS = (0.5, 1, 2, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """Histograma de buckets fijos (el último bucket acumula lo que excede el mayor límite)"""
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self.samples = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.samples += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"<={b:g}" for b in self.bounds] + [f">{self.bounds[-1]:g}"]
+        return {
+            'buckets': dict(zip(labels, self.counts)),
+            'samples': self.samples,
+            'avg': round(self.total / self.samples, 3) if self.samples else 0.0
+        }
+
+
+class BatchEncoder:
+    """
+    Cola de encodes que se resuelven en lotes.
+
+    Cada llamador encola sus textos y recibe un Future. Un hilo dedicado toma el primer
+    pedido, espera hasta `max_wait_ms` (o hasta juntar `max_batch_size` textos) y ejecuta
+    una sola llamada a `encode_fn` con todo el lote; luego resuelve el Future de cada
+    llamador con su fila. Sirve tanto desde threads del pool de chat (encode) como desde
+    endpoints async (encode_async).
+    """
+
+    def __init__(self, encode_fn: Callable[[List[str]], Any], name: str = "encoder",
+                 max_batch_size: Optional[int] = None, max_wait_ms: Optional[float] = None):
+        self.encode_fn = encode_fn
+        self.name = name
+        self.max_batch_size = max(1, max_batch_size or BATCH_MAX_SIZE)
+        self.max_wait = max(0.0, BATCH_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000
+
+        self._queue: "queue.Queue[Tuple[str, Future, float]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.wait_ms = Histogram(WAIT_MS_BUCKETS)
+        self.stats = {
+            'requests': 0,
+            'batches': 0,
+            'texts_encoded': 0,
+            'duplicates_merged': 0,
+            'errors': 0,
+            'cancelled': 0,
+            'encode_ms': 0.0
+        }
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+    def submit(self, text: str) -> Future:
+        """Encolar un texto; el Future se resuelve con su vector"""
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        with self._stats_lock:
+            self.stats['requests'] += 1
+        return future
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Versión bloqueante: matriz (len(texts), dim) en el orden recibido"""
+        futures = [self.submit(text) for text in texts]
+        return np.stack([f.result() for f in futures])
+
+    async def encode_async(self, texts: Sequence[str]) -> np.ndarray:
+        """Versión para endpoints async: no bloquea el event loop mientras se arma el lote"""
+        futures = [asyncio.wrap_future(self.submit(text)) for text in texts]
+        return np.stack(await asyncio.gather(*futures))
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name=f"batch-encoder-{self.name}",
+                                                daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> List[Tuple[str, Future, float]]:
+        """Bloquear hasta el primer pedido y juntar los que lleguen dentro de la ventana"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                self._process(batch)
+            except Exception as e:
+                # El worker atiende a todo el proceso: un error inesperado no puede detenerlo
+                logger.error(f"❌ Error inesperado en el worker de embeddings ({self.name}): {e}")
+                with self._stats_lock:
+                    self.stats['errors'] += 1
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _process(self, batch: List[Tuple[str, Future, float]]):
+        # Pedidos cancelados mientras esperaban (cliente desconectado, wait_for vencido) se descartan;
+        # los demás pasan a RUNNING y ya no se pueden cancelar antes de resolverlos
+        pending = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        cancelled = len(batch) - len(pending)
+        if cancelled:
+            with self._stats_lock:
+                self.stats['cancelled'] += cancelled
+        if not pending:
+            return
+        batch = pending
+        started = time.perf_counter()
+
+        # Textos repetidos dentro del lote se codifican una sola vez
+        unique: Dict[str, int] = {}
+        for text, _, _ in batch:
+            unique.setdefault(text, len(unique))
+
+        try:
+            vectors = np.asarray(self.encode_fn(list(unique)))
+        except Exception as e:
+            logger.error(f"❌ Error en lote de embeddings ({self.name}, {len(batch)} textos): {e}")
+            with self._stats_lock:
+                self.stats['errors'] += 1
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        elapsed = (time.perf_counter() - started) * 1000
+        for text, future, _ in batch:
+            future.set_result(vectors[unique[text]])
+
+        with self._stats_lock:
+            self.stats['batches'] += 1
+            self.stats['texts_encoded'] += len(unique)
+            self.stats['duplicates_merged'] += len(batch) - len(unique)
+            self.stats['encode_ms'] += elapsed
+            self.batch_sizes.observe(len(batch))
+            for _, _, enqueued in batch:
+                self.wait_ms.observe((started - enqueued) * 1000)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            batches = self.stats['batches']
+            return {
+                **self.stats,
+                'encode_ms': round(self.stats['encode_ms'], 2),
+                'avg_batch_size': round(self.batch_sizes.total / batches, 2) if batches else 0.0,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'queued': self._queue.qsize(),
+                'batch_size_histogram': self.batch_sizes.to_dict(),
+                'wait_ms_histogram': self.wait_ms.to_dict()
+            }
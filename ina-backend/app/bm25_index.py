@@ -0,0 +1,222 @@
+# app/bm25_index.py - Índice léxico BM25 en memoria sobre los chunks de duoc_knowledge
+import logging
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Palabras vacías ES/EN/FR más frecuentes en las consultas de estudiantes
+STOP_WORDS = frozenset("""
+    a al algo algun alguna algunas alguno algunos ante antes como con contra cual cuales cuando de del desde
+    donde dos el ella ellas ellos en entre era es esa esas ese eso esos esta estan estar este esto estos fue
+    ha hay la las le les lo los mas me mi mis mucho muy nada ni no nos o otra otro para pero poco por porque
+    puedo que quien se sea ser si sin sobre son su sus tambien tengo tiene todo tu tus un una uno unos y ya yo
+    hola necesito quiero saber puede pueden hacer tener
+    the and or of to in on for is are was be it this that with what how where when can do does my your i you
+    le la les des du de et en un une est sont pour dans sur avec que qui quoi comment ou je vous mon ma mes
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokens en minúsculas, sin tildes ni palabras vacías ('Biblioteca?' -> ['biblioteca'])"""
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return [tok for tok in _TOKEN_RE.findall(text) if len(tok) > 1 and tok not in STOP_WORDS]
+
+
+class BM25Index:
+    """
+    Índice invertido BM25 (Okapi) con estadísticas precalculadas.
+
+    - postings: término -> {posición_doc: frecuencia}
+    - idf se recalcula solo cuando cambia el corpus (agregar documentos invalida el cache)
+    - Guarda texto y metadata de cada chunk para responder sin consultar ChromaDB
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.doc_ids: List[str] = []
+        self.documents: List[str] = []
+        self.metadatas: List[Dict] = []
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._id_to_pos: Dict[str, int] = {}
+        self._total_length = 0
+        self._idf: Dict[str, float] = {}
+        self.build_time = 0.0
+        self.last_update = None
+        self._added_during_build = None
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @staticmethod
+    def _indexable_text(document: str, metadata: Optional[Dict]) -> str:
+        """Texto + keywords/sección del metadata (lo que antes se sumaba con el keyword boost)"""
+        if not metadata:
+            return document
+        extras = [str(metadata.get(field, '')) for field in ('keywords', 'section', 'category')]
+        return document + ' ' + ' '.join(extra for extra in extras if extra)
+
+    def _add(self, doc_id: str, document: str, metadata: Optional[Dict]):
+        if doc_id in self._id_to_pos or not document:
+            return
+        pos = len(self.doc_ids)
+        terms = Counter(tokenize(self._indexable_text(document, metadata)))
+        for term, tf in terms.items():
+            self.postings[term][pos] = tf
+        length = sum(terms.values())
+        self.doc_ids.append(doc_id)
+        self.documents.append(document)
+        self.metadatas.append(metadata or {})
+        self.doc_lengths.append(length)
+        self._id_to_pos[doc_id] = pos
+        self._total_length += length
+
+    def build(self, ids: Iterable[str], documents: Iterable[str], metadatas: Iterable[Optional[Dict]]):
+        """
+        Reconstruir el índice completo (ingesta o arranque).
+
+        Se arma en un índice nuevo sin tomar el lock y se intercambia al final: las búsquedas
+        siguen usando el índice anterior mientras dura la reconstrucción. Los chunks agregados
+        con add() durante la reconstrucción se vuelven a aplicar sobre el índice nuevo.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            self._added_during_build = []
+        fresh = BM25Index(self.k1, self.b)
+        for doc_id, document, metadata in zip(ids, documents, metadatas):
+            fresh._add(doc_id, document, metadata)
+        with self._lock:
+            for doc_id, document, metadata in self._added_during_build:
+                fresh._add(doc_id, document, metadata)
+            self._added_during_build = None
+            self.doc_ids = fresh.doc_ids
+            self.documents = fresh.documents
+            self.metadatas = fresh.metadatas
+            self.doc_lengths = fresh.doc_lengths
+            self.postings = fresh.postings
+            self._id_to_pos = fresh._id_to_pos
+            self._total_length = fresh._total_length
+            self._idf = {}
+            self.build_time = time.perf_counter() - start
+            self.last_update = time.time()
+        logger.info(f"✅ Índice BM25 construido: {len(self)} chunks, {len(self.postings)} términos "
+                    f"en {self.build_time * 1000:.1f}ms")
+
+    def add(self, doc_id: str, document: str, metadata: Optional[Dict] = None):
+        """Agregar un chunk nuevo (add_document) sin reconstruir el índice"""
+        with self._lock:
+            self._add(doc_id, document, metadata)
+            if self._added_during_build is not None:
+                self._added_during_build.append((doc_id, document, metadata))
+            self._idf = {}
+            self.last_update = time.time()
+
+    def _get_idf(self, term: str) -> float:
+        idf = self._idf.get(term)
+        if idf is None:
+            n = len(self.doc_ids)
+            df = len(self.postings.get(term, ()))
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            self._idf[term] = idf
+        return idf
+
+    def search(self, query: str, n_results: int = 10) -> List[Tuple[int, float, float]]:
+        """
+        Top-n por BM25. Retorna (posición_doc, score, cobertura) donde cobertura es la
+        fracción de términos de la consulta presentes en el chunk.
+        """
+        query_terms = list(dict.fromkeys(tokenize(query)))
+        if not query_terms:
+            return []
+
+        with self._lock:
+            if not self.doc_ids:
+                return []
+            avgdl = self._total_length / len(self.doc_ids)
+            scores: Dict[int, float] = defaultdict(float)
+            matched: Dict[int, int] = defaultdict(int)
+            for term in query_terms:
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = self._get_idf(term)
+                for pos, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[pos] / avgdl)
+                    scores[pos] += idf * tf * (self.k1 + 1) / (tf + norm)
+                    matched[pos] += 1
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:n_results]
+        return [(pos, score, matched[pos] / len(query_terms)) for pos, score in ranked]
+
+    def search_documents(self, query: str, n_results: int = 10) -> List[Dict]:
+        """
+        Resultados en el formato de query_optimized, sin `similarity`: el puntaje léxico no es
+        una similitud coseno. lexical_score = score relativo al mejor * cobertura.
+        """
+        with self._lock:  # posiciones y textos del mismo índice aunque se intercambie en paralelo
+            hits = self.search(query, n_results)
+            if not hits:
+                return []
+            best = hits[0][1] or 1.0
+            return [{
+                'id': self.doc_ids[pos],
+                'document': self.documents[pos],
+                'metadata': self.metadatas[pos],
+                'lexical_score': round((score / best) * coverage, 4),
+                'bm25_score': round(score, 4),
+                'coverage': coverage
+            } for pos, score, coverage in hits]
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'documents': len(self.doc_ids),
+                'terms': len(self.postings),
+                'avg_doc_length': round(self._total_length / len(self.doc_ids), 1) if self.doc_ids else 0,
+                'build_time_ms': round(self.build_time * 1000, 2),
+                'last_update': self.last_update
+            }
+
+
+def reciprocal_rank_fusion(rankings: List[List[Dict]], key=lambda item: item['document'],
+                           k: int = 60) -> List[Dict]:
+    """
+    Fusionar rankings por RRF: score = Σ 1 / (k + rank).
+
+    Cada elemento conserva la entrada del primer ranking donde aparece, completada con los
+    campos de los demás rankings (bm25_score, coverage...), y `rrf_score` con el puntaje
+    fusionado. `similarity` queda como la similitud vectorial (0.0 si el documento solo
+    apareció en el ranking léxico): los umbrales de relevancia no deben mezclar escalas.
+    """
+    fused: Dict[str, Dict] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, 1):
+            item_key = key(item)
+            entry = fused.get(item_key)
+            if entry is None:
+                entry = fused[item_key] = {**item, 'rrf_score': 0.0}
+            else:
+                for field, value in item.items():
+                    entry.setdefault(field, value)
+            entry['rrf_score'] += 1.0 / (k + rank)
+
+    for entry in fused.values():
+        entry.setdefault('similarity', 0.0)
+
+    return sorted(fused.values(), key=lambda item: item['rrf_score'], reverse=True)
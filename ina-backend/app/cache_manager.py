@@ -1,13 +1,19 @@
 # app/cache_manager.py
 import time
 import logging
-from typing import Any, Dict, Optional
-from collections import OrderedDict
+import os
+import glob
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+from collections import OrderedDict, defaultdict
 import hashlib
 import json
 import re
+import sqlite3
 import unicodedata
 
+from app.knowledge_version import get_knowledge_version
+
 logger = logging.getLogger(__name__)
 
 def normalize_question(question: str) -> str:
@@ -89,7 +95,9 @@ class AdvancedCache:
             ttl = self.default_ttl
         
         # Si el cache está lleno, eliminar el menos usado (LRU)
-        if len(self._cache) >= self.max_size:
+        if key in self._cache:
+            self._cache.move_to_end(key)
+        elif len(self._cache) >= self.max_size:
             oldest_key = next(iter(self._cache))
             del self._cache[oldest_key]
             self._evictions += 1
@@ -105,6 +113,9 @@ class AdvancedCache:
             return True
         return False
 
+    def __len__(self) -> int:
+        return len(self._cache)
+
     def clear(self) -> None:
         """Limpiar todo el cache"""
         self._cache.clear()
@@ -144,10 +155,333 @@ class AdvancedCache:
         
         return cleaned_count
 
+TEMPLATE_VERSION_CHECK_SECONDS = float(os.getenv("TEMPLATE_VERSION_CHECK_SECONDS", "5"))
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_SOURCES = (
+    os.path.join(_APP_DIR, 'template_manager', '**', '*.py'),
+    os.path.join(_APP_DIR, 'templates', '**', '*.py'),
+    os.path.join(_APP_DIR, 'templates.py'),
+)
+
+_template_version = {'digest': None, 'checked_at': 0.0}
+_template_version_lock = threading.Lock()
+
+
+def get_template_version() -> str:
+    """
+    Huella de los archivos de templates (ruta, mtime, tamaño).
+
+    Cambia cuando se edita o despliega cualquier template; se recalcula como máximo
+    cada TEMPLATE_VERSION_CHECK_SECONDS.
+    """
+    with _template_version_lock:
+        now = time.time()
+        if _template_version['digest'] and now - _template_version['checked_at'] < TEMPLATE_VERSION_CHECK_SECONDS:
+            return _template_version['digest']
+
+        fingerprint = hashlib.md5()
+        for pattern in TEMPLATE_SOURCES:
+            for path in sorted(glob.glob(pattern, recursive=True)):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                fingerprint.update(f"{os.path.relpath(path, _APP_DIR)}:{stat.st_mtime_ns}:{stat.st_size};".encode())
+
+        _template_version['digest'] = fingerprint.hexdigest()[:12]
+        _template_version['checked_at'] = now
+        return _template_version['digest']
+
+
+class VersionedResponseCache(AdvancedCache):
+    """
+    Cache de respuestas finales del chat.
+
+    La clave combina la pregunta normalizada, el idioma detectado y un digest del contexto
+    conversacional. Cada entrada queda asociada a la versión de la base de conocimiento
+    y de los templates: si cualquiera cambia (add_document, scripts de ingesta, edición
+    de templates) el cache completo se descarta. Lleva hits y almacenamientos por
+    estrategia (template, standard_rag, ...) para medir dónde rinde.
+    """
+
+    def __init__(self, max_size: int = 300, default_ttl: int = 1800):
+        super().__init__(max_size=max_size, default_ttl=default_ttl)
+        self._versions = None
+        self._invalidations = 0
+        self._strategy_stats = defaultdict(lambda: {'hits': 0, 'stores': 0})
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def make_key(query: str, language: str = 'es', conversational_context: Optional[str] = None) -> str:
+        # Solo la parte final del contexto conversacional (evitar claves enormes)
+        context_digest = ''
+        if conversational_context:
+            context_digest = hashlib.md5(conversational_context[-200:].encode()).hexdigest()[:12]
+        return f"resp_{language or 'es'}_{context_digest}_{hashlib.md5(normalize_question(query).encode()).hexdigest()}"
+
+    def _check_versions(self):
+        versions = (get_knowledge_version(), get_template_version())
+        if versions != self._versions:
+            if self._versions is not None and self._cache:
+                logger.info(f"🧹 Cache de respuestas invalidado: conocimiento/templates "
+                            f"{self._versions} → {versions}")
+                self._invalidations += 1
+                self._cache.clear()
+            self._versions = versions
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            self._check_versions()
+            entry = super().get(key)
+            if entry is None:
+                return None
+            self._strategy_stats[entry['strategy']]['hits'] += 1
+            return entry['response']
+
+    def contains(self, key: str) -> bool:
+        """Hay respuesta vigente para `key` (sin contar hit ni moverla en el LRU)"""
+        with self._lock:
+            self._check_versions()
+            entry = self._cache.get(key)
+            return entry is not None and time.time() - entry[1] <= entry[2]
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, strategy: str = 'unknown') -> None:
+        with self._lock:
+            self._check_versions()
+            self._strategy_stats[strategy]['stores'] += 1
+            super().set(key, {'strategy': strategy, 'response': value}, ttl)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self.cleanup_expired()
+            stats = super().get_stats()
+            stats['invalidations'] = self._invalidations
+            stats['knowledge_version'], stats['template_version'] = self._versions or (None, None)
+            # hit_rate por estrategia = hits / (hits + respuestas generadas y guardadas)
+            stats['strategies'] = {
+                strategy: {**counts, 'hit_rate': round(counts['hits'] / max(1, counts['hits'] + counts['stores']), 3)}
+                for strategy, counts in self._strategy_stats.items()
+            }
+            return stats
+
+
+CLASSIFICATION_CACHE_SHARED = os.getenv("CLASSIFICATION_CACHE_SHARED", "1") == "1"
+CLASSIFICATION_CACHE_DB = os.getenv(
+    "CLASSIFICATION_CACHE_DB",
+    os.path.join(_APP_DIR, '..', 'cache_disk', 'classification_cache.sqlite3')
+)
+CLASSIFICATION_CACHE_VERSION_CHECK_SECONDS = float(os.getenv("CLASSIFICATION_CACHE_VERSION_CHECK_SECONDS", "5"))
+CLASSIFICATION_STORE_MAX_ROWS = int(os.getenv("CLASSIFICATION_STORE_MAX_ROWS", "20000"))
+CLASSIFICATION_STORE_PURGE_EVERY = 500
+
+
+class SharedClassificationStore:
+    """
+    Almacén SQLite de clasificaciones compartido por los workers de uvicorn.
+
+    Cada fila es (versión de tablas, clave) → valor JSON con su expiración. Usa WAL para
+    que las lecturas de un worker no bloqueen las escrituras de otro; una conexión por
+    hilo. Si SQLite falla, el cache sigue funcionando solo en memoria. Con otra `table`
+    sirve a otros caches (p.ej. generaciones del LLM).
+    """
+
+    def __init__(self, path: str, timeout: float = 1.0, table: str = 'classifications'):
+        self.path = os.path.abspath(path)
+        self.timeout = timeout
+        self.table = table
+        self._local = threading.local()
+        self._initialized = False
+        self._init_lock = threading.Lock()
+        self.errors = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+        with self._init_lock:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                    " version TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                    " expires_at REAL NOT NULL, PRIMARY KEY (version, key))"
+                )
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_expires ON {self.table} (expires_at)")
+                self._initialized = True
+        self._local.conn = conn
+        return conn
+
+    def _run(self, operation: Callable[[sqlite3.Connection], Any], default=None):
+        try:
+            return operation(self._connection())
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"⚠️ Almacén compartido '{self.table}' no disponible: {e}")
+            return default
+
+    def get(self, version: str, key: str) -> Optional[Tuple[Any, float]]:
+        """(valor, segundos de vida restantes) o None"""
+        row = self._run(lambda conn: conn.execute(
+            f"SELECT value, expires_at FROM {self.table} WHERE version = ? AND key = ?",
+            (version, key)).fetchone())
+        if not row:
+            return None
+        remaining = row[1] - time.time()
+        if remaining <= 0:
+            return None
+        return json.loads(row[0]), remaining
+
+    def set(self, version: str, key: str, value: Any, ttl: float) -> None:
+        self._run(lambda conn: conn.execute(
+            f"INSERT OR REPLACE INTO {self.table} (version, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (version, key, json.dumps(value, ensure_ascii=False), time.time() + ttl)))
+
+    def purge(self, keep_version: str, max_rows: int = CLASSIFICATION_STORE_MAX_ROWS) -> int:
+        """Borrar filas de otras versiones, expiradas y las más antiguas sobre max_rows"""
+        def operation(conn):
+            removed = conn.execute(f"DELETE FROM {self.table} WHERE version != ? OR expires_at <= ?",
+                                   (keep_version, time.time())).rowcount
+            removed += conn.execute(
+                f"DELETE FROM {self.table} WHERE rowid IN (SELECT rowid FROM {self.table} "
+                "ORDER BY expires_at DESC LIMIT -1 OFFSET ?)", (max_rows,)).rowcount
+            return removed
+        return self._run(operation, default=0)
+
+    def clear(self) -> None:
+        self._run(lambda conn: conn.execute(f"DELETE FROM {self.table}"))
+
+    def count(self, version: str) -> int:
+        row = self._run(lambda conn: conn.execute(
+            f"SELECT COUNT(*) FROM {self.table} WHERE version = ?", (version,)).fetchone())
+        return row[0] if row else 0
+
+
+class ClassificationCache(AdvancedCache):
+    """
+    Cache de clasificaciones (pregunta normalizada → categoría).
+
+    LRU con TTL en memoria protegido por lock, más un almacén SQLite opcional
+    compartido entre workers: un miss local se busca allí y, si existe, se promueve
+    al LRU local. Las entradas quedan asociadas a la versión de las tablas de patrones
+    (`set_version_source`); cuando cambia, el cache local se descarta y las filas
+    compartidas de otras versiones dejan de leerse y se purgan.
+    """
+
+    def __init__(self, max_size: int = 2000, default_ttl: int = 3600,
+                 shared_path: Optional[str] = None,
+                 version_check_seconds: float = CLASSIFICATION_CACHE_VERSION_CHECK_SECONDS):
+        super().__init__(max_size=max_size, default_ttl=default_ttl)
+        self._lock = threading.RLock()
+        self.store = SharedClassificationStore(shared_path) if shared_path else None
+        self.version_check_seconds = version_check_seconds
+        self._version_source: Callable[[], str] = lambda: ''
+        self._version = None
+        self._version_checked_at = 0.0
+        self._shared_hits = 0
+        self._invalidations = 0
+        self._sets_since_purge = 0
+
+    def set_version_source(self, version_source: Callable[[], str]) -> None:
+        """Función que entrega la huella de las tablas de patrones usadas para clasificar"""
+        with self._lock:
+            self._version_source = version_source
+            self._version_checked_at = 0.0
+
+    def _current_version(self) -> str:
+        now = time.time()
+        if self._version is not None and now - self._version_checked_at < self.version_check_seconds:
+            return self._version
+        self._version_checked_at = now
+        version = str(self._version_source())
+        if version != self._version:
+            if self._version is not None:
+                self._invalidations += 1
+                logger.info(f"🧹 Cache de clasificación invalidado: tablas de patrones {self._version} → {version}")
+            self._cache.clear()
+            self._version = version
+            if self.store is not None:
+                self.store.purge(version)
+        return version
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            version = self._current_version()
+            value = super().get(key)
+            if value is not None or self.store is None:
+                return value
+        shared = self.store.get(version, key)
+        if shared is None:
+            return None
+        value, remaining = shared
+        with self._lock:
+            if version == self._version:
+                self._shared_hits += 1
+                super().set(key, value, ttl=remaining)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            version = self._current_version()
+            super().set(key, value, ttl)
+            self._sets_since_purge += 1
+            purge = self._sets_since_purge >= CLASSIFICATION_STORE_PURGE_EVERY
+            if purge:
+                self._sets_since_purge = 0
+        if self.store is not None:
+            self.store.set(version, key, value, ttl)
+            if purge:
+                self.store.purge(version)
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return super().delete(key)
+
+    def clear(self) -> None:
+        """Limpia el LRU local y el almacén compartido (todos los workers)"""
+        with self._lock:
+            super().clear()
+        if self.store is not None:
+            self.store.clear()
+
+    def cleanup_expired(self) -> int:
+        with self._lock:
+            return super().cleanup_expired()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = super().get_stats()
+            # Los hits del almacén compartido son misses del LRU local
+            stats['local_hits'] = self._hits
+            stats['shared_hits'] = self._shared_hits
+            stats['misses'] = self._misses - self._shared_hits
+            stats['hit_rate'] = (self._hits + self._shared_hits) / max(1, stats['total_requests'])
+            stats['invalidations'] = self._invalidations
+            stats['pattern_version'] = self._version
+            version = self._version
+        stats['shared_store'] = None
+        if self.store is not None:
+            stats['shared_store'] = {
+                'path': self.store.path,
+                'entries': self.store.count(version) if version is not None else 0,
+                'errors': self.store.errors
+            }
+        return stats
+
+
 # Instancias globales de cache para diferentes propósitos
 rag_cache = AdvancedCache(max_size=500, default_ttl=7200)  # 2 horas para RAG
-classification_cache = AdvancedCache(max_size=200, default_ttl=3600)  # 1 hora para clasificación
-response_cache = AdvancedCache(max_size=300, default_ttl=1800)  # 30 minutos para respuestas
+classification_cache = ClassificationCache(
+    max_size=int(os.getenv("CLASSIFICATION_CACHE_MAX_SIZE", "2000")),
+    default_ttl=int(os.getenv("CLASSIFICATION_CACHE_TTL", "3600")),
+    shared_path=CLASSIFICATION_CACHE_DB if CLASSIFICATION_CACHE_SHARED else None
+)  # 1 hora para clasificación, LRU local + SQLite compartido entre workers
+response_cache = VersionedResponseCache(
+    max_size=int(os.getenv("RESPONSE_CACHE_MAX_SIZE", "300")),
+    default_ttl=int(os.getenv("RESPONSE_CACHE_TTL", "1800"))
+)  # 30 minutos para respuestas, invalidado por versión de conocimiento/templates
 
 def get_cache_stats() -> Dict[str, Dict]:
     """Obtener estadísticas de todos los caches"""
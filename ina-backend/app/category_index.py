@@ -0,0 +1,87 @@
+# app/category_index.py - Índice invertido keyword → categoría para TopicClassifier
+import logging
+import time
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+from app.aho_corasick import AhoCorasick
+
+logger = logging.getLogger(__name__)
+
+SHORT_KEYWORD_LENGTH = 3
+
+# (tabla, categoría, idioma) → idioma es None en categorías con lista simple
+Bucket = Tuple[str, str, Optional[str]]
+
+
+def remove_accents(text: str) -> str:
+    """Igual que TopicClassifier._remove_accents: NFD y descartar todo lo que no sea ASCII"""
+    text = unicodedata.normalize('NFD', text)
+    text = text.encode('ascii', 'ignore').decode("utf-8")
+    return text.lower()
+
+
+class CategoryKeywordIndex:
+    """
+    Tablas de keywords de TopicClassifier compiladas en un índice invertido.
+
+    Cada keyword se registra una vez con sus "postings" (tabla, categoría, idioma,
+    posición en la lista original). Una consulta se recorre con dos autómatas
+    Aho-Corasick, con la misma regla que `_flexible_match`:
+
+    - keywords de hasta 3 caracteres: subcadena exacta de la consulta en minúsculas
+    - el resto: subcadena de la consulta sin acentos
+
+    `lookup` entrega, por (tabla, categoría, idioma), las keywords encontradas en el
+    orden de la lista original, así que el resultado es el mismo que recorrer las
+    listas con `_flexible_match`, pero el costo depende del largo de la consulta y no
+    del tamaño del vocabulario.
+    """
+
+    def __init__(self, tables: Dict[str, Dict]):
+        start = time.perf_counter()
+        self._short = AhoCorasick()
+        self._long = AhoCorasick()
+        self._postings: Dict[Tuple[bool, str], List[Tuple[Bucket, int]]] = {}
+        self._terms: Dict[Bucket, List[str]] = {}
+
+        for table_name, categories in tables.items():
+            for category, keywords_data in categories.items():
+                if isinstance(keywords_data, dict):
+                    term_lists = list(keywords_data.items())
+                else:
+                    term_lists = [(None, keywords_data)]
+                for language, terms in term_lists:
+                    bucket = (table_name, category, language)
+                    self._terms[bucket] = list(terms)
+                    for position, term in enumerate(terms):
+                        self._add(bucket, position, term)
+
+        self._short.build()
+        self._long.build()
+        self.build_ms = (time.perf_counter() - start) * 1000
+        self.keywords = len(self._postings)
+        logger.debug(f"Índice de categorías: {self.keywords} keywords en {self.build_ms:.1f}ms")
+
+    def _add(self, bucket: Bucket, position: int, term: str):
+        is_short = len(term) <= SHORT_KEYWORD_LENGTH
+        key = (is_short, term if is_short else remove_accents(term))
+        if key not in self._postings:
+            self._postings[key] = []
+            (self._short if is_short else self._long).add(key[1], key)
+        self._postings[key].append((bucket, position))
+
+    def lookup(self, question_lower: str) -> Dict[Bucket, List[str]]:
+        """{(tabla, categoría, idioma): [keywords encontradas, en el orden de la tabla]}"""
+        found = self._short.find_values(question_lower)
+        found |= self._long.find_values(remove_accents(question_lower))
+
+        positions: Dict[Bucket, List[int]] = {}
+        for key in found:
+            for bucket, position in self._postings[key]:
+                positions.setdefault(bucket, []).append(position)
+
+        return {
+            bucket: [self._terms[bucket][position] for position in sorted(hits)]
+            for bucket, hits in positions.items()
+        }
@@ -0,0 +1,312 @@
+# app/centroid_classifier.py - Clasificador de categoría por centroides de embeddings (fallback rápido)
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.knowledge_version import get_knowledge_version
+
+logger = logging.getLogger(__name__)
+
+FAQS_PATH = os.getenv(
+    "CENTROID_FAQS_PATH",
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'json', 'faqs_structured.json')
+)
+CENTROID_CLASSIFIER_ENABLED = os.getenv("CENTROID_CLASSIFIER_ENABLED", "1") == "1"
+# Hasta N centroides por categoría (k-means esférico); uno por cada CENTROID_SAMPLES_PER_CLUSTER ejemplos
+CENTROID_MAX_PER_CATEGORY = int(os.getenv("CENTROID_MAX_PER_CATEGORY", "4"))
+CENTROID_SAMPLES_PER_CLUSTER = int(os.getenv("CENTROID_SAMPLES_PER_CLUSTER", "12"))
+# Softmax sobre la mejor similitud de cada categoría; se confía si p >= MIN_CONFIDENCE y sim >= MIN_SIMILARITY
+CENTROID_TEMPERATURE = float(os.getenv("CENTROID_TEMPERATURE", "0.05"))
+CENTROID_MIN_CONFIDENCE = float(os.getenv("CENTROID_MIN_CONFIDENCE", "0.75"))
+CENTROID_MIN_SIMILARITY = float(os.getenv("CENTROID_MIN_SIMILARITY", "0.35"))
+
+# Categorías de QuestionClassifier
+CATEGORIES = (
+    "academico", "asuntos_estudiantiles", "desarrollo_profesional", "bienestar_estudiantil",
+    "deportes", "pastoral", "institucionales", "punto_estudiantil",
+)
+# Etiquetas de chunks/FAQs ('category' o 'departamento') → categoría del clasificador.
+# Las que no aparecen aquí (p.ej. 'general') no forman centroides.
+CATEGORY_ALIASES = {
+    "tne": "asuntos_estudiantiles",
+    "certificados": "asuntos_estudiantiles",
+    "becas": "asuntos_estudiantiles",
+    "beneficios": "asuntos_estudiantiles",
+    "matricula": "asuntos_estudiantiles",
+    "gratuidad": "asuntos_estudiantiles",
+    "financiamiento": "asuntos_estudiantiles",
+    "seguro": "asuntos_estudiantiles",
+    "registro_academico": "academico",
+    "titulacion": "academico",
+    "bienestar": "bienestar_estudiantil",
+    "salud_mental": "bienestar_estudiantil",
+    "deporte": "deportes",
+    "deportes_recreacion": "deportes",
+    "desarrollo_laboral": "desarrollo_profesional",
+    "practicas": "desarrollo_profesional",
+    "empleo": "desarrollo_profesional",
+    "biblioteca": "institucionales",
+    "servicios_digitales": "institucionales",
+    "contactos": "punto_estudiantil",
+}
+
+
+def resolve_category(metadata: Dict) -> Optional[str]:
+    """Categoría del clasificador para un chunk/FAQ: 'departamento' primero, luego 'category'/'categoria'"""
+    for field in ('departamento', 'category', 'categoria'):
+        label = str(metadata.get(field) or '').strip().lower()
+        if label in CATEGORIES:
+            return label
+        if label in CATEGORY_ALIASES:
+            return CATEGORY_ALIASES[label]
+    return None
+
+
+def load_faq_questions(path: str = FAQS_PATH) -> List[Tuple[str, Dict]]:
+    """(pregunta, faq) de faqs_structured.json"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️ FAQs para centroides no disponibles ({path}): {e}")
+        return []
+    questions = []
+    for category in (data.get('categorias') or {}).values():
+        for faq in category.get('faqs', []):
+            if faq.get('pregunta'):
+                questions.append((faq['pregunta'], faq))
+    return questions
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = 10) -> np.ndarray:
+    """Centroides unitarios de `vectors` (ya normalizados); inicialización determinista por punto más lejano"""
+    if k <= 1 or len(vectors) <= k:
+        return _normalize_rows(vectors.mean(axis=0, keepdims=True))
+
+    centroids = [vectors[0]]
+    closest = vectors @ vectors[0]
+    for _ in range(1, k):
+        centroids.append(vectors[int(np.argmin(closest))])
+        closest = np.maximum(closest, vectors @ centroids[-1])
+    centroids = np.vstack(centroids)
+
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        updated = np.vstack([
+            vectors[assignment == cluster].mean(axis=0) if np.any(assignment == cluster) else centroids[cluster]
+            for cluster in range(k)
+        ])
+        updated = _normalize_rows(updated)
+        if np.allclose(updated, centroids, atol=1e-5):
+            break
+        centroids = updated
+    return centroids
+
+
+class CentroidClassifier:
+    """
+    Clasificador de categoría por vecino más cercano a centroides de embeddings.
+
+    Los centroides se calculan (uno o más por categoría) desde los embeddings ya
+    guardados en duoc_knowledge, usando la metadata 'departamento'/'category' de cada
+    chunk, más las preguntas de faqs_structured.json. Quedan en una matriz pequeña
+    (centroides × dimensión), así que clasificar es un producto punto con el embedding
+    de la consulta que ya se calculó para la búsqueda vectorial.
+
+    La confianza es la probabilidad softmax de la mejor categoría; `confident` indica
+    si alcanza para saltarse la cadena de reglas de QuestionClassifier. Se reconstruye
+    en segundo plano cuando cambia la versión de conocimiento.
+    """
+
+    def __init__(self, temperature: float = CENTROID_TEMPERATURE,
+                 min_confidence: float = CENTROID_MIN_CONFIDENCE,
+                 min_similarity: float = CENTROID_MIN_SIMILARITY,
+                 max_per_category: int = CENTROID_MAX_PER_CATEGORY,
+                 samples_per_cluster: int = CENTROID_SAMPLES_PER_CLUSTER):
+        self.temperature = temperature
+        self.min_confidence = min_confidence
+        self.min_similarity = min_similarity
+        self.max_per_category = max_per_category
+        self.samples_per_cluster = samples_per_cluster
+        self._centroids: Optional[np.ndarray] = None
+        self._centroid_labels: np.ndarray = np.array([], dtype=np.int64)
+        self._categories: Tuple[str, ...] = ()
+        self._version = None
+        self._building = False
+        self._lock = threading.Lock()
+        self.build_info: Dict = {}
+        self.stats = {'classifications': 0, 'confident': 0, 'builds': 0, 'build_errors': 0}
+
+    # ------------------------------------------------------------------ construcción
+
+    def build(self, vectors: Sequence, categories: Sequence[str], version=None) -> Dict:
+        """Calcula los centroides desde vectores etiquetados (sin etiqueta = ignorado)"""
+        start = time.perf_counter()
+        groups: Dict[str, List[int]] = defaultdict(list)
+        for row, category in enumerate(categories):
+            if category:
+                groups[category].append(row)
+
+        matrix = _normalize_rows(np.asarray(vectors, dtype=np.float32).reshape(len(categories), -1)) \
+            if len(categories) else np.zeros((0, 0), dtype=np.float32)
+        labels = tuple(sorted(groups))
+        blocks, owners = [], []
+        for index, category in enumerate(labels):
+            rows = matrix[groups[category]]
+            k = max(1, min(self.max_per_category, len(rows) // max(1, self.samples_per_cluster)))
+            centroids = spherical_kmeans(rows, k)
+            blocks.append(centroids)
+            owners.extend([index] * len(centroids))
+
+        with self._lock:
+            self._centroids = np.vstack(blocks).astype(np.float32) if blocks else None
+            self._centroid_labels = np.asarray(owners, dtype=np.int64)
+            self._categories = labels
+            self._version = version
+            self.stats['builds'] += 1
+            self.build_info = {
+                'samples': {category: len(rows) for category, rows in groups.items()},
+                'centroids': len(owners),
+                'dimension': int(matrix.shape[1]) if matrix.size else 0,
+                'knowledge_version': version,
+                'build_ms': round((time.perf_counter() - start) * 1000, 2)
+            }
+        logger.info(f"✅ Centroides de categoría: {len(owners)} para {len(labels)} categorías "
+                    f"({sum(len(rows) for rows in groups.values())} ejemplos)")
+        return self.build_info
+
+    def build_from_collection(self, collection, faqs_path: str = FAQS_PATH, page_size: int = 1000) -> Dict:
+        """Centroides desde los embeddings de la colección + preguntas FAQ (con la función de la colección)"""
+        version = get_knowledge_version()
+        vectors: List = []
+        categories: List[Optional[str]] = []
+
+        offset = 0
+        while True:
+            page = collection.get(limit=page_size, offset=offset, include=['embeddings', 'metadatas'])
+            page_ids = page.get('ids') or []
+            if not page_ids:
+                break
+            embeddings = page.get('embeddings')
+            metadatas = page.get('metadatas') or [{}] * len(page_ids)
+            if embeddings is not None:
+                vectors.extend(embeddings)
+                categories.extend(resolve_category(metadata or {}) for metadata in metadatas)
+            offset += len(page_ids)
+            if len(page_ids) < page_size:
+                break
+
+        embedding_function = getattr(collection, '_embedding_function', None)
+        faqs = load_faq_questions(faqs_path)
+        if faqs and embedding_function is not None:
+            try:
+                faq_vectors = embedding_function([question for question, _ in faqs])
+                vectors.extend(faq_vectors)
+                categories.extend(resolve_category(faq) for _, faq in faqs)
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudieron codificar las FAQs para centroides: {e}")
+
+        return self.build(vectors, categories, version=version)
+
+    def is_current(self) -> bool:
+        return self._centroids is not None and self._version == get_knowledge_version()
+
+    def ensure_fresh(self, collection, background: bool = True) -> bool:
+        """
+        True si hay centroides para clasificar. Si no existen o la versión de conocimiento
+        cambió, se (re)construyen en segundo plano; mientras tanto se usan los anteriores.
+        """
+        if not CENTROID_CLASSIFIER_ENABLED or collection is None:
+            return False
+        if self.is_current():
+            return True
+        with self._lock:
+            if self._building:
+                return self._centroids is not None
+            self._building = True
+
+        def run():
+            try:
+                self.build_from_collection(collection)
+            except Exception as e:
+                self.stats['build_errors'] += 1
+                logger.warning(f"⚠️ Error construyendo centroides de categoría: {e}")
+            finally:
+                with self._lock:
+                    self._building = False
+
+        if background:
+            threading.Thread(target=run, name="centroid-classifier-build", daemon=True).start()
+        else:
+            run()
+        return self._centroids is not None
+
+    # ------------------------------------------------------------------ clasificación
+
+    def classify(self, query_embedding) -> Optional[Dict]:
+        """
+        Categoría más cercana al embedding de la consulta, o None si no hay centroides
+        (o la dimensión no coincide con la de la colección).
+        """
+        with self._lock:
+            centroids, owners, categories = self._centroids, self._centroid_labels, self._categories
+        if centroids is None or query_embedding is None:
+            return None
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        if query.shape[0] != centroids.shape[1]:
+            return None
+        norm = float(np.linalg.norm(query))
+        if norm == 0:
+            return None
+
+        similarities = centroids @ (query / norm)
+        best_by_category = np.full(len(categories), -1.0, dtype=np.float32)
+        np.maximum.at(best_by_category, owners, similarities)
+
+        logits = (best_by_category - best_by_category.max()) / self.temperature
+        probabilities = np.exp(logits)
+        probabilities /= probabilities.sum()
+        ranking = np.argsort(-best_by_category)
+        best = int(ranking[0])
+        second = int(ranking[1]) if len(ranking) > 1 else None
+
+        confidence = float(probabilities[best])
+        similarity = float(best_by_category[best])
+        confident = confidence >= self.min_confidence and similarity >= self.min_similarity
+        self.stats['classifications'] += 1
+        if confident:
+            self.stats['confident'] += 1
+        return {
+            'category': categories[best],
+            'confidence': round(confidence, 3),
+            'similarity': round(similarity, 3),
+            'second_category': categories[second] if second is not None else None,
+            'margin': round(similarity - float(best_by_category[second]), 3) if second is not None else None,
+            'confident': confident
+        }
+
+    def get_stats(self) -> Dict:
+        total = self.stats['classifications']
+        return {
+            **self.stats,
+            'confident_rate': round(self.stats['confident'] / total, 3) if total else 0.0,
+            'ready': self._centroids is not None,
+            'current': self.is_current(),
+            **self.build_info
+        }
+
+
+# Instancia global
+centroid_classifier = CentroidClassifier()
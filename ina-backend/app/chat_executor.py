@@ -0,0 +1,223 @@
+# app/chat_executor.py - Capa de ejecución del pipeline de chat (pool dedicado + admisión acotada)
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _default_workers() -> int:
+    """Tamaño del pool según el host: un worker por núcleo, acotado para no saturar Ollama"""
+    cpus = os.cpu_count() or 2
+    return max(2, min(8, cpus))
+
+
+class ChatQueueFullError(Exception):
+    """La cola de admisión del chat está llena; el cliente debe reintentar más tarde"""
+
+    def __init__(self, retry_after: int, queued: int):
+        self.retry_after = retry_after
+        self.queued = queued
+        super().__init__(f"Cola de chat llena ({queued} en espera), reintentar en {retry_after}s")
+
+
+class ChatExecutor:
+    """
+    Ejecuta el pipeline RAG (encodes, ChromaDB, Ollama, commits SQLModel) fuera del event loop.
+
+    - Pool de threads dedicado, dimensionado según el host (CHAT_WORKERS)
+    - Cola de admisión acotada (CHAT_QUEUE_DEPTH): si se llena se rechaza de inmediato
+      con ChatQueueFullError para que la API responda 503 + Retry-After
+    - Métricas de profundidad de cola, tiempo de espera y tiempo de ejecución
+
+    `fast_chat_executor` es un segundo carril para las consultas que se resuelven sin
+    Ollama (templates, respuestas cacheadas): no esperan detrás de las generaciones.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_queue: Optional[int] = None,
+                 retry_after: Optional[int] = None, name: str = "chat"):
+        self.name = name
+        self.max_workers = max_workers or int(os.getenv("CHAT_WORKERS", "0")) or _default_workers()
+        if max_queue is None:
+            max_queue = int(os.getenv("CHAT_QUEUE_DEPTH", str(self.max_workers * 4)))
+        self.max_queue = max(0, max_queue)
+        self.default_retry_after = retry_after or int(os.getenv("CHAT_RETRY_AFTER", "5"))
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix=f"{name}-worker")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._max_queued_seen = 0
+
+        # Ventanas deslizantes para percentiles (segundos)
+        self._wait_times = deque(maxlen=500)
+        self._run_times = deque(maxlen=500)
+
+        self._counters = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'rejected': 0,
+            'cancelled': 0
+        }
+
+        logger.info(f"✅ ChatExecutor '{name}' inicializado - Workers: {self.max_workers}, Cola máxima: {self.max_queue}")
+
+    # ------------------------------------------------------------------
+    # Admisión
+    # ------------------------------------------------------------------
+    def _estimate_retry_after(self) -> int:
+        """Estimar cuántos segundos tardará en liberarse un puesto en la cola"""
+        if not self._run_times:
+            return self.default_retry_after
+        avg_run = sum(self._run_times) / len(self._run_times)
+        backlog = (self._queued + self._running) / max(1, self.max_workers)
+        return int(min(60, max(1, round(avg_run * backlog))))
+
+    def _admit(self):
+        with self._lock:
+            if self._queued + self._running >= self.max_workers + self.max_queue:
+                self._counters['rejected'] += 1
+                raise ChatQueueFullError(self._estimate_retry_after(), self._queued)
+            self._queued += 1
+            self._counters['submitted'] += 1
+            self._max_queued_seen = max(self._max_queued_seen, self._queued)
+
+    def _start(self, enqueued_at: float, cancelled: threading.Event) -> bool:
+        """Marcar el inicio de la tarea en el worker. Retorna False si el cliente ya se fue."""
+        with self._lock:
+            self._queued -= 1
+            if cancelled.is_set():
+                self._counters['cancelled'] += 1
+                return False
+            self._running += 1
+            self._wait_times.append(time.perf_counter() - enqueued_at)
+            return True
+
+    def _finish(self, started_at: float, ok: bool):
+        with self._lock:
+            self._running -= 1
+            self._run_times.append(time.perf_counter() - started_at)
+            self._counters['completed' if ok else 'failed'] += 1
+
+    def _invoke(self, enqueued_at: float, cancelled: threading.Event,
+                func: Callable, args: tuple, kwargs: dict) -> Any:
+        if not self._start(enqueued_at, cancelled):
+            return None
+
+        started_at = time.perf_counter()
+        ok = False
+        try:
+            result = func(*args, **kwargs)
+            ok = True
+            return result
+        finally:
+            self._finish(started_at, ok)
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Ejecutar una función bloqueante en el pool del chat respetando la cola de admisión"""
+        self._admit()
+        enqueued_at = time.perf_counter()
+        cancelled = threading.Event()
+        loop = asyncio.get_running_loop()
+
+        try:
+            return await loop.run_in_executor(
+                self._executor, self._invoke, enqueued_at, cancelled, func, args, kwargs
+            )
+        except asyncio.CancelledError:
+            # El cliente se desconectó: si la tarea aún no empezó, no se ejecutará
+            cancelled.set()
+            raise
+
+    def stream(self, func: Callable, *args, **kwargs) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Ejecutar `func(*args, emit=..., **kwargs)` en el pool y reenviar sus frames al event loop.
+
+        La admisión ocurre al llamar (puede lanzar ChatQueueFullError antes de abrir la respuesta).
+        El iterador entrega tuplas ('frame', dato) por cada emit y termina con ('result', valor).
+        """
+        self._admit()
+        enqueued_at = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+
+        def emit(frame: Any):
+            if not cancelled.is_set():
+                loop.call_soon_threadsafe(queue.put_nowait, ('frame', frame))
+
+        # Se encola de inmediato para que la admisión siempre tenga su tarea asociada
+        future = loop.run_in_executor(
+            self._executor, self._invoke, enqueued_at, cancelled, func, args, {**kwargs, 'emit': emit}
+        )
+        future.add_done_callback(lambda _: queue.put_nowait(('done', None)))
+        return self._stream_frames(queue, future, cancelled)
+
+    async def _stream_frames(self, queue: asyncio.Queue, future: asyncio.Future,
+                             cancelled: threading.Event) -> AsyncIterator[Tuple[str, Any]]:
+        try:
+            while True:
+                kind, payload = await queue.get()
+                if kind == 'done':
+                    break
+                yield kind, payload
+            yield 'result', future.result()
+        finally:
+            # Cliente desconectado: dejar de encolar frames (la tarea termina por su cuenta)
+            cancelled.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Profundidad de cola y tiempos de espera/ejecución (ms)"""
+        with self._lock:
+            wait_times = sorted(self._wait_times)
+            run_times = sorted(self._run_times)
+            stats = {
+                'workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'queue_depth': self._queued,
+                'in_flight': self._running,
+                'max_queue_depth_seen': self._max_queued_seen,
+                **self._counters
+            }
+
+        stats['wait_time_ms'] = _summarize(wait_times)
+        stats['run_time_ms'] = _summarize(run_times)
+        return stats
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        logger.info(f"🧹 ChatExecutor '{self.name}' detenido")
+
+
+def _summarize(sorted_samples) -> Dict[str, float]:
+    """Resumen (avg/p50/p95/max en ms) de una lista ya ordenada de segundos"""
+    if not sorted_samples:
+        return {'avg': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0, 'samples': 0}
+    n = len(sorted_samples)
+    return {
+        'avg': round(sum(sorted_samples) / n * 1000, 2),
+        'p50': round(sorted_samples[n // 2] * 1000, 2),
+        'p95': round(sorted_samples[min(n - 1, int(n * 0.95))] * 1000, 2),
+        'max': round(sorted_samples[-1] * 1000, 2),
+        'samples': n
+    }
+
+
+# Instancia global
+chat_executor = ChatExecutor()
+# Carril rápido: templates y respuestas cacheadas no esperan detrás de las generaciones
+fast_chat_executor = ChatExecutor(
+    max_workers=int(os.getenv("CHAT_FAST_WORKERS", "2")),
+    max_queue=int(os.getenv("CHAT_FAST_QUEUE_DEPTH", "16")),
+    name="chat-fast"
+)
@@ -7,6 +7,8 @@ import shutil
 import logging
 from pathlib import Path
 
+from app.knowledge_version import bump_knowledge_version
+
 logger = logging.getLogger(__name__)
 
 def auto_fix_chromadb():
@@ -30,6 +32,7 @@ def auto_fix_chromadb():
                 shutil.copytree(chroma_path, backup_path)
                 # Remover corrupto
                 shutil.rmtree(chroma_path)
+                bump_knowledge_version('auto_fix_chromadb')
                 logger.info("✅ ChromaDB reparado automáticamente")
                 return True
             except Exception as e:
@@ -108,6 +111,8 @@ def safe_chromadb_init():
                     except:
                         pass
             
+            bump_knowledge_version('safe_chromadb_init')
+
             # Reintentar con directorio limpio
             client = chromadb.PersistentClient(
                 path="./chroma_db",
@@ -5,12 +5,28 @@ import logging
 import re
 from sqlmodel import Session
 from app.models import engine
-from app.cache_manager import normalize_question
+import hashlib
+import json
+from app.cache_manager import normalize_question, classification_cache, ClassificationCache
+from app.knowledge_version import get_knowledge_version
+from app.template_matcher import template_matcher
+from app.centroid_classifier import centroid_classifier
 
 logger = logging.getLogger(__name__)
 
+_topic_classifier = None
+
+
+def _get_topic_classifier():
+    """TopicClassifier compartido (construir sus tablas en cada clasificación era lo más caro)"""
+    global _topic_classifier
+    if _topic_classifier is None:
+        from app.topic_classifier import TopicClassifier
+        _topic_classifier = TopicClassifier()
+    return _topic_classifier
+
 class QuestionClassifier:
-    def __init__(self):
+    def __init__(self, cache: Optional[ClassificationCache] = None):
         # Categorías alineadas con el nuevo sistema de filtros
         self.categories = [
             "academico",  # 🔥 NUEVO: titulación, SCT, convalidación, requisitos
@@ -338,9 +354,9 @@ class QuestionClassifier:
             ]
         }
         
-        # Cache SEMÁNTICO
-        self._semantic_cache = {}
-        self._cache_size = 200
+        # Cache SEMÁNTICO: LRU compartido entre workers, invalidado cuando cambian las tablas de patrones
+        self._semantic_cache = cache if cache is not None else classification_cache
+        self._semantic_cache.set_version_source(self._pattern_tables_version)
         
         # Estadísticas de uso
         self.stats = {
@@ -350,7 +366,8 @@ class QuestionClassifier:
             'cache_hits': 0,
             'semantic_cache_hits': 0,
             'category_counts': {category: 0 for category in self.categories},
-            'template_matches': 0
+            'template_matches': 0,
+            'centroid_matches': 0
         }
     
     def _clean_question(self, question: str) -> str:
@@ -358,1343 +375,28 @@ class QuestionClassifier:
         return question.lower().strip()
     
     def detect_template_match(self, question: str) -> Optional[str]:
-        """DETECCIÓN INTELIGENTE DE TEMPLATES EXPANDIDA CON TODOS LOS NUEVOS"""
-        question_lower = self._clean_question(question)
-        
-        print(f"\n🔍 BUSCANDO TEMPLATE...")
-        print(f"   📝 Consulta normalizada: '{question_lower}'")
-        logger.info(f"🔍 Template detection iniciada para: '{question}'")
-        
-        # DETECCIÓN PRIORITARIA PARA TEMPLATES CRÍTICOS (MULTIIDIOMA)
-        priority_templates = {
-            # TNE TEMPLATES - ORDEN CRÍTICO: Más específico primero
-            "tne_reposicion_perdida_danada": [
-                r'tne.*(pierde|p[ée]rdida|da[ñn]ada)', r'tne.*(se.*pierde|esta.*da[ñn]ada)',  # español
-                r'(saco|obtener|sacar).*tne.*(pierde|perdida|da[ñn]ada)', r'tne.*si.*(pierde|esta.*da[ñn]ada)',
-                r'lost.*tne', r'damaged.*tne', r'tne.*(lost|damaged)',  # inglés
-                r"if.*tne.*(lost|damaged)", r"tne.*if.*it's.*(lost|damaged)", r"get.*tne.*(lost|damaged)",
-                r'tne.*(perdue|endommagée)', r'si.*tne.*(perdue|endommagée)',  # francés
-                r'obtenir.*tne.*(perdue|endommagée)', r'tne.*si.*elle.*est.*(perdue|endommagée)'
-            ],
-            "tne_primera_vez": [
-                r'c[óo]mo.*saco.*tne(?!.*(pierde|perdida|da[ñn]ada))', r'obtener.*tne(?!.*(pierde|perdida))', r'sacar.*tne(?!.*(pierde|perdida))',  # español
-                r'how.*do.*i.*get.*tne(?!.*(lost|damaged))', r'how.*to.*get.*tne(?!.*(lost|damaged))', r'obtain.*tne(?!.*(lost|damaged))',  # inglés
-                r'get.*my.*tne(?!.*(lost|damaged))', r'how.*get.*student.*card', r'how.*obtain.*student.*card',
-                r'comment.*obtenir.*tne(?!.*(perdue|endommagée))', r'comment.*avoir.*tne', r'obtenir.*ma.*tne(?!.*(perdue|endommagée))',  # francés
-            ],
-            "tne_seguimiento": [
-                r'c[óo]mo.*revalido.*tne', r'renovar.*tne', r'seguimiento.*tne',  # español
-                r'revalidar.*tne', r'c[óo]mo.*renuevo.*tne',  # español adicional
-                r'how.*do.*i.*renew.*tne', r'how.*renew.*my.*tne', r'tne.*renewal',  # inglés
-                r'revalidate.*tne', r'how.*to.*renew.*student.*card', r'renew.*tne',  # inglés adicional
-                r'comment.*renouveler.*tne', r'renouveler.*ma.*tne', r'revalidation.*tne',  # francés
-                r'comment.*renouveler.*ma.*tne'  # francés adicional
-            ],
-            
-            # PROGRAMA EMERGENCIA - MULTIIDIOMA EXPANDIDO
-            "programa_emergencia_requisitos": [
-                r'requisitos.*programa.*emergencia', r'requisitos.*emergencia',  # español
-                r'cu[aá]les.*requisitos.*emergencia', r'condiciones.*emergencia',  # español adicional
-                r'emergency.*program.*requirements', r'requirements.*emergency.*program',  # inglés
-                r'what.*requirements.*emergency', r'apply.*emergency.*program',  # inglés adicional
-                r'requirements.*to.*apply.*emergency', r'what.*are.*the.*requirements.*emergency',  # inglés adicional
-                r'conditions.*programme.*urgence', r'requisitos.*programme.*urgence',  # francés
-                r'conditions.*postuler.*urgence', r'quelles.*conditions', r'quelles.*sont.*conditions'  # francés adicional
-            ],
-            "programa_emergencia_categorias": [
-                r'categor[íi]as.*emergencia', r'categor[íi]as.*postulaci[óo]n.*emergencia',  # español
-                r'cu[aá]les.*categor[íi]as.*emergencia',  # español adicional
-                r'emergency.*program.*categories', r'application.*categories.*emergency',  # inglés
-                r'what.*are.*categories.*emergency', r'categories.*for.*emergency',  # inglés adicional
-                r'catégories.*programme.*urgence', r'catégories.*postulation.*urgence',  # francés
-                r'quelles.*sont.*catégories', r'catégories.*d.*urgence'  # francés adicional
-            ],
-            "programa_emergencia_plazos": [
-                r'cu[aá]ndo.*postular.*emergencia', r'plazo.*emergencia', r'cu[aá]ndo.*puedo.*postular',  # español
-                r'when.*apply.*emergency', r'when.*can.*i.*apply.*emergency',  # inglés
-                r'emergency.*program.*deadline', r'deadline.*emergency',  # inglés adicional
-                r'quand.*puis.*je.*postuler.*urgence', r'délai.*urgence',  # francés
-                r'quand.*postuler.*programme.*urgence'  # francés adicional
-            ],
-            
-            # PROGRAMAS DE APOYO - MULTIIDIOMA
-            "programas_apoyo_estudiante": [
-                r'programas.*apoyo.*estudiante', r'información.*apoyo', r'apoyo.*al.*estudiante',  # español
-                r'c[óo]mo.*obtener.*informaci[óo]n.*apoyo',  # español adicional
-                r'student.*support.*programs', r'information.*student.*support',  # inglés
-                r'how.*get.*information.*support', r'support.*programs.*information',  # inglés adicional
-                r'how.*can.*i.*get.*information.*support',  # inglés adicional
-                r'programmes.*soutien.*étudiants', r'informations.*programmes.*soutien',  # francés
-                r'comment.*obtenir.*informations.*soutien', r'soutien.*aux.*étudiants',  # francés adicional
-                r'comment.*puis.*je.*obtenir.*informations'  # francés adicional
-            ],
-            
-            # SEGURO - MULTIIDIOMA EXPANDIDO  
-            "seguro_cobertura": [
-                r'c[óo]mo.*funciona.*seguro', r'seguro.*estudiantil', r'cobertura.*seguro',  # español
-                r'funciona.*el.*seguro', r'seguro.*estudiantil.*funciona',  # español adicional
-                r'how.*insurance.*work', r'how.*does.*insurance.*work', r'student.*insurance',  # inglés
-                r'insurance.*coverage', r'does.*insurance.*work', r'how.*does.*the.*insurance.*work',  # inglés adicional
-                r'comment.*assurance.*fonctionne', r'comment.*fonctionne.*assurance',  # francés
-                r'comment.*fonctionne.*l.*assurance', r'assurance.*étudiante',  # francés adicional
-                r'couverture.*assurance'  # francés adicional
-            ]
-        }
-
-        for template_id, patterns in priority_templates.items():
-            for pattern in patterns:
-                if re.search(pattern, question_lower):
-                    print(f"   ✅ TEMPLATE ENCONTRADO: '{template_id}'")
-                    print(f"   🎯 Patrón coincidente: {pattern[:50]}...")
-                    logger.info(f"✅ PRIORITY TEMPLATE: '{question}' -> {template_id}")
-                    return template_id
-        
-        # PATRONES ESPECÍFICOS PARA TEMPLATES - COMPLETAMENTE EXPANDIDOS
-        template_patterns = {
-            # TEMPLATES BIENESTAR ESTUDIANTIL - MULTIIDIOMA
-            "apoyos_salud_mental": [
-                # ESPAÑOL
-                r'qué.*apoyos.*salud.*mental', r'apoyos.*salud.*mental.*existen',
-                r'servicios.*salud.*mental.*duoc', r'qué.*servicios.*salud.*mental',
-                r'recursos.*salud.*mental.*duoc', r'qué.*ofrece.*duoc.*salud.*mental',
-                r'apoyo.*psicológico.*disponible', r'qué.*hay.*para.*salud.*mental',
-                # INGLÉS
-                r'what.*mental.*health.*supports?.*exist', r'mental.*health.*supports?.*exist',
-                r'what.*mental.*health.*services', r'mental.*health.*services.*available',
-                r'what.*does.*duoc.*offer.*mental.*health', r'psychological.*support.*available',
-                r'what.*is.*available.*mental.*health',
-                # FRANCÉS  
-                r'quels.*soutiens.*santé.*mentale', r'soutiens.*santé.*mentale.*existent',
-                r'quels.*services.*santé.*mentale', r'services.*santé.*mentale.*disponibles',
-                r'que.*offre.*duoc.*santé.*mentale', r'soutien.*psychologique.*disponible'
-            ],
-            "atencion_presencial_psicologica": [
-                # ESPAÑOL
-                r'atención.*psicológica.*presencial', r'psicólogo.*presencial',
-                r'existe.*atención.*presencial', r'hay.*psicólogo.*presencial',
-                r'consultorio.*psicológico', r'atención.*en.*persona',
-                # INGLÉS
-                r'in-person.*psychological.*care', r'psychological.*care.*in.*person',
-                r'is.*there.*in-person.*psychological', r'face.*to.*face.*psychological',
-                r'on-site.*psychological.*care',
-                # FRANCÉS - EXPANDIDO
-                r'existe.*t.*il.*soins.*psychologiques.*présentiel', r'soins.*psychologiques.*présentiel',
-                r'existe.*soins.*présentiel', r'psychologue.*en.*personne', r'soins.*en.*personne',
-                r'existe.*t.*il.*des.*soins', r'des.*soins.*psychologiques.*en.*présentiel',
-                r'soins.*psychologiques.*en.*présentiel', r'psychologue.*présentiel'
-            ],
-            # NUEVO TEMPLATE PARA APOYO A COMPAÑEROS
-            # NUEVO TEMPLATE PARA APOYO DISCAPACIDAD
-            "apoyo_discapacidad": [
-                # ESPAÑOL
-                r'apoyo.*estudiantes.*discapacidad', r'paedis', r'estudiantes.*situación.*handicap',
-                r'programa.*acompañamiento.*estudiantes.*discapacidad',
-                # INGLÉS
-                r'support.*students.*disability', r'disabled.*students.*support',
-                # FRANCÉS
-                r'existe.*t.*il.*un.*soutien.*pour.*les.*étudiants.*handicapés',
-                r'soutien.*pour.*les.*étudiants.*handicapés',
-                r'soutien.*pour.*étudiants.*handicapés',
-                r'existe.*t.*il.*un.*soutien.*pour.*les.*étudiants',
-                r'un.*soutien.*pour.*les.*étudiants.*handicapés',
-                r'aide.*pour.*étudiants.*handicapés'
-            ],
-            
-            # ===== TEMPLATES INSTITUCIONALES 2025 =====
-            "wifi": [
-                r'c[óo]mo.*conect.*wifi', r'wifi.*duoc', r'red.*duoc.*acad',
-                r'conectar.*wifi', r'acceso.*wifi', r'problemas.*wifi',
-                r'no.*puedo.*conectar.*wifi', r'how.*connect.*wifi',
-                r'wifi.*connection', r'wifi.*access'
-            ],
-            "eventos_anuales": [
-                r'eventos.*duoc.*202[5-6]', r'calendario.*eventos', r'actividades.*año',
-                r'qué.*eventos.*hay', r'eventos.*anuales', r'agenda.*eventos',
-                r'events.*202[5-6]', r'annual.*events', r'calendar.*events'
-            ],
-            "examenes": [
-                r'cu[aá]ndo.*ex[aá]menes.*202[5-6]', r'fechas.*ex[aá]menes', r'per[ií]odo.*ex[aá]menes',
-                r'cuando.*son.*los.*ex[aá]menes', r'calendario.*ex[aá]menes',
-                r'when.*are.*exams', r'exam.*dates', r'examination.*period'
-            ],
-            "salas_estudio": [
-                r'reserv.*sala.*estudio', r'c[óo]mo.*reserv.*sala', r'salas.*estudio',
-                r'biblioteca.*sala', r'estudiar.*sala', r'reserva.*sala',
-                r'reserve.*study.*room', r'book.*study.*room', r'study.*rooms'
-            ],
-            "pagos_matricula": [
-                r'd[óo]nde.*pago.*matr[íi]cula', r'pagar.*matr[íi]cula', r'pagos.*arancel',
-                r'c[óo]mo.*pago', r'portal.*pagos', r'finanzas.*duoc',
-                r'where.*pay.*tuition', r'how.*pay.*fees', r'payment.*portal'
-            ],
-            "gratuidad": [
-                r'duoc.*tiene.*gratuidad', r'gratuidad.*duoc', r'gratuidad.*financiamiento',
-                r'c[óo]mo.*postular.*gratuidad', r'requisitos.*gratuidad',
-                r'does.*duoc.*have.*free.*tuition', r'free.*education.*duoc'
-            ],
-            "becas": [
-                r'qué.*becas.*hay', r'becas.*disponibles', r'tipos.*becas',
-                r'becas.*internas', r'becas.*duoc', r'financiamiento.*becas',
-                r'what.*scholarships', r'available.*scholarships', r'scholarship.*types'
-            ],
-            "horarios_sede": [
-                r'horario.*punto.*estudiantil', r'horario.*biblioteca', r'horario.*finanzas',
-                r'horarios.*sede', r'cu[aá]ndo.*abre', r'horario.*atenci[óo]n',
-                r'opening.*hours', r'schedule.*campus', r'when.*open'
-            ],
-            
-            # ===== TEMPLATES FINANZAS/ASUNTOS 2025 =====
-            "gratuidad_financiamiento": [
-                r'gratuidad.*financiamiento', r'c[óo]mo.*funciona.*gratuidad',
-                r'renovaci[óo]n.*gratuidad', r'requisitos.*gratuidad.*completos'
-            ],
-            "pagos_aranceles": [
-                r'pagos.*aranceles', r'consultar.*estado.*cuenta', r'deudas.*pendientes',
-                r'portal.*pagos.*online', r'payment.*portal', r'check.*balance'
-            ],
-            "certificados_documentos": [
-                r'certificado.*alumno.*regular', r'necesito.*certificado', r'certificados.*online',
-                r'c[óo]mo.*obten.*certificado', r'student.*certificate', r'official.*documents'
-            ],
-            "tne_beneficios": [
-                r'tne.*beneficios', r'otros.*beneficios.*estudiantiles', r'pase.*escolar',
-                r'convenios.*comerciales', r'student.*benefits', r'tne.*card.*benefits'
-            ],
-            "becas_internas": [
-                r'becas.*internas.*duoc', r'beca.*excelencia', r'beca.*continuidad',
-                r'beca.*hermanos', r'beca.*emergencia.*estudiantil',
-                r'internal.*scholarships', r'duoc.*scholarships'
-            ],
-            
-            # === 7 NUEVOS TEMPLATES ===
-            "emergencias": [
-                r'emergencia.*duoc', r'protocolo.*emergencia', r'qué.*hacer.*emergencia',
-                r'número.*emergencia', r'contacto.*emergencia', r'teléfono.*emergencia',
-                r'incendio.*duoc', r'sismo.*duoc', r'terremoto.*duoc', r'evacuación',
-                r'emergencia.*médica', r'enfermería.*duoc', r'ambulancia.*duoc',
-                r'seguridad.*duoc', r'brigada.*emergencia', r'extintor',
-                r'emergency.*protocol', r'what.*to.*do.*emergency', r'fire.*drill',
-                r'earthquake.*protocol', r'evacuation.*plan', r'emergency.*contact'
-            ],
-            "reglamentos_academicos": [
-                r'cuántas.*inasistencias', r'máximo.*faltas', r'75%.*asistencia',
-                r'porcentaje.*asistencia', r'asistencia.*mínima', r'puedo.*faltar',
-                r'qué.*pasa.*si.*repruebo', r'escala.*notas', r'nota.*aprobación',
-                r'justificar.*inasistencia', r'certificado.*médico.*inasistencia',
-                r'reglamento.*académico', r'normativa.*asistencia', r'eliminar.*por.*faltas',
-                r'evaluaciones.*duoc', r'tipos.*evaluación', r'examen.*final',
-                r'attendance.*minimum', r'how.*many.*absences', r'grade.*scale',
-                r'passing.*grade', r'academic.*regulations', r'evaluation.*system'
-            ],
-            "desarrollo_laboral": [
-                r'desarrollo.*laboral', r'claudia.*cortés', r'ccortesn',
-                r'asesoría.*cv', r'mejorar.*cv', r'curriculum.*vitae',
-                r'bolsa.*empleo.*duoc', r'duoclaboral', r'ofertas.*trabajo.*duoc',
-                r'práctica.*profesional', r'búsqueda.*práctica', r'encontrar.*práctica',
-                r'simulación.*entrevista', r'taller.*empleabilidad', r'empleo.*duoc',
-                r'career.*services', r'job.*placement', r'career.*counseling',
-                r'cv.*help', r'employment.*services', r'internship.*support'
-            ],
-            "congelamiento": [
-                r'congelar.*estudios', r'congelamiento.*carrera', r'suspender.*estudios',
-                r'tomar.*año.*sabático', r'pausar.*estudios', r'congelamiento.*duoc',
-                r'cómo.*congelo', r'requisitos.*congelamiento', r'proceso.*congelamiento',
-                r'freeze.*studies', r'suspend.*studies', r'gap.*year',
-                r'pause.*enrollment', r'temporary.*leave', r'study.*freeze'
-            ],
-            "cambio_sede": [
-                r'cambiar.*sede', r'cambio.*campus', r'trasladar.*otra.*sede',
-                r'ir.*otra.*sede', r'mudarme.*otra.*sede', r'cambio.*sede.*duoc',
-                r'requisitos.*cambio.*sede', r'transferencia.*sede', r'cupos.*otra.*sede',
-                r'change.*campus', r'transfer.*campus', r'move.*another.*campus',
-                r'campus.*transfer', r'change.*location', r'transfer.*process'
-            ],
-            "deportes_talleres": [
-                r'talleres.*deportivos', r'deportes.*duoc', r'actividades.*deportivas',
-                r'gimnasio.*caf', r'caf.*duoc', r'inscripción.*deportes',
-                r'fútbol.*duoc', r'basquetbol.*duoc', r'voleibol.*duoc',
-                r'natación.*duoc', r'boxeo.*duoc', r'funcional.*duoc',
-                r'horarios.*deportes', r'inscribir.*taller.*deportivo',
-                r'sports.*workshops', r'gym.*duoc', r'sports.*activities',
-                r'sports.*registration', r'athletic.*programs'
-            ],
-            "biblioteca_servicios": [
-                r'biblioteca.*duoc', r'préstamo.*libros', r'salas.*estudio',
-                r'reservar.*sala', r'computadores.*biblioteca', r'impresión.*biblioteca',
-                r'recursos.*digitales.*biblioteca', r'bibliotecas\.duoc\.cl',
-                r'horario.*biblioteca', r'servicios.*biblioteca', r'wifi.*biblioteca',
-                r'library.*services', r'book.*loan', r'study.*rooms',
-                r'print.*library', r'digital.*resources', r'library.*hours'
-            ],
-            "sesiones_psicologicas": [
-                # ESPAÑOL
-                r'cuántas.*sesiones.*psicológicas', r'sesiones.*por.*año',
-                r'máximo.*sesiones.*psicológicas', r'límite.*sesiones',
-                r'8.*sesiones.*psicológicas', r'número.*sesiones',
-                # INGLÉS
-                r'how.*many.*psychological.*sessions', r'sessions.*per.*year',
-                r'maximum.*psychological.*sessions', r'limit.*sessions',
-                r'8.*psychological.*sessions', r'number.*of.*sessions',
-                # FRANCÉS - EXPANDIDO
-                r'combien.*de.*sessions.*psychologiques', r'combien.*sessions.*psychologiques',
-                r'sessions.*par.*an', r'puis.*je.*avoir.*par.*an',
-                r'maximum.*sessions.*psychologiques', r'limite.*sessions',
-                r'nombre.*sessions.*psychologiques', r'combien.*sessions.*psychologiques.*puis.*je',
-                r'sessions.*psychologiques.*puis.*je.*avoir'
-            ],
+        """DETECCIÓN INTELIGENTE DE TEMPLATES EXPANDIDA CON TODOS LOS NUEVOS
 
-            "licencias_medicas_psicologicas": [
-                # ESPAÑOL
-                r'psicólogo.*virtual.*licencia.*médica', r'psicólogo.*puede.*otorgar.*licencia',
-                r'licencia.*médica.*psicólogo', r'psicólogo.*da.*licencia',
-                r'permiso.*médico.*psicólogo', r'incapacidad.*psicológico',
-                # INGLÉS
-                r'virtual.*psychologist.*provide.*medical.*leave', r'psychologist.*medical.*leave',
-                r'can.*psychologist.*provide.*leave', r'psychological.*medical.*certificate',
-                r'sick.*leave.*psychologist',
-                # FRANCÉS
-                r'psychologue.*virtuel.*arrêt.*maladie', r'psychologue.*peut.*fournir.*arrêt',
-                r'arrêt.*maladie.*psychologue', r'certificat.*médical.*psychologique'
-            ],
-
-
-            "curso_embajadores_avance": [
-                # ESPAÑOL
-                r'curso.*embajadores.*no.*puedo.*avanzar', r'embajadores.*siguiente.*módulo',
-                r'bloqueado.*embajadores', r'no.*avanzo.*embajadores',
-                r'módulo.*embajadores', r'85%.*embajadores',
-                # INGLÉS
-                r'ambassadors.*course.*can\'t.*advance', r'started.*ambassadors.*course.*can\'t',
-                r'ambassadors.*next.*module', r'blocked.*ambassadors.*course',
-                r'can\'t.*progress.*ambassadors',
-                # FRANCÉS - MEJORADO ESPECÍFICO
-                r"j'ai.*commencé.*le.*cours.*d?'?ambassadeurs.*mais.*je.*ne.*peux.*pas",
-                r'cours.*d?\'?ambassadeurs.*ne.*peux.*pas.*passer',
-                r'ambassadeurs.*module.*suivant', r'ne.*peux.*pas.*passer.*au.*module',
-                r'bloqué.*cours.*ambassadeurs', r"n'avance.*pas.*ambassadeurs",
-                r"cours.*d'ambassadeurs.*mais.*je.*ne", r'commencé.*le.*cours.*ambassadeurs',
-                r'peux.*pas.*passer.*au.*module.*suivant', r'mais.*je.*ne.*peux.*pas.*passer'
-            ],
-            "curso_embajadores_finalizacion": [
-                # ESPAÑOL
-                r'cómo.*sé.*terminé.*curso.*embajadores', r'finalicé.*embajadores',
-                r'terminé.*curso.*embajadores', r'completé.*embajadores',
-                r'curso.*embajadores.*finalizado', r'embajadores.*terminado',
-                # INGLÉS
-                r'how.*know.*if.*finished.*ambassadors.*course', r'completed.*ambassadors.*course',
-                r'finished.*ambassadors.*course', r'how.*tell.*ambassadors.*done',
-                # FRANCÉS - MEJORADO ESPECÍFICO
-                r'comment.*savoir.*si.*j?\'?ai.*terminé.*le.*cours.*d?\'?ambassadeurs',
-                r'comment.*savoir.*terminé.*cours.*ambassadeurs', r'comment.*savoir.*terminé.*cours',
-                r'fini.*cours.*ambassadeurs', r'terminé.*cours.*ambassadeurs',
-                r'comment.*savoir.*ambassadeurs.*fini', r"si.*j'ai.*terminé.*le.*cours",
-                r"j'ai.*terminé.*le.*cours.*ambassadeurs", r'savoir.*si.*terminé.*ambassadeurs',
-                r'cours.*ambassadeurs.*terminé'
-            ],
-            "curso_embajadores_salud_mental": [
-                # ESPAÑOL
-                r'responsabilidad.*adicional.*curso.*embajadores', r'embajadores.*en.*salud.*mental',
-                r'compromiso.*embajadores', r'tareas.*embajadores',
-                r'responsabilidades.*embajadores', r'qué.*implica.*ser.*embajador',
-                # INGLÉS
-                r'additional.*responsibility.*ambassadors.*course', r'ambassadors.*mental.*health',
-                r'responsibility.*after.*completing.*ambassadors', r'duties.*ambassadors',
-                r'what.*does.*being.*ambassador.*involve',
-                # FRANCÉS - MEJORADO PARA CAPTURAR CONSULTAS ESPECÍFICAS
-                r"ai.*je.*une.*responsabilité.*supplémentaire.*après.*avoir.*réalisé",
-                r'responsabilité.*supplémentaire.*après.*avoir.*réalisé.*cours',
-                r'ambassadeurs.*santé.*mentale', r'après.*avoir.*réalisé.*cours.*ambassadeurs',
-                r'responsabilité.*après.*ambassadeurs', r'devoirs.*ambassadeurs',
-                r'une.*responsabilité.*supplémentaire.*après', r'responsabilité.*supplémentaire.*après.*avoir',
-                r'après.*avoir.*réalisé.*le.*cours', r'réalisé.*le.*cours.*ambassadeurs'
-            ],
-            "programa_emergencia_que_es": [
-                r'qué.*es.*programa.*emergencia', r'programa.*emergencia.*qué.*es',
-                r'información.*programa.*emergencia', r'explicación.*emergencia',
-                r'para.*qué.*sirve.*emergencia', r'qué.*ofrece.*programa.*emergencia'
-                r'definición.*programa.*emergencia', r'qué.*significa.*emergencia'
-            ],
-
-            "programa_emergencia_requisitos": [
-                r'requisitos.*programa.*emergencia', r'qué.*necesito.*emergencia',
-                r'documentación.*emergencia', r'postular.*emergencia.*requisitos',
-                r'qué.*papeles.*emergencia', r'requisitos.*para.*emergencia'
-                r'qué.*documentos.*emergencia', r'condiciones.*emergencia'
-            ],
-            
-            "apoyo_tecnicas_estudio_que_es": [
-            r'qué.*es.*apoyo.*técnicas.*estudio', r'apoyo.*técnicas.*estudio.*qué.*es',
-            r'qué.*es.*técnicas.*estudio', r'definición.*técnicas.*estudio',
-            r'explicación.*técnicas.*estudio', r'para.*qué.*sirve.*técnicas.*estudio',
-            r'qué.*ofrece.*técnicas.*estudio', r'información.*técnicas.*estudio'
-            ],
-
-            "tne_reposicion_perdida_danada": [
-                r'tne.*perdí', r'perdí.*tne', r'tne.*extravié', r'extravié.*tne',
-                r'tne.*dañad', r'dañé.*tne', r'tne.*robaron', r'robaron.*tne',
-                r'tne.*mal.*estado', r'tne.*rota', r'tne.*deteriorad',
-                r'reposición.*tne.*perdida', r'nueva.*tne.*perdida',
-                r'3600.*tne', r'3\.600.*tne', r'comisariavirtual.*tne',
-                r'constancia.*pérdida.*tne'
-            ],
-
-            "contacto_plaza_norte_especifico": [
-                r'correo.*plaza.*norte', r'email.*plaza.*norte', 
-                r'persona.*plaza.*norte', r'quién.*plaza.*norte',
-                r'contacto.*específico.*plaza.*norte', r'directamente.*plaza.*norte',
-                r'claudia.*cortés', r'ccortesn', r'adriana.*vásquez',
-                r'elizabeth.*domínguez', r'coordinadora.*plaza.*norte',
-                # FRENCH PATTERNS
-                r'courriel.*plaza.*norte', r'email.*plaza.*norte',
-                r'personne.*plaza.*norte', r'qui.*plaza.*norte',
-                r'à.*quel.*courriel.*plaza.*norte', r'adresser.*plaza.*norte',
-                r'contact.*plaza.*norte', r'campus.*plaza.*norte'
-            ],
-
-            "beneficios_titulados": [
-                r'beneficios.*titulados', r'titulados.*beneficios',
-                r'qué.*beneficios.*titulados', r'ventajas.*titulado',
-                r'después.*titular.*beneficios', r'egresados.*beneficios'
-            ],
-            
-            # ASUNTOS ESTUDIANTILES - EXPANDIDO
-            "tne_documentos_primera_vez": [
-                r'documentos.*tne', r'qué.*necesito.*tne', r'requisitos.*tne',
-                r'qué.*llevar.*tne', r'primera.*vez.*tne', r'sacar.*tne.*primera',
-                r'qué.*papeles.*tne', r'requisitos.*para.*tne', r'qué.*documentación.*tne'
-            ],
-            "tne_tiempos_emision": [
-                r'cuánto.*demora.*tne', r'tiempo.*tne', r'cuándo.*estará.*tne',
-                r'demora.*tne', r'plazo.*tne', r'cuánto.*tarda.*tne',
-                r'en.*cuánto.*tiempo.*tne', r'cuándo.*sale.*tne'
-            ],
-            "tne_revalidacion": [
-                r'revalidar.*tne', r'renovar.*tne', r'validar.*tne',
-                r'tne.*anterior', r'tne.*previa', r'pago.*1100', r'1\.100'
-            ],
-            "tne_reposicion": [
-                r'reposición.*tne', r'perdí.*tne', r'dañ.*tne', r'robaron.*tne',
-                r'hurtaron.*tne', r'nueva.*tne.*perdida', r'tne.*extraviada',
-                r'pago.*3600', r'3\.600', r'comisariavirtual'
-            ],
-            "tne_seguimiento": [
-                r'tne.*seguimiento', r'estado.*tne', r'seguimiento.*tne',
-                r'consultar.*tne', r'ver.*estado.*tne', r'cómo.*va.*tne',
-                r'dónde.*está.*tne', r'proceso.*tne', r'tne.*móvil'
-            ],
-            "seguro_cobertura": [
-                r'seguro.*estudiantil', r'cómo.*funciona.*seguro', r'cobertura.*seguro',
-                r'doc.*duoc', r'accidente.*estudiantil', r'para.*qué.*sirve.*seguro',
-                r'qué.*cubre.*seguro', r'beneficio.*seguro', r'atención.*médica.*duoc'
-            ],
-            "programa_emergencia": [
-                r'programa.*emergencia', r'requisitos.*emergencia', r'postular.*emergencia',
-                r'ayuda.*económica.*emergencia', r'beneficio.*emergencia',
-                r'cómo.*postular.*emergencia', r'qué.*necesito.*emergencia',
-                r'monto.*emergencia', r'200\.000', r'subvención.*emergencia'
-            ],
-            "programa_transporte": [
-                r'programa.*transporte', r'beneficio.*transporte', r'ayuda.*transporte',
-                r'subsidio.*transporte', r'100\.000', r'beca.*transporte',
-                r'requisitos.*transporte', r'postular.*transporte'
-            ],
-            "programa_materiales": [
-                r'programa.*materiales', r'materiales.*estudio', r'subsidio.*materiales',
-                r'beneficio.*materiales', r'200\.000.*materiales', r'útiles.*estudio',
-                r'postular.*materiales', r'requisitos.*materiales'
-            ],
-            "certificado_alumno_regular": [
-                r'certificado.*alumno', r'constancia.*alumno', r'certificado.*regular',
-                r'documento.*alumno', r'acreditar.*alumno', r'certificado.*estudiante',
-                r'cómo.*saco.*certificado', r'ob.*certificado'
-            ],
-            "certificado_notas": [
-                r'certificado.*notas', r'concentración.*notas', r'record.*académico',
-                r'notas.*académicas', r'historial.*notas', r'promedio.*notas',
-                r'cómo.*obtener.*notas', r'descargar.*notas'
-            ],
-            "tecnicas_estudio": [
-                r'técnicas.*estudio', r'apoyo.*psicopedagógico', r'estrategias.*estudio',
-                r'cómo.*estudiar', r'mejorar.*rendimiento', r'psicopedagogo',
-                r'eventos\.duoc\.cl', r'agendar.*técnicas'
-            ],
-            "centro_virtual_aprendizaje": [
-                r'centro.*virtual.*aprendizaje', r'cva', r'recursos.*online',
-                r'videos.*interactivos', r'técnicas.*estudio.*online',
-                r'cva\.duoc\.cl', r'aprendizaje.*virtual'
-            ],
-            "beca_alimentacion": [
-                r'beca.*alimentación', r'alimentación.*estudiante', r'comida.*estudiante',
-                r'beneficio.*alimenticio', r'ayuda.*alimentaria', r'60\.000',
-                r'postular.*alimentación', r'requisitos.*alimentación'
-            ],
-            "convenios_internos": [
-                r'convenios.*internos', r'descuentos.*estudiantiles', r'beneficios.*comercios',
-                r'farmacias.*descuento', r'ópticas.*descuento', r'librerías.*descuento',
-                r'descuento.*estudiante', r'convenio.*duoc'
-            ],
-            "credencial_estudiantil": [
-                r'credencial.*estudiantil', r'carnet.*estudiante', r'identificación.*estudiantil',
-                r'cómo.*saco.*credencial', r'obtener.*credencial', r'carnet.*duoc'
-            ],
-            "boletas_pagos": [
-                r'boletas.*pago', r'pagos.*duoc', r'arancel.*pago',
-                r'cómo.*pagar', r'portal.*pagos', r'webpay.*duoc',
-                r'financiamiento.*estudiantil', r'deuda.*estudiantil'
-            ],
-            
-            # BIENESTAR ESTUDIANTIL - EXPANDIDO
+        Las reglas (app/template_patterns.py) están precompiladas en `template_matcher`:
+        primero los templates prioritarios y luego el resto, en el mismo orden de siempre.
+        """
+        question_lower = self._clean_question(question)
+        logger.debug(f"🔍 Template detection iniciada para: '{question_lower}'")
 
-            "curso_embajadores_salud_mental": [
-                # ESPAÑOL - CONSOLIDADO
-                r'responsabilidad.*adicional.*curso.*embajadores', r'embajadores.*en.*salud.*mental',
-                r'compromiso.*embajadores', r'tareas.*embajadores',
-                r'responsabilidades.*embajadores', r'qué.*implica.*ser.*embajador',
-                r'tengo.*alguna.*responsabilidad.*adicional.*embajadores',
-                r'obligaciones.*embajadores', r'curso.*embajadores.*responsabilidad',
-                # INGLÉS - CONSOLIDADO
-                r'additional.*responsibility.*ambassadors.*course', r'ambassadors.*mental.*health',
-                r'responsibility.*after.*completing.*ambassadors', r'duties.*ambassadors',
-                r'what.*does.*being.*ambassador.*involve',
-                r'do.*i.*have.*any.*additional.*responsibility.*ambassadors',
-                r'ambassadors.*tasks', r'ambassadors.*obligations',
-                # FRANCÉS - CONSOLIDADO MEJORADO
-                r"ai.*je.*une.*responsabilité.*supplémentaire.*après.*avoir.*réalisé",
-                r'responsabilité.*supplémentaire.*après.*avoir.*réalisé.*cours',
-                r'ambassadeurs.*santé.*mentale', r'après.*avoir.*réalisé.*cours.*ambassadeurs',
-                r'responsabilité.*après.*ambassadeurs', r'devoirs.*ambassadeurs',
-                r'une.*responsabilité.*supplémentaire.*après', r'responsabilité.*supplémentaire.*après.*avoir',
-                r'après.*avoir.*réalisé.*le.*cours', r'réalisé.*le.*cours.*ambassadeurs',
-                r'ai.*je.*une.*responsabilité.*supplémentaire.*ambassadeurs',
-                r'responsabilité.*ambassadeurs', r'engagement.*ambassadeurs'
-            ],
-            "sesiones_psicologicas": [
-                # ESPAÑOL - EXPANDIDO
-                r'cuántas.*sesiones', r'sesiones.*psicológicas', r'máximo.*sesiones',
-                r'8.*sesiones', r'sesiones.*incluye', r'límite.*sesiones',
-                r'cuántas.*veces.*psicólogo', r'número.*sesiones',
-                # INGLÉS - EXPANDIDO
-                r'how.*many.*sessions', r'psychological.*sessions', r'maximum.*sessions',
-                r'8.*sessions', r'sessions.*included', r'sessions.*limit',
-                r'how.*many.*times.*psychologist', r'number.*sessions',
-                # FRANCÉS - EXPANDIDO
-                r'combien.*de.*sessions', r'sessions.*psychologiques', r'maximum.*de.*sessions',
-                r'8.*sessions', r'sessions.*comprises', r'limite.*sessions',
-                r'combien.*fois.*psychologue', r'nombre.*sessions',
-                r'sessions.*incluses', r'limite.*de.*sessions.*psychologiques'
-            ],
-            # TEMPLATES PARA DETECTAR CONSULTAS FRANCESAS FALTANTES
-            "apoyo_discapacidad": [
-                # FRANCÉS - PATRONES PARA APOYO A ESTUDIANTES CON DISCAPACIDAD
-                r'existe.*t.*il.*un.*soutien.*pour.*les.*étudiants.*handicapés',
-                r'soutien.*pour.*étudiants.*handicapés',
-                r'aide.*pour.*étudiants.*en.*situation.*de.*handicap',
-                r'accompagnement.*étudiants.*handicapés',
-                r'services.*pour.*personnes.*handicapées',
-                r'programme.*paedis.*français',
-                r'soutien.*spécialisé.*handicap'
-            ],
-            "apoyo_companeros": [
-                # ESPAÑOL - EXPANDIDO
-                r'qué.*puedo.*hacer.*si.*sé.*que.*compañero.*pasando.*mal.*momento',
-                r'compañero.*mal.*momento.*no.*quiere.*ayuda',
-                r'amigo.*mal.*no.*quiere.*pedir.*ayuda',
-                r'compañero.*problema.*rechaza.*ayuda',
-                r'cómo.*ayudar.*compañero.*deprimido',
-                r'ayudar.*compañero.*problemas.*emocionales',
-                r'qué.*hacer.*compañero.*triste',
-                # INGLÉS - EXPANDIDO  
-                r'what.*can.*i.*do.*if.*i.*know.*classmate.*going.*through.*bad.*time',
-                r'what.*can.*i.*do.*if.*i.*know.*classmate.*going.*through.*difficult.*time',
-                r'friend.*bad.*time.*doesn.*t.*want.*help',
-                r'classmate.*struggling.*refuses.*help',
-                r'how.*help.*friend.*who.*won.*t.*ask.*for.*help',
-                r'help.*classmate.*emotional.*problems',
-                r'friend.*doesn\'t.*want.*ask.*for.*help', r'what.*to.*do.*classmate.*sad',
-                r'classmate.*depressed.*what.*do', r'person.*difficult.*time.*help',
-                r'how.*support.*classmate.*problems', r'help.*friend.*emotional',
-                # FRANCÉS - EXPANDIDO (INTEGRADO)
-                r'que.*puis.*je.*faire.*si.*je.*sais.*qu.*un.*camarade.*traverse.*(mauvais|difficile).*moment',
-                r'camarade.*(mauvais|difficile).*moment.*ne.*veut.*pas.*(aide|demander)',
-                r'aider.*camarade.*problèmes.*émotionnels',
-                r'ami.*ne.*veut.*pas.*demander.*aide', r'que.*faire.*camarade.*triste',
-                r'camarade.*déprimé.*que.*faire', r'personne.*(moment|difficile).*aider',
-                r'comment.*soutenir.*camarade.*problèmes', r'aider.*ami.*émotionnel'
-            ],
-            "agendar_psicologico": [
-                # ESPAÑOL - EXPANDIDO
-                r'cómo.*agendar.*psicológico', r'agendar.*atención', r'pedir.*hora.*psicológico',
-                r'conseguir.*sesión', r'eventos\.duoc\.cl', r'solicitar.*psicólogo',
-                r'cómo.*saco.*hora.*psicólogo', r'reservar.*sesión', r'agendar.*psicologo',
-                r'intenté.*agendar', r'no.*encuentro.*horas', r'no.*hay.*horas.*disponibles',
-                # INGLÉS - EXPANDIDO
-                r'how.*schedule.*psychological', r'schedule.*appointment', r'request.*psychological.*appointment',
-                r'get.*session', r'eventos\.duoc\.cl', r'request.*psychologist',
-                r'how.*get.*psychologist.*appointment', r'book.*session', r'schedule.*psychologist',
-                r'tried.*to.*schedule', r'can\'t.*find.*available.*appointments', r'no.*available.*appointments',
-                # FRANCÉS - EXPANDIDO (NUEVO)
-                r'comment.*prendre.*rendez.*vous.*psychologique', r'prendre.*rendez.*vous',
-                r'j\'ai.*essayé.*de.*prendre.*rendez.*vous', r'je.*ne.*trouve.*pas.*de.*créneaux',
-                r'créneaux.*disponibles', r'programmer.*séance', r'réserver.*session',
-                r'comment.*obtenir.*rendez.*vous', r'soins.*psychologiques.*rendez.*vous'
-            ],
-            "apoyo_psicologico_principal": [
-                r'agendar.*atención.*psicológica', r'cómo.*agendo.*atención.*psicológica',
-                r'agendar.*hora.*psicológica', r'agendar.*sesión.*psicológica',
-                r'cómo.*pedir.*hora.*psicólog', r'pedir.*hora.*psicólogo',
-                r'solicitar.*atención.*psicológica', r'reservar.*hora.*psicológica',
-                r'cita.*psicológica', r'reserva.*sesión', r'eventos\.duoc\.cl',
-                r'cómo.*accedo.*apoyo.*psicológico', r'dónde.*agendar.*psicólogo'
-            ],
-            "apoyo_discapacidad": [
-                # ESPAÑOL - EXPANDIDO
-                r'discapacidad', r'paedis', r'elizabeth.*domínguez', r'estudiantes.*discapacidad',
-                r'inclusión', r'edominguezs', r'coordinadora.*inclusión', r'accesibilidad',
-                r'necesidades.*especiales', r'apoyo.*discapacidad', r'apoyo.*estudiantes.*discapacidad',
-                r'existe.*apoyo.*discapacidad', r'programa.*discapacidad', r'inclusión.*estudiantil',
-                r'adaptaciones.*académicas',
-                # INGLÉS - EXPANDIDO
-                r'disability', r'paedis', r'elizabeth.*domínguez', r'students.*disabilities',
-                r'inclusion', r'edominguezs', r'inclusion.*coordinator', r'accessibility',
-                r'special.*needs', r'disability.*support', r'support.*students.*disabilities',
-                r'support.*for.*students.*with.*disabilities', r'disability.*support.*program',
-                r'special.*needs.*students', r'academic.*accommodations.*disabilities', r'inclusive.*education',
-                # FRANCÉS - EXPANDIDO  
-                r'existe.*t.*il.*soutien.*étudiants.*handicapés', r'soutien.*étudiants.*handicapés',
-                r'soutien.*pour.*les.*étudiants.*handicapés', r'programme.*handicap',
-                r'étudiants.*besoins.*spéciaux', r'adaptations.*académiques',
-                r'inclusion.*étudiante', r'un.*soutien.*pour.*les.*étudiants'
-            ],
-            "linea_ops_emergencia": [
-                # ESPAÑOL
-                r'línea.*ops', r'urgencia.*psicológica', r'crisis.*psicológica',
-                r'emergencia.*emocional', r'2820.*3450', r'ops.*duoc',
-                r'atención.*inmediata', r'crisis.*salud.*mental',
-                # INGLÉS
-                r'ops.*line', r'psychological.*emergency', r'psychological.*crisis',
-                r'emotional.*emergency', r'2820.*3450', r'ops.*duoc',
-                r'immediate.*attention', r'mental.*health.*crisis'
-            ],
-            "talleres_bienestar": [
-                r'talleres.*bienestar', r'taller.*bienestar', r'actividades.*bienestar',
-                r'grupos.*bienestar', r'talleres.*emocionales', r'charlas.*bienestar',
-                r'webinar.*bienestar', r'actividad.*grupal'
-            ],
-            "grupos_apoyo": [
-                r'grupos.*apoyo', r'grupo.*apoyo', r'apoyo.*grupal',
-                r'terapia.*grupal', r'comunidad.*apoyo', r'grupo.*terapéutico',
-                r'encuentros.*grupales', r'sesión.*grupal'
-            ],
-            "apoyo_crisis": [
-                # ESPAÑOL - EXPANDIDO CON VARIANTES ESPECÍFICAS
-                r'qué.*debo.*hacer.*si.*tengo.*crisis', r'qué.*hacer.*si.*tengo.*crisis',
-                r'tengo.*crisis.*estando.*en.*sede', r'me.*siento.*mal.*estando.*en.*sede',
-                r'crisis.*o.*me.*siento.*mal', r'crisis.*en.*la.*sede', r'crisis.*en.*el.*campus',
-                r'me.*siento.*mal.*en.*sede', r'me.*siento.*mal.*en.*campus',
-                r'apoyo.*crisis', r'protocolo.*crisis', r'emergencia.*emocional',
-                r'crisis.*psicológica', r'urgencia.*salud.*mental', r'atención.*inmediata',
-                r'situación.*crítica', r'protocolo.*emergencia',
-                # INGLÉS
-                r'what.*should.*i.*do.*if.*i.*have.*crisis', r'what.*do.*if.*crisis',
-                r'crisis.*support', r'crisis.*protocol', r'emotional.*emergency',
-                r'psychological.*crisis', r'mental.*health.*emergency', r'immediate.*care',
-                r'critical.*situation', r'emergency.*protocol', r'crisis.*feel.*unwell',
-                r'have.*crisis.*campus', r'feel.*unwell.*campus', r'crisis.*on.*campus',
-                r'feel.*unwell.*while.*at.*campus', r'crisis.*while.*on.*campus',
-                # FRANCÉS - EXPANDIDO
-                r"que.*dois.*je.*faire.*si.*j'ai.*une.*crise", r'crise.*ou.*me.*sens.*mal',
-                r"j'ai.*une.*crise", r'me.*sens.*mal.*sur.*le.*campus',
-                r'soutien.*crise', r'aide.*urgente', r'crise.*émotionnelle',
-                r'que.*faire.*si.*crise', r'mal.*sur.*le.*campus',
-                r'crise.*sur.*le.*campus', r'me.*sens.*mal.*campus'
-            ],
-            "recursos_digitales_bienestar": [
-                r'recursos.*digitales', r'contenidos.*online', r'material.*digital',
-                r'recursos.*online', r'guías.*digitales', r'videos.*bienestar',
-                r'audios.*relajación', r'infografías.*bienestar'
-            ],
-            
-            # DEPORTES - EXPANDIDO
-            "talleres_deportivos": [
-                r'qué.*talleres.*deport', r'talleres.*deportivos', r'actividades.*deportivas',
-                r'deportes.*disponibles', r'qué.*deportes.*hay', r'lista.*talleres',
-                r'necesito.*información.*talleres.*deportes',
-                r'info.*sobre.*deportes', r'qué.*hay.*de.*deportes',
-                r'qué.*actividades.*deportivas', r'oferta.*deportiva',
-                r'actividades.*deportivas.*disponibles',
-                # ENGLISH PATTERNS
-                r'what.*sports.*workshops.*do.*you.*have', r'what.*sports.*workshops',
-                r'sports.*workshops.*available', r'what.*sports.*activities',
-                r'available.*sports.*workshops', r'sports.*programs.*available',
-                r'what.*sports.*do.*you.*offer', r'list.*of.*sports.*workshops',
-                r'sports.*activities.*offered', r'what.*sports.*are.*available',
-                r'what.*sports.*workshops.*do.*you.*have\?', r'what.*workshops.*do.*you.*have',
-                # FRENCH PATTERNS
-                r'quels.*ateliers.*sportifs.*avez.*vous', r'quels.*ateliers.*sportifs',
-                r'ateliers.*sportifs.*disponibles', r'quelles.*activités.*sportives',
-                r'activités.*sportives.*disponibles', r'sports.*disponibles',
-                r'que.*proposez.*vous.*comme.*sports', r'liste.*ateliers.*sportifs',
-                r'quels.*ateliers.*sportifs.*avez.*vous\?', r'quels.*ateliers.*avez.*vous'
-            ],
-            "horarios_talleres_2025": [
-                r'horarios.*talleres', r'horario.*deportes', r'cuándo.*son.*talleres',
-                r'horario.*entrenamiento', r'qué.*horarios.*taller', r'calendarización.*deportes'
-            ],
-            "ausencias_talleres": [
-                r'qué.*pasa.*si.*falto', r'inasistencias.*taller', r'faltar.*taller',
-                r'consecuencias.*falta', r'reglamento.*asistencia', r'no.*puedo.*ir.*taller',
-                # ENGLISH PATTERNS
-                r'what.*happens.*if.*i.*miss.*one.*or.*more.*workshops',
-                r'what.*happens.*if.*i.*miss.*workshops', r'miss.*workshops',
-                r'absence.*from.*workshops', r'missing.*sports.*workshops',
-                r'what.*if.*i.*miss.*sessions', r'consequences.*missing.*workshops',
-                r'attendance.*policy.*workshops', r'skip.*workshops',
-                # FRENCH PATTERNS
-                r'que.*se.*passe.*t.*il.*si.*je.*manque.*un.*ou.*plusieurs.*ateliers',
-                r'que.*se.*passe.*si.*je.*manque.*ateliers', r'manquer.*ateliers',
-                r'absence.*ateliers', r'si.*je.*manque.*sessions',
-                r'conséquences.*manquer.*ateliers', r'politique.*présence'
-            ],
-            "horarios_talleres": [
-                r'horario.*taller', r'horario.*deporte', r'cuándo.*taller',
-                r'horario.*entrenamientos', r'cuándo.*entrenan',
-                r'día.*entrenamiento', r'qué.*horarios', r'calendarización.*deportes',
-                r'programación.*talleres', r'cuándo.*son.*los.*talleres',
-                r'qué.*días.*deporte', r'horas.*de.*práctica',
-                # ENGLISH PATTERNS
-                r'2025.*workshop.*schedule', r'workshop.*schedule', r'sports.*schedule',
-                r'training.*schedule', r'when.*are.*workshops', r'workshop.*times',
-                r'sports.*workshop.*hours', r'class.*schedule.*sports',
-                # FRENCH PATTERNS
-                r'horaires.*des.*ateliers.*2025', r'horaires.*ateliers', r'horaire.*sport',
-                r'quand.*sont.*les.*ateliers', r'programme.*ateliers',
-                r'heures.*des.*ateliers', r'calendrier.*sportif'
-            ],
-            "gimnasio_caf": [
-                r'gimnasio', r'caf', r'centro.*bienestar', r'acondicionamiento.*físico',
-                r'preparador.*físico', r'evaluación.*física', r'uso.*gimnasio',
-                r'horario.*gimnasio', r'cómo.*entrenar', r'centro.*deportivo',
-                r'tomar.*taller.*deporte', r'cómo.*me.*inscribo.*deporte',
-                r'cómo.*inscribo.*optativos', r'inscripción.*deportivos',
-                r'proceso.*inscripción.*deportes',
-                # ENGLISH PATTERNS
-                r'how.*can.*i.*enroll.*in.*the.*gym', r'how.*can.*i.*enroll.*in.*gym',
-                r'caf.*gym', r'gym.*enrollment', r'how.*to.*register.*gym',
-                r'physical.*conditioning.*center', r'gym.*registration.*process',
-                r'enroll.*caf', r'gym.*caf', r'fitness.*center.*registration'
-            ],
-            "gimnasio_caf_inscripcion": [
-                r'cómo.*inscribirme.*gimnasio', r'gimnasio.*caf', 
-                r'acceder.*gimnasio', r'uso.*gimnasio', r'preparador.*físico'
-            ],
-            "inscripcion_optativos_deportivos": [
-                r'inscribir.*deportivo', r'optativo.*deporte', r'tomar.*taller',
-                r'inscripción.*deportes', r'solicitud.*en.*línea', r'vivo.*duoc',
-                r'cómo.*me.*inscribo', r'proceso.*inscripción',
-                # ENGLISH PATTERNS
-                r'how.*do.*i.*enroll.*in.*sports.*electives', r'sports.*electives.*registration',
-                r'how.*to.*register.*sports.*workshops', r'enroll.*sports.*electives',
-                r'sports.*electives.*enrollment', r'register.*for.*sports.*workshops',
-                r'how.*to.*sign.*up.*sports', r'sports.*registration.*process',
-                # FRENCH PATTERNS
-                r'comment.*inscrire.*les.*options.*sportives', r'inscription.*options.*sportives',
-                r'comment.*s.*inscrire.*ateliers.*sportifs', r'inscrire.*ateliers',
-                r'processus.*inscription.*sport', r'inscription.*activités.*sportives'
-            ],
-            "selecciones_deportivas": [
-                r'selección.*deportiva', r'equipo.*deportivo', r'futsal', r'rugby',
-                r'representar.*duoc', r'competir.*duoc', r'deporte.*competitivo',
-                r'selecciones.*deportivas', r'equipos.*representativos',
-                r'deporte.*competitivo', r'representar.*duoc', r'probar.*selección',
-                r'reclutamiento', r'probar.*selección',
-                # ENGLISH PATTERNS
-                r'sports.*teams', r'sports.*team', r'competitive.*sports',
-                r'represent.*duoc', r'sports.*selection', r'team.*tryouts',
-                r'sports.*competitions', r'varsity.*sports', r'athletic.*teams',
-                # FRENCH PATTERNS
-                r'équipes.*sportives', r'équipe.*sportive', r'sports.*compétitifs',
-                r'représenter.*duoc', r'sélection.*sportive', r'essais.*équipe',
-                r'compétitions.*sportives', r'équipes.*représentatives'
-            ],
-            "desinscripcion_optativos": [
-                r'cómo.*puedo.*des.*inscribirme', r'retirarme.*taller',
-                r'cancelar.*inscripción', r'dejar.*taller', r'abandonar.*optativo',
-                # ENGLISH PATTERNS
-                r'how.*can.*i.*unenroll', r'how.*to.*withdraw.*from.*workshop',
-                r'cancel.*sports.*registration', r'withdraw.*sports.*elective',
-                r'how.*to.*drop.*sports.*workshop', r'unenroll.*from.*sports',
-                r'leave.*sports.*workshop', r'cancel.*sports.*enrollment',
-                # FRENCH PATTERNS
-                r'comment.*puis.*je.*me.*désinscrire', r'me.*désinscrire.*atelier',
-                r'annuler.*inscription.*sportive', r'arrêter.*atelier',
-                r'quitter.*option.*sportive', r'désinscription.*sport'
-            ],
-            "optativos_deportivos_nota": [
-                r'tienen.*nota.*los.*optativos.*deportivos', r'optativos.*deportivos.*tienen.*nota',
-                r'nota.*optativos.*deportivos', r'calificación.*optativos.*deportivos',
-                r'evalúan.*optativos.*deportivos', r'tienen.*calificación.*optativos',
-                # ENGLISH PATTERNS
-                r'do.*workshops.*have.*grades', r'do.*sports.*electives.*have.*grades',
-                r'sports.*workshops.*graded', r'are.*sports.*workshops.*graded',
-                r'grades.*in.*sports.*workshops', r'sports.*electives.*grades',
-                r'evaluation.*sports.*workshops', r'grading.*system.*sports',
-                # FRENCH PATTERNS
-                r'les.*ateliers.*ont.*ils.*des.*notes', r'les.*options.*sportives.*ont.*elles.*des.*notes',
-                r'notes.*pour.*ateliers.*sportifs', r'évaluation.*ateliers',
-                r'système.*notation.*sport', r'ateliers.*sportifs.*notés'
-            ],
-            "gimnasio_caf_horarios": [
-                r'horario.*gimnasio', r'cuándo.*abre.*caf', r'puedo.*ir.*cualquier.*horario',
-                r'disponibilidad.*gimnasio', r'horarios.*caf',
-                # ENGLISH PATTERNS
-                r'can.*i.*go.*at.*any.*time', r'gym.*schedule', r'caf.*hours',
-                r'gym.*opening.*hours', r'when.*is.*gym.*open', r'gym.*availability',
-                r'can.*i.*use.*gym.*anytime', r'gym.*operating.*hours',
-                r'free.*time.*gym', r'gym.*hours.*schedule',
-                # FRENCH PATTERNS
-                r'puis.*je.*y.*aller.*à.*n.*importe.*quel.*horaire', r'horaires.*gymnase',
-                r'heures.*d.*ouverture.*caf', r'quand.*gymnase.*ouvert',
-                r'disponibilité.*gymnase', r'horaire.*centre.*sportif'
-            ],
-            "becas_deportivas": [
-                r'beca.*deportiva', r'postular.*beca.*deporte', r'beneficio.*deportivo',
-                r'apoyo.*deportivo', r'financiamiento.*deporte', r'requisitos.*beca.*deporte',
-                r'beneficio.*deportivo', r'apoyo.*económico.*deporte',
-                # ENGLISH PATTERNS
-                r'sports.*scholarships', r'sports.*scholarship', r'athletic.*scholarships',
-                r'sports.*financial.*aid', r'scholarship.*for.*athletes',
-                r'sports.*funding', r'athletic.*financial.*support',
-                # FRENCH PATTERNS
-                r'bourses.*sportives', r'bourse.*sportive', r'aide.*financière.*sport',
-                r'soutien.*financier.*athlètes', r'financement.*sport',
-                r'bourse.*pour.*athlètes', r'aide.*économique.*sport',
-                r'\bbourses\b.*\bsportives\b', r'bourses.*sportives\b'
-            ],
-            "torneos_internos": [
-                r'torneos.*internos', r'competencia.*interna', r'torneo.*deportivo',
-                r'competencia.*estudiantes', r'torneo.*duoc', r'campeonato.*interno',
-                r'competencia.*carreras', r'torneo.*intercarreras'
-            ],
-            "evaluacion_fisica": [
-                r'evaluación.*física', r'test.*físico', r'condición.*física',
-                r'diagnóstico.*físico', r'evaluacion.*fisica', r'test.*condición',
-                r'análisis.*físico', r'diagnóstico.*corporal'
-            ],
-            "actividades_recreativas": [
-                r'actividades.*recreativas', r'deporte.*recreativo', r'competencia.*recreativa',
-                r'evento.*deportivo', r'juego.*recreativo', r'actividad.*lúdica',
-                r'competencia.*express', r'deporte.*divertido'
-            ],
-            "ubicaciones_deportivas": [
-                r'dónde.*están.*talleres', r'ubicación.*deportes', r'en.*qué.*lugar',
-                r'lugar.*taller', r'dónde.*se.*hacen', r'complejo.*maiclub',
-                r'gimnasio.*entretiempo', r'piscina.*acquatiempo', r'en.*qué.*lugar.*ubicados',
-                # ENGLISH PATTERNS
-                r'where.*are.*you.*located', r'where.*are.*sports.*facilities',
-                r'location.*of.*sports.*workshops', r'where.*are.*workshops.*held',
-                r'sports.*facilities.*location', r'where.*do.*workshops.*take.*place',
-                r'gym.*location', r'sports.*complex.*location',
-                # FRENCH PATTERNS
-                r'où.*êtes.*vous.*situés', r'où.*se.*trouvent.*installations.*sportives',
-                r'localisation.*ateliers', r'où.*ont.*lieu.*ateliers',
-                r'emplacement.*gymnase', r'où.*sont.*installations'
-            ],
-            "talleres_tienen_asistencia": [
-                r'tienen.*asistencia', r'asistencia.*taller', r'control.*asistencia',
-                r'registro.*asistencia', r'presentismo'
-            ],
-            "desinscripcion_talleres": [
-                r'cómo.*puedo.*des.*inscribirme', r'retirarme.*taller',
-                r'cancelar.*inscripción', r'dejar.*taller', r'abandonar.*optativo',
-                r'cómo.*me.*doy.*de.*baja'
-            ],
-            "gimnasio_caf_libre": [
-                r'si.*tengo.*tiempo.*libre.*y.*no.*hay.*profesores.*puedo.*usar.*el.*gimnasio',
-                r'uso.*libre.*gimnasio', r'gimnasio.*sin.*profesor', r'entrenar.*solo',
-                r'acceso.*libre.*caf', r'gimnasio.*independiente',
-                # ENGLISH PATTERNS
-                r'if.*i.*have.*free.*time.*and.*there.*are.*no.*teachers.*can.*i.*use.*the.*gym',
-                r'gym.*without.*teachers', r'free.*access.*gym', r'independent.*gym.*use',
-                r'use.*gym.*without.*instructor', r'solo.*gym.*training',
-                # FRENCH PATTERNS
-                r'si.*j.*ai.*du.*temps.*libre.*et.*qu.*il.*n.*y.*a.*pas.*de.*professeurs.*puis.*je.*utiliser.*la.*salle.*de.*sport',
-                r'utilisation.*libre.*gymnase', r'gymnase.*sans.*professeur',
-                r'accès.*libre.*salle.*sport', r'entraînement.*indépendant'
-            ],
-            
-            # DESARROLLO PROFESIONAL - EXPANDIDO
-            "practicas_profesionales": [
-                r'práctica.*profesional', r'practica', r'claudia.*cortés',
-                r'ccortesn', r'buscar.*práctica', r'encontrar.*práctica',
-                r'proceso.*práctica', r'requisitos.*práctica', r'practicas.*profesionales',
-                # ENGLISH PATTERNS
-                r'professional.*internship', r'internship', r'find.*internship',
-                r'search.*internship', r'internship.*process', r'internship.*requirements',
-                r'support.*for.*finding.*internships',
-                # FRENCH PATTERNS
-                r'quel.*soutien.*pour.*trouver.*des.*stages.*professionnels',
-                r'aide.*pour.*stages.*professionnels', r'stages.*professionnels',
-                r'trouver.*des.*stages', r'comment.*puis-je.*faire.*un.*stage.*professionnel',
-                r'stage.*professionnel', r'faire.*stage'
-            ],
-            "mejorar_curriculum": [
-                r'mejorar.*curriculum', r'mejorar.*cv', r'asesoría.*curricular',
-                r'revisar.*cv', r'optimizar.*curriculum', r'cv.*mejor',
-                r'consejos.*curriculum', r'cómo.*hacer.*cv',
-                # ENGLISH PATTERNS
-                r'improve.*resume', r'improve.*cv', r'cv.*advisory',
-                r'review.*cv', r'optimize.*curriculum', r'resume.*help',
-                r'curriculum.*vitae.*help', r'how.*to.*make.*cv',
-                r'how.*can.*you.*help.*me.*improve.*my.*cv',
-                r'help.*me.*improve.*my.*cv', r'can.*you.*help.*improve.*cv',
-                r'how.*can.*you.*help.*me.*improve', r'help.*improve.*cv',
-                r'can.*you.*help.*me.*improve',
-                # FRENCH PATTERNS
-                r'comment.*pouvez-vous.*m\'aider.*à.*améliorer.*mon.*cv',
-                r'améliorer.*mon.*cv', r'conseils.*pour.*cv', r'aider.*améliorer.*cv',
-                r'comment.*améliorer.*cv', r'optimiser.*cv', r'aide.*pour.*cv'
-            ],
-            "simulaciones_entrevistas": [
-                r'simulación.*entrevista', r'entrevista.*laboral', r'practicar.*entrevista',
-                r'preparación.*entrevista', r'feedback.*entrevista', r'ensayo.*entrevista',
-                r'cómo.*enfrentar.*entrevista',
-                # ENGLISH PATTERNS
-                r'interview.*simulation', r'job.*interview', r'practice.*interview',
-                r'interview.*preparation', r'interview.*feedback', r'interview.*rehearsal',
-                r'how.*to.*face.*interview',
-                # FRENCH PATTERNS
-                r'comment.*puis-je.*préparer.*un.*entretien.*d\'embauche',
-                r'préparation.*entretien', r'simulation.*entretien', r'entretien.*d\'embauche',
-                r'préparer.*entretien', r'conseils.*entretien'
-            ],
-            "talleres_empleabilidad": [
-                r'taller.*empleabilidad', r'taller.*cv', r'taller.*entrevista',
-                r'desarrollo.*laboral', r'charla.*empleo', r'taller.*habilidades',
-                r'formación.*laboral', r'capacitación.*empleo',
-                # ENGLISH PATTERNS
-                r'employability.*workshop', r'cv.*workshop', r'interview.*workshop',
-                r'career.*development', r'employment.*talk', r'skills.*workshop',
-                r'job.*training', r'employment.*training',
-                # FRENCH PATTERNS
-                r'quels.*sont.*les.*ateliers.*d\'employabilité.*disponibles',
-                r'ateliers.*d\'employabilité', r'formations.*employabilité',
-                r'ateliers.*emploi', r'ateliers.*compétences'
-            ],
-            "beneficios_titulados": [
-                r'beneficios.*titulados', r'egresados', r'titulados', r'después.*titular',
-                r'ventajas.*titulado', r'servicios.*egresados', r'duoc.*después.*estudiar',
-                # ENGLISH PATTERNS
-                r'graduate.*benefits', r'benefits.*for.*graduates', r'graduated.*advantages',
-                r'services.*for.*graduates', r'duoc.*after.*studying', r'post.*graduation.*benefits',
-                r'what.*benefits.*do.*graduates.*have', r'benefits.*graduates.*have',
-                # FRENCH PATTERNS
-                r'quels.*sont.*les.*avantages.*pour.*les.*diplômés',
-                r'avantages.*diplômés', r'services.*diplômés', r'bénéfices.*diplômés',
-                r'privilèges.*diplômés', r'après.*diplôme'
-            ],
-            "ferias_laborales": [
-                r'ferias.*laborales', r'feria.*empleo', r'encuentro.*empresas',
-                r'feria.*trabajo', r'empresas.*reclutando', r'feria.*laboral.*duoc',
-                r'evento.*empleadores', r'feria.*profesional',
-                # FRENCH PATTERNS - MEJORADOS
-                r'y.*a.*t.*il.*des.*foires.*de.*l\'emploi',
-                r'y.*a-t-il.*des.*foires.*de.*l\'emploi',
-                r'foires.*de.*l\'emploi', r'salons.*emploi', r'foires.*travail',
-                r'événements.*emploi', r'rencontres.*employeurs', 
-                r'a.*t.*il.*foires', r'y.*a.*t.*il.*foires', 
-                r'des.*foires.*emploi', r'il.*des.*foires', 
-                r'a.*t.*il.*des.*foires'
-            ],
-            "mentoria_profesional": [
-                r'mentoría.*profesional', r'mentor.*profesional', r'programa.*mentores',
-                r'acompañamiento.*profesional', r'guía.*carrera', r'mentoria.*profesional',
-                r'consejero.*profesional', r'orientación.*carrera'
-            ],
-            "linkedin_optimizacion": [
-                r'optimizar.*linkedin', r'perfil.*linkedin', r'linkedin.*profesional',
-                r'mejorar.*linkedin', r'linkedin.*optimización', r'perfil.*linkedin.*mejorar',
-                r'consejos.*linkedin', r'linkedin.*cv',
-                # FRENCH PATTERNS
-                r'comment.*optimiser.*mon.*profil.*linkedin',
-                r'optimiser.*linkedin', r'améliorer.*profil.*linkedin',
-                r'conseils.*linkedin', r'linkedin.*professionnel'
-            ],
-            "que_es_desarrollo_laboral": [
-                r'qué.*es.*desarrollo.*laboral', r'desarrollo.*laboral.*duoc',
-                r'qué.*hace.*desarrollo.*laboral', r'información.*desarrollo.*laboral',
-                r'definición.*desarrollo.*laboral', r'desarrollo.*laboral.*en.*duoc',
-                # ENGLISH PATTERNS
-                r'what.*is.*career.*development', r'career.*development.*duoc',
-                r'what.*does.*career.*development.*do', r'information.*career.*development',
-                r'definition.*career.*development', r'career.*development.*at.*duoc',
-                r'what.*is.*labor.*development', r'labor.*development.*duoc',
-                r'what.*is.*labor.*development.*at.*duoc',
-                # FRENCH PATTERNS
-                r'qu\'est-ce.*que.*le.*développement.*professionnel',
-                r'développement.*professionnel.*duoc', r'qu\'est-ce.*que.*développement.*professionnel'
-            ],
-            
-            # INSTITUCIONALES
-            "saludo_inicial": [
-                r'^hola$', r'^buenos.*días$', r'^buenas.*tardes$', r'^buenas.*noches$',
-                r'^quién.*eres$', r'^presentate$', r'^qué.*puedes.*hacer$',
-                r'^hola ina$', r'^hola iná$', r'^ina hola$', r'^hola asistente$'
-            ],
-            "informacion_contacto": [
-                r'contacto', r'teléfono', r'dirección', r'ubicación', r'horario.*atención',
-                r'dónde.*están', r'cómo.*llegar', r'datos.*contacto',
-                r'qué.*horario', r'cuándo.*abren', r'número.*teléfono',
-                r'dirección.*plaza.*norte', r'santa.*elena', r'huechuraba'
-            ],
-            "horarios_atencion": [
-                r'horarios.*atención', r'horario.*atención', r'cuándo.*abren',
-                r'horario.*punto.*estudiantil', r'horario.*biblioteca', r'horario.*gimnasio',
-                r'horario.*cafetería', r'horario.*casino', r'cuándo.*cierran'
-            ],
-            "becas_beneficios": [
-                r'becas.*beneficios', r'todos.*beneficios', r'beneficios.*duoc',
-                r'ayudas.*estudiantiles', r'becas.*internas', r'programas.*apoyo',
-                r'qué.*beneficios.*hay', r'beneficios.*disponibles'
-            ],
-            "calendario_academico_2026": [
-                r'calendario.*académico.*2026', r'cuándo.*empieza.*semestre.*2026',
-                r'cuándo.*comienza.*2026', r'fechas.*2026', r'inicio.*semestre.*2026',
-                r'semestre.*otoño.*2026', r'semestre.*primavera.*2026',
-                r'calendario.*2026', r'inicio.*clases.*2026', r'fechas.*importantes.*2026',
-                r'cuándo.*empiezan.*clases.*2026', r'inicio.*año.*académico.*2026'
-            ],
-            "calendario_academico": [
-                r'calendario.*académico', r'fechas.*importantes', r'cuándo.*empiezan.*clases',
-                r'cuándo.*terminan.*clases', r'exámenes.*cuándo', r'vacaciones.*cuándo',
-                r'cronograma.*académico', r'fechas.*claves'
-            ],
-            "biblioteca_recursos": [
-                r'biblioteca', r'recursos.*biblioteca', r'servicios.*biblioteca',
-                r'préstamo.*libros', r'salas.*estudio', r'computadores.*biblioteca',
-                r'bases.*datos', r'biblioteca\.duoc\.cl'
-            ],
-            "plataformas_digitales": [
-                r'plataformas.*digitales', r'sistemas.*duoc', r'plataformas.*online',
-                r'sistemas.*digitales', r'plataforma.*virtual', r'portal.*duoc',
-                r'centro.*ayuda', r'mi.*duoc'
-            ],
-            "contingencias_emergencias": [
-                r'contingencias', r'emergencias', r'protocolo.*emergencia',
-                r'protocolo.*seguridad', r'emergencia.*sede'
-            ],
-            "contacto_areas": [
-                r'contacto.*áreas', r'teléfonos.*específicos', r'contacto.*especializado',
-                r'áreas.*contacto', r'departamentos.*contacto', r'contacto.*directo',
-                r'números.*directos', r'email.*específico'
-            ],
-            
-            # === TEMPLATES FALTANTES DESARROLLO LABORAL ===
-            "bolsa_empleo": [
-                r'bolsa.*empleo', r'bolsa.*trabajo', r'ofertas.*empleo', r'buscar.*trabajo',
-                r'duoclaboral', r'portal.*empleo', r'ofertas.*laborales',
-                # ENGLISH PATTERNS
-                r'job.*portal', r'job.*board', r'job.*bank', r'employment.*platform', r'find.*work',
-                r'access.*duoclaboral', r'job.*offers', r'employment.*opportunities',
-                r'where.*can.*i.*access.*job.*bank', r'duoc.*uc.*job.*bank',
-                r'access.*the.*job.*bank', r'job.*bank.*access', r'where.*can.*i.*access.*the.*duoc.*uc.*job.*bank',
-                r'duoc.*job.*bank', r'access.*job.*bank',
-                # FRENCH PATTERNS
-                r'où.*puis-je.*accéder.*à.*la.*bourse.*d\'emploi',
-                r'bourse.*d\'emploi.*duoc.*uc', r'accès.*bourse.*emploi'
-            ],
-            "simulaciones_entrevistas": [
-                r'simulación.*entrevista', r'simulacro.*entrevista', r'práctica.*entrevista',
-                r'entrevista.*simulada', r'preparación.*entrevista',
-                # ENGLISH PATTERNS
-                r'interview.*simulation', r'mock.*interview', r'interview.*practice',
-                r'simulated.*interview', r'interview.*preparation', r'interview.*training',
-                # FRENCH PATTERNS
-                r'offrez-vous.*des.*simulations.*d\'entretiens',
-                r'simulations.*d\'entretiens.*d\'embauche', r'simulation.*entretien'
-            ],
-            "talleres_empleabilidad": [
-                r'talleres.*empleabilidad', r'taller.*empleo', r'empleabilidad',
-                r'habilidades.*laborales', r'competencias.*laborales',
-                # ENGLISH PATTERNS
-                r'employability.*workshops', r'employment.*workshop', r'employability',
-                r'job.*skills', r'work.*competencies', r'professional.*skills',
-                # FRENCH PATTERNS
-                r'quel.*type.*d\'ateliers.*d\'employabilité',
-                r'ateliers.*d\'employabilité', r'formations.*employabilité'
-            ],
-            "ferias_laborales": [
-                r'ferias.*laborales', r'feria.*trabajo', r'feria.*empleo',
-                r'evento.*laboral', r'encuentro.*laboral'
-            ],
-            "mentoria_profesional": [
-                r'mentoría.*profesional', r'mentor.*laboral', r'asesoría.*profesional',
-                r'guía.*profesional', r'coaching.*laboral'
-            ],
-            "linkedin_optimizacion": [
-                r'linkedin', r'linkedin.*optimización', r'perfil.*linkedin',
-                r'optimizar.*linkedin', r'mejorar.*linkedin'
-            ],
-            
-            # === TEMPLATES FALTANTES DEPORTES ===
-            "talleres_tienen_asistencia": [
-                r'asistencia.*talleres', r'talleres.*asistencia', r'control.*asistencia',
-                r'attendance.*workshops', r'asistencia.*deportes'
-            ],
-            "desinscripcion_talleres": [
-                r'desinscripción.*talleres', r'cancelar.*talleres', r'retirarme.*taller',
-                r'unsubscribe.*workshops', r'dejar.*taller'
-            ],
-            "becas_deportivas": [
-                r'becas.*deportivas', r'beca.*deporte', r'sports.*scholarships',
-                r'beca.*deportiva', r'apoyo.*deportista'
-            ],
-            
-            # === TEMPLATES FALTANTES PASTORAL ===
-            "pastoral_informacion_general": [
-                r'pastoral.*información', r'qué.*es.*pastoral', r'pastoral.*general',
-                r'área.*pastoral', r'servicios.*pastoral'
-            ],
-            "voluntariado": [
-                r'voluntariado', r'volunteer.*work', r'trabajo.*voluntario',
-                r'actividades.*solidarias', r'servicio.*comunitario'
-            ],
-            "retiros_espirituales": [
-                r'retiros.*espirituales', r'spiritual.*retreats', r'retiro.*religioso',
-                r'actividad.*espiritual', r'encuentro.*espiritual'
-            ],
-            "grupos_oracion": [
-                r'grupos.*oración', r'prayer.*groups', r'grupo.*religioso',
-                r'oración.*grupal', r'encuentro.*oración'
-            ],
-            "celebraciones_liturgicas": [
-                r'celebraciones.*litúrgicas', r'liturgical.*celebrations',
-                r'misa', r'celebración.*religiosa', r'evento.*litúrgico'
-            ],
-            "solidaridad_ayuda_social": [
-                r'solidaridad', r'ayuda.*social', r'solidarity.*social.*help',
-                r'acción.*solidaria', r'apoyo.*social'
-            ],
-            
-            # === TEMPLATES FALTANTES TNE ===
-            "tne_informacion_general": [
-                r'información.*general.*tne', r'qué.*es.*tne', r'general.*information.*tne',
-                r'what.*is.*tne', r'información.*tarjeta.*estudiante'
-            ],
-            
-            # === TEMPLATES FALTANTES VARIOS ===
-            "programa_emergencia_categorias": [
-                r'categorías.*programa.*emergencia', r'emergency.*program.*categories',
-                r'tipos.*ayuda.*emergencia', r'modalidades.*emergencia'
-            ],
-            "seguro_funcionamiento": [
-                r'funcionamiento.*seguro', r'how.*insurance.*works',
-                r'proceso.*seguro', r'cómo.*usar.*seguro'
-            ],
-            "horarios_atencion": [
-                r'horarios.*atención', r'horario.*punto.*estudiantil', 
-                r'schedule.*attention', r'hours.*attention'
-            ],
-            "informacion_contacto": [
-                r'información.*contacto', r'contact.*information',
-                r'datos.*contacto', r'contacto.*general'
-            ],
-            "saludo_inicial": [
-                r'hola', r'buenos.*días', r'buenas.*tardes', r'hello',
-                r'good.*morning', r'hi', r'hey'
-            ],
-            "calendario_academico": [
-                r'calendario.*académico', r'academic.*calendar',
-                r'fechas.*importantes', r'cronograma.*académico'
-            ],
-            "biblioteca_recursos": [
-                r'biblioteca.*recursos', r'library.*resources',
-                r'recursos.*biblioteca', r'servicios.*biblioteca'
-            ],
-            "becas_beneficios": [
-                r'becas.*beneficios', r'scholarships.*benefits',
-                r'beneficios.*estudiantiles', r'ayudas.*estudiantiles'
-            ],
-            
-            # === PATRONES ADICIONALES CRÍTICOS FALTANTES ===
-            "talleres_deportivos": [
-                r'qu[ée].*deportes.*puedo.*practicar', r'qu[ée].*deportes.*hay',
-                r'qu[ée].*actividades.*deportivas', r'deportes.*disponibles',
-                r'oferta.*deportiva', r'talleres.*deportivos', r'actividades.*deportivas',
-                # ENGLISH PATTERNS
-                r'what.*sports.*workshops.*do.*you.*have', r'what.*sports.*workshops',
-                r'what.*workshops.*do.*you.*have', r'what.*sports.*activities',
-                # FRENCH PATTERNS  
-                r'quels.*ateliers.*sportifs.*avez.*vous', r'quels.*ateliers.*sportifs',
-                r'quels.*ateliers.*avez.*vous'
-            ],
-            "becas_deportivas": [
-                r'beca.*deportiva', r'becas.*deportivas', r'beneficio.*deportivo',
-                # ENGLISH PATTERNS
-                r'sports.*scholarships', r'sports.*scholarship',
-                # FRENCH PATTERNS
-                r'bourses.*sportives', r'bourse.*sportive'
-            ],
-            "optativos_deportivos_nota": [
-                r'tienen.*nota.*los.*optativos.*deportivos', r'optativos.*deportivos.*tienen.*nota',
-                # ENGLISH PATTERNS
-                r'do.*workshops.*have.*grades', r'workshops.*have.*grades',
-                r'do.*sports.*electives.*have.*grades', r'sports.*electives.*have.*grades',
-                # FRENCH PATTERNS
-                r'les.*ateliers.*ont.*ils.*des.*notes', r'ateliers.*ont.*notes',
-                r'les.*options.*sportives.*ont.*elles.*des.*notes', r'options.*sportives.*ont.*notes'
-            ],
-            "ubicaciones_deportivas": [
-                r'd[óo]nde.*est[aá]n.*ubicados', r'ubicaci[óo]n.*deportes',
-                r'en.*qu[eé].*lugar.*est[aá]n.*ubicados', r'qu[eé].*lugar.*est[aá]n.*ubicados',
-                # ENGLISH PATTERNS
-                r'where.*are.*you.*located', r'sports.*location',
-                # FRENCH PATTERNS
-                r'o[ùu].*[eê]tes.*vous.*situ[eé]s', r'localisation.*sport'
-            ],
-            "mejorar_curriculum": [
-                r'c[oó]mo.*mejoro.*mi.*curriculum', r'c[oó]mo.*mejoro.*curr[íi]culum',
-                r'mejorar.*curr[íi]culum', r'optimizar.*cv', r'ayuda.*curriculum',
-                r'asesor[íi]a.*curriculum', r'revisi[oó]n.*cv', r'c[oó]mo.*mejorar.*cv',
-                # ENGLISH PATTERNS
-                r'how.*can.*you.*help.*me.*improve.*my.*resume', r'improve.*cv.*help',
-                r'resume.*improvement', r'cv.*enhancement', r'help.*with.*curriculum',
-                r'review.*my.*resume', r'curriculum.*vitae.*help', r'cv.*advisory',
-                r'how.*can.*you.*help.*me.*improve.*my.*cv',
-                r'help.*me.*improve.*my.*cv', r'can.*you.*help.*improve.*cv',
-                r'how.*can.*you.*help.*me.*improve', r'help.*improve.*cv',
-                r'can.*you.*help.*me.*improve',
-                # FRENCH PATTERNS
-                r'comment.*pouvez-vous.*m\'aider.*à.*améliorer.*mon.*cv',
-                r'améliorer.*mon.*cv', r'conseils.*pour.*cv', r'aide.*cv'
-            ],
-            "apoyo_psicologico_principal": [
-                r'necesito.*apoyo.*psicologico', r'necesito.*ayuda.*psicol[óo]gica',
-                r'apoyo.*psicol[óo]gico', r'atenci[óo]n.*psicol[óo]gica',
-                r'ayuda.*emocional', r'necesito.*psic[óo]logo'
-            ],
-            "talleres_tienen_nota": [
-                r'los.*talleres.*tienen.*nota', r'tienen.*nota.*talleres',
-                r'talleres.*deportivos.*tienen.*nota', r'nota.*talleres',
-                r'evaluaci[óo]n.*talleres.*deportivos', r'calificaci[óo]n.*deportes'
-            ],
-            "simulaciones_entrevistas": [
-                r'simulaci[oó]n.*entrevista', r'simulaciones.*entrevistas',
-                r'ofrecen.*simulaciones', r'simulaci[oó]n.*laboral',
-                r'pr[áa]ctica.*entrevista', r'entrenar.*entrevistas',
-                r'preparaci[oó]n.*entrevista.*laboral',
-                # ENGLISH PATTERNS
-                r'interview.*simulation', r'interview.*simulations',
-                r'do.*you.*offer.*interview.*simulations', r'practice.*interviews',
-                r'mock.*interviews', r'interview.*training', r'interview.*preparation',
-                # FRENCH PATTERNS
-                r'comment.*puis-je.*préparer.*un.*entretien.*d\'embauche',
-                r'préparation.*entretien', r'simulation.*entretien', r'entretien.*d\'embauche',
-                r'préparer.*entretien', r'conseils.*entretien'
-            ],
+        match = template_matcher.match(question_lower)
+        if match is None:
+            logger.debug(f"No template match para: '{question}'")
+            return None
 
-            "ferias_laborales": [
-                r'ferias.*laborales', r'feria.*empleo', r'encuentro.*empresas',
-                r'feria.*trabajo', r'empresas.*reclutando', r'feria.*laboral.*duoc',
-                r'evento.*empleadores', r'feria.*profesional',
-                # ENGLISH PATTERNS  
-                r'job.*fair', r'career.*fair', r'employment.*fair',
-                r'job.*fairs', r'career.*fairs', r'recruiting.*events',
-                # FRENCH PATTERNS
-                r'y.*a.*t.*il.*des.*foires.*de.*l\'emploi',
-                r'y.*a-t-il.*des.*foires.*de.*l\'emploi',
-                r'foires.*de.*l\'emploi', r'salons.*emploi', r'foires.*travail',
-                r'événements.*emploi', r'rencontres.*employeurs', 
-                r'a.*t.*il.*foires', r'y.*a.*t.*il.*foires', 
-                r'des.*foires.*emploi', r'il.*des.*foires', 
-                r'a.*t.*il.*des.*foires'
-            ],
-            
-            # === 7 NUEVOS TEMPLATES ===
-            "emergencias": [
-                r'emergencia.*duoc', r'protocolo.*emergencia', r'qué.*hacer.*emergencia',
-                r'número.*emergencia', r'contacto.*emergencia', r'teléfono.*emergencia',
-                r'incendio.*duoc', r'sismo.*duoc', r'terremoto.*duoc', r'evacuación',
-                r'emergencia.*médica', r'enfermería.*duoc', r'ambulancia.*duoc',
-                r'caso.*emergencia', r'qué.*hago.*emergencia', r'protocolo.*seguridad',
-                r'caso.*terremoto', r'caso.*sismo', r'caso.*incendio',
-                r'qué.*hago.*terremoto', r'qué.*hago.*sismo', r'qué.*hago.*incendio',
-                r'emergency.*protocol', r'what.*to.*do.*emergency', r'fire.*drill',
-                r'earthquake.*protocol', r'evacuation.*plan', r'emergency.*contact'
-            ],
-            "reglamentos_academicos": [
-                r'cuántas.*inasistencias', r'máximo.*faltas', r'75%.*asistencia',
-                r'porcentaje.*asistencia', r'asistencia.*mínima', r'puedo.*faltar',
-                r'qué.*pasa.*si.*repruebo', r'escala.*notas', r'nota.*aprobación',
-                r'justificar.*inasistencia', r'certificado.*médico.*inasistencia',
-                r'reglamento.*académico', r'normativa.*asistencia', r'eliminar.*por.*faltas',
-                r'evaluaciones.*duoc', r'tipos.*evaluación', r'examen.*final',
-                r'cuántas.*faltas.*puedo', r'requisito.*asistencia',
-                r'attendance.*minimum', r'how.*many.*absences', r'grade.*scale',
-                r'passing.*grade', r'academic.*regulations', r'evaluation.*system'
-            ],
-            "desarrollo_laboral": [
-                r'desarrollo.*laboral', r'claudia.*cortés', r'ccortesn',
-                r'asesoría.*cv', r'mejorar.*cv', r'curriculum.*vitae',
-                r'bolsa.*empleo.*duoc', r'duoclaboral', r'ofertas.*trabajo.*duoc',
-                r'práctica.*profesional', r'búsqueda.*práctica', r'encontrar.*práctica',
-                r'simulación.*entrevista', r'taller.*empleabilidad', r'empleo.*duoc',
-                r'qué.*es.*desarrollo.*laboral', r'servicios.*desarrollo.*laboral',
-                r'career.*services', r'job.*placement', r'career.*counseling',
-                r'cv.*help', r'employment.*services', r'internship.*support'
-            ],
-            "congelamiento": [
-                r'congelar.*estudios', r'congelamiento.*carrera', r'suspender.*estudios',
-                r'tomar.*año.*sabático', r'pausar.*estudios', r'congelamiento.*duoc',
-                r'cómo.*congelo', r'requisitos.*congelamiento', r'proceso.*congelamiento',
-                r'puedo.*congelar', r'cómo.*pausar.*estudios',
-                r'freeze.*studies', r'suspend.*studies', r'gap.*year',
-                r'pause.*enrollment', r'temporary.*leave', r'study.*freeze'
-            ],
-            "cambio_sede": [
-                r'cambiar.*sede', r'cambio.*campus', r'trasladar.*otra.*sede',
-                r'ir.*otra.*sede', r'mudarme.*otra.*sede', r'cambio.*sede.*duoc',
-                r'requisitos.*cambio.*sede', r'transferencia.*sede', r'cupos.*otra.*sede',
-                r'puedo.*cambiar.*sede', r'cómo.*cambio.*sede',
-                r'change.*campus', r'transfer.*campus', r'move.*another.*campus',
-                r'campus.*transfer', r'change.*location', r'transfer.*process'
-            ],
-            "deportes_talleres": [
-                r'talleres.*deportivos', r'deportes.*duoc', r'actividades.*deportivas',
-                r'gimnasio.*caf', r'caf.*duoc', r'inscripción.*deportes',
-                r'fútbol.*duoc', r'basquetbol.*duoc', r'voleibol.*duoc',
-                r'natación.*duoc', r'boxeo.*duoc', r'funcional.*duoc',
-                r'horarios.*deportes', r'inscribir.*taller.*deportivo',
-                r'qué.*talleres.*deportivos', r'actividades.*físicas',
-                r'sports.*workshops', r'gym.*duoc', r'sports.*activities',
-                r'sports.*registration', r'athletic.*programs'
-            ],
-            "biblioteca_servicios": [
-                r'biblioteca.*duoc', r'préstamo.*libros', r'salas.*estudio',
-                r'reservar.*sala', r'computadores.*biblioteca', r'impresión.*biblioteca',
-                r'recursos.*digitales.*biblioteca', r'bibliotecas\.duoc\.cl',
-                r'horario.*biblioteca', r'servicios.*biblioteca', r'wifi.*biblioteca',
-                r'cómo.*imprimir', r'fotocopias.*biblioteca',
-                r'dónde.*está.*biblioteca', r'ubicación.*biblioteca', r'dónde.*biblioteca',
-                r'dónde.*puedo.*imprimir', r'dónde.*imprimir', r'imprimir.*documentos',
-                r'imprimir.*biblioteca', r'fotocopiar.*documentos',
-                r'library.*services', r'book.*loan', r'study.*rooms',
-                r'print.*library', r'digital.*resources', r'library.*hours',
-                r'where.*is.*library', r'library.*location', r'where.*can.*i.*print'
-            ]
-        }
-        
-        for template_id, patterns in template_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, question_lower):
-                    print(f"   ✅ TEMPLATE ENCONTRADO: '{template_id}'")
-                    print(f"   🎯 Patrón coincidente: {pattern[:50]}...")
-                    logger.info(f"✅ TEMPLATE MATCH: '{question}' -> {template_id}")
-                    self.stats['template_matches'] += 1
-                    return template_id
-        
-        print(f"   ℹ️  No se encontró template específico (se usará RAG)")
-        logger.debug(f"No template match para: '{question}'")
-        return None
+        group, template_id, pattern = match
+        print(f"   ✅ TEMPLATE ENCONTRADO: '{template_id}'")
+        print(f"   🎯 Patrón coincidente: {pattern[:50]}...")
+        if group == 'priority':
+            logger.info(f"✅ PRIORITY TEMPLATE: '{question}' -> {template_id}")
+        else:
+            logger.info(f"✅ TEMPLATE MATCH: '{question}' -> {template_id}")
+            self.stats['template_matches'] += 1
+        return template_id
     
     def _keyword_classification(self, question: str) -> Tuple[str, float]:
         """
@@ -1838,25 +540,39 @@ class QuestionClassifier:
         
         return best_category, confidence
     
-    def get_classification_info(self, question: str) -> Dict:
+    def get_classification_info(self, question: str, topic_result: Optional[Dict] = None,
+                                query_embedding=None, include_category: bool = True) -> Dict:
         """
         Obtiene información completa de clasificación incluyendo idioma detectado
         SIEMPRE detecta idioma independientemente del cache
+
+        `topic_result`: clasificación de tópico ya calculada para esta pregunta (QueryAnalysis)
+        `query_embedding`: embedding de la búsqueda vectorial; si los centroides lo clasifican
+        con alta confianza no se recorre la cadena de reglas
+        `include_category=False`: solo idioma y tópico; "category" queda en None para que el
+        llamador la calcule cuando la necesite (classify_question con el embedding de la búsqueda)
         """
         try:
-            from app.topic_classifier import TopicClassifier
-            topic_classifier = TopicClassifier()
+            topic_classifier = _get_topic_classifier()
             
             # SIEMPRE detectar idioma independientemente del cache
             detected_language = topic_classifier._detect_simple_language(question)
             
-            # Obtener categoría con el método principal
-            category = self.classify_question(question)
+            # Obtener categoría: centroides si son concluyentes, si no el método principal
+            centroid_result = self.classify_by_centroid(query_embedding) if include_category else None
+            if not include_category:
+                category = None
+            elif centroid_result and centroid_result['confident']:
+                self.stats['total_classifications'] += 1
+                category = self._accept_centroid_category(question, centroid_result)
+            else:
+                category = self.classify_question(question)
             
             # Obtener clasificación completa del topic_classifier para confidence
-            topic_result = topic_classifier.classify_topic(question)
+            if topic_result is None:
+                topic_result = topic_classifier.classify_topic(question)
             
-            return {
+            info = {
                 "category": category,
                 "language": detected_language,  # PRIORIZAR idioma detectado directamente
                 "confidence": topic_result.get("confidence", 0.7),
@@ -1864,19 +580,24 @@ class QuestionClassifier:
                 "is_institutional": topic_result.get("is_institutional", True),
                 "source": "enhanced_classifier_with_language"
             }
+            if centroid_result:
+                info["centroid"] = centroid_result
+                if centroid_result['confident']:
+                    info["confidence"] = centroid_result['confidence']
+                    info["source"] = "centroid_classifier_with_language"
+            return info
             
         except Exception as e:
             logger.error(f"Error obteniendo información de clasificación: {e}")
             # En caso de error, SIEMPRE intentar detectar idioma
             try:
-                from app.topic_classifier import TopicClassifier
-                topic_classifier = TopicClassifier()
+                topic_classifier = _get_topic_classifier()
                 detected_language = topic_classifier._detect_simple_language(question)
             except:
                 detected_language = "es"
                 
             return {
-                "category": self.classify_question(question),
+                "category": self.classify_question(question) if include_category else None,
                 "language": detected_language,
                 "confidence": 0.5,
                 "matched_keywords": [],
@@ -1890,8 +611,7 @@ class QuestionClassifier:
         Retorna diccionario con categoría, idioma y detalles adicionales
         """
         try:
-            from app.topic_classifier import TopicClassifier
-            topic_classifier = TopicClassifier()
+            topic_classifier = _get_topic_classifier()
             
             topic_result = topic_classifier.classify_topic(question)
             
@@ -1922,33 +642,63 @@ class QuestionClassifier:
                 "source": "error"
             }
     
+    def _pattern_tables_version(self) -> str:
+        """Huella de las tablas que deciden la categoría (regex, TopicClassifier y centroides)"""
+        topic_classifier = _get_topic_classifier()
+        tables = {
+            'keyword_patterns': self.keyword_patterns,
+            'allowed_categories': topic_classifier.allowed_categories,
+            'redirect_categories': topic_classifier.redirect_categories,
+        }
+        digest = hashlib.md5(json.dumps(tables, sort_keys=True, default=str).encode()).hexdigest()[:12]
+        # Los centroides se reconstruyen con cada versión de conocimiento
+        return f"{digest}-k{get_knowledge_version()}"
+
     def _manage_semantic_cache(self, question: str, category: str):
-        """Gestiona cache SEMÁNTICO (normalizado)"""
-        normalized_question = normalize_question(question)
-        
-        # Limpiar cache si es muy grande
-        if len(self._semantic_cache) >= self._cache_size:
-            items_to_remove = list(self._semantic_cache.keys())[:self._cache_size // 5]
-            for key in items_to_remove:
-                del self._semantic_cache[key]
-        
-        self._semantic_cache[normalized_question] = category
+        """Gestiona cache SEMÁNTICO (normalizado): LRU con TTL, compartido entre workers"""
+        self._semantic_cache.set(normalize_question(question), category)
     
-    def classify_question(self, question: str) -> str:
+    def classify_by_centroid(self, query_embedding) -> Optional[Dict]:
+        """Categoría por centroides de embeddings (None si no hay embedding o centroides)"""
+        if query_embedding is None:
+            return None
+        try:
+            return centroid_classifier.classify(query_embedding)
+        except Exception as e:
+            logger.warning(f"Error en clasificación por centroides: {e}")
+            return None
+
+    def _accept_centroid_category(self, question: str, centroid_result: Dict) -> str:
+        category = centroid_result['category']
+        self.stats['centroid_matches'] += 1
+        self.stats['category_counts'][category] = self.stats['category_counts'].get(category, 0) + 1
+        self._manage_semantic_cache(question, category)
+        logger.info(f"Centroid classification - Pregunta: '{question}' -> '{category}' "
+                    f"(confianza: {centroid_result['confidence']:.2f}, similitud: {centroid_result['similarity']:.2f})")
+        return category
+
+    def classify_question(self, question: str, query_embedding=None) -> str:
         """
         Clasifica una pregunta usando CACHE SEMÁNTICO MEJORADO
+
+        Con `query_embedding` (el de la búsqueda vectorial) se prueba primero el
+        clasificador por centroides; solo si no es concluyente se usan las reglas.
         """
         self.stats['total_classifications'] += 1
         
         # 1. Verificar cache SEMÁNTICO (normalizado)
         normalized_question = normalize_question(question)
-        if normalized_question in self._semantic_cache:
+        cached_category = self._semantic_cache.get(normalized_question)
+        if cached_category is not None:
             self.stats['semantic_cache_hits'] += 1
-            cached_category = self._semantic_cache[normalized_question]
-            self.stats['category_counts'][cached_category] += 1
+            self.stats['category_counts'][cached_category] = self.stats['category_counts'].get(cached_category, 0) + 1
             logger.info(f"Semantic Cache hit - Pregunta: '{question}' -> '{cached_category}'")
             return cached_category
         
+        centroid_result = self.classify_by_centroid(query_embedding)
+        if centroid_result and centroid_result['confident']:
+            return self._accept_centroid_category(question, centroid_result)
+        
         try:
             # 2. Clasificación por palabras clave MEJORADA
             keyword_category, confidence = self._keyword_classification(question)
@@ -1994,8 +744,12 @@ class QuestionClassifier:
             'keyword_match_rate': self.stats['keyword_matches'] / max(1, total),
             'ollama_call_rate': self.stats['ollama_calls'] / max(1, total),
             'template_match_rate': self.stats['template_matches'] / max(1, total),
+            'centroid_match_rate': self.stats['centroid_matches'] / max(1, total),
             'category_distribution': self.stats['category_counts'],
-            'semantic_cache_size': len(self._semantic_cache)
+            'semantic_cache_size': len(self._semantic_cache),
+            'semantic_cache': self._semantic_cache.get_stats(),
+            'template_matcher': template_matcher.get_stats(),
+            'centroid_classifier': centroid_classifier.get_stats()
         }
         
         return stats
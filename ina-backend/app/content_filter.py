@@ -1,11 +1,27 @@
 # app/content_filter.py - VERSIÓN CORREGIDA Y MEJORADA
 import re
+import time
 import logging
-from typing import Dict, List, Any, Optional
+import threading
+from collections import Counter
+from typing import Dict, List, Any, Optional, Tuple
+
+from app.aho_corasick import AhoCorasick
 
 logger = logging.getLogger(__name__)
 
 class ContentFilter:
+    """
+    Filtro de contenido con prioridad Institucional > Categoría conocida > Contexto > Bloqueo.
+
+    Todas las listas de términos (institucionales, permitidos, contextos, off-topic,
+    opinión, bloqueados) se compilan en un solo autómata Aho-Corasick y las regex se
+    precompilan: cada pregunta se recorre una vez y la decisión se toma sobre esas
+    coincidencias. Si se modifican las listas en tiempo de ejecución hay que llamar a
+    compile(). Cada decisión suma a `rule_hits` (regla que decidió) y `term_hits`
+    (término o patrón que bloqueó).
+    """
+
     def __init__(self):
         # BLOQUEADOS: SOLO CONTENIDO REALMENTE INAPROPIADO
         self.blocked_keywords = [
@@ -220,136 +236,225 @@ class ContentFilter:
             "punto_estudiantil"
         ]
 
+        self._stats_lock = threading.Lock()
+        self.rule_hits: Counter = Counter()
+        self.term_hits: Counter = Counter()
+        self.compile()
+
+    def compile(self):
+        """Compilar las listas de términos en un autómata y precompilar las regex"""
+        start = time.perf_counter()
+        rule_terms = {
+            'strong': list(self.strong_institutional_terms),
+            'allowed': list(self.allowed_terms),
+            'context': [phrase for context_list in self.allowed_contexts.values() for phrase in context_list],
+            'off_topic': list(self.off_topic_keywords),
+            'opinion': list(self.opinion_blockers),
+            'blocked': list(self.blocked_keywords),
+        }
+        automaton = AhoCorasick()
+        for rule, terms in rule_terms.items():
+            for index, term in enumerate(terms):
+                automaton.add(term, (rule, index))
+        automaton.build()
+
+        self._rule_terms = rule_terms
+        self._automaton = automaton
+        self._opinion_regexes = [re.compile(pattern) for pattern in self.opinion_patterns]
+        self._suspicious_regexes = [(pattern, re.compile(pattern, re.IGNORECASE))
+                                    for pattern in self.suspicious_patterns]
+        self.compile_ms = (time.perf_counter() - start) * 1000
+
+    def _scan(self, question: str) -> Dict[str, List[int]]:
+        """{lista: índices de sus términos presentes en la pregunta, en orden de la lista}"""
+        hits: Dict[str, List[int]] = {}
+        for rule, index in self._automaton.find_values(question):
+            hits.setdefault(rule, []).append(index)
+        for indexes in hits.values():
+            indexes.sort()
+        return hits
+
+    def _first_term(self, hits: Dict[str, List[int]], rule: str) -> str:
+        """Primer término de la lista que aparece (mismo resultado que recorrer la lista)"""
+        indexes = hits.get(rule)
+        return self._rule_terms[rule][indexes[0]] if indexes else ""
+
     def validate_question(self, question: str, category: Optional[str] = None) -> Dict[str, Any]:
         """
         Valida si una pregunta es permitida.
         Prioridad: Institucional > Categoría conocida > Contexto > Bloqueo
         """
-        question_lower = question.lower().strip()
+        result, rule, term = self._evaluate(question.lower().strip(), category)
+        self._record(rule, term)
+
+        if rule == 'known_category':
+            logger.info(f"Pregunta permitida por categoría conocida: {category}")
+        elif rule == 'strong_institutional':
+            logger.info(f"PRIORIDAD ALTA - Pregunta institucional: {question}")
+        elif rule == 'allowed_terms':
+            logger.info(f"Pregunta permitida por términos institucionales o contexto: {question}")
+        elif rule == 'off_topic':
+            logger.warning(f"Pregunta bloqueada por tema off-topic: {term}")
+        elif rule == 'blocked_keyword':
+            logger.warning(f"Pregunta bloqueada por palabra clave: {term}")
+        elif rule == 'suspicious_pattern':
+            logger.warning(f"Pregunta bloqueada por patrón: {term}")
+        elif rule == 'default':
+            logger.info(f"Permitiendo consulta por defecto: {question}")
+        return result
+
+    def validate_batch(self, questions: List[str], category: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Validar muchas preguntas de una vez (replay de logs, moderación retroactiva).
+
+        Retorna el resultado de cada pregunta (en el mismo orden, con la regla que decidió)
+        y las estadísticas de reglas y términos de este lote. No escribe un log por pregunta.
+        """
+        start = time.perf_counter()
+        results = []
+        rule_hits: Counter = Counter()
+        term_hits: Counter = Counter()
+
+        for question in questions:
+            result, rule, term = self._evaluate((question or "").lower().strip(), category)
+            rule_hits[rule] += 1
+            if term:
+                term_hits[f"{rule}: {term}"] += 1
+            results.append({**result, "rule": rule})
+
+        with self._stats_lock:
+            self.rule_hits.update(rule_hits)
+            self.term_hits.update(term_hits)
+
+        elapsed = time.perf_counter() - start
+        allowed = sum(1 for result in results if result["allowed"])
+        logger.info(f"🛡️ Validación en lote: {len(results)} preguntas, {len(results) - allowed} bloqueadas "
+                    f"en {elapsed * 1000:.1f}ms")
+        return {
+            "results": results,
+            "total": len(results),
+            "allowed": allowed,
+            "blocked": len(results) - allowed,
+            "rule_hits": dict(rule_hits.most_common()),
+            "term_hits": dict(term_hits.most_common()),
+            "elapsed_ms": round(elapsed * 1000, 2),
+            "questions_per_second": round(len(results) / elapsed) if elapsed > 0 else None
+        }
+
+    def _record(self, rule: str, term: str):
+        with self._stats_lock:
+            self.rule_hits[rule] += 1
+            if term:
+                self.term_hits[f"{rule}: {term}"] += 1
 
+    def _evaluate(self, question_lower: str, category: Optional[str]) -> Tuple[Dict[str, Any], str, str]:
+        """(resultado, regla que decidió, término/patrón que bloqueó) sobre la pregunta en minúsculas"""
         if len(question_lower) < 3:
             return {
                 "allowed": False,
                 "reason": "Por favor, haz una pregunta más clara sobre los servicios del Punto Estudiantil.",
                 "category": None,
                 "block_reason": "too_short"
-            }
+            }, 'too_short', ""
 
         # PRIORIDAD 1: CATEGORÍA CONOCIDA (del clasificador)
         if category and category in self.known_categories:
-            logger.info(f"Pregunta permitida por categoría conocida: {category}")
             return {
                 "allowed": True,
                 "reason": f"Categoría detectada: {category}",
                 "category": category
-            }
+            }, 'known_category', ""
+
+        hits = self._scan(question_lower)
 
         # PRIORIDAD 2: TÉRMINOS INSTITUCIONALES FUERTES
-        if any(term in question_lower for term in self.strong_institutional_terms):
-            logger.info(f"PRIORIDAD ALTA - Pregunta institucional: {question}")
+        if 'strong' in hits:
             return {
                 "allowed": True,
                 "reason": "Término institucional fuerte detectado",
                 "category": category or "institucionales"
-            }
+            }, 'strong_institutional', ""
         
         # PRIORIDAD 3: TÉRMINOS PERMITIDOS Y CONTEXTOS ESPECÍFICOS
-        if self._contains_allowed_terms(question_lower) or self._is_in_allowed_context(question_lower):
-            logger.info(f"Pregunta permitida por términos institucionales o contexto: {question}")
+        if 'allowed' in hits or 'context' in hits:
             return {
                 "allowed": True,
                 "reason": "Contexto o términos institucionales detectados",
                 "category": category or "institucionales"
-            }
+            }, 'allowed_terms', ""
         
         # BLOQUEO DE TEMAS OFF-TOPIC (solo si NO hay contexto institucional)
-        off_topic_word = self._contains_off_topic_keyword(question_lower)
+        off_topic_word = self._first_term(hits, 'off_topic')
         if off_topic_word:
-            logger.warning(f"Pregunta bloqueada por tema off-topic: {off_topic_word}")
             return {
                 "allowed": False,
                 "reason": f"No puedo responder consultas sobre '{off_topic_word}' fuera del contexto institucional. Pregúntame sobre servicios de Duoc UC.",
                 "category": None,
                 "block_reason": "off_topic"
-            }
+            }, 'off_topic', off_topic_word
         
         # BLOQUEO DE SOLICITUDES DE OPINIÓN
-        if self._is_opinion_request(question_lower):
+        if 'opinion' in hits or any(regex.search(question_lower) for regex in self._opinion_regexes):
             return {
                 "allowed": False,
                 "reason": "No puedo ofrecer opiniones personales. Puedo proporcionarte información objetiva sobre los servicios del Punto Estudiantil.",
                 "category": None,
                 "block_reason": "opinion_request"
-            }
+            }, 'opinion_request', ""
 
         # BLOQUEO: Solo contenido realmente peligroso
-        blocked_keyword = self._contains_blocked_keyword(question_lower)
+        blocked_keyword = self._first_term(hits, 'blocked')
         if blocked_keyword:
-            logger.warning(f"Pregunta bloqueada por palabra clave: {blocked_keyword}")
             return {
                 "allowed": False,
                 "reason": "Esta consulta no corresponde al ámbito del Punto Estudiantil.",
                 "category": None,
                 "block_reason": "blocked_keyword",
                 "blocked_keyword": blocked_keyword
-            }
+            }, 'blocked_keyword', blocked_keyword
 
         blocked_pattern = self._matches_suspicious_pattern(question_lower)
         if blocked_pattern:
-            logger.warning(f"Pregunta bloqueada por patrón: {blocked_pattern}")
             return {
                 "allowed": False,
                 "reason": "No puedo ayudarte con ese tipo de consultas.",
                 "category": None,
                 "block_reason": "suspicious_pattern",
                 "blocked_pattern": blocked_pattern
-            }
+            }, 'suspicious_pattern', blocked_pattern
 
         # OFF-TOPIC: MUY PERMISIVO - solo bloquear si es contenido realmente peligroso
-        logger.info(f"Permitiendo consulta por defecto: {question}")
         return {
             "allowed": True,
             "reason": "Permitido por defecto - consulta institucional",
             "category": category or "institucionales"
-        }
+        }, 'default', ""
 
     def _contains_allowed_terms(self, question: str) -> bool:
-        return any(term in question for term in self.allowed_terms)
+        return 'allowed' in self._scan(question)
 
     def _is_opinion_request(self, question: str) -> bool:
         """Detecta solicitudes de opinión personal"""
         # Verificar palabras clave directas
-        if any(phrase in question for phrase in self.opinion_blockers):
+        if 'opinion' in self._scan(question):
             return True
 
         # Verificar patrones regex
-        if any(re.search(pattern, question) for pattern in self.opinion_patterns):
-            return True
-
-        return False
+        return any(regex.search(question) for regex in self._opinion_regexes)
 
     def _is_in_allowed_context(self, question: str) -> bool:
-        for context_list in self.allowed_contexts.values():
-            if any(phrase in question for phrase in context_list):
-                return True
-        return False
+        return 'context' in self._scan(question)
 
     def _contains_blocked_keyword(self, question: str) -> str:
-        for keyword in self.blocked_keywords:
-            if keyword in question:
-                return keyword
-        return ""
+        return self._first_term(self._scan(question), 'blocked')
     
     def _contains_off_topic_keyword(self, question: str) -> str:
         """Check for off-topic keywords (sexo, drogas, alcohol, videojuegos) when not in institutional context"""
-        for keyword in self.off_topic_keywords:
-            if keyword in question:
-                return keyword
-        return ""
+        return self._first_term(self._scan(question), 'off_topic')
 
     def _matches_suspicious_pattern(self, question: str) -> str:
-        for pattern in self.suspicious_patterns:
-            if re.search(pattern, question, re.IGNORECASE):
+        for pattern, regex in self._suspicious_regexes:
+            if regex.search(question):
                 return pattern
         return ""
 
@@ -360,7 +465,10 @@ class ContentFilter:
             "allowed_terms": len(self.allowed_terms),
             "strong_institutional_terms": len(self.strong_institutional_terms),
             "allowed_contexts": sum(len(v) for v in self.allowed_contexts.values()),
-            "known_categories": len(self.known_categories)
+            "known_categories": len(self.known_categories),
+            "compile_ms": round(self.compile_ms, 2),
+            "rule_hits": dict(self.rule_hits.most_common()),
+            "top_term_hits": dict(self.term_hits.most_common(20))
         }
 
     def explain_decision(self, question: str, category: Optional[str] = None) -> Dict:
@@ -376,23 +484,21 @@ class ContentFilter:
         }
 
         q = question.lower()
+        hits = self._scan(q)
 
         # Términos permitidos encontrados
         if category and category in self.known_categories:
             explanation["matched_terms"].append(f"category: {category}")
-        for term in self.strong_institutional_terms:
-            if term in q:
-                explanation["matched_terms"].append(f"strong: {term}")
-        for term in self.allowed_terms:
-            if term in q:
-                explanation["matched_terms"].append(term)
+        for index in hits.get('strong', []):
+            explanation["matched_terms"].append(f"strong: {self._rule_terms['strong'][index]}")
+        for index in hits.get('allowed', []):
+            explanation["matched_terms"].append(self._rule_terms['allowed'][index])
 
         # Bloqueos
-        for kw in self.blocked_keywords:
-            if kw in q:
-                explanation["blocked_items"].append(f"keyword: {kw}")
-        for pattern in self.suspicious_patterns:
-            if re.search(pattern, q, re.IGNORECASE):
+        for index in hits.get('blocked', []):
+            explanation["blocked_items"].append(f"keyword: {self._rule_terms['blocked'][index]}")
+        for pattern, regex in self._suspicious_regexes:
+            if regex.search(q):
                 explanation["blocked_items"].append(f"pattern: {pattern}")
 
         return explanation
\ No newline at end of file
@@ -0,0 +1,177 @@
+# app/embedding_registry.py - Registro compartido de modelos de embeddings (un modelo por proceso)
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.batch_encoder import BatchEncoder
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE") or None
+EMBEDDING_BATCHING = os.getenv("EMBEDDING_BATCHING", "true").lower() == "true"
+
+
+def _rss_mb() -> Optional[float]:
+    if not PSUTIL_AVAILABLE:
+        return None
+    return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+
+
+class SharedEncoder:
+    """
+    Encoder compartido para un modelo SentenceTransformer.
+
+    Se entrega el mismo objeto a todos los componentes que piden el mismo modelo.
+    Los pesos se cargan en la primera llamada a encode(), y encode() es seguro entre
+    hilos; los encodes cortos de distintos requests se agrupan en un BatchEncoder
+    (EMBEDDING_BATCHING) para hacer una sola pasada por el modelo. Los demás atributos se delegan al modelo, así que reemplaza a
+    SentenceTransformer sin cambios en quien lo usa.
+    """
+
+    def __init__(self, registry: 'EmbeddingRegistry', model_name: str):
+        self.model_name = model_name
+        self._registry = registry
+        self._encode_lock = threading.Lock()
+        self.stats = {'encode_calls': 0, 'sentences': 0, 'encode_ms': 0.0}
+        # Encodes de consultas (pocos textos, sin kwargs) se agrupan entre requests concurrentes
+        self.batcher = BatchEncoder(self._encode_direct, name=model_name) if EMBEDDING_BATCHING else None
+
+    @property
+    def model(self):
+        return self._registry._load(self.model_name)
+
+    def _encode_direct(self, sentences, **kwargs):
+        model = self.model
+        start = time.perf_counter()
+        with self._encode_lock:
+            result = model.encode(sentences, **kwargs)
+        self.stats['encode_calls'] += 1
+        self.stats['sentences'] += 1 if isinstance(sentences, str) else len(sentences)
+        self.stats['encode_ms'] += (time.perf_counter() - start) * 1000
+        return result
+
+    def _batchable(self, sentences, kwargs) -> bool:
+        if self.batcher is None or kwargs:
+            return False
+        if isinstance(sentences, str):
+            return True
+        return 0 < len(sentences) <= self.batcher.max_batch_size
+
+    def encode(self, sentences, **kwargs):
+        if not self._batchable(sentences, kwargs):
+            return self._encode_direct(sentences, **kwargs)
+        if isinstance(sentences, str):
+            return self.batcher.submit(sentences).result()
+        return self.batcher.encode(sentences)
+
+    async def encode_async(self, sentences):
+        """encode() para endpoints async: espera el lote sin bloquear el event loop"""
+        texts = [sentences] if isinstance(sentences, str) else list(sentences)
+        if self.batcher is None:
+            vectors = np.asarray(await asyncio.to_thread(self._encode_direct, texts))
+        else:
+            vectors = await self.batcher.encode_async(texts)
+        return vectors[0] if isinstance(sentences, str) else vectors
+
+    def __getattr__(self, name: str) -> Any:
+        # Solo se llama para atributos que no existen en el encoder (p.ej. get_sentence_embedding_dimension)
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+
+class EmbeddingRegistry:
+    """
+    Carga cada modelo de embeddings una sola vez por proceso (lazy) y registra
+    tiempo de carga y memoria residente agregada por cada modelo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._encoders: Dict[str, SharedEncoder] = {}
+        self._models: Dict[str, Any] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._load_info: Dict[str, Dict[str, Any]] = {}
+        self._requests: Dict[str, int] = {}
+
+    def get_encoder(self, model_name: str, preload: bool = False) -> SharedEncoder:
+        """Encoder compartido para `model_name` (preload=True carga los pesos de inmediato)"""
+        with self._lock:
+            encoder = self._encoders.get(model_name)
+            if encoder is None:
+                encoder = self._encoders[model_name] = SharedEncoder(self, model_name)
+                self._load_locks[model_name] = threading.Lock()
+            self._requests[model_name] = self._requests.get(model_name, 0) + 1
+        if preload:
+            self._load(model_name)
+        return encoder
+
+    def _load(self, model_name: str):
+        model = self._models.get(model_name)
+        if model is not None:
+            return model
+
+        with self._load_locks[model_name]:
+            model = self._models.get(model_name)
+            if model is not None:
+                return model
+
+            from sentence_transformers import SentenceTransformer
+
+            rss_before = _rss_mb()
+            start = time.perf_counter()
+            model = SentenceTransformer(model_name, device=EMBEDDING_DEVICE)
+            load_time = time.perf_counter() - start
+            rss_after = _rss_mb()
+
+            self._load_info[model_name] = {
+                'load_time_ms': round(load_time * 1000, 1),
+                'rss_delta_mb': round(rss_after - rss_before, 1) if rss_before is not None else None,
+                'dimension': model.get_sentence_embedding_dimension(),
+                'loaded_at': time.time()
+            }
+            self._models[model_name] = model
+            logger.info(f"✅ Modelo de embeddings cargado: {model_name} en {load_time:.1f}s "
+                        f"(+{self._load_info[model_name]['rss_delta_mb']} MB RSS)")
+            return model
+
+    def is_loaded(self, model_name: str) -> bool:
+        return model_name in self._models
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            models = {}
+            for name, encoder in self._encoders.items():
+                models[name] = {
+                    'loaded': name in self._models,
+                    'consumers': self._requests.get(name, 0),
+                    **self._load_info.get(name, {}),
+                    **{k: round(v, 2) if isinstance(v, float) else v for k, v in encoder.stats.items()}
+                }
+                if encoder.batcher is not None:
+                    models[name]['batching'] = encoder.batcher.get_stats()
+        rss = _rss_mb()
+        return {
+            'models': models,
+            'loaded_models': sum(1 for m in models.values() if m['loaded']),
+            'process_rss_mb': round(rss, 1) if rss is not None else None
+        }
+
+
+# Instancia global
+embedding_registry = EmbeddingRegistry()
+
+
+def get_encoder(model_name: str, preload: bool = False) -> SharedEncoder:
+    return embedding_registry.get_encoder(model_name, preload=preload)
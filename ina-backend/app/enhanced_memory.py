@@ -1,7 +1,7 @@
 from typing import Dict, List, Optional
 import numpy as np
 from datetime import datetime, timedelta
-from sentence_transformers import SentenceTransformer
+from app.embedding_registry import get_encoder
 from sklearn.metrics.pairwise import cosine_similarity
 import json
 import os
@@ -11,7 +11,7 @@ class HierarchicalMemory:
         self.short_term_memory = {}  # Caché en memoria
         self.medium_term_memory = {}  # ChromaDB
         self.long_term_memory = "long_term_storage.json"
-        self.model = SentenceTransformer('intfloat/multilingual-e5-large')
+        self.model = get_encoder('intfloat/multilingual-e5-large')
         
     def store_information(self, content: str, metadata: Dict, memory_type: str = "short"):
         embedding = self.model.encode([content])[0]
@@ -14,6 +14,8 @@ from app.adaptive_learning import adaptive_learning, LearningType
 from app.intelligent_cache import intelligent_cache
 from app.memory_manager import MemoryManager
 from app.rag import rag_engine, get_ai_response
+from app.retrieval_context import RetrievalContext
+from app.query_embeddings import QueryEmbeddings
 
 logger = logging.getLogger(__name__)
 
@@ -55,12 +57,15 @@ class EnhancedRAGSystem:
         """Procesar consulta con todas las mejoras de memoria e IA"""
         start_time = time.time()
         enhanced_context = context or {}
+        # Embeddings de la consulta compartidos por cache, grafo, memoria y ChromaDB
+        query_embeddings = QueryEmbeddings()
         
         try:
             self.enhanced_metrics['total_enhanced_queries'] += 1
             
             # 1. BÚSQUEDA INTELIGENTE EN CACHE
-            cache_result = self._intelligent_cache_lookup(user_message, enhanced_context)
+            cache_result = self._intelligent_cache_lookup(user_message, enhanced_context,
+                                                          query_embeddings=query_embeddings)
             if cache_result:
                 cache_result['processing_time'] = time.time() - start_time
                 cache_result['source'] = 'intelligent_cache'
@@ -68,7 +73,8 @@ class EnhancedRAGSystem:
             
             # 2. ENRIQUECIMIENTO DE CONTEXTO CON GRAFO DE CONOCIMIENTO
             if self.enable_knowledge_graph:
-                knowledge_context = self._enrich_with_knowledge_graph(user_message, enhanced_context)
+                knowledge_context = self._enrich_with_knowledge_graph(user_message, enhanced_context,
+                                                                      query_embeddings=query_embeddings)
                 enhanced_context.update(knowledge_context)
                 if knowledge_context.get('concepts'):
                     self.enhanced_metrics['knowledge_graph_contributions'] += 1
@@ -76,7 +82,8 @@ class EnhancedRAGSystem:
             # 3. RECUPERACIÓN DE MEMORIA PERSISTENTE
             if self.enable_persistent_memory:
                 memory_context = self._retrieve_persistent_memory(
-                    user_message, user_id, session_id, enhanced_context
+                    user_message, user_id, session_id, enhanced_context,
+                    query_embeddings=query_embeddings
                 )
                 enhanced_context.update(memory_context)
                 if memory_context.get('relevant_memories'):
@@ -87,7 +94,8 @@ class EnhancedRAGSystem:
                 user_message=user_message,
                 context=enhanced_context.get('conversation_context', []),
                 conversational_context=enhanced_context.get('contextual_summary', ''),
-                user_profile=enhanced_context.get('user_profile', {})
+                user_profile=enhanced_context.get('user_profile', {}),
+                retrieval_context=RetrievalContext(user_message, embeddings=query_embeddings)
             )
             
             # 5. APLICAR ADAPTACIONES APRENDIDAS
@@ -133,7 +141,8 @@ class EnhancedRAGSystem:
             # Fallback al sistema original
             return get_ai_response(user_message, context)
     
-    def _intelligent_cache_lookup(self, query: str, context: Dict) -> Optional[Dict]:
+    def _intelligent_cache_lookup(self, query: str, context: Dict,
+                                  query_embeddings: QueryEmbeddings = None) -> Optional[Dict]:
         """Búsqueda inteligente en cache con múltiples estrategias"""
         try:
             # Buscar respuesta exacta
@@ -142,7 +151,9 @@ class EnhancedRAGSystem:
                 key=cache_key,
                 data_type='response',
                 similarity_search=True,
-                user_id=context.get('user_id')
+                user_id=context.get('user_id'),
+                query_text=query,
+                query_embeddings=query_embeddings
             )
             
             if cached_response:
@@ -160,14 +171,16 @@ class EnhancedRAGSystem:
             logger.error(f"Error en búsqueda de cache: {e}")
             return None
     
-    def _enrich_with_knowledge_graph(self, query: str, context: Dict) -> Dict:
+    def _enrich_with_knowledge_graph(self, query: str, context: Dict,
+                                     query_embeddings: QueryEmbeddings = None) -> Dict:
         """Enriquecer contexto usando grafo de conocimiento"""
         try:
             # Buscar conceptos relacionados
             related_concepts = self.knowledge_graph.find_related_concepts(
                 query=query,
                 max_results=5,
-                include_paths=True
+                include_paths=True,
+                query_embeddings=query_embeddings
             )
             
             enrichment = {
@@ -199,7 +212,8 @@ class EnhancedRAGSystem:
             return {}
     
     def _retrieve_persistent_memory(self, query: str, user_id: str, 
-                                  session_id: str, context: Dict) -> Dict:
+                                  session_id: str, context: Dict,
+                                  query_embeddings: QueryEmbeddings = None) -> Dict:
         """Recuperar memoria persistente relevante"""
         try:
             # Búsqueda de memoria relevante
@@ -209,7 +223,8 @@ class EnhancedRAGSystem:
                 category=context.get('category'),
                 user_id=user_id,
                 max_results=5,
-                include_related=True
+                include_related=True,
+                query_embeddings=query_embeddings
             )
             
             memory_context = {
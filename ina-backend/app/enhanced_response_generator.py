@@ -8,6 +8,8 @@ from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 import json
 
+from app.template_index import template_index
+
 logger = logging.getLogger(__name__)
 
 class EnhancedResponseGenerator:
@@ -572,17 +574,39 @@ Centro de servicios estudiantiles para trámites y consultas:
 
 📞 **Contacto:** +56 2 2354 8000"""
         }
+
+        # Patrones precompilados; las respuestas se sirven desde el índice único de templates
+        self._compiled_patterns = [
+            (query_type, [re.compile(pattern) for pattern in template_data["patterns"]])
+            for query_type, template_data in self.specific_templates.items()
+        ]
+        template_index.register_source("enhanced", self._specific_template_entries)
+        template_index.register_source("enhanced_category", self._category_template_entries)
+
+    def _specific_template_entries(self):
+        """
+        (área, tipo de consulta, idioma, texto) de los templates con "response" propio.
+        Las entradas "use_template" nunca se sirvieron (la respuesta RAG se mantiene); habilitarlas
+        reemplazaría respuestas completas por templates genéricos y es un cambio aparte.
+        """
+        for query_type, template_data in self.specific_templates.items():
+            if "response" in template_data:
+                yield None, query_type, "es", template_data["response"]
+
+    def _category_template_entries(self):
+        for category, text in self.category_templates.items():
+            yield category, category, "es", text
     
     def detect_query_type(self, query: str) -> Tuple[str, float]:
         """Detectar el tipo de consulta específico"""
         query_lower = query.lower()
         
         # Verificar patrones específicos primero
-        for query_type, template_data in self.specific_templates.items():
-            for pattern in template_data["patterns"]:
-                if re.search(pattern, query_lower):
+        for query_type, patterns in self._compiled_patterns:
+            for pattern in patterns:
+                if pattern.search(query_lower):
                     # Calcular confianza basada en matches
-                    matches = len(re.findall(pattern, query_lower))
+                    matches = len(pattern.findall(query_lower))
                     confidence = min(95, 60 + (matches * 15))
                     return query_type, confidence
         
@@ -596,9 +620,8 @@ Centro de servicios estudiantiles para trámites y consultas:
             query_type, confidence = self.detect_query_type(query)
 
             # Si tenemos un template específico, úsalo
-            if query_type in self.specific_templates:
-                template = self.specific_templates[query_type]
-                response_text = template["response"]
+            response_text = template_index.get(query_type, "es", source="enhanced")
+            if response_text:
                 return {
                     "response": response_text,
                     "sources": [{"type": "template", "category": query_type}],
@@ -608,9 +631,8 @@ Centro de servicios estudiantiles para trámites y consultas:
                 }
 
             # Si tenemos template de categoría
-            elif category in self.category_templates:
-                template = self.category_templates[category]
-                response_text = template["response"].format(contact_info=self._get_contact_info())
+            response_text = template_index.get(category, "es", source="enhanced_category")
+            if response_text:
                 return {
                     "response": response_text,
                     "response_type": f"category_{category}",
@@ -620,15 +642,14 @@ Centro de servicios estudiantiles para trámites y consultas:
                 }
 
             # No hay respuesta específica disponible - devolver None
-            else:
-                logger.info(f"No hay template específico para query_type='{query_type}', category='{category}'")
-                return {
-                    "response": None,
-                    "sources": [],
-                    "is_enhanced": False,
-                    "success": False,
-                    "reason": "no_template_available"
-                }
+            logger.info(f"No hay template específico para query_type='{query_type}', category='{category}'")
+            return {
+                "response": None,
+                "sources": [],
+                "is_enhanced": False,
+                "success": False,
+                "reason": "no_template_available"
+            }
 
         except Exception as e:
             logger.error(f"Error generando respuesta mejorada: {e}")
@@ -0,0 +1,145 @@
+# app/generation_cache.py - Cache de generaciones deterministas del LLM (modelo, mensajes, opciones)
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from app.cache_manager import AdvancedCache, SharedClassificationStore
+
+logger = logging.getLogger(__name__)
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+GENERATION_CACHE_ENABLED = os.getenv("GENERATION_CACHE_ENABLED", "1") == "1"
+GENERATION_CACHE_MAX_SIZE = int(os.getenv("GENERATION_CACHE_MAX_SIZE", "500"))
+GENERATION_CACHE_TTL = int(os.getenv("GENERATION_CACHE_TTL", str(7 * 24 * 3600)))
+GENERATION_CACHE_DB = os.getenv(
+    "GENERATION_CACHE_DB",
+    os.path.join(_APP_DIR, '..', 'cache_disk', 'generation_cache.sqlite3')
+)
+GENERATION_STORE_MAX_ROWS = int(os.getenv("GENERATION_STORE_MAX_ROWS", "20000"))
+GENERATION_STORE_PURGE_EVERY = 200
+# Seed fija para generaciones con temperature > 0: las hace deterministas y cacheables
+GENERATION_SEED = int(os.getenv("GENERATION_SEED", "42"))
+# Formato de las entradas en disco: cambiarlo descarta las filas anteriores
+GENERATION_STORE_VERSION = "1"
+
+
+class GenerationCache(AdvancedCache):
+    """
+    Cache de salidas del LLM, debajo del prompt builder.
+
+    Solo guarda generaciones deterministas (temperature 0 o seed fija): con el mismo
+    modelo, mensajes y opciones Ollama produce el mismo texto. La clave es un sha256 de
+    (modelo, versión del modelo, mensajes, opciones), así que preguntas distintas que
+    recuperan las mismas fuentes y terminan en el mismo prompt también aciertan.
+
+    LRU con TTL en memoria delante de un almacén SQLite en cache_disk/ que sobrevive a
+    reinicios y se comparte entre workers. La versión del modelo (digest de Ollama,
+    `set_model_version_source`) entra en la clave: un `ollama pull` no sirve salidas viejas.
+    """
+
+    def __init__(self, max_size: int = GENERATION_CACHE_MAX_SIZE, default_ttl: int = GENERATION_CACHE_TTL,
+                 disk_path: Optional[str] = None, max_disk_rows: int = GENERATION_STORE_MAX_ROWS):
+        super().__init__(max_size=max_size, default_ttl=default_ttl)
+        self._lock = threading.RLock()
+        self.store = SharedClassificationStore(disk_path, table='generations') if disk_path else None
+        self.max_disk_rows = max_disk_rows
+        self._model_version: Callable[[str], str] = lambda model: ''
+        self._disk_hits = 0
+        self._stores = 0
+        self._uncacheable = 0
+        self._sets_since_purge = 0
+        self._saved = {'bytes': 0, 'tokens': 0, 'seconds': 0.0}
+
+    def set_model_version_source(self, model_version: Callable[[str], str]) -> None:
+        """Función modelo → versión (digest) que se incluye en la clave"""
+        self._model_version = model_version
+
+    @staticmethod
+    def is_deterministic(options: Optional[Dict]) -> bool:
+        options = options or {}
+        temperature = options.get('temperature')
+        return (temperature is not None and temperature <= 0) or options.get('seed') is not None
+
+    def make_key(self, model: str, messages: List[Dict], options: Optional[Dict]) -> Optional[str]:
+        """Clave de la generación, o None si no es determinista (no se cachea)"""
+        if not self.is_deterministic(options):
+            with self._lock:
+                self._uncacheable += 1
+            return None
+        try:
+            version = self._model_version(model) or ''
+        except Exception:
+            version = ''
+        payload = json.dumps({'model': model, 'version': version, 'messages': messages, 'options': options},
+                             sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            value = super().get(key)
+        if value is None and self.store is not None:
+            shared = self.store.get(GENERATION_STORE_VERSION, key)
+            if shared is not None:
+                value, remaining = shared
+                with self._lock:
+                    self._disk_hits += 1
+                    super().set(key, value, ttl=remaining)
+        if value is not None:
+            with self._lock:
+                self._saved['bytes'] += len(value.get('message', {}).get('content', '').encode('utf-8'))
+                self._saved['tokens'] += value.get('eval_count') or 0
+                self._saved['seconds'] += (value.get('total_duration') or 0) / 1e9
+        return value
+
+    def set(self, key: str, value: Dict, ttl: Optional[int] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            super().set(key, value, ttl)
+            self._stores += 1
+            self._sets_since_purge += 1
+            purge = self._sets_since_purge >= GENERATION_STORE_PURGE_EVERY
+            if purge:
+                self._sets_since_purge = 0
+        if self.store is not None:
+            self.store.set(GENERATION_STORE_VERSION, key, value, ttl)
+            if purge:
+                self.store.purge(GENERATION_STORE_VERSION, self.max_disk_rows)
+
+    def clear(self) -> None:
+        """Limpia el LRU y el almacén en disco"""
+        with self._lock:
+            super().clear()
+        if self.store is not None:
+            self.store.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = super().get_stats()
+            # Los hits en disco son misses del LRU en memoria
+            stats['memory_hits'] = self._hits
+            stats['disk_hits'] = self._disk_hits
+            stats['hits'] = self._hits + self._disk_hits
+            stats['misses'] = self._misses - self._disk_hits
+            stats['hit_rate'] = round(stats['hits'] / max(1, stats['total_requests']), 3)
+            stats['stores'] = self._stores
+            stats['uncacheable'] = self._uncacheable
+            stats['bytes_saved'] = self._saved['bytes']
+            stats['tokens_saved'] = self._saved['tokens']
+            stats['seconds_saved'] = round(self._saved['seconds'], 2)
+        stats['disk'] = None
+        if self.store is not None:
+            stats['disk'] = {
+                'path': self.store.path,
+                'entries': self.store.count(GENERATION_STORE_VERSION),
+                'size_bytes': os.path.getsize(self.store.path) if os.path.exists(self.store.path) else 0,
+                'errors': self.store.errors
+            }
+        return stats
+
+
+# Instancia global
+generation_cache = GenerationCache(disk_path=GENERATION_CACHE_DB) if GENERATION_CACHE_ENABLED else None
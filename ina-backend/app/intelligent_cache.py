@@ -13,7 +13,7 @@ import logging
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass, asdict
-from sentence_transformers import SentenceTransformer
+from app.embedding_registry import get_encoder
 from sklearn.metrics.pairwise import cosine_similarity
 import hashlib
 import threading
@@ -21,6 +21,8 @@ import time
 from collections import defaultdict, Counter
 from enum import Enum
 
+from app.query_embeddings import QueryEmbeddings, encode_query
+
 logger = logging.getLogger(__name__)
 
 class CacheStrategy(Enum):
@@ -83,7 +85,8 @@ class IntelligentCacheSystem:
         self.memory_cache = {} if fallback_to_memory else None
         
         # Modelo para embeddings semánticos
-        self.model = SentenceTransformer(model_name)
+        self.model_name = model_name
+        self.model = get_encoder(model_name)
         
         # Configuraciones de cache
         self.cache_strategies = {
@@ -133,8 +136,13 @@ class IntelligentCacheSystem:
         logger.info("🧠 Sistema de Cache Inteligente inicializado")
     
     def get(self, key: str, data_type: str = 'default', 
-           similarity_search: bool = True, user_id: str = None) -> Optional[Any]:
-        """Recuperar valor del cache con búsqueda inteligente"""
+           similarity_search: bool = True, user_id: str = None,
+           query_text: str = None, query_embeddings: Optional[QueryEmbeddings] = None) -> Optional[Any]:
+        """Recuperar valor del cache con búsqueda inteligente
+
+        `query_text` es el texto a comparar semánticamente (por defecto, la clave) y
+        `query_embeddings` el handle del request para no recodificarlo.
+        """
         try:
             self.cache_metrics['total_operations'] += 1
             
@@ -147,14 +155,16 @@ class IntelligentCacheSystem:
             
             # Si no existe y la búsqueda semántica está habilitada
             if similarity_search and data_type in ['response', 'knowledge']:
-                semantic_value = self._semantic_search(key, data_type)
+                semantic_value = self._semantic_search(key, data_type, query_text=query_text,
+                                                       query_embeddings=query_embeddings)
                 if semantic_value is not None:
                     self._record_access(key, data_type, user_id, 'semantic')
                     self.cache_metrics['semantic_hits'] += 1
                     return semantic_value
             
             # Buscar en clusters semánticos
-            cluster_value = self._cluster_search(key, data_type)
+            cluster_value = self._cluster_search(key, data_type, query_text=query_text,
+                                                 query_embeddings=query_embeddings)
             if cluster_value is not None:
                 self._record_access(key, data_type, user_id, 'cluster')
                 self.cache_metrics['cluster_hits'] += 1
@@ -236,14 +246,15 @@ class IntelligentCacheSystem:
         return None
     
     def _semantic_search(self, query_key: str, data_type: str,
-                        similarity_threshold: float = 0.8) -> Optional[Any]:
+                        similarity_threshold: float = 0.8, query_text: str = None,
+                        query_embeddings: Optional[QueryEmbeddings] = None) -> Optional[Any]:
         """Búsqueda semántica en cache"""
         if data_type not in ['response', 'knowledge']:
             return None
         
         try:
-            # Generar embedding para la consulta
-            query_embedding = self.model.encode([query_key])[0]
+            # Generar embedding para la consulta (compartido con el resto del request)
+            query_embedding = encode_query(self.model, self.model_name, query_text or query_key, query_embeddings)
             
             best_match = None
             best_similarity = 0
@@ -294,13 +305,14 @@ class IntelligentCacheSystem:
             logger.error(f"Error en búsqueda semántica: {e}")
             return None
     
-    def _cluster_search(self, query_key: str, data_type: str) -> Optional[Any]:
+    def _cluster_search(self, query_key: str, data_type: str, query_text: str = None,
+                        query_embeddings: Optional[QueryEmbeddings] = None) -> Optional[Any]:
         """Búsqueda en clusters semánticos"""
         if data_type not in self.semantic_clusters:
             return None
         
         try:
-            query_embedding = self.model.encode([query_key])[0]
+            query_embedding = encode_query(self.model, self.model_name, query_text or query_key, query_embeddings)
             
             # Encontrar cluster más cercano
             closest_cluster = None
@@ -12,6 +12,34 @@ from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Expresiones precompiladas (antes se resolvían en cada llamada)
+MULTIPLE_NEWLINES = re.compile(r'\n{3,}')
+MULTIPLE_SPACES = re.compile(r' {2,}')
+MULTIPLE_ASTERISKS = re.compile(r'\*{3,}')
+STEPS_PATTERN = re.compile(r'(\d+[\.\)]\s*[^\n]+)')
+STEP_PREFIX = re.compile(r'^\d+[\.\)]\s*')
+LOCATION_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'(piso \d+)',
+    r'(edificio [A-Z])',
+    r'(hall [a-z]+)',
+    r'(sector [a-z]+)'
+)]
+SCHEDULE_PATTERN = re.compile(r'(lunes a viernes|l-v|horario)[^\n]{10,80}', re.IGNORECASE)
+LOCATION_CLEANUP = re.compile(r'(piso \d+|edificio [A-Z]|horario[^\n]+)', re.IGNORECASE)
+PHONE_PATTERN = re.compile(r'\+?\d{1,3}[\s\-]?\d{1,4}[\s\-]?\d{3,4}[\s\-]?\d{3,4}')
+EMAIL_PATTERN = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+CONTACT_SCHEDULE = re.compile(r'(horario[^\n]{5,80}|lunes[^\n]{5,80})', re.IGNORECASE)
+SENTENCE_SPLIT = re.compile(r'[.!?]\s+')
+NUMBERED_STEP = re.compile(r'\d+[\.\)]\s')
+
+# Llamado a la acción por categoría
+CTA_TEMPLATES = {
+    'asuntos_estudiantiles': '\n\n💬 **Más información:** Punto Estudiantil, Piso 2 | Tel: +56 2 2999 3075',
+    'bienestar_estudiantil': '\n\n💚 **Apoyo:** Bienestar Estudiantil, Piso 2 | Lunes-Viernes 09:00-18:00',
+    'deportes': '\n\n⚽ **Coordinación Deportes:** Piso 3 | eventos.duoc.cl',
+    'desarrollo_laboral': '\n\n💼 **Asesoría Laboral:** Claudia Cortés | duoclaboral.cl'
+}
+
 
 class IntelligentResponseOptimizer:
     """
@@ -35,6 +63,7 @@ class IntelligentResponseOptimizer:
             r'\b(es importante destacar que){2,}',
             r'\b(por favor|tenga en cuenta){2,}',
         ]
+        self._compiled_redundancy = [re.compile(pattern, re.IGNORECASE) for pattern in self.redundancy_patterns]
         
         # Templates de estructura optimizada por tipo de consulta
         self.structure_templates = {
@@ -138,17 +167,17 @@ class IntelligentResponseOptimizer:
         cleaned = response
         
         # Eliminar patrones redundantes
-        for pattern in self.redundancy_patterns:
-            cleaned = re.sub(pattern, '', cleaned, flags=re.IGNORECASE)
+        for pattern in self._compiled_redundancy:
+            cleaned = pattern.sub('', cleaned)
         
         # Eliminar múltiples saltos de línea
-        cleaned = re.sub(r'\n{3,}', '\n\n', cleaned)
+        cleaned = MULTIPLE_NEWLINES.sub('\n\n', cleaned)
         
         # Eliminar espacios múltiples
-        cleaned = re.sub(r' {2,}', ' ', cleaned)
+        cleaned = MULTIPLE_SPACES.sub(' ', cleaned)
         
         # Eliminar asteriscos múltiples (markdown mal formado)
-        cleaned = re.sub(r'\*{3,}', '**', cleaned)
+        cleaned = MULTIPLE_ASTERISKS.sub('**', cleaned)
         
         return cleaned.strip()
     
@@ -201,18 +230,17 @@ class IntelligentResponseOptimizer:
     def _structure_procedure(self, response: str) -> str:
         """Estructura respuestas de procedimientos con pasos claros"""
         # Intentar identificar pasos existentes
-        steps_pattern = r'(\d+[\.\)]\s*[^\n]+)'
-        existing_steps = re.findall(steps_pattern, response)
+        existing_steps = STEPS_PATTERN.findall(response)
         
         if existing_steps:
             # Ya tiene estructura de pasos, solo mejorar formato
             structured = "**Procedimiento:**\n\n"
             for i, step in enumerate(existing_steps[:5], 1):  # Max 5 pasos
-                clean_step = re.sub(r'^\d+[\.\)]\s*', '', step).strip()
+                clean_step = STEP_PREFIX.sub('', step).strip()
                 structured += f"{i}. {clean_step}\n"
             
             # Agregar información adicional si existe
-            remaining_text = re.sub(steps_pattern, '', response).strip()
+            remaining_text = STEPS_PATTERN.sub('', response).strip()
             if remaining_text and len(remaining_text) > 50:
                 structured += f"\n📌 **Información adicional:** {remaining_text[:200]}..."
             
@@ -226,29 +254,21 @@ class IntelligentResponseOptimizer:
         structured = ""
         
         # Extraer ubicación
-        location_patterns = [
-            r'(piso \d+)',
-            r'(edificio [A-Z])',
-            r'(hall [a-z]+)',
-            r'(sector [a-z]+)'
-        ]
-        
         locations = []
-        for pattern in location_patterns:
-            matches = re.findall(pattern, response, re.IGNORECASE)
+        for pattern in LOCATION_PATTERNS:
+            matches = pattern.findall(response)
             locations.extend(matches)
         
         if locations:
             structured += f"📍 **Ubicación:** {', '.join(set(locations))}\n\n"
         
         # Extraer horarios
-        horario_pattern = r'(lunes a viernes|l-v|horario)[^\n]{10,80}'
-        horarios = re.findall(horario_pattern, response, re.IGNORECASE)
+        horarios = SCHEDULE_PATTERN.findall(response)
         if horarios:
             structured += f"🕐 **Horarios:** {horarios[0]}\n\n"
         
         # Texto restante condensado
-        clean_text = re.sub(r'(piso \d+|edificio [A-Z]|horario[^\n]+)', '', response, flags=re.IGNORECASE)
+        clean_text = LOCATION_CLEANUP.sub('', response)
         clean_text = clean_text.strip()
         
         if clean_text and len(clean_text) > 50:
@@ -261,20 +281,18 @@ class IntelligentResponseOptimizer:
         structured = ""
         
         # Extraer teléfonos
-        phone_pattern = r'\+?\d{1,3}[\s\-]?\d{1,4}[\s\-]?\d{3,4}[\s\-]?\d{3,4}'
-        phones = re.findall(phone_pattern, response)
+        phones = PHONE_PATTERN.findall(response)
         if phones:
             structured += f"📞 **Teléfono:** {phones[0]}\n\n"
         
         # Extraer emails
-        email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-        emails = re.findall(email_pattern, response)
+        emails = EMAIL_PATTERN.findall(response)
         if emails:
             structured += f"📧 **Email:** {emails[0]}\n\n"
         
         # Extraer horarios
         if 'horario' in response.lower() or 'lunes' in response.lower():
-            horario_match = re.search(r'(horario[^\n]{5,80}|lunes[^\n]{5,80})', response, re.IGNORECASE)
+            horario_match = CONTACT_SCHEDULE.search(response)
             if horario_match:
                 structured += f"🕐 **Horarios:** {horario_match.group(1)}\n\n"
         
@@ -283,7 +301,7 @@ class IntelligentResponseOptimizer:
     def _structure_information(self, response: str) -> str:
         """Estructura respuestas informativas de forma clara"""
         # Dividir en oraciones
-        sentences = re.split(r'[.!?]\s+', response)
+        sentences = SENTENCE_SPLIT.split(response)
         
         # Priorizar oraciones con información clave
         key_sentences = []
@@ -307,15 +325,9 @@ class IntelligentResponseOptimizer:
         enhanced = response
         
         # Agregar llamado a la acción específico según categoría
-        cta_templates = {
-            'asuntos_estudiantiles': '\n\n💬 **Más información:** Punto Estudiantil, Piso 2 | Tel: +56 2 2999 3075',
-            'bienestar_estudiantil': '\n\n💚 **Apoyo:** Bienestar Estudiantil, Piso 2 | Lunes-Viernes 09:00-18:00',
-            'deportes': '\n\n⚽ **Coordinación Deportes:** Piso 3 | eventos.duoc.cl',
-            'desarrollo_laboral': '\n\n💼 **Asesoría Laboral:** Claudia Cortés | duoclaboral.cl'
-        }
-        
-        if category in cta_templates and cta_templates[category] not in enhanced:
-            enhanced += cta_templates[category]
+        cta = CTA_TEMPLATES.get(category)
+        if cta and cta not in enhanced:
+            enhanced += cta
         
         return enhanced
     
@@ -336,7 +348,7 @@ class IntelligentResponseOptimizer:
             score += 10
         
         # Bonificar si tiene pasos numerados
-        if re.search(r'\d+[\.\)]\s', response):
+        if NUMBERED_STEP.search(response):
             score += 5
         
         # Penalizar si tiene mucho texto no estructurado
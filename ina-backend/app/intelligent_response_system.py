@@ -6,7 +6,7 @@ import numpy as np
 from typing import Dict, List, Optional, Tuple, Set
 from datetime import datetime, timedelta
 from collections import defaultdict, deque
-from sentence_transformers import SentenceTransformer
+from app.embedding_registry import get_encoder
 from sklearn.metrics.pairwise import cosine_similarity
 from dataclasses import dataclass, asdict
 from sqlmodel import Session, select
@@ -52,7 +52,7 @@ class IntelligentResponseSystem:
     
     def __init__(self):
         # Modelo para embeddings y análisis semántico
-        self.model = SentenceTransformer('intfloat/multilingual-e5-small')
+        self.model = get_encoder('intfloat/multilingual-e5-small')
         
         # Almacenamiento de datos
         self.user_profiles: Dict[str, UserProfile] = {}
@@ -0,0 +1,167 @@
+# app/keyword_automaton.py - Índice de keywords compartido (un autómata para todas las tablas)
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from functools import lru_cache
+from itertools import product
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import re._parser as sre_parse
+    from re._constants import (LITERAL, IN, AT, AT_BOUNDARY, MAX_REPEAT, CATEGORY, CATEGORY_SPACE)
+except ImportError:  # Python < 3.11
+    import sre_parse
+    from sre_constants import LITERAL, IN, AT, AT_BOUNDARY, MAX_REPEAT, CATEGORY, CATEGORY_SPACE
+
+from app.aho_corasick import AhoCorasick
+
+logger = logging.getLogger(__name__)
+
+KEYWORD_TABLES_DIR = os.getenv(
+    "KEYWORD_TABLES_DIR",
+    os.path.join(os.path.dirname(__file__), '..', 'config', 'keywords')
+)
+KEYWORD_TABLES_CHECK_SECONDS = float(os.getenv("KEYWORD_TABLES_CHECK_SECONDS", "5"))
+SCAN_CACHE_SIZE = int(os.getenv("KEYWORD_SCAN_CACHE_SIZE", "512"))
+MAX_PATTERN_VARIANTS = 64
+
+
+def normalize_text(text: str) -> str:
+    """Normaliza texto: minúsculas, sin acentos, sin puntuación, espacios simples"""
+    text = text.lower().strip()
+    text = ''.join(
+        c for c in unicodedata.normalize('NFD', text)
+        if unicodedata.category(c) != 'Mn'
+    )
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return ' '.join(text.split())
+
+
+def expand_word_pattern(pattern: str) -> Optional[Tuple[List[str], bool, bool]]:
+    """
+    Expandir una regex simple de palabras (p.ej. r'\\bm[ée]dico\\b', r'\\bpase\\s+escolar\\b')
+    a sus frases literales.
+
+    Retorna (frases, exige_limite_izquierdo, exige_limite_derecho) o None si la regex usa
+    construcciones que no son literales, clases de letras, \\s+ o \\b en los extremos.
+    """
+    items = list(sre_parse.parse(pattern))
+    left = bool(items) and items[0] == (AT, AT_BOUNDARY)
+    right = len(items) > 1 and items[-1] == (AT, AT_BOUNDARY)
+    items = items[int(left):len(items) - int(right)]
+
+    pieces: List[List[str]] = []
+    for op, av in items:
+        if op is LITERAL:
+            pieces.append([chr(av)])
+        elif op is IN and all(member_op is LITERAL for member_op, _ in av):
+            pieces.append([chr(c) for _, c in av])
+        elif op is MAX_REPEAT and av[0] == 1 and list(av[2]) == [(IN, [(CATEGORY, CATEGORY_SPACE)])]:
+            pieces.append([' '])
+        else:
+            return None
+
+    variants = 1
+    for options in pieces:
+        variants *= len(options)
+    if not pieces or variants > MAX_PATTERN_VARIANTS:
+        return None
+    return [''.join(chars) for chars in product(*pieces)], left, right
+
+
+def table_mtime(filename: str) -> Optional[int]:
+    try:
+        return os.stat(os.path.join(KEYWORD_TABLES_DIR, filename)).st_mtime_ns
+    except OSError:
+        return None
+
+
+def load_table_overrides(filename: str) -> Tuple[Dict[str, Dict], Optional[int]]:
+    """Leer config/keywords/<filename> (entradas que reemplazan o agregan keywords) y su mtime"""
+    path = os.path.join(KEYWORD_TABLES_DIR, filename)
+    mtime = table_mtime(filename)
+    if mtime is None:
+        return {}, None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError("se esperaba un objeto {keyword: config}")
+        return data, mtime
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️ Tabla de keywords inválida ({path}): {e}")
+        return {}, mtime
+
+
+class _CompiledIndex:
+    """Autómata inmutable con las frases de todas las tablas; se reemplaza completo al recargar"""
+
+    def __init__(self, tables: Dict[str, Sequence[Tuple[str, Any]]]):
+        self.automaton = AhoCorasick()
+        self.phrases = 0
+        for source, entries in tables.items():
+            for phrase, payload in entries:
+                if phrase:
+                    self.automaton.add(phrase, (source, payload))
+                    self.phrases += 1
+        self.automaton.build()
+        self.scan = lru_cache(maxsize=SCAN_CACHE_SIZE)(self._scan)
+
+    def _scan(self, text: str) -> Tuple[str, Dict[str, Tuple[Tuple[int, int, Any], ...]]]:
+        normalized = normalize_text(text)
+        hits: Dict[str, List[Tuple[int, int, Any]]] = {}
+        for start, end, (source, payload) in self.automaton.iter_matches(normalized):
+            hits.setdefault(source, []).append((start, end, payload))
+        return normalized, {source: tuple(found) for source, found in hits.items()}
+
+
+class KeywordIndex:
+    """
+    Un solo autómata Aho-Corasick con las frases normalizadas de todas las tablas de
+    keywords (SmartKeywordDetector, PriorityKeywordSystem). Cada consulta se normaliza
+    y se recorre una sola vez; el resultado queda en un LRU para que los distintos
+    detectores que analizan la misma consulta no repitan el trabajo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tables: Dict[str, List[Tuple[str, Any]]] = {}
+        self._compiled = _CompiledIndex({})
+        self.stats = {'builds': 0, 'build_ms': 0.0, 'scans': 0}
+
+    def set_table(self, source: str, entries: List[Tuple[str, Any]]):
+        """Reemplazar las frases de una tabla y recompilar (las consultas en curso usan el autómata anterior)"""
+        with self._lock:
+            self._tables[source] = entries
+            start = time.perf_counter()
+            compiled = _CompiledIndex(self._tables)
+            self._compiled = compiled
+            self.stats['builds'] += 1
+            self.stats['build_ms'] = (time.perf_counter() - start) * 1000
+        logger.info(f"✅ Índice de keywords compilado: {compiled.phrases} frases "
+                    f"({', '.join(f'{s}={len(e)}' for s, e in self._tables.items())}) "
+                    f"en {self.stats['build_ms']:.1f}ms")
+
+    def scan(self, text: str) -> Tuple[str, Dict[str, Tuple[Tuple[int, int, Any], ...]]]:
+        """(texto normalizado, {tabla: ((inicio, fin, payload), ...)})"""
+        self.stats['scans'] += 1
+        return self._compiled.scan(text or '')
+
+    def get_stats(self) -> Dict[str, Any]:
+        cache = self._compiled.scan.cache_info()
+        return {
+            **self.stats,
+            'build_ms': round(self.stats['build_ms'], 2),
+            'phrases': self._compiled.phrases,
+            'tables': {source: len(entries) for source, entries in self._tables.items()},
+            'scan_cache_hits': cache.hits,
+            'scan_cache_size': cache.currsize
+        }
+
+
+# Instancia global
+keyword_index = KeywordIndex()
@@ -3,7 +3,7 @@ import networkx as nx
 import numpy as np
 from typing import Dict, List, Optional, Set, Tuple
 from datetime import datetime, timedelta
-from sentence_transformers import SentenceTransformer
+from app.embedding_registry import get_encoder
 from sklearn.metrics.pairwise import cosine_similarity
 import json
 import logging
@@ -11,6 +11,8 @@ from collections import defaultdict, Counter
 import pickle
 import os
 
+from app.query_embeddings import QueryEmbeddings, encode_query
+
 logger = logging.getLogger(__name__)
 
 class KnowledgeNode:
@@ -33,7 +35,8 @@ class KnowledgeGraph:
     """Sistema de grafos de conocimiento para memoria semántica avanzada"""
     
     def __init__(self, model_name: str = 'intfloat/multilingual-e5-small'):
-        self.model = SentenceTransformer(model_name)
+        self.model_name = model_name
+        self.model = get_encoder(model_name)
         self.graph = nx.DiGraph()  # Grafo dirigido
         self.concept_embeddings = {}
         self.concept_nodes = {}
@@ -101,10 +104,11 @@ class KnowledgeGraph:
         logger.debug(f"🔗 {connections_made} conexiones creadas para {new_concept}")
     
     def find_related_concepts(self, query: str, max_results: int = 5, 
-                            include_paths: bool = True) -> List[Dict]:
+                            include_paths: bool = True,
+                            query_embeddings: Optional[QueryEmbeddings] = None) -> List[Dict]:
         """Encontrar conceptos relacionados usando el grafo"""
         try:
-            query_embedding = self.model.encode([query])[0]
+            query_embedding = encode_query(self.model, self.model_name, query, query_embeddings)
             results = []
             
             # Buscar conceptos similares directamente
@@ -0,0 +1,97 @@
+# app/knowledge_version.py - Versión de la base de conocimiento compartida entre workers
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+VERSION_PATH = os.getenv(
+    "KNOWLEDGE_VERSION_PATH",
+    os.path.join(os.path.dirname(__file__), '..', 'cache_disk', 'knowledge_version.json')
+)
+CHECK_SECONDS = float(os.getenv("KNOWLEDGE_VERSION_CHECK_SECONDS", "1"))
+
+
+class KnowledgeVersion:
+    """
+    Contador monotónico que cambia cada vez que cambia duoc_knowledge.
+
+    Se persiste en un archivo pequeño en cache_disk/ para que todos los workers de uvicorn
+    vean el mismo valor (fuera de chroma_db: los scripts que recrean la base la borran
+    completa y el contador volvería a 0). Quien agrega o borra documentos llama a bump(), y los
+    índices derivados (espejo vectorial, BM25, caches) comparan su versión con get()
+    para saber si quedaron obsoletos.
+    """
+
+    def __init__(self, path: str = VERSION_PATH):
+        self.path = os.path.abspath(path)
+        self._lock = threading.Lock()
+        self._version = 0
+        self._updated_at = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self._refresh(force=True)
+
+    def _refresh(self, force: bool = False):
+        now = time.time()
+        if not force and now - self._checked_at < CHECK_SECONDS:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._version = int(data.get('version', 0))
+            self._updated_at = data.get('updated_at')
+            self._mtime = mtime
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ No se pudo leer la versión de conocimiento: {e}")
+
+    def get(self) -> int:
+        with self._lock:
+            self._refresh()
+            return self._version
+
+    def bump(self, reason: str = '') -> int:
+        """Incrementar la versión (escritura atómica, visible para los demás workers)"""
+        with self._lock:
+            self._refresh(force=True)
+            self._version += 1
+            self._updated_at = time.time()
+            payload = {'version': self._version, 'updated_at': self._updated_at, 'reason': reason}
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(payload, f)
+                os.replace(tmp_path, self.path)
+                self._mtime = os.stat(self.path).st_mtime_ns
+            except OSError as e:
+                logger.warning(f"⚠️ No se pudo persistir la versión de conocimiento: {e}")
+            logger.debug(f"📚 Versión de conocimiento → {self._version} ({reason})")
+            return self._version
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            self._refresh()
+            return {'version': self._version, 'updated_at': self._updated_at, 'path': self.path}
+
+
+# Instancia global
+knowledge_version = KnowledgeVersion()
+
+
+def get_knowledge_version() -> int:
+    return knowledge_version.get()
+
+
+def bump_knowledge_version(reason: str = '') -> int:
+    return knowledge_version.bump(reason)
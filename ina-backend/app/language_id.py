@@ -0,0 +1,271 @@
+# app/language_id.py - Identificación de idioma (es/en/fr) por perfiles de n-gramas de caracteres
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+LANGUAGES = ('es', 'en', 'fr')
+DEFAULT_LANGUAGE = 'es'
+NGRAM_ORDERS = (1, 2, 3, 4)
+LANGUAGE_ID_CACHE_SIZE = int(os.getenv("LANGUAGE_ID_CACHE_SIZE", "2048"))
+# Ventaja mínima sobre el español (log-prob promedio por n-grama) para elegir otro idioma:
+# consultas en español con términos técnicos en inglés quedan bajo 0.25, las inglesas/francesas sobre 0.4
+LANGUAGE_ID_MIN_MARGIN = float(os.getenv("LANGUAGE_ID_MIN_MARGIN", "0.3"))
+# Consultas de hasta estas palabras ("hola", "wifi", "holi!") solo dejan el español si alguna
+# palabra es propia del otro idioma: sus pocos n-gramas no bastan para decidir
+LANGUAGE_ID_SHORT_WORDS = int(os.getenv("LANGUAGE_ID_SHORT_WORDS", "2"))
+# Conteos de n-gramas precalculados desde los templates (se regeneran si cambian los paquetes)
+LANGUAGE_PROFILE_PATH = os.getenv(
+    "LANGUAGE_PROFILE_PATH",
+    os.path.join(_APP_DIR, '..', 'cache_disk', 'language_profiles.json')
+)
+
+# Palabras de conversación que los templates (respuestas) no contienen
+CONVERSATIONAL_WORDS = {
+    'es': "hola holi holis chao chau adios adiós gracias buenas buenos dias días tardes noches saludos sí",
+    'en': "hi hey hello thanks thank bye goodbye sorry please good morning afternoon evening yes",
+    'fr': "bonjour bonsoir salut merci revoir oui svp",
+}
+
+_NOISE = re.compile(r"https?://\S+|www\.\S+|\S+@\S+|\S+\.(?:cl|com|org)\S*")
+_NON_LETTERS = re.compile(r"[^a-záéíóúüñàâçèêëîïôûùœæÿ¿¡'’\s]")
+
+
+def _clean(text: str) -> str:
+    """Minúsculas, sin URLs/correos/números/emojis; conserva acentos, apóstrofes y ¿¡"""
+    text = _NOISE.sub(' ', text.lower())
+    text = _NON_LETTERS.sub(' ', text).replace('’', "'")
+    return ' '.join(text.split())
+
+
+def extract_ngrams(text: str) -> List[str]:
+    """N-gramas de caracteres de cada palabra con bordes (' palabra ')"""
+    ngrams = []
+    for word in _clean(text).split():
+        padded = f' {word} '
+        for n in NGRAM_ORDERS:
+            if n > len(padded):
+                break
+            ngrams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return ngrams
+
+
+def template_pack_digest(area_languages: Optional[Dict[str, Tuple[str, ...]]] = None) -> str:
+    """Huella del contenido de los paquetes de templates por área e idioma (sin importarlos)"""
+    from app.template_index import AREA_LANGUAGES
+
+    digest = hashlib.md5()
+    for area, languages in sorted((area_languages or AREA_LANGUAGES).items()):
+        for lang in languages:
+            path = os.path.join(_APP_DIR, 'template_manager', area, f'templates_{lang}.py')
+            try:
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+            except OSError:
+                continue
+            digest.update(f"{area}/{lang};".encode())
+    return digest.hexdigest()[:12]
+
+
+def count_template_ngrams(index=None) -> Tuple[Dict[str, Counter], Dict[str, Set[str]]]:
+    """Conteos de n-gramas y palabras por idioma desde el índice de templates, un idioma a la vez"""
+    if index is None:
+        from app.template_index import template_index as index
+
+    counts: Dict[str, Counter] = {}
+    words: Dict[str, Set[str]] = {}
+    for lang in LANGUAGES:
+        counter = Counter()
+        vocabulary = set(CONVERSATIONAL_WORDS.get(lang, '').split())
+        for area in index.area_languages:
+            for text in index.area_templates(area, lang).values():
+                counter.update(extract_ngrams(str(text)))
+                vocabulary.update(_clean(str(text)).split())
+        counts[lang] = counter
+        words[lang] = vocabulary
+    return counts, words
+
+
+def load_profile(path: str, digest: str) -> Optional[Tuple[Dict[str, Counter], Dict[str, Set[str]]]]:
+    """Perfiles guardados en disco si corresponden a los templates actuales"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get('digest') != digest or data.get('orders') != list(NGRAM_ORDERS) or 'words' not in data:
+        return None
+    return ({lang: Counter(grams) for lang, grams in data.get('counts', {}).items()},
+            {lang: set(vocabulary) for lang, vocabulary in data['words'].items()})
+
+
+def save_profile(path: str, digest: str, counts: Dict[str, Counter], words: Dict[str, Set[str]]):
+    """Escritura atómica de los perfiles (los demás workers los leen sin importar templates)"""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'digest': digest, 'orders': list(NGRAM_ORDERS),
+                       'counts': {lang: dict(counter) for lang, counter in counts.items()},
+                       'words': {lang: sorted(vocabulary) for lang, vocabulary in words.items()}},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"⚠️ No se pudieron guardar los perfiles de idioma: {e}")
+
+
+class LanguageIdentifier:
+    """
+    Clasificador de idioma tipo Naive Bayes sobre n-gramas de caracteres (1 a 4).
+
+    Se entrena (perezosamente, una vez por proceso) con los conteos de n-gramas de los
+    templates es/en/fr guardados en cache_disk/: detectar no importa los paquetes de
+    templates de otros idiomas. Si el archivo falta o los paquetes cambiaron, los conteos
+    se recalculan desde el índice de templates, un idioma a la vez, y se vuelven a guardar.
+    Los perfiles quedan en una matriz n-grama × idioma de log-probabilidades con suavizado
+    de Laplace. Detectar es promediar las filas de los n-gramas de la consulta, así
+    que cuesta microsegundos y no depende de listas de palabras por idioma. Las
+    consultas recientes quedan en un LRU. Sin evidencia suficiente (consulta vacía,
+    solo siglas, ventaja mínima o consulta corta sin palabras propias de otro idioma)
+    se asume español, el idioma principal del sistema.
+    """
+
+    def __init__(self, samples: Optional[Dict[str, Iterable[str]]] = None,
+                 cache_size: int = LANGUAGE_ID_CACHE_SIZE, min_margin: float = LANGUAGE_ID_MIN_MARGIN,
+                 profile_path: Optional[str] = LANGUAGE_PROFILE_PATH, index=None):
+        self._samples = samples
+        self.profile_path = os.path.abspath(profile_path) if profile_path else None
+        self._index_source = index
+        self.profile_source = None
+        self.min_margin = min_margin
+        self._languages: Tuple[str, ...] = ()
+        self._index: Dict[str, int] = {}           # n-grama → fila de la matriz
+        self._matrix: Optional[np.ndarray] = None  # (n-gramas + 1, idiomas); última fila = no visto
+        self._profile_sizes: Dict[str, int] = {}
+        self._words: Dict[str, Set[str]] = {}      # palabras vistas por idioma (consultas cortas)
+        self._lock = threading.Lock()
+        self.build_ms = 0.0
+        self.stats = {'detections': 0, 'defaulted': 0}
+        self.detect_with_confidence = lru_cache(maxsize=cache_size)(self._detect_with_confidence)
+
+    def _ensure_trained(self):
+        if self._matrix is not None:
+            return
+        with self._lock:
+            if self._matrix is not None:
+                return
+            start = time.perf_counter()
+            counts, words = self._training_counts()
+
+            languages = tuple(counts)
+            vocabulary = sorted(set().union(*counts.values())) if counts else []
+            matrix = np.zeros((len(vocabulary) + 1, len(languages)), dtype=np.float64)
+            for column, lang in enumerate(languages):
+                counter = counts[lang]
+                total = sum(counter.values()) + len(vocabulary) + 1
+                matrix[:-1, column] = [counter.get(gram, 0) + 1 for gram in vocabulary]
+                matrix[-1, column] = 1
+                matrix[:, column] = np.log(matrix[:, column] / total)
+
+            self._languages = languages
+            self._index = {gram: row for row, gram in enumerate(vocabulary)}
+            self._profile_sizes = {lang: len(counts[lang]) for lang in languages}
+            self._words = words
+            self._matrix = matrix
+            self.build_ms = (time.perf_counter() - start) * 1000
+            logger.info(f"✅ Perfiles de idioma entrenados: {len(vocabulary)} n-gramas "
+                        f"({', '.join(languages)}) en {self.build_ms:.0f}ms")
+
+    def _training_counts(self) -> Tuple[Dict[str, Counter], Dict[str, Set[str]]]:
+        if self._samples is not None:
+            self.profile_source = 'samples'
+            counts = {lang: Counter() for lang in self._samples}
+            words = {lang: set(CONVERSATIONAL_WORDS.get(lang, '').split()) for lang in self._samples}
+            for lang, texts in self._samples.items():
+                for text in texts:
+                    counts[lang].update(extract_ngrams(text))
+                    words[lang].update(_clean(text).split())
+            return counts, words
+
+        digest = template_pack_digest()
+        if self.profile_path:
+            profile = load_profile(self.profile_path, digest)
+            if profile is not None:
+                self.profile_source = 'profile'
+                return profile
+        counts, words = count_template_ngrams(self._index_source)
+        self.profile_source = 'templates'
+        if self.profile_path:
+            save_profile(self.profile_path, digest, counts, words)
+        return counts, words
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """Log-probabilidad promedio por n-grama para cada idioma (más alto = más probable)"""
+        self._ensure_trained()
+        ngrams = extract_ngrams(text or '')
+        if not ngrams:
+            return {}
+        unseen = len(self._index)
+        rows = [self._index.get(gram, unseen) for gram in ngrams]
+        averages = self._matrix[rows].mean(axis=0)
+        return dict(zip(self._languages, averages.tolist()))
+
+    def _detect_with_confidence(self, text: str) -> Tuple[str, float]:
+        scores = self.scores(text)
+        # Con menos de cuatro letras (p.ej. "tne", "¿?") no hay señal de idioma
+        if len(scores) < 2 or sum(c.isalpha() for c in text) < 4:
+            return DEFAULT_LANGUAGE, 0.0
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        (best, best_score), (_, second_score) = ranked[0], ranked[1]
+        if best != DEFAULT_LANGUAGE and best_score - scores.get(DEFAULT_LANGUAGE, best_score) < self.min_margin:
+            return DEFAULT_LANGUAGE, 0.0
+        words = _clean(text).split()
+        if best != DEFAULT_LANGUAGE and len(words) <= LANGUAGE_ID_SHORT_WORDS and not self._has_word_evidence(words, best):
+            return DEFAULT_LANGUAGE, 0.0
+        return best, round(min(1.0, (best_score - second_score) / self.min_margin), 3)
+
+    def _has_word_evidence(self, words: List[str], language: str) -> bool:
+        """¿Alguna palabra es conocida en `language` y no en español?"""
+        spanish = self._words.get(DEFAULT_LANGUAGE, set())
+        known = self._words.get(language, set())
+        return any(word in known and word not in spanish for word in words)
+
+    def detect(self, text: str) -> str:
+        """Código de idioma ('es', 'en', 'fr') de `text`"""
+        self.stats['detections'] += 1
+        language, confidence = self.detect_with_confidence((text or '').strip())
+        if confidence == 0.0:
+            self.stats['defaulted'] += 1
+        return language
+
+    def get_stats(self) -> Dict:
+        cache = self.detect_with_confidence.cache_info()
+        return {
+            **self.stats,
+            'trained': self._matrix is not None,
+            'profile_source': self.profile_source,
+            'build_ms': round(self.build_ms, 1),
+            'ngrams': dict(self._profile_sizes),
+            'cache_hits': cache.hits,
+            'cache_size': cache.currsize
+        }
+
+
+# Instancia global
+language_identifier = LanguageIdentifier()
+
+
+def detect_language(text: str) -> str:
+    return language_identifier.detect(text)
@@ -0,0 +1,436 @@
+# app/llm_gateway.py - Acceso único a Ollama: cliente HTTP asíncrono con pool, límites por modelo y deadlines
+import asyncio
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Callable, Dict, Iterator, List, Optional
+
+import httpx
+
+from app.chat_executor import _summarize
+from app.generation_cache import GenerationCache, generation_cache
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL") or os.getenv("OLLAMA_HOST") or "http://127.0.0.1:11434"
+# Generaciones simultáneas por modelo (un host chico se satura con más de una)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "1"))
+# Límites específicos: "llama3.2:3b=1,gemma3:4b=2"
+LLM_MODEL_CONCURRENCY = os.getenv("LLM_MODEL_CONCURRENCY", "")
+# Deadline por solicitud (espera en cola + generación)
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "0.5"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "8"))
+
+# Estados HTTP que indican una falla pasajera de Ollama (cargando modelo, sobrecarga)
+TRANSIENT_STATUS = {429, 500, 502, 503, 504}
+
+_DONE = object()
+
+
+class LLMGatewayError(Exception):
+    """Ollama no pudo completar la generación"""
+
+
+class LLMDeadlineExceeded(LLMGatewayError):
+    """La solicitud superó su deadline (en cola o generando) y se canceló"""
+
+    def __init__(self, model: str, deadline: float):
+        self.model = model
+        self.deadline = deadline
+        super().__init__(f"Generación con {model} superó el deadline de {deadline:.1f}s")
+
+
+class _TransientStatus(Exception):
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+        super().__init__(f"Ollama respondió HTTP {status_code}")
+
+
+def _parse_model_limits(spec: str) -> Dict[str, int]:
+    limits = {}
+    for item in spec.split(','):
+        model, _, value = item.strip().rpartition('=')
+        if model and value.strip().isdigit():
+            limits[model.strip()] = max(1, int(value))
+    return limits
+
+
+class LLMGateway:
+    """
+    Punto único para generar con Ollama (API HTTP /api/chat).
+
+    - Un httpx.AsyncClient con pool de conexiones keep-alive, en un event loop propio
+      (thread "llm-gateway"), compartido por todos los workers del chat
+    - Semáforo por modelo: las solicitudes que exceden el límite esperan en cola
+    - Deadline por solicitud: al vencer se cancela la tarea y se cierra el stream HTTP,
+      lo que también detiene la generación en Ollama
+    - Reintentos con backoff exponencial ante errores de red o HTTP 429/5xx, solo si
+      todavía no se entregó ningún token
+    - Métricas: en curso, en cola, tokens/s, latencia del primer token y espera en cola
+    - Con `cache`, las generaciones deterministas se sirven desde el GenerationCache
+      sin pasar por la cola ni por Ollama
+
+    `chat` y `stream_chat` son bloqueantes (para el pipeline síncrono del RAG);
+    `achat` se puede esperar desde cualquier otro event loop.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, timeout: Optional[float] = None,
+                 max_retries: Optional[int] = None, retry_backoff: Optional[float] = None,
+                 default_concurrency: Optional[int] = None, model_concurrency: Optional[Dict[str, int]] = None,
+                 max_connections: Optional[int] = None, transport: Optional[httpx.AsyncBaseTransport] = None,
+                 cache: Optional[GenerationCache] = None):
+        self.base_url = (base_url or OLLAMA_BASE_URL).rstrip('/')
+        self.timeout = timeout if timeout is not None else LLM_TIMEOUT_SECONDS
+        self.max_retries = max_retries if max_retries is not None else LLM_MAX_RETRIES
+        self.retry_backoff = retry_backoff if retry_backoff is not None else LLM_RETRY_BACKOFF
+        self.default_concurrency = max(1, default_concurrency or LLM_MAX_CONCURRENCY)
+        self.model_concurrency = (model_concurrency if model_concurrency is not None
+                                  else _parse_model_limits(LLM_MODEL_CONCURRENCY))
+        self.max_connections = max_connections or LLM_MAX_CONNECTIONS
+        self._transport = transport
+        self.cache = cache
+        # Función modelo → keep_alive que se envía en cada generación (la registra ModelManager)
+        self._keep_alive_provider: Optional[Callable[[str], object]] = None
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+
+        # Estado por modelo (solo se modifica en el thread del gateway)
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight = defaultdict(int)
+        self._queued = defaultdict(int)
+
+        self._first_token_times = deque(maxlen=500)
+        # Latencia por modelo (espera en cola + generación) de las solicitudes completadas
+        self._latencies = defaultdict(lambda: deque(maxlen=200))
+        self._queue_waits = deque(maxlen=500)
+        self._eval_tokens = 0
+        self._eval_seconds = 0.0
+        self._counters = {
+            'requests': 0,
+            'completed': 0,
+            'failed': 0,
+            'retries': 0,
+            'deadline_exceeded': 0,
+            'cancelled': 0,
+            'cache_hits': 0
+        }
+
+    # ------------------------------------------------------------------
+    # Event loop y cliente
+    # ------------------------------------------------------------------
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is not None:
+            return self._loop
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="llm-gateway", daemon=True)
+                thread.start()
+                self._thread = thread
+                self._loop = loop
+                logger.info(f"✅ LLM gateway iniciado - {self.base_url}, "
+                            f"concurrencia por modelo: {self.default_concurrency}, deadline: {self.timeout}s")
+        return self._loop
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout, connect=LLM_CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_keepalive_connections=self.max_connections,
+                                    max_connections=self.max_connections),
+                transport=self._transport
+            )
+        return self._client
+
+    def concurrency_limit(self, model: str) -> int:
+        return self.model_concurrency.get(model, self.default_concurrency)
+
+    def set_keep_alive_provider(self, provider: Optional[Callable[[str], object]]):
+        """Registra la función que decide el keep_alive (segundos o duración de Ollama) por modelo"""
+        self._keep_alive_provider = provider
+
+    def _keep_alive(self, model: str):
+        if self._keep_alive_provider is None:
+            return None
+        try:
+            return self._keep_alive_provider(model)
+        except Exception as e:
+            logger.warning(f"⚠️ Error calculando keep_alive para {model}: {e}")
+            return None
+
+    def _semaphore(self, model: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(model)
+        if semaphore is None:
+            semaphore = self._semaphores[model] = asyncio.Semaphore(self.concurrency_limit(model))
+        return semaphore
+
+    # ------------------------------------------------------------------
+    # Generación (corre en el event loop del gateway)
+    # ------------------------------------------------------------------
+    async def _chat(self, model: str, messages: List[Dict], options: Optional[Dict],
+                    timeout: Optional[float], on_token: Optional[Callable[[str], None]],
+                    cache_messages: Optional[List[Dict]] = None) -> Dict:
+        deadline = timeout if timeout is not None else self.timeout
+        self._counters['requests'] += 1
+        started = time.perf_counter()
+        key = self.cache.make_key(model, cache_messages or messages, options) if self.cache is not None else None
+        if key is not None:
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                self._counters['cache_hits'] += 1
+                content = cached.get('message', {}).get('content', '')
+                if on_token is not None and content:
+                    on_token(content)
+                return {**cached, 'cached': True}
+        try:
+            result = await asyncio.wait_for(self._run(model, messages, options, on_token), deadline)
+        except asyncio.TimeoutError:
+            self._counters['deadline_exceeded'] += 1
+            logger.warning(f"⏱️ Generación con {model} cancelada por deadline ({deadline:.1f}s)")
+            raise LLMDeadlineExceeded(model, deadline) from None
+        except asyncio.CancelledError:
+            self._counters['cancelled'] += 1
+            raise
+        except Exception:
+            self._counters['failed'] += 1
+            raise
+        self._counters['completed'] += 1
+        self._latencies[model].append(time.perf_counter() - started)
+        if key is not None and result['message']['content']:
+            # Guardar en disco sin demorar la respuesta
+            asyncio.get_running_loop().run_in_executor(None, self.cache.set, key, result)
+        return result
+
+    async def _run(self, model: str, messages: List[Dict], options: Optional[Dict],
+                   on_token: Optional[Callable[[str], None]]) -> Dict:
+        semaphore = self._semaphore(model)
+        enqueued_at = time.perf_counter()
+        self._queued[model] += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self._queued[model] -= 1
+        self._queue_waits.append(time.perf_counter() - enqueued_at)
+
+        self._in_flight[model] += 1
+        try:
+            return await self._generate_with_retries(model, messages, options, on_token, enqueued_at)
+        finally:
+            self._in_flight[model] -= 1
+            semaphore.release()
+
+    async def _generate_with_retries(self, model: str, messages: List[Dict], options: Optional[Dict],
+                                     on_token: Optional[Callable[[str], None]], enqueued_at: float) -> Dict:
+        attempt = 0
+        while True:
+            emitted = []
+            try:
+                return await self._stream_once(model, messages, options, on_token, enqueued_at, emitted)
+            except (httpx.TransportError, _TransientStatus) as e:
+                # Con tokens ya entregados no se puede reintentar sin duplicar texto
+                if emitted or attempt >= self.max_retries:
+                    raise LLMGatewayError(f"Error llamando a Ollama ({model}): {e}") from e
+                attempt += 1
+                self._counters['retries'] += 1
+                delay = self.retry_backoff * (2 ** (attempt - 1)) * (1 + random.random() * 0.25)
+                logger.warning(f"🔄 Reintento {attempt}/{self.max_retries} con {model} en {delay:.2f}s: {e}")
+                await asyncio.sleep(delay)
+
+    async def _stream_once(self, model: str, messages: List[Dict], options: Optional[Dict],
+                           on_token: Optional[Callable[[str], None]], enqueued_at: float,
+                           emitted: List[str]) -> Dict:
+        payload = {'model': model, 'messages': messages, 'stream': True}
+        if options:
+            payload['options'] = options
+        keep_alive = self._keep_alive(model)
+        if keep_alive is not None:
+            payload['keep_alive'] = keep_alive
+
+        final: Dict = {}
+        async with self._get_client().stream('POST', '/api/chat', json=payload) as response:
+            if response.status_code in TRANSIENT_STATUS:
+                await response.aread()
+                raise _TransientStatus(response.status_code)
+            if response.status_code >= 400:
+                body = (await response.aread()).decode('utf-8', errors='replace')
+                raise LLMGatewayError(f"Ollama respondió HTTP {response.status_code} ({model}): {body[:200]}")
+
+            first_token_at = None
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if chunk.get('error'):
+                    raise LLMGatewayError(f"Ollama ({model}): {chunk['error']}")
+                token = chunk.get('message', {}).get('content', '')
+                if token:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                        self._first_token_times.append(first_token_at - enqueued_at)
+                    emitted.append(token)
+                    if on_token:
+                        on_token(token)
+                if chunk.get('done'):
+                    final = chunk
+                    break
+
+        self._record_throughput(final, len(emitted), first_token_at)
+        result = {
+            'model': final.get('model', model),
+            'message': {'role': 'assistant', 'content': ''.join(emitted)},
+            'done': True
+        }
+        for key in ('done_reason', 'total_duration', 'prompt_eval_count', 'prompt_eval_duration',
+                    'eval_count', 'eval_duration'):
+            if key in final:
+                result[key] = final[key]
+        return result
+
+    def _record_throughput(self, final: Dict, chunks: int, first_token_at: Optional[float]):
+        """Tokens/s según Ollama (eval_count/eval_duration); si no vienen, chunks por segundo de stream"""
+        if final.get('eval_count') and final.get('eval_duration'):
+            self._eval_tokens += final['eval_count']
+            self._eval_seconds += final['eval_duration'] / 1e9
+        elif chunks and first_token_at is not None:
+            self._eval_tokens += chunks
+            self._eval_seconds += max(1e-6, time.perf_counter() - first_token_at)
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+    def chat(self, model: str, messages: List[Dict], options: Optional[Dict] = None,
+             timeout: Optional[float] = None, cache_messages: Optional[List[Dict]] = None) -> Dict:
+        """Generación completa (bloqueante). Retorna {'message': {'content': ...}, ...} como ollama.chat
+
+        `cache_messages`: mensajes que identifican la generación en el cache (por defecto `messages`),
+        p.ej. BuiltPrompt.cache_messages con la pregunta normalizada.
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self._chat(model, messages, options, timeout, None, cache_messages), self._ensure_loop()
+        )
+        try:
+            return future.result()
+        finally:
+            future.cancel()
+
+    def stream_chat(self, model: str, messages: List[Dict], options: Optional[Dict] = None,
+                    timeout: Optional[float] = None,
+                    on_done: Optional[Callable[[Dict], None]] = None,
+                    cache_messages: Optional[List[Dict]] = None) -> Iterator[str]:
+        """Tokens a medida que se generan (bloqueante). Cerrar el iterador cancela la generación.
+
+        `on_done` recibe el resultado final (conteos y duraciones de Ollama) al terminar el stream.
+        """
+        tokens: queue.Queue = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(
+            self._chat(model, messages, options, timeout, tokens.put_nowait, cache_messages), self._ensure_loop()
+        )
+        future.add_done_callback(lambda _: tokens.put_nowait(_DONE))
+        try:
+            while True:
+                token = tokens.get()
+                if token is _DONE:
+                    break
+                yield token
+            result = future.result()
+            if on_done is not None:
+                on_done(result)
+        finally:
+            future.cancel()
+
+    async def achat(self, model: str, messages: List[Dict], options: Optional[Dict] = None,
+                    timeout: Optional[float] = None, cache_messages: Optional[List[Dict]] = None) -> Dict:
+        """Versión awaitable de `chat` para usar desde otro event loop (p.ej. FastAPI)"""
+        future = asyncio.run_coroutine_threadsafe(
+            self._chat(model, messages, options, timeout, None, cache_messages), self._ensure_loop()
+        )
+        return await asyncio.wrap_future(future)
+
+    async def _request_json(self, method: str, path: str, payload: Optional[Dict]) -> Dict:
+        response = await self._get_client().request(method, path, json=payload)
+        if response.status_code >= 400:
+            raise LLMGatewayError(f"Ollama respondió HTTP {response.status_code} en {path}")
+        return response.json()
+
+    def request_json(self, method: str, path: str, payload: Optional[Dict] = None,
+                     timeout: Optional[float] = None) -> Dict:
+        """Llamada a la API de Ollama que no genera (p.ej. /api/tags, /api/ps), por el mismo pool"""
+        deadline = timeout if timeout is not None else LLM_CONNECT_TIMEOUT
+        future = asyncio.run_coroutine_threadsafe(
+            asyncio.wait_for(self._request_json(method, path, payload), deadline), self._ensure_loop()
+        )
+        try:
+            return future.result()
+        except (asyncio.TimeoutError, httpx.TransportError) as e:
+            raise LLMGatewayError(f"Ollama no respondió en {path}: {e or type(e).__name__}") from e
+        finally:
+            future.cancel()
+
+    def load(self, model: Optional[str] = None) -> Dict:
+        """Carga actual: solicitudes en cola y en curso (totales) y latencia del modelo indicado"""
+        load = {'queued': sum(self._queued.values()), 'in_flight': sum(self._in_flight.values())}
+        if model is not None:
+            load['latency_ms'] = _summarize(sorted(self._latencies.get(model, ())))
+        return load
+
+    def get_stats(self) -> Dict:
+        models = set(self._semaphores) | set(self.model_concurrency)
+        first_token = sorted(self._first_token_times)
+        waits = sorted(self._queue_waits)
+        return {
+            'base_url': self.base_url,
+            'deadline_seconds': self.timeout,
+            'in_flight': sum(self._in_flight.values()),
+            'queued': sum(self._queued.values()),
+            'models': {
+                model: {
+                    'limit': self.concurrency_limit(model),
+                    'in_flight': self._in_flight.get(model, 0),
+                    'queued': self._queued.get(model, 0),
+                    'latency_ms': _summarize(sorted(self._latencies.get(model, ())))
+                } for model in sorted(models)
+            },
+            **self._counters,
+            'tokens_per_second': round(self._eval_tokens / self._eval_seconds, 1) if self._eval_seconds else 0.0,
+            'first_token_latency_ms': _summarize(first_token),
+            'queue_wait_ms': _summarize(waits),
+            'generation_cache': self.cache.get_stats() if self.cache is not None else None
+        }
+
+    def shutdown(self):
+        """Cerrar el pool HTTP y detener el event loop del gateway"""
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            if self._client is not None:
+                asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result(timeout=5)
+        except Exception as e:
+            logger.warning(f"⚠️ Error cerrando cliente del LLM gateway: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if not loop.is_running():
+            loop.close()
+        with self._lock:
+            self._client = None
+            self._semaphores.clear()
+            self._loop = None
+            self._thread = None
+        logger.info("🧹 LLM gateway detenido")
+
+
+# Instancia global
+llm_gateway = LLMGateway(cache=generation_cache)
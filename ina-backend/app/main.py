@@ -10,31 +10,28 @@ initialize_silent_chroma()
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from app.models import init_db, ChatLog, UserQuery, UnansweredQuestion, engine, ResponseFeedback
 from app.rag import get_ai_response
 from app.rag import rag_engine
+from app.chat_executor import chat_executor, fast_chat_executor, ChatQueueFullError
+from app.llm_gateway import llm_gateway
+from app.model_manager import model_manager
+from app.retrieval_context import RetrievalContext
+from app.embedding_registry import embedding_registry
 from sqlmodel import Session, select
 import asyncio
+import json
 import logging
-import importlib
 
 import time
 
 # Configurar logger
 logger = logging.getLogger(__name__)
-_ollama_spec = importlib.util.find_spec("ollama")
-if _ollama_spec is not None:
-    ollama = importlib.import_module("ollama")
-else:
-    # Entorno sin ollama: crear stub ligero para evitar fallos en import y permitir health checks controlados
-    class _OllamaStub:
-        def chat(self, *args, **kwargs):
-            raise RuntimeError("ollama no está disponible en este entorno")
-
-    ollama = _OllamaStub()
 from app.analytics import get_query_analytics, get_category_analytics
 from app.classifier import classifier
+from app.template_matcher import template_matcher
 from pydantic import BaseModel as BaseModelOriginal
 from typing import Optional
 from app.quality_monitor import quality_monitor
@@ -137,7 +134,7 @@ qr_generator = QRGenerator()
 duoc_url_manager = DuocURLManager()
 
 # Importar funciones y objetos de cache_manager después de definir app
-from app.cache_manager import get_cache_stats, rag_cache, classification_cache
+from app.cache_manager import get_cache_stats, rag_cache, classification_cache, response_cache
 
 # ✅ SOLUCIÓN TELEMETRÍA: Configurar ChromaDB ANTES de cargar datos
 import chromadb
@@ -186,6 +183,8 @@ async def clear_cache_endpoint(cache_type: str = "all"):
             rag_cache.clear()
         if cache_type == "classification" or cache_type == "all":
             classification_cache.clear()
+        if cache_type == "response" or cache_type == "all":
+            response_cache.clear()
         
         return {
             "status": "success",
@@ -287,6 +286,9 @@ async def on_startup():
         engine = _get_rag_engine()
         engine_time = time.time() - knowledge_start
         logger.info(f"✅ RAG Engine inicializado correctamente ({engine_time:.2f}s)")
+
+        # 🔥 Precargar el modelo en segundo plano (la primera consulta no paga la carga en RAM)
+        model_manager.start(engine.current_model)
         
         # 🔍 VERIFICACIÓN RÁPIDA DE CHROMADB (Sin Reprocesamiento Automático)
         # ⚠️ FASE 3: El reprocesamiento automático fue DESHABILITADO (38s delay)
@@ -441,6 +443,13 @@ async def on_startup():
     print(f"📚 Documentación API: http://localhost:8000/docs")
     print("=" * 80 + "\n")
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    chat_executor.shutdown()
+    fast_chat_executor.shutdown()
+    model_manager.stop()
+    llm_gateway.shutdown()
+
 class Message(BaseModel):
     text: Optional[str] = None
     message: Optional[str] = None  # Alias para compatibilidad con diferentes clientes
@@ -452,13 +461,101 @@ class Message(BaseModel):
 @app.post("/api/ask")  # Alias para compatibilidad
 @app.post("/ask")  # Alias adicional
 async def chat(message: Message, request: Request):
+    # Soportar tanto 'text' como 'message' como nombre del campo
+    question = (message.text or message.message or "").strip()
+    
+    if not question:
+        raise HTTPException(status_code=400, detail="Message text is required")
+
+    user_id = request.client.host if request.client else 'anonymous'
+
+    # 🚦 El pipeline RAG es bloqueante: se ejecuta en el pool del chat para no congelar
+    # el event loop (health checks y demás endpoints siguen respondiendo)
+    try:
+        return await _chat_lane(question).run(_process_chat, question, user_id)
+    except ChatQueueFullError as e:
+        logger.warning(f"🚦 Cola de chat llena ({e.queued} en espera) - rechazando: '{question[:50]}'")
+        return JSONResponse(
+            status_code=503,
+            headers={"Retry-After": str(e.retry_after)},
+            content={
+                "response": "InA está atendiendo muchas consultas en este momento. Intenta nuevamente en unos segundos.",
+                "success": False,
+                "retry_after": e.retry_after,
+                "timestamp": datetime.now().isoformat()
+            }
+        )
+
+
+@app.post("/chat/stream")
+async def chat_stream(message: Message, request: Request):
+    """
+    Variante en streaming de /chat (JSON por línea, application/x-ndjson).
+
+    Frames: 'meta' (estrategia/template), 'sources' (fuentes recuperadas), 'token' (texto de
+    Ollama a medida que se genera) y 'final' (respuesta post-procesada con QR, idéntica a /chat).
+    El texto del frame 'final' es el definitivo y reemplaza a los tokens acumulados.
+    """
+    question = (message.text or message.message or "").strip()
+    
+    if not question:
+        raise HTTPException(status_code=400, detail="Message text is required")
+
+    user_id = request.client.host if request.client else 'anonymous'
+
+    try:
+        frames = _chat_lane(question).stream(_process_chat, question, user_id)
+    except ChatQueueFullError as e:
+        logger.warning(f"🚦 Cola de chat llena ({e.queued} en espera) - rechazando stream: '{question[:50]}'")
+        return JSONResponse(
+            status_code=503,
+            headers={"Retry-After": str(e.retry_after)},
+            content={
+                "response": "InA está atendiendo muchas consultas en este momento. Intenta nuevamente en unos segundos.",
+                "success": False,
+                "retry_after": e.retry_after,
+                "timestamp": datetime.now().isoformat()
+            }
+        )
+
+    async def ndjson_lines():
+        try:
+            async for kind, payload in frames:
+                if kind == 'result':
+                    payload = {"type": "final", **payload}
+                yield json.dumps(payload, ensure_ascii=False, default=str) + "\n"
+        except HTTPException as e:
+            yield json.dumps({"type": "error", "status_code": e.status_code, "detail": e.detail}) + "\n"
+        except Exception as e:
+            logger.error(f"Error en /chat/stream: {e}")
+            yield json.dumps({"type": "error", "status_code": 500, "detail": "Error interno del servidor"}) + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def _chat_lane(question: str):
+    """
+    Pool que atiende la consulta. Templates y respuestas ya cacheadas no llaman a Ollama: van al
+    carril rápido y no esperan detrás de las generaciones (el gateway atiende una por modelo).
+    """
+    try:
+        if template_matcher.match(question.lower().strip()) is not None:
+            return fast_chat_executor
+        if response_cache.contains(response_cache.make_key(question, rag_engine.detect_language(question))):
+            return fast_chat_executor
+    except Exception as e:
+        logger.debug(f"No se pudo anticipar el carril de la consulta: {e}")
+    return chat_executor
+
+
+def _process_chat(question: str, user_id: str, emit=None):
+    """Pipeline completo de /chat (síncrono, se ejecuta en un worker de chat_executor).
+
+    `emit` (opcional) recibe los frames de streaming de get_ai_response para /chat/stream.
+    """
     try:
         start_time = datetime.now()
-        # Soportar tanto 'text' como 'message' como nombre del campo
-        question = (message.text or message.message or "").strip()
-        
-        if not question:
-            raise HTTPException(status_code=400, detail="Message text is required")
 
         # 👇 1. VALIDACIÓN DE CONTENIDO - NUEVO SISTEMA
         content_validation = content_filter.validate_question(question)
@@ -566,7 +663,6 @@ async def chat(message: Message, request: Request):
         # 3.2.1 ✅ NUEVO: INICIALIZAR SISTEMA INTELIGENTE
         # Generar IDs únicos para el sistema inteligente
         import uuid
-        user_id = request.client.host if hasattr(request, 'client') else 'anonymous'
         session_id = str(uuid.uuid4())
         
         # Iniciar conversación inteligente
@@ -592,12 +688,9 @@ async def chat(message: Message, request: Request):
             conversation_context = None
             user_profile = None
         
-        # 3.3 BUSCAR EN BASE DE CONOCIMIENTOS
-        context_results = rag_engine.query(question)
-        has_context = bool(context_results)
-
-        print(f"🔍 Contexto encontrado: {len(context_results)} resultados")
-        logger.info(f"🔍 Contexto encontrado: {len(context_results)} resultados para categoría '{category}'")
+        # 3.3 CONTEXTO DE RECUPERACIÓN DEL REQUEST (la búsqueda en ChromaDB se hace una sola vez dentro del pipeline)
+        retrieval_context = RetrievalContext(question)
+        has_context = False
         
         # 3.4 OBTENER RESPUESTA (AHORA CON QR Y CONTEXTO INTELIGENTE)
         try:
@@ -624,14 +717,19 @@ async def chat(message: Message, request: Request):
             # Llamar directamente al sistema RAG que incluye detección de templates
             response_data = get_ai_response(
                 question, 
-                context_results, 
                 conversational_context=conversational_context,
-                user_profile=user_profile.__dict__ if user_profile else None
+                user_profile=user_profile.__dict__ if user_profile else None,
+                stream_callback=emit,
+                retrieval_context=retrieval_context
             )
             
             # Si no se usó un template (estrategia no es 'template'), intentar enhanced_generator
             processing_info = response_data.get('processing_info', {})
             strategy = processing_info.get('processing_strategy', 'N/A')
+            has_context = retrieval_context.has_candidates() or bool(response_data.get('sources')) or strategy == 'template'
+            retrieval_stats = retrieval_context.get_stats()
+            print(f"🔍 Contexto encontrado: {has_context} ({retrieval_stats['vector_queries']} búsquedas vectoriales)")
+            logger.info(f"🔍 Contexto encontrado: {has_context} para categoría '{category}' - {retrieval_stats}")
             
             if strategy != 'template':
                 # ✨ FALLBACK: INTENTAR RESPUESTA MEJORADA SI NO HAY TEMPLATE
@@ -663,7 +761,8 @@ async def chat(message: Message, request: Request):
                     current_query=question,
                     category=category,
                     user_id=user_id,
-                    limit=3
+                    limit=3,
+                    query_embeddings=retrieval_context.embeddings
                 )
             
             # ✅ AGREGAR GENERACIÓN DE QR AQUÍ MISMO
@@ -875,17 +974,52 @@ async def chat(message: Message, request: Request):
         logger.error(f"Error general en /chat: {e}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
+@app.get("/chat/queue/stats")
+async def chat_queue_stats():
+    """Profundidad de la cola de admisión del chat y tiempos de espera"""
+    return {
+        "status": "success",
+        "chat_executor": chat_executor.get_stats(),
+        "fast_chat_executor": fast_chat_executor.get_stats(),
+        "llm_gateway": llm_gateway.get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.get("/embeddings/stats")
+async def embeddings_stats():
+    """Modelos de embeddings cargados en este proceso: tiempo de carga, RSS agregado y uso"""
+    return {
+        "status": "success",
+        "embeddings": embedding_registry.get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.post("/keywords/reload")
+async def reload_keyword_tables():
+    """Recompilar las tablas de keywords (config/keywords/*.json) sin reiniciar"""
+    from app.smart_keyword_detector import smart_keyword_detector
+    from app.priority_keyword_system import priority_keyword_system
+    from app.keyword_automaton import keyword_index
+    try:
+        smart_keyword_detector.reload()
+        priority_keyword_system.reload()
+        return {
+            "status": "success",
+            "keyword_index": keyword_index.get_stats(),
+            "timestamp": datetime.now().isoformat()
+        }
+    except Exception as e:
+        logger.error(f"Error recargando keywords: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/health")
 @app.get("/api/health")  # Agregar alias para compatibilidad
 async def health_check():
     """Endpoint de salud que verifica Ollama también"""
     try:
-        # Test simple de Ollama
-        test_response = ollama.chat(
-            model='llama3.2:1b-instruct-q4_K_M',
-            messages=[{'role': 'user', 'content': 'Hola'}],
-            options={'num_predict': 10}
-        )
+        # Test de Ollama sin generar: /api/ps no pasa por el semáforo de generación, así que no
+        # espera detrás de los usuarios ni les quita el cupo (lanza LLMGatewayError si no responde)
+        await asyncio.to_thread(llm_gateway.request_json, 'GET', '/api/ps')
         
         # Test de base de datos
         with Session(engine) as session:
@@ -902,7 +1036,8 @@ async def health_check():
         
         return {
             "status": "healthy", 
-            "model": "llama3.2:1b-instruct-q4_K_M",
+            "model": rag_engine.current_model,
+            "model_lifecycle": await asyncio.to_thread(model_manager.get_status),
             "ollama": "connected",
             "database": "connected",
             "chromadb": rag_status,
@@ -913,13 +1048,17 @@ async def health_check():
             "qr_generator": "active",
             "intelligent_response_system": "active",
             "memory_manager": "active",
-            "enhanced_rag_system": enhanced_status  # 👈 NUEVO
+            "enhanced_rag_system": enhanced_status,  # 👈 NUEVO
+            "chat_executor": chat_executor.get_stats(),
+            "fast_chat_executor": fast_chat_executor.get_stats(),
+            "llm_gateway": llm_gateway.get_stats()
         }
     except Exception as e:
         logger.error(f"Health check failed: {e}")
         return {
             "status": "unhealthy", 
-            "model": "llama3.2:1b-instruct-q4_K_M",
+            "model": model_manager.current_model,
+            "model_lifecycle": model_manager.get_status(check_loaded=False),
             "error": str(e)
         }
 
@@ -1506,14 +1645,14 @@ async def validate_question(request: dict):
         "question": question,
         "content_validation": content_result,
         "topic_classification": topic_result,
-        "final_decision": "allowed" if (content_result["is_allowed"] and topic_result["is_institutional"]) else "blocked",
+        "final_decision": "allowed" if (content_result["allowed"] and topic_result["is_institutional"]) else "blocked",
         "timestamp": datetime.now().isoformat()
     }
     
     # Si está bloqueado, agregar mensaje apropiado
     if response_data["final_decision"] == "blocked":
-        if not content_result["is_allowed"]:
-            response_data["message"] = content_result["rejection_message"]
+        if not content_result["allowed"]:
+            response_data["message"] = content_result["reason"]
         elif not topic_result["is_institutional"]:
             if topic_result["category"] != "unknown":
                 response_data["message"] = topic_classifier.get_redirection_message(
@@ -1524,6 +1663,40 @@ async def validate_question(request: dict):
     
     return response_data
 
+VALIDATE_BATCH_MAX_QUESTIONS = int(os.getenv("VALIDATE_BATCH_MAX_QUESTIONS", "10000"))
+
+@app.post("/validate-question/batch")
+async def validate_question_batch(request: dict):
+    """
+    Validar muchas preguntas en una llamada (replay de logs, moderación retroactiva)
+
+    Body: {"questions": [...], "category": opcional, "include_topic": false}
+    Retorna un resultado por pregunta (mismo orden, con la regla que decidió) y los
+    conteos por regla y por término/patrón de bloqueo del lote.
+    """
+    questions = request.get("questions") or []
+    if not isinstance(questions, list) or not all(isinstance(q, str) for q in questions):
+        raise HTTPException(status_code=400, detail="'questions' debe ser una lista de textos")
+    if len(questions) > VALIDATE_BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=413,
+                            detail=f"Máximo {VALIDATE_BATCH_MAX_QUESTIONS} preguntas por llamada")
+    include_topic = bool(request.get("include_topic", False))
+
+    def run_batch():
+        batch = content_filter.validate_batch(questions, request.get("category"))
+        if include_topic:
+            for question, result in zip(questions, batch["results"]):
+                topic_result = topic_classifier.classify_topic(question)
+                result["topic_category"] = topic_result.get("category")
+                result["is_institutional"] = topic_result.get("is_institutional", False)
+                result["final_decision"] = "allowed" if (result["allowed"] and result["is_institutional"]) else "blocked"
+        return batch
+
+    # Lotes grandes son CPU: fuera del event loop
+    batch = await asyncio.to_thread(run_batch)
+    batch["timestamp"] = datetime.now().isoformat()
+    return batch
+
 @app.get("/allowed-topics")
 async def get_allowed_topics():
     """Endpoint para ver los temas permitidos"""
@@ -1642,7 +1815,7 @@ async def get_semantic_cache_stats():
         # Obtener stats del cache a partir de los objetos disponibles
         cache_stats = {
             "rag_cache_size": len(getattr(rag_cache, 'cache', {})),
-            "semantic_cache_size": len(getattr(rag_engine.semantic_cache, 'cache', {})) if hasattr(rag_engine, 'semantic_cache') else 0,
+            "semantic_cache_size": len(rag_engine.semantic_cache) if hasattr(rag_engine, 'semantic_cache') else 0,
             "text_cache_entries": len(getattr(rag_engine, 'text_cache', {})) if hasattr(rag_engine, 'text_cache') else 0
         }
         
@@ -1650,6 +1823,7 @@ async def get_semantic_cache_stats():
             "status": "success",
             "normalization_examples": normalized_examples,
             "cache_stats": cache_stats,
+            "semantic_cache": rag_engine.semantic_cache.get_stats(),
             "classifier_semantic_cache": classifier.get_classification_stats(),
             "rag_metrics": rag_engine.metrics
         }
@@ -1662,7 +1836,7 @@ async def clear_semantic_cache():
     """Limpiar cache semántico"""
     try:
         rag_engine.text_cache.clear()
-        rag_engine.semantic_cache.cache.clear()
+        rag_engine.semantic_cache.clear()
         
         return {
             "status": "success",
@@ -1698,7 +1872,7 @@ async def test_semantic_cache():
         
         cache_stats = {
             "rag_cache_size": len(getattr(rag_cache, 'cache', {})),
-            "semantic_cache_size": len(getattr(rag_engine.semantic_cache, 'cache', {})) if hasattr(rag_engine, 'semantic_cache') else 0,
+            "semantic_cache_size": len(rag_engine.semantic_cache) if hasattr(rag_engine, 'semantic_cache') else 0,
             "text_cache_entries": len(getattr(rag_engine, 'text_cache', {})) if hasattr(rag_engine, 'text_cache') else 0
         }
 
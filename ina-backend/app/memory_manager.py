@@ -1,7 +1,7 @@
 from typing import Dict, List, Optional, Tuple
 import numpy as np
 from datetime import datetime, timedelta
-from sentence_transformers import SentenceTransformer
+from app.embedding_registry import get_encoder
 from sklearn.metrics.pairwise import cosine_similarity
 import json
 import os
@@ -10,12 +10,15 @@ from collections import defaultdict
 import uuid
 import hashlib
 
+from app.query_embeddings import QueryEmbeddings, encode_query
+
 logger = logging.getLogger(__name__)
 
 class MemoryManager:
     def __init__(self, model_name: str = 'intfloat/multilingual-e5-small'):
         # Modelo más ligero para mejor rendimiento
-        self.model = SentenceTransformer(model_name)
+        self.model_name = model_name
+        self.model = get_encoder(model_name)
         
         # Memoria multi-nivel
         self.short_term_memory = {}  # Caché en memoria para respuestas recientes
@@ -40,6 +43,16 @@ class MemoryManager:
         
         logger.info(f"🧠 MemoryManager inicializado con modelo {model_name}")
         
+    def _get_cached_embedding(self, text: str) -> np.ndarray:
+        """Embedding de textos ya vistos (patrones aprendidos): se codifican una sola vez"""
+        embedding = self.embedding_cache.get(text)
+        if embedding is None:
+            if len(self.embedding_cache) >= 1000:
+                self.embedding_cache.pop(next(iter(self.embedding_cache)))
+            embedding = self.model.encode([text])[0]
+            self.embedding_cache[text] = embedding
+        return embedding
+
     def add_to_memory(self, query: str, response: str, metadata: Dict, memory_type: str = 'short_term'):
         try:
             # Si se proporciona timestamp en metadata, usarlo; si no, usar el actual
@@ -73,9 +86,10 @@ class MemoryManager:
             logger.error(f"Error adding to memory: {e}")
             return False
     
-    def find_similar_queries(self, query: str, threshold: float = 0.75) -> List[Dict]:
+    def find_similar_queries(self, query: str, threshold: float = 0.75,
+                             query_embeddings: Optional[QueryEmbeddings] = None) -> List[Dict]:
         try:
-            query_embedding = self.model.encode(query)
+            query_embedding = encode_query(self.model, self.model_name, query, query_embeddings)
             results = []
             
             # Buscar en memoria a corto plazo
@@ -344,17 +358,18 @@ class MemoryManager:
         return insights
     
     def suggest_related_queries(self, current_query: str, category: str = None, 
-                               user_id: str = None, limit: int = 3) -> List[str]:
+                               user_id: str = None, limit: int = 3,
+                               query_embeddings: Optional[QueryEmbeddings] = None) -> List[str]:
         """Sugerir consultas relacionadas basadas en patrones aprendidos"""
         suggestions = []
         
         try:
-            current_embedding = self.model.encode([current_query])[0]
+            current_embedding = encode_query(self.model, self.model_name, current_query, query_embeddings)
             
             # Buscar en patrones aprendidos de la categoría
             if category and category in self.learning_patterns:
                 for pattern in self.learning_patterns[category][-20:]:  # Últimos 20 patrones
-                    pattern_embedding = self.model.encode([pattern['query']])[0]
+                    pattern_embedding = self._get_cached_embedding(pattern['query'])
                     similarity = cosine_similarity([current_embedding], [pattern_embedding])[0][0]
                     
                     if 0.6 < similarity < 0.9:  # Similar pero no idéntica
@@ -0,0 +1,281 @@
+# app/model_manager.py - Ciclo de vida del modelo Ollama: descubrimiento con TTL, precarga y keep-alive
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from app.llm_gateway import LLMGateway, llm_gateway
+from app.prompt_builder import SYSTEM_INSTRUCTIONS, prompt_builder
+
+logger = logging.getLogger(__name__)
+
+# Orden de preferencia (llama3.2:1b-instruct-q4_K_M es el más liviano y optimizado para instrucciones)
+PREFERRED_MODELS = [m.strip() for m in os.getenv(
+    "OLLAMA_PREFERRED_MODELS", "llama3.2:1b-instruct-q4_K_M,llama3.2:3b,gemma3:4b"
+).split(',') if m.strip()]
+MODEL_DISCOVERY_TTL = float(os.getenv("MODEL_DISCOVERY_TTL", "300"))
+MODEL_WARMUP_ENABLED = os.getenv("MODEL_WARMUP_ENABLED", "1") == "1"
+MODEL_WARMUP_TIMEOUT = float(os.getenv("MODEL_WARMUP_TIMEOUT", "120"))
+# Minutos antes de la apertura en que se vuelve a precargar el modelo
+MODEL_WARMUP_LEAD_MINUTES = int(os.getenv("MODEL_WARMUP_LEAD_MINUTES", "15"))
+# Horario de la sede (hora local): "días@HH:MM-HH:MM" separados por coma, lunes=0
+CAMPUS_HOURS = os.getenv("CAMPUS_HOURS", "0-4@08:00-22:30,5@08:00-14:00")
+# keep_alive fuera del horario (segundos; el default de Ollama son 5 minutos)
+OFF_HOURS_KEEP_ALIVE = int(os.getenv("MODEL_OFF_HOURS_KEEP_ALIVE", "300"))
+
+# Con las instrucciones fijas del prompt: la precarga deja evaluado el prefijo que comparten todas las consultas
+WARMUP_MESSAGES = [{'role': 'system', 'content': SYSTEM_INSTRUCTIONS}, {'role': 'user', 'content': 'Hola'}]
+
+
+def parse_campus_hours(spec: str) -> Dict[int, Tuple[int, int]]:
+    """{día: (minuto de apertura, minuto de cierre)} desde "0-4@08:00-22:30,5@08:00-14:00" """
+    schedule = {}
+    for item in spec.split(','):
+        days, _, hours = item.strip().partition('@')
+        if not hours:
+            continue
+        try:
+            first, _, last = days.partition('-')
+            opening, _, closing = hours.partition('-')
+            start_minute = int(opening[:2]) * 60 + int(opening[3:5])
+            end_minute = int(closing[:2]) * 60 + int(closing[3:5])
+            for day in range(int(first), int(last or first) + 1):
+                schedule[day] = (start_minute, end_minute)
+        except ValueError:
+            logger.warning(f"⚠️ Horario de sede inválido ignorado: '{item}'")
+    return schedule
+
+
+class ModelManager:
+    """
+    Mantiene el modelo de Ollama listo para responder.
+
+    - Descubre los modelos instalados por la API HTTP (/api/tags) y guarda la lista
+      con TTL (antes: `ollama list` por subprocess al construir el RAGEngine)
+    - Precarga el modelo elegido (con el num_ctx del prompt builder) con una generación
+      mínima al iniciar el servidor y otra vez antes de la apertura de cada día de clases
+    - Registra en el gateway el keep_alive de cada generación: durante el horario de la
+      sede el modelo queda residente hasta el cierre; fuera del horario se usa el
+      keep_alive corto para liberar RAM
+    - Entrega el digest de cada modelo al cache de generaciones del gateway
+    - `get_status()` reporta el estado de carga (incluye /api/ps) para /health
+    """
+
+    def __init__(self, gateway: LLMGateway = llm_gateway, preferred_models: Optional[List[str]] = None,
+                 discovery_ttl: float = MODEL_DISCOVERY_TTL, campus_hours: str = CAMPUS_HOURS,
+                 off_hours_keep_alive: int = OFF_HOURS_KEEP_ALIVE, num_ctx: Optional[int] = None):
+        self.gateway = gateway
+        self.preferred_models = list(preferred_models or PREFERRED_MODELS)
+        self.discovery_ttl = discovery_ttl
+        self.schedule = parse_campus_hours(campus_hours)
+        self.off_hours_keep_alive = off_hours_keep_alive
+        # Precargar con el num_ctx de los prompts: con otro valor Ollama recargaría el modelo en la primera consulta
+        self.num_ctx = num_ctx or prompt_builder.num_ctx
+
+        self._lock = threading.RLock()
+        self._available: List[str] = []
+        self._digests: Dict[str, str] = {}
+        self._discovered_at = 0.0
+        self._discovery_error: Optional[str] = None
+        self.current_model: Optional[str] = None
+
+        self._warmup_thread: Optional[threading.Thread] = None
+        self._warmup_timer: Optional[threading.Timer] = None
+        self.warmup = {'state': 'cold', 'model': None, 'load_ms': None, 'at': None, 'error': None, 'count': 0}
+
+        self.gateway.set_keep_alive_provider(self.keep_alive)
+        if self.gateway.cache is not None:
+            self.gateway.cache.set_model_version_source(self.model_digest)
+
+    # ------------------------------------------------------------------
+    # Descubrimiento
+    # ------------------------------------------------------------------
+    def list_models(self, force: bool = False) -> List[str]:
+        """Modelos instalados en Ollama (cache con TTL; si Ollama no responde se usa la última lista)"""
+        with self._lock:
+            if not force and self._discovered_at and time.time() - self._discovered_at < self.discovery_ttl:
+                return list(self._available)
+            try:
+                data = self.gateway.request_json('GET', '/api/tags')
+                self._available = [model.get('name') or model.get('model') for model in data.get('models', [])]
+                self._digests = {model.get('name') or model.get('model'): model.get('digest') or ''
+                                 for model in data.get('models', [])}
+                self._discovery_error = None
+                logger.info(f"🔍 Modelos Ollama disponibles: {', '.join(self._available) or 'ninguno'}")
+            except Exception as e:
+                self._discovery_error = str(e)
+                logger.error(f"Error detectando modelos Ollama: {e}")
+            self._discovered_at = time.time()
+            return list(self._available)
+
+    def model_digest(self, model: str) -> str:
+        """Digest del modelo según el último descubrimiento ('' si no se conoce); no consulta Ollama"""
+        digest = self._digests.get(model)
+        if digest is None:
+            digest = next((value for name, value in self._digests.items()
+                           if name and model.lower() in name.lower()), '')
+        return digest
+
+    def select_model(self, force: bool = False) -> str:
+        """Primer modelo preferido instalado; si no hay, el primero instalado; si Ollama no responde, el preferido"""
+        available = self.list_models(force=force)
+        names = [name.lower() for name in available if name]
+        model = None
+        for preferred in self.preferred_models:
+            if any(preferred.lower() in name for name in names):
+                logger.info(f"✅ Modelo seleccionado: {preferred}")
+                model = preferred
+                break
+            logger.info(f"❌ Modelo no encontrado: {preferred}")
+        if model is None and available:
+            model = available[0]
+            logger.warning(f"🔄 Usando primer modelo disponible: {model}")
+        if model is None:
+            model = self.preferred_models[0]
+            logger.error(f"❌ No se encontraron modelos Ollama disponibles, usando {model}")
+        self.current_model = model
+        return model
+
+    # ------------------------------------------------------------------
+    # Horario y keep-alive
+    # ------------------------------------------------------------------
+    def seconds_until_close(self, now: Optional[datetime] = None, lead_minutes: int = 0) -> Optional[int]:
+        """
+        Segundos hasta el cierre si la sede está abierta, None si está cerrada.
+        Con `lead_minutes` la jornada empieza esos minutos antes de la apertura.
+        """
+        now = now or datetime.now()
+        hours = self.schedule.get(now.weekday())
+        if not hours:
+            return None
+        minute = now.hour * 60 + now.minute
+        opening, closing = hours
+        if opening - lead_minutes <= minute < closing:
+            return (closing - minute) * 60 - now.second
+        return None
+
+    def next_opening(self, now: Optional[datetime] = None) -> Optional[datetime]:
+        """Próxima apertura de la sede posterior a `now`"""
+        now = now or datetime.now()
+        for offset in range(8):
+            day = now + timedelta(days=offset)
+            hours = self.schedule.get(day.weekday())
+            if not hours:
+                continue
+            opening = day.replace(hour=hours[0] // 60, minute=hours[0] % 60, second=0, microsecond=0)
+            if opening > now:
+                return opening
+        return None
+
+    def keep_alive(self, model: Optional[str] = None, now: Optional[datetime] = None) -> int:
+        """
+        keep_alive (segundos) a enviar con cada generación. La precarga programada corre
+        MODEL_WARMUP_LEAD_MINUTES antes de la apertura: desde ahí ya se mantiene hasta el cierre.
+        Solo el modelo principal queda residente: otro modelo (p.ej. el grande del router)
+        recibe el keep_alive corto para no ocupar RAM todo el día junto al principal
+        """
+        if model is not None and self.current_model is not None and model != self.current_model:
+            return self.off_hours_keep_alive
+        remaining = self.seconds_until_close(now, lead_minutes=MODEL_WARMUP_LEAD_MINUTES)
+        if remaining is None:
+            return self.off_hours_keep_alive
+        return max(remaining, self.off_hours_keep_alive)
+
+    # ------------------------------------------------------------------
+    # Precarga
+    # ------------------------------------------------------------------
+    def warm_up(self, model: Optional[str] = None) -> bool:
+        """Generación mínima para cargar el modelo en RAM (bloqueante)"""
+        model = model or self.current_model or self.select_model()
+        self.warmup.update(state='loading', model=model, error=None)
+        start = time.perf_counter()
+        try:
+            self.gateway.chat(model, WARMUP_MESSAGES, options={'num_predict': 1, 'num_ctx': self.num_ctx},
+                              timeout=MODEL_WARMUP_TIMEOUT)
+        except Exception as e:
+            self.warmup.update(state='error', error=str(e), at=datetime.now().isoformat())
+            logger.warning(f"⚠️ No se pudo precargar el modelo {model}: {e}")
+            return False
+        load_ms = round((time.perf_counter() - start) * 1000, 1)
+        self.warmup.update(state='ready', load_ms=load_ms, at=datetime.now().isoformat(),
+                           count=self.warmup['count'] + 1)
+        logger.info(f"🔥 Modelo {model} precargado en {load_ms:.0f}ms (keep_alive {self.keep_alive(model)}s)")
+        return True
+
+    def start(self, model: Optional[str] = None):
+        """Precargar en segundo plano y programar la precarga antes de cada apertura"""
+        if not MODEL_WARMUP_ENABLED:
+            return
+        with self._lock:
+            if self._warmup_thread is not None and self._warmup_thread.is_alive():
+                return
+            self._warmup_thread = threading.Thread(target=self.warm_up, args=(model,),
+                                                   name="model-warmup", daemon=True)
+            self._warmup_thread.start()
+        self._schedule_next_warmup()
+
+    def _schedule_next_warmup(self):
+        opening = self.next_opening()
+        if opening is None:
+            return
+        warmup_at = opening - timedelta(minutes=MODEL_WARMUP_LEAD_MINUTES)
+        delay = max(1.0, (warmup_at - datetime.now()).total_seconds())
+        with self._lock:
+            if self._warmup_timer is not None:
+                self._warmup_timer.cancel()
+            self._warmup_timer = threading.Timer(delay, self._scheduled_warmup)
+            self._warmup_timer.daemon = True
+            self._warmup_timer.start()
+        logger.info(f"⏰ Próxima precarga del modelo: {warmup_at:%Y-%m-%d %H:%M}")
+
+    def _scheduled_warmup(self):
+        try:
+            self.warm_up(self.select_model(force=True))
+        finally:
+            self._schedule_next_warmup()
+
+    def stop(self):
+        with self._lock:
+            if self._warmup_timer is not None:
+                self._warmup_timer.cancel()
+                self._warmup_timer = None
+
+    # ------------------------------------------------------------------
+    # Estado
+    # ------------------------------------------------------------------
+    def loaded_models(self) -> Optional[List[Dict]]:
+        """Modelos residentes en RAM según /api/ps (None si Ollama no responde)"""
+        try:
+            data = self.gateway.request_json('GET', '/api/ps')
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo consultar /api/ps: {e}")
+            return None
+        return [{'name': model.get('name'), 'expires_at': model.get('expires_at'),
+                 'size_vram': model.get('size_vram')} for model in data.get('models', [])]
+
+    def get_status(self, check_loaded: bool = True) -> Dict:
+        loaded = self.loaded_models() if check_loaded else None
+        current = self.current_model
+        status = {
+            'model': current,
+            'warmup': dict(self.warmup),
+            'available_models': list(self._available),
+            'discovered_at': datetime.fromtimestamp(self._discovered_at).isoformat() if self._discovered_at else None,
+            'discovery_error': self._discovery_error,
+            'campus_open': self.seconds_until_close() is not None,
+            'keep_alive_seconds': self.keep_alive(current),
+        }
+        if loaded is not None:
+            status['loaded_models'] = loaded
+            status['loaded'] = any(current and (entry['name'] or '').lower().startswith(current.lower())
+                                   for entry in loaded)
+        opening = self.next_opening()
+        status['next_warmup'] = ((opening - timedelta(minutes=MODEL_WARMUP_LEAD_MINUTES)).isoformat()
+                                 if opening else None)
+        return status
+
+
+# Instancia global
+model_manager = ModelManager()
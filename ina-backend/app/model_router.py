@@ -0,0 +1,194 @@
+# app/model_router.py - Elección del modelo por solicitud según complejidad de la consulta y carga del gateway
+import json
+import logging
+import os
+import re
+import threading
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.chat_executor import _summarize
+from app.llm_gateway import LLMGateway, llm_gateway
+from app.model_manager import ModelManager, model_manager
+
+logger = logging.getLogger(__name__)
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ROUTER_ENABLED = os.getenv("MODEL_ROUTER_ENABLED", "1") == "1"
+# Modelo para consultas complejas; vacío = el siguiente preferido instalado después del principal
+ROUTER_LARGE_MODEL = os.getenv("MODEL_ROUTER_LARGE_MODEL", "")
+# Señales de complejidad
+ROUTER_LONG_QUERY_WORDS = int(os.getenv("MODEL_ROUTER_LONG_QUERY_WORDS", "18"))
+ROUTER_LOW_CONFIDENCE = float(os.getenv("MODEL_ROUTER_LOW_CONFIDENCE", "0.35"))
+# Señales que debe sumar una consulta para usar el modelo grande aunque haya otras solicitudes en curso
+ROUTER_COMPLEXITY_THRESHOLD = int(os.getenv("MODEL_ROUTER_COMPLEXITY_THRESHOLD", "2"))
+# Carga: solicitudes en cola o p95 del modelo grande desde los que se vuelve al modelo chico
+ROUTER_MAX_QUEUE = int(os.getenv("MODEL_ROUTER_MAX_QUEUE", "1"))
+ROUTER_MAX_P95_SECONDS = float(os.getenv("MODEL_ROUTER_MAX_P95_SECONDS", "20"))
+ROUTER_MIN_SAMPLES = 5
+ROUTER_LOG_PATH = os.getenv(
+    "MODEL_ROUTER_LOG_PATH",
+    os.path.join(_APP_DIR, '..', 'logs', 'model_routing.jsonl')
+)
+
+# Consulta con varias preguntas o que encadena temas
+MULTI_PART_PATTERN = re.compile(r"\?[^?]+\?|\b(?:además|también|y otra|otra pregunta|por otro lado)\b", re.IGNORECASE)
+
+# Motivos de cada decisión
+SINGLE_MODEL = "single_model"
+LOAD = "load"
+COMPLEX = "complex"
+IDLE_UPGRADE = "idle_upgrade"
+SIMPLE = "simple"
+
+
+class RouteDecision(NamedTuple):
+    model: str
+    reason: str
+    complexity: int
+    signals: Dict[str, bool]
+    load: Dict
+
+
+class ModelRouter:
+    """
+    Elige entre el modelo principal (el más liviano, p.ej. llama3.2:1b) y uno más grande
+    (p.ej. llama3.2:3b) para cada generación.
+
+    - Complejidad de la consulta: varias preguntas, consulta larga o baja confianza de
+      la recuperación (similitud de la mejor fuente)
+    - Carga del LLM gateway: con solicitudes en cola o p95 del modelo grande sobre el
+      límite se usa siempre el modelo chico
+    - Con el gateway ocioso basta una señal de complejidad para subir al modelo grande;
+      con otras solicitudes en curso se exigen ROUTER_COMPLEXITY_THRESHOLD señales
+    - `record()` deja cada decisión con su latencia en logs/model_routing.jsonl y en
+      las estadísticas por modelo y motivo, para evaluar la política
+    """
+
+    def __init__(self, gateway: LLMGateway = llm_gateway, manager: ModelManager = model_manager,
+                 enabled: bool = ROUTER_ENABLED, large_model: str = ROUTER_LARGE_MODEL,
+                 log_path: Optional[str] = ROUTER_LOG_PATH):
+        self.gateway = gateway
+        self.manager = manager
+        self.enabled = enabled
+        self.large_model = large_model
+        self.log_path = os.path.abspath(log_path) if log_path else None
+        self._lock = threading.Lock()
+        self._decisions = defaultdict(int)
+        self._models = defaultdict(int)
+        self._outcomes = defaultdict(lambda: deque(maxlen=200))  # (modelo, motivo) -> latencias (s)
+        self._failures = defaultdict(int)
+        self._log_errors = 0
+
+    def tiers(self) -> Tuple[str, Optional[str]]:
+        """(modelo chico, modelo grande o None si no hay otro instalado)"""
+        small = self.manager.current_model or self.manager.select_model()
+        installed = [name.lower() for name in self.manager.list_models() if name]
+        if self.large_model:
+            large = self.large_model if any(self.large_model.lower() in name for name in installed) else None
+            return small, large if large != small else None
+        preferred = self.manager.preferred_models
+        start = preferred.index(small) + 1 if small in preferred else 0
+        for candidate in preferred[start:]:
+            if candidate != small and any(candidate.lower() in name for name in installed):
+                return small, candidate
+        return small, None
+
+    @staticmethod
+    def complexity_signals(query: str, sources: Optional[List[Dict]] = None,
+                           multi_part: Optional[bool] = None) -> Dict[str, bool]:
+        query = query or ''
+        best = max((source.get('similarity', 0.0) or 0.0 for source in sources or []), default=0.0)
+        return {
+            'multi_part': bool(MULTI_PART_PATTERN.search(query)) if multi_part is None else multi_part,
+            'long': len(query.split()) >= ROUTER_LONG_QUERY_WORDS,
+            'low_confidence': best < ROUTER_LOW_CONFIDENCE,
+        }
+
+    def route(self, query: str, sources: Optional[List[Dict]] = None,
+              multi_part: Optional[bool] = None) -> RouteDecision:
+        small, large = self.tiers()
+        signals = self.complexity_signals(query, sources, multi_part)
+        complexity = sum(signals.values())
+        load = self.gateway.load(large) if large else self.gateway.load()
+
+        if not self.enabled or large is None:
+            model, reason = small, SINGLE_MODEL
+        else:
+            p95 = load['latency_ms']
+            slow = p95['samples'] >= ROUTER_MIN_SAMPLES and p95['p95'] > ROUTER_MAX_P95_SECONDS * 1000
+            if load['queued'] >= ROUTER_MAX_QUEUE or slow:
+                model, reason = small, LOAD
+            elif complexity >= ROUTER_COMPLEXITY_THRESHOLD:
+                model, reason = large, COMPLEX
+            elif complexity and not load['in_flight']:
+                model, reason = large, IDLE_UPGRADE
+            else:
+                model, reason = small, SIMPLE
+
+        with self._lock:
+            self._decisions[reason] += 1
+            self._models[model] += 1
+        active = [name for name, value in signals.items() if value]
+        logger.info(f"🧭 Modelo {model} ({reason}): señales {', '.join(active) or 'ninguna'}, "
+                    f"cola {load['queued']}, en curso {load['in_flight']}")
+        return RouteDecision(model, reason, complexity, signals, load)
+
+    def record(self, decision: RouteDecision, latency: float, ok: bool = True, cached: bool = False):
+        """Registrar el resultado de una decisión (latencia de la generación)"""
+        with self._lock:
+            if ok and not cached:
+                self._outcomes[(decision.model, decision.reason)].append(latency)
+            if not ok:
+                self._failures[decision.model] += 1
+        logger.info(f"🧭 Ruta {decision.model} ({decision.reason}): {latency * 1000:.0f}ms"
+                    f"{'' if ok else ', con error'}{', desde cache' if cached else ''}")
+        if self.log_path:
+            self._append_log({
+                'at': datetime.now().isoformat(timespec='seconds'),
+                'model': decision.model,
+                'reason': decision.reason,
+                'complexity': decision.complexity,
+                'signals': decision.signals,
+                'queued': decision.load.get('queued'),
+                'in_flight': decision.load.get('in_flight'),
+                'latency_ms': round(latency * 1000, 1),
+                'ok': ok,
+                'cached': cached
+            })
+
+    def _append_log(self, entry: Dict):
+        try:
+            with self._lock:
+                os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+                with open(self.log_path, 'a', encoding='utf-8') as log_file:
+                    log_file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        except OSError as e:
+            self._log_errors += 1
+            if self._log_errors == 1:
+                logger.warning(f"⚠️ No se pudo escribir el log de ruteo de modelos: {e}")
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            outcomes = {f"{model}|{reason}": _summarize(sorted(latencies))
+                        for (model, reason), latencies in self._outcomes.items()}
+            stats = {
+                'enabled': self.enabled,
+                'decisions': dict(self._decisions),
+                'models': dict(self._models),
+                'failures': dict(self._failures),
+                'latency_ms': outcomes,
+                'log_path': self.log_path,
+                'log_errors': self._log_errors
+            }
+        try:
+            stats['tiers'] = dict(zip(('small', 'large'), self.tiers()))
+        except Exception as e:
+            stats['tiers'] = {'error': str(e)}
+        return stats
+
+
+# Instancia global
+model_router = ModelRouter()
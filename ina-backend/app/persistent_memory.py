@@ -5,7 +5,7 @@ import numpy as np
 from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime, timedelta
 from dataclasses import dataclass, asdict
-from sentence_transformers import SentenceTransformer
+from app.embedding_registry import get_encoder
 from sklearn.metrics.pairwise import cosine_similarity
 import logging
 import os
@@ -15,6 +15,8 @@ from collections import defaultdict, deque
 import pickle
 import hashlib
 
+from app.query_embeddings import QueryEmbeddings, encode_query
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -53,7 +55,8 @@ class PersistentMemorySystem:
     def __init__(self, db_path: str = "persistent_memory.db", 
                  model_name: str = 'intfloat/multilingual-e5-small'):
         self.db_path = db_path
-        self.model = SentenceTransformer(model_name)
+        self.model_name = model_name
+        self.model = get_encoder(model_name)
         
         # Memoria en RAM para acceso rápido
         self.hot_memory = {}  # Entradas más accedidas
@@ -266,10 +269,11 @@ class PersistentMemorySystem:
     
     def recall_memory(self, query: str, context_type: str = None, 
                      category: str = None, user_id: str = None,
-                     max_results: int = 5, include_related: bool = True) -> List[Dict]:
+                     max_results: int = 5, include_related: bool = True,
+                     query_embeddings: Optional[QueryEmbeddings] = None) -> List[Dict]:
         """Recuperar memoria relevante basada en consulta"""
         try:
-            query_embedding = self.model.encode([query])[0]
+            query_embedding = encode_query(self.model, self.model_name, query, query_embeddings)
             results = []
             
             # Buscar en memoria caliente primero
@@ -6,9 +6,13 @@ Evita expansiones incorrectas del query y mejora la precisión para consultas de
 """
 
 import re
+import time
 import logging
 from typing import Dict, Optional, List
 
+from app.keyword_automaton import (keyword_index, normalize_text, expand_word_pattern, load_table_overrides,
+                                   table_mtime, KEYWORD_TABLES_CHECK_SECONDS)
+
 logger = logging.getLogger(__name__)
 
 
@@ -16,7 +20,13 @@ class PriorityKeywordSystem:
     """
     Sistema que detecta keywords con prioridad absoluta y evita confusiones.
     Palabras como 'TNE', 'salud', 'deportes', 'notas' deben ser inequívocas.
+
+    Los patrones (\\bpalabra\\b con clases de acentos) se expanden a frases literales
+    normalizadas y se buscan con el índice compartido de keywords, sin distinguir acentos.
+    config/keywords/priority_keywords.json puede reemplazar o agregar keywords.
     """
+
+    TABLE_FILE = 'priority_keywords.json'
     
     def __init__(self):
         # Keywords ABSOLUTAS - Prioridad máxima, no ambiguas
@@ -273,6 +283,48 @@ class PriorityKeywordSystem:
                 ]
             },
         }
+
+        self._default_keywords = self.absolute_keywords
+        self._regex_fallback = []
+        self._table_mtime = None
+        self._checked_at = 0.0
+        self.reload()
+
+    def reload(self) -> int:
+        """Recompilar la tabla (por defecto + config/keywords/priority_keywords.json)"""
+        overrides, self._table_mtime = load_table_overrides(self.TABLE_FILE)
+        self._checked_at = time.time()
+        self.absolute_keywords = {**self._default_keywords, **overrides}
+
+        # Payload: (orden de la keyword, nombre, exige \\b a la izquierda, exige \\b a la derecha)
+        entries = []
+        regex_fallback = []
+        for order, (keyword_name, config) in enumerate(self.absolute_keywords.items()):
+            for pattern in config["patterns"]:
+                expanded = expand_word_pattern(pattern)
+                if expanded is None:
+                    # Patrón no literal: se evalúa como regex sobre la consulta
+                    regex_fallback.append((order, keyword_name, re.compile(pattern, re.IGNORECASE)))
+                    continue
+                phrases, left, right = expanded
+                for phrase in {normalize_text(p) for p in phrases}:
+                    entries.append((phrase, (order, keyword_name, left, right)))
+        self._regex_fallback = regex_fallback
+        keyword_index.set_table('priority', entries)
+        return len(entries)
+
+    def _maybe_reload(self):
+        now = time.time()
+        if now - self._checked_at < KEYWORD_TABLES_CHECK_SECONDS:
+            return
+        self._checked_at = now
+        if table_mtime(self.TABLE_FILE) != self._table_mtime:
+            logger.info("🔄 Tabla de keywords prioritarias modificada, recargando")
+            self.reload()
+
+    @staticmethod
+    def _is_word_char(char: str) -> bool:
+        return char.isalnum() or char == '_'
     
     def detect_absolute_keyword(self, query: str) -> Optional[Dict]:
         """
@@ -284,22 +336,34 @@ class PriorityKeywordSystem:
         Returns:
             Dict con información de la keyword detectada o None
         """
-        query_lower = query.lower().strip()
-        query_normalized = self._normalize(query_lower)
-        
-        # Almacenar todas las coincidencias con sus prioridades
+        self._maybe_reload()
+        normalized, hits = keyword_index.scan(query)
+
+        # Keywords cuyas frases aparecen como palabra completa (una pasada del autómata)
+        found = {}
+        for start, end, (order, keyword_name, left, right) in hits.get('priority', ()):
+            if left and start > 0 and self._is_word_char(normalized[start - 1]):
+                continue
+            if right and end < len(normalized) and self._is_word_char(normalized[end]):
+                continue
+            found[order] = keyword_name
+        if self._regex_fallback:
+            query_lower = query.lower().strip()
+            for order, keyword_name, regex in self._regex_fallback:
+                if order not in found and regex.search(query_lower):
+                    found[order] = keyword_name
+
+        # Almacenar todas las coincidencias con sus prioridades (en el orden de la tabla)
         matches = []
-        
-        for keyword_name, config in self.absolute_keywords.items():
-            for pattern in config["patterns"]:
-                if re.search(pattern, query_lower, re.IGNORECASE):
-                    matches.append({
-                        "keyword": keyword_name,
-                        "config": config,
-                        "priority": config["priority"]
-                    })
-                    logger.info(f"✅ Absolute keyword detected: '{keyword_name}' in query: '{query}'")
-                    break  # Solo necesitamos un match por keyword
+        for order in sorted(found):
+            keyword_name = found[order]
+            config = self.absolute_keywords[keyword_name]
+            matches.append({
+                "keyword": keyword_name,
+                "config": config,
+                "priority": config["priority"]
+            })
+            logger.info(f"✅ Absolute keyword detected: '{keyword_name}' in query: '{query}'")
         
         # Si hay matches, devolver el de mayor prioridad
         if matches:
@@ -355,16 +419,7 @@ class PriorityKeywordSystem:
     
     def _normalize(self, text: str) -> str:
         """Normaliza texto para comparación"""
-        import unicodedata
-        # Eliminar acentos
-        text = ''.join(
-            c for c in unicodedata.normalize('NFD', text)
-            if unicodedata.category(c) != 'Mn'
-        )
-        # Limpiar
-        text = re.sub(r'[^\w\s]', ' ', text)
-        text = ' '.join(text.split())
-        return text.lower()
+        return normalize_text(text)
     
     def is_single_word_query(self, query: str) -> bool:
         """Verifica si es una consulta de una sola palabra clave"""
@@ -0,0 +1,377 @@
+# app/prompt_builder.py - Prompt del LLM con presupuesto de tokens: fuentes sin duplicados y oraciones relevantes
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter, deque
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.bm25_index import tokenize as lexical_tokenize
+from app.cache_manager import normalize_question
+from app.chat_executor import _summarize
+
+logger = logging.getLogger(__name__)
+
+# Tokens para las fuentes dentro del prompt (antes: 3 fuentes x 300 caracteres)
+PROMPT_CONTEXT_TOKENS = int(os.getenv("PROMPT_CONTEXT_TOKENS", "300"))
+PROMPT_MAX_SOURCES = int(os.getenv("PROMPT_MAX_SOURCES", "4"))
+# Reserva para la pregunta y para la respuesta al calcular num_ctx
+PROMPT_QUERY_TOKENS = int(os.getenv("PROMPT_QUERY_TOKENS", "96"))
+PROMPT_RESPONSE_TOKENS = int(os.getenv("PROMPT_RESPONSE_TOKENS", "256"))
+PROMPT_MAX_NUM_CTX = int(os.getenv("PROMPT_MAX_NUM_CTX", "4096"))
+# Fracción de shingles compartidos desde la que dos fuentes se consideran la misma
+PROMPT_DEDUP_THRESHOLD = float(os.getenv("PROMPT_DEDUP_THRESHOLD", "0.7"))
+# Tokens por pieza (palabra o signo) antes de calibrar con el prompt_eval_count de Ollama
+PROMPT_TOKENS_PER_PIECE = float(os.getenv("PROMPT_TOKENS_PER_PIECE", "1.3"))
+
+NUM_CTX_STEP = 512
+MESSAGE_OVERHEAD_TOKENS = 4      # tokens de la plantilla de chat por mensaje
+CALIBRATION_WEIGHT = 0.2
+SHINGLE_SIZE = 3
+FIRST_SENTENCE_BONUS = 0.1       # la primera oración de un chunk suele nombrar el tema
+LATENCY_BUCKET_TOKENS = 128
+MAX_SAMPLES = 500
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?;])\s+|\n+")
+_MARKDOWN_PREFIX_RE = re.compile(r"^[#>*\-\s]+")
+_SPACES_RE = re.compile(r"\s+")
+
+# Instrucciones fijas: van primero y sin cambios entre consultas para que Ollama
+# reutilice el prefijo ya evaluado
+SYSTEM_INSTRUCTIONS = """Responde estrictamente en español (Chile). No uses inglés.
+
+Eres InA, asistente del Punto Estudiantil Plaza Norte. Responde en máximo 100 palabras (2-3 oraciones).
+
+REGLAS CRÍTICAS:
+1. Usa SOLO información de los DATOS DISPONIBLES - NO inventes
+2. Si el tema NO está en los datos O está FUERA del alcance del Punto Estudiantil → Responde BREVE y DERIVA al área correcta
+3. Responde en 2-3 oraciones SIN emojis, negritas ni formato Markdown
+4. Escribe texto corrido natural
+5. NO uses frases genéricas como "¡Hola!" o "Con gusto"
+6. NO menciones otras universidades que no sean Duoc UC
+
+TEMAS QUE MANEJA EL PUNTO ESTUDIANTIL (puedes dar info completa):
+- TNE (Tarjeta Nacional Estudiantil): solicitud, renovación, problemas
+- Certificados básicos: alumno regular, notas
+- Orientación general sobre servicios de la sede
+- Información sobre horarios y ubicaciones de áreas
+
+TEMAS QUE NO MANEJA (responde BREVE y deriva):
+- ACADÉMICO (mallas, ramos, notas, convalidaciones) → DERIVA a "tu Jefatura de Carrera"
+- FINANCIERO (aranceles, CAE, gratuidad, becas) → DERIVA a "Finanzas o Caja"
+- TECNOLOGÍA (WiFi, SIGA, correo, contraseñas) → DERIVA a "Servicios Digitales o Mesa de Ayuda"
+- BIBLIOTECA (libros, bases de datos, salas estudio) → DERIVA a "Biblioteca"
+- PRÁCTICAS/EMPLEO (prácticas profesionales, bolsa trabajo) → DERIVA a "Desarrollo Laboral"
+- SALUD/BIENESTAR (psicólogo, médico) → DERIVA a "Bienestar Estudiantil"
+
+FORMATO DE DERIVACIÓN:
+"[Info básica si la tienes en 1 oración]. Para [tema específico], contacta a [ÁREA], ya que ellos manejan [tipo de información]. [Cómo contactarlos]."
+
+EJEMPLO DE DERIVACIÓN:
+Pregunta: "¿Cómo puedo obtener la gratuidad?"
+Respuesta: "Duoc UC sí tiene gratuidad. Para postular y conocer si eres elegible, contacta a Finanzas o Caja, ya que ellos manejan todo el proceso de gratuidad, requisitos y documentación."
+
+INFORMACIÓN ESPECÍFICA (solo si preguntan por horarios/ubicación):
+- Punto Estudiantil: Piso 2, lunes-viernes 08:30-22:30, sábados 08:30-14:00
+- Biblioteca: Lunes-viernes 08:00-21:00, sábados 09:00-14:00
+- Bienestar: Lunes-viernes 09:00-18:00
+- Contacto: Mesa Central +56 2 2999 3000, Punto Estudiantil +56 2 2999 3075
+
+IMPORTANTE: Si el tema requiere derivación, NO des detalles extensos. Sé breve, reconoce la consulta y deriva claramente."""
+
+USER_TEMPLATE = """DATOS DISPONIBLES:
+{context}
+
+PREGUNTA: {query}
+
+RESPUESTA (máximo 100 palabras, deriva si es necesario):"""
+
+NO_SOURCES_TEMPLATE = ("Di brevemente que no tienes información sobre '{query}' y que pueden consultar en el "
+                       "Punto Estudiantil (estás al lado). Horario: lunes-viernes 08:30-22:30, sábados 08:30-14:00. "
+                       "Contacto: +56 2 2999 3075. NO agregues disculpas.")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Oraciones (o líneas de lista) de un chunk, sin marcas de Markdown al inicio"""
+    sentences = []
+    for part in _SENTENCE_SPLIT_RE.split(text or ''):
+        part = _SPACES_RE.sub(' ', _MARKDOWN_PREFIX_RE.sub('', part)).strip()
+        if part and any(ch.isalnum() for ch in part):
+            sentences.append(part)
+    return sentences
+
+
+def _shingles(tokens: List[str]) -> set:
+    if len(tokens) < SHINGLE_SIZE:
+        return {tuple(tokens)} if tokens else set()
+    return {tuple(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+
+class TokenCounter:
+    """
+    Conteo de tokens por modelo.
+
+    Sin tokenizador local: se cuentan piezas (palabras y signos) y se multiplican por una
+    razón tokens/pieza propia de cada modelo, calibrada con el `prompt_eval_count` real
+    que Ollama devuelve al terminar cada generación.
+    """
+
+    def __init__(self, default_ratio: float = PROMPT_TOKENS_PER_PIECE):
+        self.default_ratio = default_ratio
+        self._ratios: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def pieces(text: str) -> int:
+        return len(_PIECE_RE.findall(text)) if text else 0
+
+    def ratio(self, model: Optional[str] = None) -> float:
+        return self._ratios.get(model, self.default_ratio)
+
+    def count(self, text: str, model: Optional[str] = None) -> int:
+        return int(math.ceil(self.pieces(text) * self.ratio(model)))
+
+    def count_messages(self, messages: List[Dict], model: Optional[str] = None) -> int:
+        return sum(self.count(message.get('content', ''), model) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+    def calibrate(self, model: Optional[str], messages: List[Dict], observed: int) -> None:
+        """Ajustar la razón del modelo con el conteo real de Ollama (media móvil)"""
+        pieces = sum(self.pieces(message.get('content', '')) for message in messages)
+        overhead = MESSAGE_OVERHEAD_TOKENS * len(messages)
+        if not model or not pieces or observed <= overhead:
+            return
+        measured = (observed - overhead) / pieces
+        with self._lock:
+            current = self.ratio(model)
+            # Si Ollama reutilizó el prefijo en cache solo cuenta lo evaluado de nuevo: no sirve para calibrar
+            if measured < current * 0.5:
+                return
+            self._ratios[model] = current + CALIBRATION_WEIGHT * (measured - current)
+
+    def get_ratios(self) -> Dict[str, float]:
+        return {model: round(ratio, 3) for model, ratio in self._ratios.items()}
+
+
+class BuiltPrompt(NamedTuple):
+    messages: List[Dict]
+    prompt_tokens: int          # estimación para el modelo activo
+    context_tokens: int
+    num_ctx: int
+    sources: List[Dict]         # fuentes que quedaron en el prompt, en orden
+    duplicates: int             # fuentes descartadas por repetir a otra
+    sentences_kept: int
+    sentences_total: int
+    cache_messages: List[Dict]  # clave del cache de generaciones: mismos mensajes con la pregunta normalizada
+
+
+class PromptBuilder:
+    """
+    Arma los mensajes para Ollama dentro de un presupuesto de tokens.
+
+    - Descarta fuentes casi duplicadas (chunks solapados): contención de shingles de 3 tokens
+    - Elige las oraciones más relevantes para la consulta (términos compartidos ponderados
+      por IDF) hasta llenar el presupuesto, y las presenta en su orden original
+    - Instrucciones fijas en el mensaje de sistema y un único `num_ctx` derivado del
+      presupuesto: cambiar num_ctx entre solicitudes obliga a Ollama a recargar el modelo
+    - `record()` registra tokens del prompt contra la latencia para ajustar el presupuesto
+    """
+
+    def __init__(self, context_tokens: int = PROMPT_CONTEXT_TOKENS, max_sources: int = PROMPT_MAX_SOURCES,
+                 dedup_threshold: float = PROMPT_DEDUP_THRESHOLD, max_num_ctx: int = PROMPT_MAX_NUM_CTX,
+                 counter: Optional[TokenCounter] = None):
+        self.context_tokens = context_tokens
+        self.max_sources = max_sources
+        self.dedup_threshold = dedup_threshold
+        self.max_num_ctx = max_num_ctx
+        self.counter = counter or TokenCounter()
+        self.num_ctx = self._compute_num_ctx()
+
+        self._lock = threading.Lock()
+        self._samples: deque = deque(maxlen=MAX_SAMPLES)  # (tokens, evaluación s, total s)
+        self._stats = {'built': 0, 'duplicates': 0, 'sentences_kept': 0, 'sentences_total': 0, 'recorded': 0}
+
+    def _fixed_tokens(self, model: Optional[str] = None) -> int:
+        return (self.counter.count(SYSTEM_INSTRUCTIONS, model)
+                + self.counter.count(USER_TEMPLATE.format(context='', query=''), model)
+                + 2 * MESSAGE_OVERHEAD_TOKENS)
+
+    def _compute_num_ctx(self) -> int:
+        needed = self._fixed_tokens() + self.context_tokens + PROMPT_QUERY_TOKENS + PROMPT_RESPONSE_TOKENS
+        rounded = int(math.ceil(needed / NUM_CTX_STEP)) * NUM_CTX_STEP
+        return max(2 * NUM_CTX_STEP, min(self.max_num_ctx, rounded))
+
+    # ------------------------------------------------------------------
+    # Fuentes
+    # ------------------------------------------------------------------
+    def deduplicate(self, sources: List[Dict]) -> Tuple[List[Dict], int]:
+        """Fuentes en orden de relevancia sin las que repiten (casi) el texto de una anterior"""
+        kept, kept_shingles, duplicates = [], [], 0
+        for source in sources:
+            shingles = _shingles(lexical_tokenize(source.get('document') or ''))
+            if not shingles:
+                continue
+            if any(len(shingles & other) / min(len(shingles), len(other)) >= self.dedup_threshold
+                   for other in kept_shingles):
+                duplicates += 1
+                continue
+            kept.append(source)
+            kept_shingles.append(shingles)
+            if len(kept) >= self.max_sources:
+                break
+        return kept, duplicates
+
+    def _truncate(self, sentence: str, budget: int, model: Optional[str]) -> str:
+        words = sentence.split()
+        while words and self.counter.count(' '.join(words), model) > budget:
+            words = words[:max(1, int(len(words) * 0.8))] if len(words) > 1 else []
+        return ' '.join(words)
+
+    def select_sentences(self, sources: List[Dict], query: str, budget: int,
+                         model: Optional[str] = None) -> Tuple[List[Tuple[Dict, List[str]]], int, int]:
+        """[(fuente, oraciones elegidas)], tokens usados y total de oraciones candidatas"""
+        query_terms = set(lexical_tokenize(query))
+        candidates = []  # (índice fuente, posición, oración, términos, tokens)
+        for source_index, source in enumerate(sources):
+            for position, sentence in enumerate(split_sentences(source.get('document') or '')):
+                candidates.append((source_index, position, sentence,
+                                   set(lexical_tokenize(sentence)), self.counter.count(sentence, model)))
+        if not candidates:
+            return [], 0, 0
+
+        document_frequency = Counter(term for candidate in candidates for term in candidate[3] & query_terms)
+        total = len(candidates)
+
+        def score(candidate) -> float:
+            value = sum(math.log(1 + total / document_frequency[term]) for term in candidate[3] & query_terms)
+            return value + (FIRST_SENTENCE_BONUS if candidate[1] == 0 else 0.0)
+
+        ranked = sorted(candidates, key=lambda c: (-score(c), c[0], c[1]))
+        chosen: Dict[Tuple[int, int], str] = {}
+        seen = set()
+        used = 0
+        for source_index, position, sentence, terms, tokens in ranked:
+            key = sentence.lower()
+            if key in seen or used + tokens + 1 > budget:
+                continue
+            chosen[(source_index, position)] = sentence
+            seen.add(key)
+            used += tokens + 1
+        if not chosen and budget > 1:
+            # Ni la oración más relevante cabe completa: se recorta
+            source_index, position, sentence = ranked[0][:3]
+            sentence = self._truncate(sentence, budget - 1, model)
+            if sentence:
+                chosen[(source_index, position)] = sentence
+                used = self.counter.count(sentence, model) + 1
+
+        selected = []
+        for source_index, source in enumerate(sources):
+            sentences = [chosen[key] for key in sorted(chosen) if key[0] == source_index]
+            if sentences:
+                selected.append((source, sentences))
+        return selected, used, total
+
+    # ------------------------------------------------------------------
+    # Prompt
+    # ------------------------------------------------------------------
+    def build(self, sources: List[Dict], query: str, model: Optional[str] = None) -> BuiltPrompt:
+        unique, duplicates = self.deduplicate(sources or [])
+        query_tokens = self.counter.count(query, model)
+        # Una pregunta larga le quita espacio a las fuentes, no a la respuesta
+        budget = min(self.context_tokens,
+                     self.num_ctx - self._fixed_tokens(model) - query_tokens - PROMPT_RESPONSE_TOKENS)
+        selected, context_tokens, sentences_total = self.select_sentences(unique, query, budget, model)
+
+        # El prompt lleva la pregunta tal cual; la clave del cache, normalizada: variantes de
+        # mayúsculas, tildes o signos con las mismas fuentes reutilizan la misma generación
+        normalized_query = normalize_question(query)
+        if selected:
+            context = "\n".join(f"[{i}] {' '.join(sentences)}" for i, (_, sentences) in enumerate(selected, 1))
+            user_content = USER_TEMPLATE.format(context=context, query=query)
+            cache_content = USER_TEMPLATE.format(context=context, query=normalized_query)
+        else:
+            user_content = NO_SOURCES_TEMPLATE.format(query=query)
+            cache_content = NO_SOURCES_TEMPLATE.format(query=normalized_query)
+        messages = [
+            {'role': 'system', 'content': SYSTEM_INSTRUCTIONS},
+            {'role': 'user', 'content': user_content}
+        ]
+        cache_messages = [messages[0], {'role': 'user', 'content': cache_content}]
+        sentences_kept = sum(len(sentences) for _, sentences in selected)
+        with self._lock:
+            self._stats['built'] += 1
+            self._stats['duplicates'] += duplicates
+            self._stats['sentences_kept'] += sentences_kept
+            self._stats['sentences_total'] += sentences_total
+
+        return BuiltPrompt(
+            messages=messages,
+            prompt_tokens=self.counter.count_messages(messages, model),
+            context_tokens=context_tokens,
+            num_ctx=self.num_ctx,
+            sources=[source for source, _ in selected],
+            duplicates=duplicates,
+            sentences_kept=sentences_kept,
+            sentences_total=sentences_total,
+            cache_messages=cache_messages
+        )
+
+    # ------------------------------------------------------------------
+    # Métricas
+    # ------------------------------------------------------------------
+    def record(self, model: Optional[str], prompt: BuiltPrompt, result: Optional[Dict], elapsed: float):
+        """Registrar tokens del prompt contra la latencia de la generación (y calibrar el conteo)"""
+        result = result or {}
+        observed = result.get('prompt_eval_count')
+        eval_ns = result.get('prompt_eval_duration')
+        if observed:
+            self.counter.calibrate(model, prompt.messages, observed)
+        tokens = observed or prompt.prompt_tokens
+        eval_seconds = eval_ns / 1e9 if eval_ns else None
+        with self._lock:
+            self._samples.append((tokens, eval_seconds, elapsed))
+            self._stats['recorded'] += 1
+        eval_text = f"evaluación {eval_seconds * 1000:.0f}ms, " if eval_seconds is not None else ""
+        logger.info(f"🧮 Prompt {model}: {tokens} tokens ({'Ollama' if observed else 'estimado'}, "
+                    f"estimado {prompt.prompt_tokens}), {eval_text}total {elapsed * 1000:.0f}ms, "
+                    f"{prompt.sentences_kept}/{prompt.sentences_total} oraciones, "
+                    f"{prompt.duplicates} fuentes duplicadas")
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            samples = list(self._samples)
+            stats = dict(self._stats)
+        tokens = sorted(sample[0] for sample in samples)
+        evaluations = [sample for sample in samples if sample[1] is not None]
+        eval_tokens = sum(sample[0] for sample in evaluations)
+
+        buckets: Dict[int, List[float]] = {}
+        for sample_tokens, _, elapsed in samples:
+            buckets.setdefault(sample_tokens // LATENCY_BUCKET_TOKENS * LATENCY_BUCKET_TOKENS, []).append(elapsed)
+
+        stats.update({
+            'context_budget_tokens': self.context_tokens,
+            'num_ctx': self.num_ctx,
+            'tokens_per_piece': self.counter.get_ratios(),
+            'prompt_tokens': {
+                'avg': round(sum(tokens) / len(tokens), 1) if tokens else 0.0,
+                'p50': tokens[len(tokens) // 2] if tokens else 0,
+                'max': tokens[-1] if tokens else 0,
+            },
+            'prompt_eval_ms': _summarize(sorted(sample[1] for sample in evaluations)),
+            'ms_per_prompt_token': (round(sum(sample[1] for sample in evaluations) * 1000 / eval_tokens, 3)
+                                    if eval_tokens else None),
+            'latency_ms': _summarize(sorted(sample[2] for sample in samples)),
+            # Latencia total por tramo de tokens del prompt: base para ajustar PROMPT_CONTEXT_TOKENS
+            'latency_by_prompt_tokens': {
+                f"{start}-{start + LATENCY_BUCKET_TOKENS - 1}": _summarize(sorted(values))
+                for start, values in sorted(buckets.items())
+            },
+        })
+        return stats
+
+
+# Instancia global
+prompt_builder = PromptBuilder()
@@ -0,0 +1,78 @@
+# app/query_analysis.py - Análisis de la consulta calculado una sola vez por request
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from app.priority_keyword_system import priority_keyword_system
+from app.smart_keyword_detector import smart_keyword_detector
+
+logger = logging.getLogger(__name__)
+
+
+class QueryAnalysis:
+    """
+    Minúsculas, idioma, keywords y tópico de una consulta, compartidos por todas las
+    etapas del request.
+
+    get_ai_response la crea (la usa para la clave del cache de respuestas y el detector
+    smart), process_user_query y la búsqueda híbrida la reciben a través del
+    RetrievalContext. Cada campo se calcula de forma perezosa la primera vez que alguien
+    lo pide; las siguientes etapas reutilizan el resultado en vez de volver a pasar la
+    consulta por el detector correspondiente.
+    """
+
+    def __init__(self, query: str, language_detector: Optional[Callable[[str], str]] = None):
+        self.query = query or ''
+        self.lower = self.query.lower().strip()
+        self._language_detector = language_detector
+        self._values: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'computed': 0,
+            'reuses': 0
+        }
+
+    def get(self, stage: str, compute: Callable[[str], Any]) -> Any:
+        """Resultado de `compute(query)` calculado una sola vez por etapa"""
+        with self._lock:
+            if stage in self._values:
+                self.stats['reuses'] += 1
+                return self._values[stage]
+
+        value = compute(self.query)
+
+        with self._lock:
+            # Si otra etapa lo calculó en paralelo, se conserva el primero
+            value = self._values.setdefault(stage, value)
+            self.stats['computed'] += 1
+        return value
+
+    # ------------------------------------------------------------------
+    # Detecciones
+    # ------------------------------------------------------------------
+    @property
+    def language(self) -> str:
+        if self._language_detector is None:
+            return 'es'
+        return self.get('language', self._language_detector)
+
+    @property
+    def priority_detection(self) -> Optional[Dict]:
+        """Keyword absoluta (PriorityKeywordSystem) o None"""
+        return self.get('priority', priority_keyword_system.detect_absolute_keyword)
+
+    @property
+    def keyword_analysis(self) -> Dict:
+        """Resultado de SmartKeywordDetector.detect_keywords"""
+        return self.get('keywords', smart_keyword_detector.detect_keywords)
+
+    def topic(self, classify: Callable[[str], Dict]) -> Dict:
+        """Clasificación de tópico con el clasificador que entregue quien llama"""
+        return self.get('topic', classify)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                'stages': sorted(self._values)
+            }
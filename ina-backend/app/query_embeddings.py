@@ -0,0 +1,69 @@
+# app/query_embeddings.py - Embeddings de la consulta calculados una vez por request
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class QueryEmbeddings:
+    """
+    Handle por request: cada par (modelo, texto) se codifica una sola vez.
+
+    MemoryManager, SemanticCache, KnowledgeGraph, PersistentMemorySystem,
+    IntelligentCacheSystem y la búsqueda en ChromaDB reciben el mismo handle; los que
+    comparten modelo (multilingual-e5-small) reutilizan el mismo vector en vez de
+    volver a pasar la consulta por el encoder.
+    """
+
+    def __init__(self):
+        self._vectors: Dict[Tuple[str, str], np.ndarray] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'encodes': 0,
+            'reuses': 0,
+            'encode_ms': 0.0
+        }
+
+    def get(self, model_name: str, text: str, encode: Callable[[List[str]], Any]) -> np.ndarray:
+        """Vector de `text` con `model_name`; `encode` recibe una lista y retorna una matriz"""
+        key = (model_name, text)
+        with self._lock:
+            vector = self._vectors.get(key)
+            if vector is not None:
+                self.stats['reuses'] += 1
+                return vector
+
+        start = time.perf_counter()
+        vector = np.asarray(encode([text])[0], dtype=np.float32)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            # Si otro hilo del mismo request lo calculó en paralelo, se conserva el primero
+            existing = self._vectors.setdefault(key, vector)
+            self.stats['encodes'] += 1
+            self.stats['encode_ms'] += elapsed
+        return existing
+
+    def peek(self, model_name: str, text: str) -> Optional[np.ndarray]:
+        with self._lock:
+            return self._vectors.get((model_name, text))
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                'encode_ms': round(self.stats['encode_ms'], 2),
+                'models': sorted({model for model, _ in self._vectors})
+            }
+
+
+def encode_query(model, model_name: str, text: str,
+                 query_embeddings: Optional[QueryEmbeddings] = None) -> np.ndarray:
+    """Codificar una consulta usando el handle del request si existe (si no, encode directo)"""
+    if query_embeddings is None:
+        return np.asarray(model.encode([text])[0])
+    return query_embeddings.get(model_name, text, model.encode)
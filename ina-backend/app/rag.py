@@ -1,23 +1,45 @@
 # rag.py - VERSIÓN COMPLETA ACTUALIZADA CON SISTEMA HÍBRIDO
 # IMPORTS SIN chromadb (para evitar activar telemetría)
-import ollama
 from typing import List, Dict, Optional
 import logging
 import json
 from app.qr_generator import qr_generator
 import traceback
 import hashlib
-from datetime import datetime, timedelta
+from datetime import datetime
 from collections import defaultdict
 import re
-import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+import os
+import threading
+import time
 
 # IMPORTACIONES EXISTENTES
 from app.cache_manager import rag_cache, response_cache, normalize_question
 from app.topic_classifier import TopicClassifier
 from app.classifier import classifier  # IMPORTAR CLASIFICADOR
+from app.language_id import detect_language as detect_query_language
+from app.query_analysis import QueryAnalysis
+from app.retrieval_context import RetrievalContext
+from app.semantic_cache import SEMANTIC_CACHE_THRESHOLD, SemanticCache
+from app.bm25_index import BM25Index, reciprocal_rank_fusion, tokenize as lexical_tokenize
+from app.knowledge_version import bump_knowledge_version, get_knowledge_version
+from app.vector_mirror import vector_mirror, export_vector_mirror, VECTOR_MIRROR_ENABLED
+from app.centroid_classifier import centroid_classifier
+from app.llm_gateway import llm_gateway
+from app.model_manager import model_manager
+from app.prompt_builder import BuiltPrompt, prompt_builder
+from app.generation_cache import GENERATION_SEED
+from app.model_router import model_router
+
+# Búsqueda léxica BM25 fusionada con la vectorial (RRF)
+BM25_ENABLED = os.getenv("BM25_ENABLED", "1") == "1"
+BM25_REFRESH_SECONDS = int(os.getenv("BM25_REFRESH_SECONDS", "300"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+# Espera tras el último add_document antes de re-exportar el espejo vectorial (debounce de ingestas)
+MIRROR_EXPORT_DELAY = float(os.getenv("VECTOR_MIRROR_EXPORT_DELAY", "30"))
+# Estrategias cuya respuesta depende solo de la pregunta, el contexto y las versiones de conocimiento/templates
+# (los saludos se eligen al azar y las emergencias nunca se cachean)
+CACHEABLE_STRATEGIES = {'template', 'standard_rag', 'derivation', 'multiple_queries', 'clarification'}
 
 # NUEVO: Importar sistema híbrido
 # ❌ ELIMINADO EN LIMPIEZA - hybrid_response_system.py no se usaba
@@ -32,34 +54,17 @@ HYBRID_SYSTEM_AVAILABLE = False
 #     HYBRID_SYSTEM_AVAILABLE = False
 #     logging.error(f"❌ Error cargando sistema híbrido: {e}")
 
-# NUEVO: Importar sistema de mejora de respuestas
-try:
-    from app.response_enhancer import enhance_response
-    RESPONSE_ENHANCER_AVAILABLE = True
-    logging.info("✅ Mejoras de respuesta cargadas correctamente")
-except ImportError as e:
-    RESPONSE_ENHANCER_AVAILABLE = False
-    logging.warning(f"⚠️ Mejoras de respuesta no disponibles: {e}")
-except Exception as e:
-    RESPONSE_ENHANCER_AVAILABLE = False
-    logging.error(f"❌ Error cargando mejoras de respuesta: {e}")
-
-# NUEVO: Importar optimizador inteligente de respuestas
-try:
-    from app.intelligent_response_optimizer import intelligent_optimizer, optimize_rag_response
-    INTELLIGENT_OPTIMIZER_AVAILABLE = True
-    logging.info("✅ Optimizador inteligente cargado correctamente")
-except ImportError as e:
-    INTELLIGENT_OPTIMIZER_AVAILABLE = False
-    logging.warning(f"⚠️ Optimizador inteligente no disponible: {e}")
-except Exception as e:
-    INTELLIGENT_OPTIMIZER_AVAILABLE = False
-    logging.error(f"❌ Error cargando optimizador inteligente: {e}")
+# Post-procesamiento de respuestas (limpieza, optimizador inteligente y mejoras) como pipeline de etapas
+from app.response_pipeline import (
+    response_pipeline, ResponseContext, CLEANUP_STAGES, ENHANCE_STAGES,
+    RESPONSE_ENHANCER_AVAILABLE, INTELLIGENT_OPTIMIZER_AVAILABLE,
+    RAG as RESPONSE_RAG, OLLAMA as RESPONSE_OLLAMA, TEMPLATE as RESPONSE_TEMPLATE, FIXED as RESPONSE_FIXED
+)
 
 logger = logging.getLogger(__name__)
 
 # FUNCIÓN AUXILIAR PARA MEJORAR RESPUESTAS
-def enhance_final_response(response_text: str, query: str, category: str = "") -> str:
+def enhance_final_response(response_text: str, query: str, category: str = "", kind: str = RESPONSE_FIXED) -> str:
     """Aplicar mejoras CONSERVADORAS a la respuesta - NO eliminar contenido útil"""
     if not response_text or len(response_text.strip()) < 20:
         logger.warning(f"⚠️ Respuesta muy corta, no se mejorará: {len(response_text)} chars")
@@ -69,7 +74,8 @@ def enhance_final_response(response_text: str, query: str, category: str = "") -
         try:
             # Solo mejorar si la respuesta ya tiene contenido sustancial
             if len(response_text) >= 50:
-                enhanced = enhance_response(response_text, query, category)
+                context = ResponseContext(query, category, kind)
+                enhanced = response_pipeline.run(response_text, context, stages=ENHANCE_STAGES)
                 # Verificar que la mejora no eliminó contenido importante
                 if len(enhanced) >= len(response_text) * 0.7:  # Al menos 70% del original
                     logger.info(f"✅ Respuesta mejorada: {len(response_text)} → {len(enhanced)} chars")
@@ -87,67 +93,6 @@ def enhance_final_response(response_text: str, query: str, category: str = "") -
         return response_text
 
 
-class SemanticCache:
-    def __init__(self, similarity_threshold: float = 0.65):
-        try:
-            self.model = SentenceTransformer(
-                'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2')
-            self.cache = {}
-            self.threshold = similarity_threshold
-            logger.info(f"Cache semántico inicializado (umbral: {similarity_threshold})")
-        except Exception as e:
-            logger.error(f"Error inicializando cache semántico: {e}")
-            self.model = None
-            self.cache = {}
-
-    def get_embedding(self, text: str) -> Optional[np.ndarray]:
-        if self.model is None:
-            return None
-        try:
-            return self.model.encode([text])[0]
-        except Exception as e:
-            logger.error(f"Error generando embedding: {e}")
-            return None
-
-    def _embedding_to_key(self, embedding: np.ndarray) -> tuple:
-        return tuple(embedding.tolist())
-
-    def find_similar(self, query_embedding: np.ndarray) -> Optional[Dict]:
-        if not self.cache or query_embedding is None:
-            return None
-
-        best_similarity = 0
-        best_response = None
-
-        for cached_embedding_key, response_data in self.cache.items():
-            try:
-                cached_embedding = np.array(cached_embedding_key)
-                similarity = cosine_similarity(
-                    [query_embedding], [cached_embedding])[0][0]
-
-                if similarity > self.threshold and similarity > best_similarity:
-                    best_similarity = similarity
-                    best_response = response_data
-
-            except Exception as e:
-                logger.error(f"Error calculando similitud: {e}")
-                continue
-
-        if best_response:
-            logger.info(f"Semantic similarity found: {best_similarity:.3f}")
-            best_response['semantic_similarity'] = best_similarity
-            return best_response
-
-        return None
-
-    def add_to_cache(self, query: str, response_data: Dict):
-        embedding = self.get_embedding(query)
-        if embedding is not None:
-            embedding_key = self._embedding_to_key(embedding)
-            self.cache[embedding_key] = response_data
-            logger.info(f"Added to semantic cache: '{query[:50]}...'")
-
-
 class EnhancedTopicClassifier:
     """CLASIFICADOR MEJORADO CON DETECCIÓN INTELIGENTE"""
     
@@ -168,9 +113,10 @@ class EnhancedTopicClassifier:
         """CLASIFICACIÓN MEJORADA"""
         return self.topic_classifier.classify_topic(query)
 
-    def should_derive(self, query: str) -> bool:
-        """DETECCIÓN MEJORADA DE CONSULTAS PARA DERIVAR"""
-        topic_info = self.classify_topic(query)
+    def should_derive(self, query: str, topic_info: Dict = None) -> bool:
+        """DETECCIÓN MEJORADA DE CONSULTAS PARA DERIVAR (reutiliza topic_info si ya se clasificó)"""
+        if topic_info is None:
+            topic_info = self.classify_topic(query)
         
         # Consultas que SIEMPRE deben derivarse
         derivation_keywords = [
@@ -198,12 +144,14 @@ class EnhancedTopicClassifier:
         
         return not topic_info.get('is_institutional', True)
 
-    def detect_multiple_queries(self, query: str) -> List[str]:
+    def detect_multiple_queries(self, query: str, should_derive: bool = None) -> List[str]:
         """DETECCIÓN INTELIGENTE MEJORADA DE CONSULTAS MÚLTIPLES"""
         query_lower = query.lower().strip()
         
         # EVITAR DIVIDIR CONSULTAS DE DERIVACIÓN
-        if self.should_derive(query):
+        if should_derive is None:
+            should_derive = self.should_derive(query)
+        if should_derive:
             return [query]
         
         # EVITAR DIVIDIR CONSULTAS FRANCESAS VÁLIDAS
@@ -261,92 +209,6 @@ class RAGEngine:
         from app.memory_manager import MemoryManager
         from app.derivation_manager import derivation_manager
         # from app.stationary_ai_filter import stationary_filter  # ❌ ELIMINADO EN LIMPIEZA
-        # Inicializar el gestor de memoria
-        self.memory_manager = MemoryManager()
-        # Inicializar el gestor de derivación estacionaria
-        self.derivation_manager = derivation_manager
-        # Inicializar filtro específico para IA estacionaria
-        self.stationary_filter = None  # stationary_filter  # ❌ Módulo eliminado
-        # Expansiones de sinónimos mejoradas
-        self.synonym_expansions = {
-            "tne": ["tarjeta nacional estudiantil", "pase escolar", "tne duoc", "beneficio tne", "tarjeta estudiante", "validación tne", "activación tne"],
-            "deporte": ["deportes", "actividad física", "taller deportivo", "entrenamiento", "gimnasio", "maiclub", "entretiempo", "acquatiempo", "deporte duoc", "selección deportiva"],
-            "certificado": ["certificados", "alumno regular", "constancia", "record académico", "concentración de notas", "documentos académicos", "solicitud certificado"],
-            "bienestar": ["salud mental", "psicológico", "apoyo emocional", "consejería", "urgencia", "crisis", "línea ops"],
-            "práctica": ["prácticas profesionales", "empleo", "duoclaboral", "bolsa de trabajo", "curriculum", "cv", "entrevista"],
-            "matrícula": ["matricular", "arancel", "pago", "postulación", "admisión"],
-            "beneficio": ["beca", "ayuda económica", "programa emergencia", "subsidio"],
-            "embajadores": ["curso embajadores", "embajadores salud mental", "módulo embajadores", "85% embajadores"]
-        }
-        # IMPORTAR chromadb AL FINAL, DESPUÉS DE QUE chroma_config.py LO HAYA DESACTIVADO
-        # INICIALIZACIÓN SEGURA DE CHROMADB CON AUTO-REPARACIÓN
-        try:
-            from app.chromadb_autofix import safe_chromadb_init
-            self.client = safe_chromadb_init()
-            if self.client is None:
-                raise Exception("No se pudo inicializar ChromaDB")
-            logger.info("✅ ChromaDB inicializado de forma segura")
-        except Exception as e:
-            logger.error(f"❌ Error con ChromaDB seguro, usando fallback básico: {e}")
-            # Fallback: usar cliente en memoria
-            import chromadb
-            self.client = chromadb.Client()
-            logger.warning("⚠️ Usando ChromaDB en memoria como fallback")
-        try:
-            self.collection = self.client.get_or_create_collection(
-                name="duoc_knowledge"
-            )
-            # Verificar que la colección se creó correctamente
-            if not hasattr(self.collection, 'count'):
-                raise Exception("Colección inválida - no tiene método count()")
-            logger.info(f"✅ Colección 'duoc_knowledge' inicializada correctamente")
-        except Exception as e:
-            logger.error(f"❌ Error creando colección: {e}")
-            # Reintentar con cliente nuevo en memoria
-            import chromadb
-            self.client = chromadb.Client()
-            self.collection = self.client.get_or_create_collection(name="duoc_knowledge")
-            logger.warning("⚠️ Usando colección en memoria como último recurso")
-        # CLASIFICADOR DE TEMAS MEJORADO
-        self.topic_classifier = EnhancedTopicClassifier()
-        # CONFIGURACIÓN ESPECÍFICA DUOC UC
-        self.duoc_context = {
-            "sede": "Plaza Norte",
-            "direccion": "Santa Elena de Huechuraba 1660, Huechuraba",
-            "horario_punto_estudiantil": "Lunes a Viernes 8:30-19:00",
-            "telefono": "+56 2 2360 6400",
-            "email": "Puntoestudiantil_pnorte@duoc.cl"
-        }
-        # CACHE SEMÁNTICO MEJORADO
-        self.semantic_cache = SemanticCache(similarity_threshold=0.65)
-        self.text_cache = {}
-        # CONFIGURACIÓN DE MODELOS OLLAMA OPTIMIZADA
-        # llama3.2:1b-instruct-q4_K_M es más liviano (807MB) y optimizado para instrucciones
-        # mistral:7b requiere 4.5GB y causa errores de memoria
-        self.ollama_models = ['llama3.2:1b-instruct-q4_K_M', 'llama3.2:3b', 'gemma3:4b']  
-        self.current_model = self._select_best_model()
-        logger.info("RAG Engine DUOC UC inicializado")
-        logger.info(f"🤖 Modelo Ollama: {self.current_model}")
-        self.metrics = {
-            'total_queries': 0,
-            'successful_responses': 0,
-            'cache_hits': 0,
-            'semantic_cache_hits': 0,
-            'text_cache_hits': 0,
-            'documents_added': 0,
-            'errors': 0,
-            'categories_used': defaultdict(int),
-            'response_times': [],
-            'derivations': 0,
-            'multiple_queries': 0,
-            'ambiguous_queries': 0,
-            'greetings': 0,
-            'emergencies': 0,
-            'template_responses': 0  # MÉTRICA PARA TEMPLATES
-        }
-        from app.memory_manager import MemoryManager
-        from app.derivation_manager import derivation_manager
-        # from app.stationary_ai_filter import stationary_filter  # ❌ ELIMINADO EN LIMPIEZA
         
         # Inicializar el gestor de memoria
         self.memory_manager = MemoryManager()
@@ -414,14 +276,15 @@ class RAGEngine:
             "email": "Puntoestudiantil_pnorte@duoc.cl"
         }
 
-        # CACHE SEMÁNTICO MEJORADO
-        self.semantic_cache = SemanticCache(similarity_threshold=0.65)
-        self.text_cache = {}
+        # CACHE SEMÁNTICO: paráfrasis de preguntas ya respondidas por RAG (se vacía al cambiar el conocimiento)
+        self.semantic_cache = SemanticCache(similarity_threshold=SEMANTIC_CACHE_THRESHOLD)
+        # Cache de respuestas finales versionado (conocimiento + templates), compartido con cache_manager
+        self.text_cache = response_cache
         
         # CONFIGURACIÓN DE MODELOS OLLAMA OPTIMIZADA
         # llama3.2:1b-instruct-q4_K_M es más liviano (807MB) y optimizado para instrucciones
         # mistral:7b requiere 4.5GB y causa errores de memoria
-        self.ollama_models = ['llama3.2:1b-instruct-q4_K_M', 'llama3.2:3b', 'gemma3:4b']  
+        self.ollama_models = model_manager.preferred_models
         self.current_model = self._select_best_model()
 
         logger.info("RAG Engine DUOC UC inicializado")
@@ -443,120 +306,44 @@ class RAGEngine:
             'emergencies': 0,
             'template_responses': 0  # MÉTRICA PARA TEMPLATES
         }
+
+        # ÍNDICE LÉXICO BM25 (se construye en segundo plano al arrancar, se actualiza en add_document
+        # y se reconstruye en un hilo cuando cambia la versión de conocimiento)
+        self.bm25_index = BM25Index()
+        self._bm25_lock = threading.Lock()
+        self._bm25_checked_at = 0.0
+        self._bm25_version = None
+        self._bm25_rebuilding = False
+        self.metrics['lexical_only_searches'] = 0
+        self.metrics['fused_searches'] = 0
+
+        # ESPEJO VECTORIAL MMAP (compartido entre workers; se re-exporta cuando cambia la colección)
+        self.vector_mirror = vector_mirror
+        self._mirror_timer = None
+        self._mirror_timer_lock = threading.Lock()
+        if VECTOR_MIRROR_ENABLED and not self.vector_mirror.is_current():
+            self._schedule_mirror_export(delay=5)
+
+        # CENTROIDES DE CATEGORÍA (embeddings de la colección + FAQs; se construyen en segundo plano)
+        self.centroid_classifier = centroid_classifier
+        self.centroid_classifier.ensure_fresh(self.collection)
+
+        if BM25_ENABLED:
+            self._schedule_lexical_rebuild()
         
     def _select_best_model(self) -> str:
-        """Selecciona el mejor modelo Ollama disponible"""
-        try:
-            import subprocess
-            result = subprocess.run(['ollama', 'list'], capture_output=True, text=True, timeout=5)
-            available_models = result.stdout.lower()
-            
-            # Debug: mostrar modelos disponibles
-            logger.info(f"🔍 Modelos Ollama disponibles:\n{available_models}")
-            
-            for model in self.ollama_models:
-                model_lower = model.lower()
-                if model_lower in available_models:
-                    logger.info(f"✅ Modelo seleccionado: {model}")
-                    return model
-                else:
-                    logger.info(f"❌ Modelo no encontrado: {model}")
-            
-            # Fallback: verificar si hay algún modelo disponible
-            logger.warning("⚠️ No se encontraron modelos preferidos, buscando cualquier modelo disponible")
-            
-            # Extraer nombres de modelos de la salida de ollama list
-            lines = result.stdout.strip().split('\n')[1:]  # Skip header
-            if lines:
-                first_available = lines[0].split()[0]  # Primer columna (NAME)
-                logger.warning(f"🔄 Usando primer modelo disponible: {first_available}")
-                return first_available
-            
-            # Último fallback
-            logger.error("❌ No se encontraron modelos Ollama disponibles")
-            return 'llama3.2:1b-instruct-q4_K_M'  # Default to our preferred lightweight model
-        except Exception as e:
-            logger.error(f"Error detectando modelos Ollama: {e}")
-            return 'llama3.2:1b-instruct-q4_K_M'  # Default to our preferred lightweight model
+        """Selecciona el mejor modelo Ollama disponible (descubrimiento por HTTP con TTL en model_manager)"""
+        return model_manager.select_model()
     
-    def _build_strict_prompt(self, sources: List[Dict], query: str) -> str:
-        """Construye prompt estricto: HORARIOS ESPECÍFICOS, SIN UBICACIONES, CON DERIVACIÓN INTELIGENTE"""
-        if not sources:
-            return f"Di brevemente que no tienes información sobre '{query}' y que pueden consultar en el Punto Estudiantil (estás al lado). Horario: lunes-viernes 08:30-22:30, sábados 08:30-14:00. Contacto: +56 2 2999 3075. NO agregues disculpas."
-        
-        # Construir contexto conciso
-        context_parts = []
-        for i, source in enumerate(sources[:3], 1):  # Máximo 3 fuentes
-            content = source['document'][:300]  # 300 chars max por fuente
-            category = source.get('metadata', {}).get('category', 'info')
-            context_parts.append(f"[{i}] {content}")
-        
-        context = "\n".join(context_parts)
-        
-        # Prompt optimizado: ÉNFASIS EN HORARIOS, SIN UBICACIONES, CON DERIVACIÓN
-        prompt = f"""Eres InA, asistente del Punto Estudiantil Plaza Norte. Responde en máximo 100 palabras (2-3 oraciones).
-
-DATOS DISPONIBLES:
-{context}
+    def _build_prompt(self, sources: List[Dict], query: str, model: Optional[str] = None) -> BuiltPrompt:
+        """Prompt estricto (HORARIOS ESPECÍFICOS, SIN UBICACIONES, CON DERIVACIÓN) dentro del presupuesto de tokens"""
+        return prompt_builder.build(sources, query, model=model or self.current_model)
 
-REGLAS CRÍTICAS:
-1. Usa SOLO información de los DATOS DISPONIBLES - NO inventes
-2. Si el tema NO está en los datos O está FUERA del alcance del Punto Estudiantil → Responde BREVE y DERIVA al área correcta
-3. Responde en 2-3 oraciones SIN emojis, negritas ni formato Markdown
-4. Escribe texto corrido natural
-5. NO uses frases genéricas como "¡Hola!" o "Con gusto"
-6. NO menciones otras universidades que no sean Duoc UC
+    def _expand_query(self, query: str, analysis: QueryAnalysis = None) -> str:
+        """Expande consulta con sinónimos clave para mejorar recall - MEJORADO CON PRIORITY KEYWORDS
 
-TEMAS QUE MANEJA EL PUNTO ESTUDIANTIL (puedes dar info completa):
-- TNE (Tarjeta Nacional Estudiantil): solicitud, renovación, problemas
-- Certificados básicos: alumno regular, notas
-- Orientación general sobre servicios de la sede
-- Información sobre horarios y ubicaciones de áreas
-
-TEMAS QUE NO MANEJA (responde BREVE y deriva):
-- ACADÉMICO (mallas, ramos, notas, convalidaciones) → DERIVA a "tu Jefatura de Carrera"
-- FINANCIERO (aranceles, CAE, gratuidad, becas) → DERIVA a "Finanzas o Caja"
-- TECNOLOGÍA (WiFi, SIGA, correo, contraseñas) → DERIVA a "Servicios Digitales o Mesa de Ayuda"
-- BIBLIOTECA (libros, bases de datos, salas estudio) → DERIVA a "Biblioteca"
-- PRÁCTICAS/EMPLEO (prácticas profesionales, bolsa trabajo) → DERIVA a "Desarrollo Laboral"
-- SALUD/BIENESTAR (psicólogo, médico) → DERIVA a "Bienestar Estudiantil"
-
-FORMATO DE DERIVACIÓN:
-"[Info básica si la tienes en 1 oración]. Para [tema específico], contacta a [ÁREA], ya que ellos manejan [tipo de información]. [Cómo contactarlos]."
-
-EJEMPLO DE DERIVACIÓN:
-Pregunta: "¿Cómo puedo obtener la gratuidad?"
-Respuesta: "Duoc UC sí tiene gratuidad. Para postular y conocer si eres elegible, contacta a Finanzas o Caja, ya que ellos manejan todo el proceso de gratuidad, requisitos y documentación."
-
-INFORMACIÓN ESPECÍFICA (solo si preguntan por horarios/ubicación):
-- Punto Estudiantil: Piso 2, lunes-viernes 08:30-22:30, sábados 08:30-14:00
-- Biblioteca: Lunes-viernes 08:00-21:00, sábados 09:00-14:00
-- Bienestar: Lunes-viernes 09:00-18:00
-- Contacto: Mesa Central +56 2 2999 3000, Punto Estudiantil +56 2 2999 3075
-
-IMPORTANTE: Si el tema requiere derivación, NO des detalles extensos. Sé breve, reconoce la consulta y deriva claramente.
-
-PREGUNTA: {query}
-
-RESPUESTA (máximo 100 palabras, deriva si es necesario):"""
-        
-        return prompt
-
-        # Si pregunta por beneficios, agregar instrucciones específicas
-        if is_beneficios:
-            return base_prompt + """
-
-💡 ESPECIAL: Lista solo los beneficios MENCIONADOS en el contexto.
-Formato: viñetas cortas. NO inventes becas internacionales u otros no listados.
-
-✍️ RESPUESTA:"""
-        else:
-            return base_prompt + """
-
-✍️ RESPUESTA:"""
-    
-    def _expand_query(self, query: str) -> str:
-        """Expande consulta con sinónimos clave para mejorar recall - MEJORADO CON PRIORITY KEYWORDS"""
+        Con `analysis` (consulta original del request) se reutiliza la keyword prioritaria ya detectada.
+        """
         from app.priority_keyword_system import priority_keyword_system
         
         # ✅ FIX: Validar query no None antes de .lower()
@@ -564,10 +351,13 @@ Formato: viñetas cortas. NO inventes becas internacionales u otros no listados.
             logger.warning("⚠️ Query None/vacío en _expand_query")
             return ""
             
-        query_lower = query.lower().strip()
+        query_lower = analysis.lower if analysis is not None else query.lower().strip()
         
         # 🔥 PASO 1: Verificar si hay keyword prioritaria que evite expansión genérica
-        priority_detection = priority_keyword_system.detect_absolute_keyword(query)
+        if analysis is not None:
+            priority_detection = analysis.priority_detection
+        else:
+            priority_detection = priority_keyword_system.detect_absolute_keyword(query)
         
         if priority_detection:
             # ✅ FIX: Validar keyword no None
@@ -729,21 +519,29 @@ Formato: viñetas cortas. NO inventes becas internacionales u otros no listados.
         return ' '.join(unique_words)
 
     def process_user_query(self, user_message: str, session_id: str = None,
-                          conversational_context: str = None, user_profile: dict = None) -> Dict:
-        """PROCESAMIENTO INTELIGENTE MEJORADO CON SMART KEYWORD DETECTION + PRIORITY KEYWORDS"""
-        from app.smart_keyword_detector import smart_keyword_detector
-        from app.priority_keyword_system import priority_keyword_system
-        
+                          conversational_context: str = None, user_profile: dict = None,
+                          retrieval_context: RetrievalContext = None) -> Dict:
+        """PROCESAMIENTO INTELIGENTE MEJORADO CON SMART KEYWORD DETECTION + PRIORITY KEYWORDS
+
+        La pre-búsqueda queda en `retrieval_context`: si quien llama lo entrega, la generación
+        de la respuesta reutiliza esos candidatos sin volver a consultar ChromaDB. Las
+        detecciones de keywords, idioma y tópico se leen de `retrieval_context.analysis`,
+        así que las que ya hizo get_ai_response no se repiten.
+        """
         self.metrics['total_queries'] += 1
         
         # ✅ FIX: Validar user_message no None
         if not user_message or user_message is None:
             logger.warning("⚠️ user_message None/vacío en process_query")
             return self._generate_fallback_response("Por favor reformula tu consulta.")
-        query_lower = user_message.lower().strip()
+        if retrieval_context is None:
+            retrieval_context = RetrievalContext(user_message,
+                                                 analysis=QueryAnalysis(user_message, self.detect_language))
+        analysis = retrieval_context.analysis
+        query_lower = analysis.lower
         
         # 0A. DETECCIÓN DE KEYWORDS ABSOLUTAS (MÁXIMA PRIORIDAD)
-        priority_detection = priority_keyword_system.detect_absolute_keyword(user_message)
+        priority_detection = analysis.priority_detection
         if priority_detection:
             print(f"🔥 KEYWORD ABSOLUTA DETECTADA: '{priority_detection['keyword']}' "
                   f"(priority: {priority_detection['priority']}, category: {priority_detection['category']})")
@@ -752,7 +550,7 @@ Formato: viñetas cortas. NO inventes becas internacionales u otros no listados.
                        f"(avoid_expansion: {priority_detection['avoid_expansion']})")
         
         # 0B. DETECCIÓN INTELIGENTE DE KEYWORDS (SEGUNDA PRIORIDAD)
-        keyword_analysis = smart_keyword_detector.detect_keywords(user_message)
+        keyword_analysis = analysis.keyword_analysis
         
         # Si hay keyword de alta confianza, usarla para orientar la búsqueda
         if keyword_analysis['confidence'] >= 80 and keyword_analysis['primary_keyword']:
@@ -763,7 +561,11 @@ Formato: viñetas cortas. NO inventes becas internacionales u otros no listados.
         
         # 1. DETECCIÓN DE IDIOMA Y CATEGORÍA (UNA SOLA VEZ)
         try:
-            classification_info = classifier.get_classification_info(user_message)
+            # Solo idioma y tópico: sin keyword decisiva, la categoría se decide más abajo
+            # (reglas si responde un template; centroides y luego reglas si llega a la recuperación)
+            classification_info = classifier.get_classification_info(
+                user_message, topic_result=analysis.topic(self.topic_classifier.classify_topic),
+                include_category=False)
             detected_language = classification_info.get('language', 'es')
             
             # 🎯 USAR PRIORITY KEYWORD PRIMERO, luego SMART DETECTOR
@@ -777,14 +579,14 @@ Formato: viñetas cortas. NO inventes becas internacionales u otros no listados.
                 confidence = keyword_analysis['confidence'] / 100.0
                 print(f"✨ Categoría: {category} (smart, conf: {confidence:.2f})")
             else:
-                category = classification_info.get('category', 'otros')
+                category = None
                 confidence = classification_info.get('confidence', 0.5)
             
-            print(f"🌍 Idioma: {detected_language} | Categoría: {category} ({confidence:.2f})")
+            print(f"🌍 Idioma: {detected_language} | Categoría: {category or 'pendiente'} ({confidence:.2f})")
             logger.info(f"🔍 '{user_message}' -> {category} ({detected_language}) {confidence:.2f}")
         except Exception as e:
             logger.warning(f"Error en clasificación, usando fallback: {e}")
-            detected_language = self.detect_language(user_message)
+            detected_language = analysis.get('language', self.detect_language)
             
             if priority_detection:
                 category = priority_detection['category']
@@ -807,12 +609,13 @@ Formato: viñetas cortas. NO inventes becas internacionales u otros no listados.
                 'detected_language': detected_language,  # 🔥 CACHEAR IDIOMA
                 'template_id': template_match,
                 'detected_language': detected_language,
-                'category': category,
+                'category': category or classifier.classify_question(user_message),
                 'query_parts': [user_message]
             }
         
         # 2. SI NO HAY TEMPLATE, BUSCAR EN MEMORIA (SEGUNDA PRIORIDAD)
-        similar_queries = self.memory_manager.find_similar_queries(user_message)
+        similar_queries = self.memory_manager.find_similar_queries(
+            user_message, query_embeddings=retrieval_context.embeddings)
         if similar_queries:
             best_match = similar_queries[0]
             if best_match['similarity'] > 0.85:  # Alta confianza en la similitud
@@ -868,18 +671,28 @@ Formato: viñetas cortas. NO inventes becas internacionales u otros no listados.
                 'query_parts': [user_message]
             }
         
+        # 4B. CATEGORÍA SIN KEYWORD DECISIVA: el embedding de la búsqueda vectorial se compara con
+        # los centroides; la cadena de reglas solo corre si no son concluyentes
+        if category is None:
+            query_embedding = None
+            if self.centroid_classifier.ensure_fresh(self.collection):
+                query_embedding = self._retrieval_embedding(user_message, retrieval_context)
+            category = classifier.classify_question(user_message, query_embedding=query_embedding)
+        
         # 5. BUSCAR EN CHROMADB PRIMERO antes de decidir derivar
-        topic_info = self.topic_classifier.classify_topic(user_message)
+        topic_info = analysis.topic(self.topic_classifier.classify_topic)
         
         # 🔥 NUEVO: Intentar búsqueda en ChromaDB ANTES de derivar
         chromadb_has_info = False
         try:
             logger.info(f"🔍 Pre-búsqueda en ChromaDB para: '{user_message}'")
-            test_search = self.hybrid_search(user_message, n_results=10)  # Buscar más resultados
+            test_search = self.hybrid_search(user_message, n_results=10,  # Buscar más resultados
+                                             retrieval_context=retrieval_context)
             
             # Verificar si hay resultados con relevancia razonable
+            # La relevancia se mide con la similitud coseno; el ranking fusionado no la garantiza primera
             if test_search and len(test_search) > 0:
-                best_score = test_search[0].get('similarity', 0.0)
+                best_score = max(result.get('similarity', 0.0) for result in test_search)
                 if best_score >= 0.20:  # Umbral MÁS bajo para capturar nuevos documentos
                     chromadb_has_info = True
                     logger.info(f"✅ ChromaDB tiene información: {len(test_search)} docs, mejor score: {best_score:.3f}")
@@ -891,7 +704,7 @@ Formato: viñetas cortas. NO inventes becas internacionales u otros no listados.
             logger.warning(f"⚠️ Error en pre-búsqueda ChromaDB: {e}")
         
         # 5b. DERIVAR SOLO SI ChromaDB NO TIENE INFORMACIÓN
-        should_derive = self.topic_classifier.should_derive(user_message)
+        should_derive = self.topic_classifier.should_derive(user_message, topic_info=topic_info)
         if should_derive and not chromadb_has_info:
             logger.info(f"DERIVACIÓN ACTIVADA: ChromaDB sin info + should_derive=True")
             self.metrics['derivations'] += 1
@@ -907,7 +720,7 @@ Formato: viñetas cortas. NO inventes becas internacionales u otros no listados.
             logger.info(f"🎯 ANULANDO DERIVACIÓN: ChromaDB tiene información relevante")
         
         # 6. Detectar consultas múltiples SOLO para temas institucionales
-        query_parts = self.topic_classifier.detect_multiple_queries(user_message)
+        query_parts = self.topic_classifier.detect_multiple_queries(user_message, should_derive=should_derive)
         
         response_info = {
             'original_query': user_message,
@@ -915,6 +728,7 @@ Formato: viñetas cortas. NO inventes becas internacionales u otros no listados.
             'topic_classification': topic_info,
             'multiple_queries_detected': len(query_parts) > 1,
             'query_parts': query_parts,
+            'category': category,
             'processing_strategy': 'standard'
         }
         
@@ -935,252 +749,12 @@ Formato: viñetas cortas. NO inventes becas internacionales u otros no listados.
         return response_info
 
     def detect_language(self, query: str) -> str:
-        """Detecta el idioma con prioridad correcta para español"""
+        """Detecta el idioma (es/en/fr) con el identificador de n-gramas compartido (español por defecto)"""
         # ✅ FIX: Validar query no None
         if not query or query is None:
             logger.warning("⚠️ Query None/vacío en detect_language")
             return "es"
-        query_lower = query.lower()
-        
-        # ================================================================
-        # PASO 1: DETECCIÓN DIRECTA DE CONSULTAS FRANCESAS INEQUÍVOCAS
-        # ================================================================
-        ultra_specific_french_queries = [
-            'comment fonctionne l\'assurance',
-            'comment fonctionne assurance',
-            'comment renouveler ma tne',
-            'comment obtenir ma tne',
-            'quelles sont les catégories',
-            'programme d\'urgence',
-            'quand puis-je postuler',
-            'informations sur les programmes',
-            'conditions pour postuler',
-            'elle est perdue ou endommagée',
-            'programmes de soutien aux étudiants',
-            'offrez-vous des simulations d\'entretiens d\'embauche',
-            'offrez-vous des simulations d\'entretiens'
-        ]
-        
-        # RETORNO INMEDIATO solo para consultas 100% francesas
-        for direct_query in ultra_specific_french_queries:
-            if direct_query in query_lower:
-                print(f"   🔥 ULTRA-SPECIFIC FRENCH MATCH: '{direct_query}' -> FORCING FRENCH")
-                return 'fr'
-        
-        # PASO 1.1: DETECCIÓN DIRECTA DE CONSULTAS INGLESAS INEQUÍVOCAS
-        # ================================================================
-        ultra_specific_english_queries = [
-            'where can i access the duoc uc job bank',
-            'duoc uc job bank access',
-            'access duoc uc job bank'
-        ]
-        
-        # RETORNO INMEDIATO solo para consultas 100% inglesas específicas
-        for direct_query in ultra_specific_english_queries:
-            if direct_query in query_lower:
-                print(f"   🔥 ULTRA-SPECIFIC ENGLISH MATCH: '{direct_query}' -> FORCING ENGLISH")
-                return 'en'
-        
-        # ================================================================
-        # PASO 2: IDENTIFICADORES ESPAÑOLES FUERTES (PRIORIDAD MÁXIMA)
-        # ================================================================
-        strong_spanish_indicators = {
-            # Signos de puntuación españoles
-            '¿': 50,    # Pregunta española - INDICADOR MÁS FUERTE
-            '¡': 40,    # Exclamación española
-            
-            # Interrogativos españoles específicos
-            'qué': 25,      # Con acento español
-            'cómo': 25,     # Con acento español
-            'cuándo': 25,   # Con acento español
-            'dónde': 25,    # Con acento español
-            'cuáles': 25,   # Con acento español
-            'cuántos': 25,  # Con acento español
-            'cuántas': 25,  # Con acento español
-            
-            # Verbos españoles comunes
-            'puedo': 20,    # Primera persona singular
-            'debo': 20,     # Primera persona singular
-            'tengo': 20,    # Primera persona singular
-            'necesito': 20, # Primera persona singular
-            'quiero': 20,   # Primera persona singular
-            'sé': 15,       # Sé con acento
-            'está': 15,     # Está con acento
-            'estás': 15,    # Estás con acento
-            
-            # Contexto institucional español
-            'duoc uc': 30,      # Nombre institución
-            'en duoc': 30,      # En la institución
-            'estudiante': 25,   # Sin s final (vs étudiants)
-            'psicólogo': 25,    # Término académico español
-            'atención': 20,     # Servicio español
-            'sesiones': 20,     # Plural español
-            'apoyo': 20,        # Servicio español
-            'curso': 15,        # Educativo español
-            'embajadores': 20,  # Programa específico
-            
-            # Artículos y conectores españoles
-            ' de la ': 15, ' del ': 15, ' con el ': 15,
-            ' al ': 10, ' para ': 10, ' por ': 10,
-        }
-        
-        # ================================================================
-        # PASO 3: IDENTIFICADORES FRANCESES ESPECÍFICOS
-        # ================================================================
-        specific_french_indicators = {
-            # Interrogativos franceses únicos
-            'comment': 20,  # Cómo en francés
-            'quelles': 20,  # Plural femenino francés
-            'quand': 15,    # Cuándo en francés
-            'puis-je': 30,  # Construcción única francesa
-            
-            # Verbos franceses específicos
-            'fonctionne': 25, # Funciona en francés
-            'renouveler': 25, # Renovar en francés
-            'obtenir': 20,    # Obtener en francés
-            'postuler': 20,   # Postular en francés
-            
-            # Sustantivos franceses únicos
-            'assurance': 20,     # Seguro en francés
-            'programme': 15,     # Sin acento (vs programa)
-            'urgence': 15,       # Urgencia en francés
-            'informations': 15,  # Plural francés
-            'soutien': 20,       # Apoyo en francés
-            'étudiants': 25,     # Con acento francés y plural
-            
-            # Construcciones francesas específicas
-            'd\'urgence': 30,    # Ultra-específico francés
-            'l\'assurance': 30,  # Ultra-específico francés
-            'aux étudiants': 30, # A los estudiantes francés
-            
-            # Artículos y conectores franceses
-            'pour': 8,  # Para en francés (BAJO - puede confundirse)
-            'sur': 8,   # Sobre en francés (BAJO)
-            # 'des': 10,  # ELIMINADO - aparece en palabras españolas como "consejos para mejorar mi habilidades"
-            'sont': 15, # Son/están en francés
-        }
-        
-        # ================================================================
-        # PASO 4: IDENTIFICADORES INGLESES (SIN FALSOS POSITIVOS)
-        # ================================================================
-        english_indicators = {
-            'how': 15, 'what': 15, 'when': 15, 'where': 12, 'why': 12,
-            'student': 15, 'insurance': 15, 'emergency': 15, 'support': 12,
-            'programs': 12, 'information': 12, 'categories': 12,
-            'apply': 12, 'obtain': 12, 'renew': 15, 'can': 8, 'should': 8,
-            # REMOVIDO 'exist' - causa falsos positivos con 'existe' español
-        }
-        
-        # ================================================================
-        # PASO 5: CÁLCULO DE SCORES CORREGIDO
-        # ================================================================
-        spanish_score = 0
-        french_score = 0
-        english_score = 0
-        
-        # Calcular puntuación española
-        for indicator, weight in strong_spanish_indicators.items():
-            if indicator in query_lower:
-                spanish_score += weight
-                print(f"   🇪🇸 SPANISH KEYWORD: '{indicator}' +{weight} points")
-        
-        # Calcular puntuación francesa
-        for indicator, weight in specific_french_indicators.items():
-            if indicator in query_lower:
-                french_score += weight
-                print(f"   🇫🇷 FRENCH KEYWORD: '{indicator}' +{weight} points")
-        
-        # Calcular puntuación inglesa
-        for indicator, weight in english_indicators.items():
-            if indicator in query_lower:
-                english_score += weight
-                print(f"   🇺🇸 ENGLISH KEYWORD: '{indicator}' +{weight} points")
-        
-        # ================================================================
-        # PASO 6: MANEJO ESPECIAL DE ACENTOS (PROBLEMA PRINCIPAL)
-        # ================================================================
-        # Los acentos españoles NO deben dar puntos al francés
-        spanish_accents = ['ó', 'á', 'í', 'ú', 'ñ']  # Acentos típicamente españoles
-        french_accents = ['è', 'ê', 'à', 'ù', 'ç', 'ô', 'î', 'ï', 'ë', 'ü']  # Acentos típicamente franceses
-        
-        # Solo contar acentos franceses si NO hay indicadores españoles fuertes
-        if spanish_score < 20:  # Solo si no hay indicadores españoles claros
-            french_accent_count = sum(1 for char in french_accents if char in query_lower)
-            if french_accent_count > 0:
-                accent_bonus = french_accent_count * 5  # REDUCIDO de 8 a 5
-                french_score += accent_bonus
-                print(f"   ✨ FRENCH ACCENTS: {french_accent_count} accents +{accent_bonus} points")
-        
-        # Bonus por acentos españoles
-        spanish_accent_count = sum(1 for char in spanish_accents if char in query_lower)
-        if spanish_accent_count > 0:
-            spanish_accent_bonus = spanish_accent_count * 10
-            spanish_score += spanish_accent_bonus
-            print(f"   🇪🇸 SPANISH ACCENTS: {spanish_accent_count} accents +{spanish_accent_bonus} points")
-        
-        # ================================================================
-        # PASO 7: PENALIZACIONES POR CONFUSIÓN
-        # ================================================================
-        # Si detectamos "é" en contexto español, penalizar francés
-        if 'é' in query_lower and any(esp_word in query_lower for esp_word in ['qué', 'psicólog', 'médi']):
-            french_penalty = 15
-            french_score -= french_penalty
-            print(f"   ⛔ FRENCH PENALTY FOR SPANISH CONTEXT: -{french_penalty} points")
-        
-        # Si detectamos "est" en contexto español (como "existe"), penalizar francés
-        if 'est' in query_lower and any(esp_word in query_lower for esp_word in ['exist', 'cuest', 'contest', 'manifest', 'rest']):
-            french_penalty = 10
-            french_score -= french_penalty
-            print(f"   ⛔ FRENCH 'EST' PENALTY IN SPANISH CONTEXT: -{french_penalty} points")
-        
-        # Si detectamos "les" en contexto español (como "disponibles"), penalizar francés
-        if 'les' in query_lower and any(esp_word in query_lower for esp_word in ['disponib', 'posib', 'terrib']):
-            french_penalty = 8
-            french_score -= french_penalty
-            print(f"   ⛔ FRENCH 'LES' PENALTY IN SPANISH CONTEXT: -{french_penalty} points")
-        
-        # ================================================================
-        # PASO 8: LOGGING Y DECISIÓN FINAL
-        # ================================================================
-        print(f"🔍 Language detection: ES={spanish_score}, EN={english_score}, FR={french_score} para '{query_lower[:50]}...'")
-        
-        # REGLAS DE DECISIÓN CORREGIDAS
-        
-        # 1. Si hay indicadores españoles fuertes (¿, qué, puedo, etc.)
-        if spanish_score >= 20:
-            print(f"   🇪🇸 DETECTED: SPANISH (STRONG INDICATORS: {spanish_score})")
-            return 'es'
-        
-        # 2. Si hay indicadores franceses MUY específicos sin confusión española
-        if french_score >= 35 and spanish_score < 10:
-            print(f"   🇫🇷 DETECTED: FRENCH (VERY SPECIFIC: {french_score} vs ES:{spanish_score})")
-            return 'fr'
-        
-        # 3. Si español domina claramente
-        if spanish_score > french_score and spanish_score > english_score:
-            print(f"   🇪🇸 DETECTED: SPANISH (DOMINANT: {spanish_score} vs FR:{french_score} EN:{english_score})")
-            return 'es'
-        
-        # 4. Si inglés domina claramente
-        if english_score >= 15 and english_score > spanish_score and english_score > french_score:
-            print(f"   🇺🇸 DETECTED: ENGLISH (DOMINANT: {english_score} vs ES:{spanish_score} FR:{french_score})")
-            return 'en'
-        
-        # 5. Si francés tiene puntaje moderado SIN confusión
-        if french_score >= 20 and spanish_score < 5 and english_score < french_score:
-            print(f"   🇫🇷 DETECTED: FRENCH (MODERATE CLEAN: {french_score} vs ES:{spanish_score} EN:{english_score})")
-            return 'fr'
-        
-        # 6. Fallback: Priorizar español por defecto
-        if spanish_score > 0:
-            print(f"   🇪🇸 DETECTED: SPANISH (FALLBACK: {spanish_score})")
-            return 'es'
-        elif english_score > 0:
-            print(f"   🇺🇸 DETECTED: ENGLISH (FALLBACK: {english_score})")
-            return 'en'
-        else:
-            print(f"   🇪🇸 DETECTED: SPANISH (DEFAULT)")
-            return 'es'
+        return detect_query_language(query)
     
     def generate_template_response(self, processing_info: Dict) -> Dict:
         """GENERAR RESPUESTA DESDE TEMPLATE CON QR CODES CORREGIDO CON SOPORTE MULTIIDIOMA"""
@@ -1200,99 +774,25 @@ Formato: viñetas cortas. NO inventes becas internacionales u otros no listados.
             template_response = None
             template_category = processing_info.get('category', 'asuntos_estudiantiles')
             
-            # PRIMERO: Intentar con nuevo template_manager (RECOMENDADO)
-            try:
-                from app.template_manager.templates_manager import template_manager, detect_area_from_query
-                
-                # Detectar área desde la query para tener el área correcta
-                detected_area_tuple = detect_area_from_query(original_query)
-                detected_area = detected_area_tuple[0] if isinstance(detected_area_tuple, tuple) else detected_area_tuple
-                
-                # Usar template_manager directamente
-                template_response = template_manager.get_template(detected_area, template_id, detected_language)
-                template_category = detected_area
-                
-                if template_response:
-                    print(f"\n📄 GENERANDO RESPUESTA DESDE TEMPLATE:")
-                    print(f"   ✅ Template encontrado: {template_id}")
-                    print(f"   📂 Área: {template_category}")
-                    print(f"   🌍 Idioma: {detected_language}")
-                    logger.info(f"✅ Template multiidioma '{template_id}' encontrado en '{template_category}' idioma '{detected_language}'")
-                else:
-                    print(f"\n⚠️  Template no encontrado en área principal")
-                    print(f"   🔍 Buscando en otras áreas...")
-                    logger.warning(f"❌ Template multiidioma '{template_id}' NO encontrado en '{template_category}' idioma '{detected_language}'")
-                    
-                    # BÚSQUEDA AGRESIVA: Si no se encuentra en el área detectada, buscar en TODAS las áreas
-                    print(f"🔍 BÚSQUEDA AGRESIVA: Buscando template '{template_id}' en todas las áreas...")
-                    all_areas = ['academico', 'institucionales', 'asuntos_estudiantiles', 'bienestar_estudiantil', 'desarrollo_laboral', 'deportes', 'pastoral']
-                    
-                    for search_area in all_areas:
-                        if search_area != detected_area:  # No buscar en el área ya probada
-                            try:
-                                aggressive_template = template_manager.get_template(search_area, template_id, detected_language)
-                                if aggressive_template:
-                                    template_response = aggressive_template
-                                    template_category = search_area
-                                    print(f"✅ Template encontrado en búsqueda agresiva: {template_id} en {search_area} ({detected_language})")
-                                    logger.info(f"✅ Template agresivo '{template_id}' encontrado en '{search_area}' idioma '{detected_language}'")
-                                    break
-                            except Exception as search_error:
-                                continue  # Continuar búsqueda en otras áreas
-                
-            except Exception as tm_error:
-                logger.warning(f"Error en template_manager: {tm_error}")
-                
-                # SEGUNDO: Fallback a sistema MULTILINGUAL_TEMPLATES
-                from app.templates import MULTILINGUAL_TEMPLATES, get_multilingual_template
-                
-                multilingua_response = get_multilingual_template(template_id, detected_language)
-                if multilingua_response:
-                    template_response = multilingua_response
-                    print(f"✅ Template multiidioma (fallback) encontrado: {template_id} en {template_category} ({detected_language})")
-                    logger.info(f"✅ Template multiidioma fallback '{template_id}' encontrado en '{template_category}' idioma '{detected_language}'")
-                else:
-                    print(f"❌ Template multiidioma (fallback) NO encontrado: {template_id} en {template_category} ({detected_language})")
-                    logger.warning(f"❌ Template multiidioma fallback '{template_id}' NO encontrado en '{template_category}' idioma '{detected_language}'")
-            
-            # SEGUNDO: Si no se encontró, usar sistema anterior
-            if not template_response:
-                from app.templates import TEMPLATES
-                
-                # Buscar template en todas las categorías del sistema español
-                for category, templates in TEMPLATES.items():
-                    if template_id in templates:
-                        template_response = templates[template_id]
-                        template_category = category
-                        if detected_language != 'es':
-                            print(f"⚠️ Usando template español como fallback para idioma {detected_language}")
-                        else:
-                            print(f"📋 Template español usado: {template_id} en {category}")
-                        logger.info(f"✅ Template español '{template_id}' encontrado en categoría '{template_category}'")
-                        break
-            
-            # TERCERO: Si aún no se encuentra, intentar multiidioma en español
-            if not template_response:
-                try:
-                    from app.template_manager.templates_manager import template_manager, detect_area_from_query
-                    
-                    detected_area_tuple = detect_area_from_query(original_query)
-                    detected_area = detected_area_tuple[0]  # Solo tomar el área, no la tupla completa
-                    
-                    # Override específico para desinscripción deportiva
-                    if template_id == "desinscripcion_optativos" and category == "deportes":
-                        detected_area = "deportes"
-                        logger.info(f"🔧 Override: Forzando área 'deportes' para template 'desinscripcion_optativos'")
-                    
-                    # Buscar template en nuevo sistema (español como fallback)
-                    template_response = template_manager.get_template(detected_area, template_id, 'es')
-                    template_category = detected_area
-                    
-                    if template_response:
-                        logger.info(f"✅ Template fallback '{template_id}' encontrado en área '{detected_area}' idioma 'es'")
-                
-                except Exception as e:
-                    logger.warning(f"Error en sistema multiidioma fallback: {e}")
+            # Índice único de templates: área detectada → resto de áreas → templates.py (O(1) por id/idioma)
+            from app.template_index import template_index
+            from app.template_manager.templates_manager import detect_area_from_query
+
+            detected_area_tuple = detect_area_from_query(original_query)
+            detected_area = detected_area_tuple[0] if isinstance(detected_area_tuple, tuple) else detected_area_tuple
+
+            template_entry = template_index.resolve(template_id, detected_language, detected_area)
+            if template_entry:
+                template_response = template_entry.text
+                template_category = template_entry.area or template_category
+                print(f"\n📄 GENERANDO RESPUESTA DESDE TEMPLATE:")
+                print(f"   ✅ Template encontrado: {template_id}")
+                print(f"   📂 Área: {template_category}")
+                print(f"   🌍 Idioma: {template_entry.language}")
+                if template_entry.area != detected_area:
+                    logger.info(f"🔍 Template '{template_id}' no está en '{detected_area}', usando '{template_category}' ({template_entry.source})")
+                if template_entry.language != detected_language:
+                    print(f"⚠️ Usando template {template_entry.language} como fallback para idioma {detected_language}")
             
             # LOGGING DE RESULTADOS FINAL
             if template_response:
@@ -1311,7 +811,8 @@ Formato: viñetas cortas. NO inventes becas internacionales u otros no listados.
                 original_query = processing_info['original_query']
                 
                 # MEJORAR LA RESPUESTA CON INFORMACIÓN ESPECÍFICA
-                enhanced_response = enhance_final_response(template_response, original_query, template_category)
+                enhanced_response = enhance_final_response(template_response, original_query, template_category,
+                                                           kind=RESPONSE_TEMPLATE)
                 
                 qr_processed_response = qr_generator.process_response(enhanced_response, original_query)
                 
@@ -1452,7 +953,8 @@ Puedo ayudarte con:*
             'has_qr': qr_processed_response['has_qr']       # Boolean
         }
 
-    def generate_multiple_queries_response(self, processing_info: Dict) -> Dict:
+    def generate_multiple_queries_response(self, processing_info: Dict,
+                                           retrieval_context: RetrievalContext = None) -> Dict:
         """RESPUESTA OPTIMIZADA PARA CONSULTAS MÚLTIPLES CON QR"""
         import time
         start_time = time.time()
@@ -1471,7 +973,7 @@ Puedo ayudarte con:*
             
             # BUSCAR CON TÉRMINOS EXPANDIDOS
             expanded_query = self._expand_query_with_context(part, original_query)
-            sources = self.hybrid_search(expanded_query, n_results=2)
+            sources = self.hybrid_search(expanded_query, n_results=2, retrieval_context=retrieval_context)
             
             if sources:
                 part_response = self._process_with_ollama_optimized(expanded_query, sources)
@@ -1480,7 +982,7 @@ Puedo ayudarte con:*
                 # MEJORAR CALIDAD DE RESPUESTA
                 if "no hay información" in response_text.lower() or "consulta en punto estudiantil" in response_text.lower():
                     # Intentar con búsqueda más amplia
-                    broader_sources = self.hybrid_search(part, n_results=3)
+                    broader_sources = self.hybrid_search(part, n_results=3, retrieval_context=retrieval_context)
                     if broader_sources:
                         part_response = self._process_with_ollama_optimized(part, broader_sources)
                 
@@ -1559,22 +1061,33 @@ Puedo ayudarte con:*
                     'sources': []
                 }
             
-            # Usar el prompt estricto mejorado
-            system_message = self._build_strict_prompt(limited_sources, query)
+            # Usar el prompt estricto dentro del presupuesto de tokens, con el modelo que elija el router
+            route = model_router.route(query, limited_sources)
+            prompt = self._build_prompt(limited_sources, query, model=route.model)
             
-            response = ollama.chat(
-                model=self.current_model,
-                messages=[
-                    {'role': 'system', 'content': 'Responde estrictamente en español (Chile). No uses inglés.'},
-                    {'role': 'user', 'content': system_message}  # Todo en user para mayor claridad
-                ],
-                options={
-                    'temperature': 0.0,  # Máximo determinismo
-                    'num_predict': 120,  # Respuestas concisas
-                    'top_p': 0.8,        # Más enfocado
-                    'repeat_penalty': 1.5  # Evitar repeticiones
-                }
-            )
+            generation_start = time.perf_counter()
+            try:
+                response = llm_gateway.chat(
+                    model=route.model,
+                    messages=prompt.messages,
+                    cache_messages=prompt.cache_messages,
+                    options={
+                        'temperature': 0.0,  # Máximo determinismo
+                        'num_predict': 120,  # Respuestas concisas
+                        'top_p': 0.8,        # Más enfocado
+                        'repeat_penalty': 1.5,  # Evitar repeticiones
+                        'num_ctx': prompt.num_ctx
+                    }
+                )
+            except Exception:
+                model_router.record(route, time.perf_counter() - generation_start, ok=False)
+                raise
+            generation_time = time.perf_counter() - generation_start
+            if response.get('cached'):
+                logger.info("💾 Generación servida desde el cache de generaciones")
+            else:
+                prompt_builder.record(route.model, prompt, response, generation_time)
+            model_router.record(route, generation_time, cached=bool(response.get('cached')))
             
             # PROCESAR RESPUESTA CON OPTIMIZADOR INTELIGENTE
             raw_response = response['message']['content'].strip()
@@ -1583,15 +1096,11 @@ Puedo ayudarte con:*
             if INTELLIGENT_OPTIMIZER_AVAILABLE:
                 try:
                     category = sources[0]['metadata'].get('category', 'general') if sources else 'general'
-                    optimization_result = optimize_rag_response(
-                        raw_response, 
-                        query, 
-                        category,
-                        sources=limited_sources
-                    )
+                    context = ResponseContext(query, category, RESPONSE_OLLAMA, sources=limited_sources)
+                    optimized_response = response_pipeline.run(raw_response, context, stages=('intelligent_optimizer',))
+                    optimization_result = context.info.get('optimization', {})
                     
                     if optimization_result.get('success'):
-                        optimized_response = optimization_result['optimized_response']
                         logger.info(f"✅ Respuesta optimizada: {optimization_result['original_length']} → "
                                   f"{optimization_result['optimized_length']} chars "
                                   f"(calidad: {optimization_result['quality_score']}/100)")
@@ -1781,6 +1290,14 @@ No entiendo completamente '{original_query}'.
                 metadatas=[enhanced_metadata],
                 ids=[doc_id]
             )
+            version = bump_knowledge_version('add_document')
+            if BM25_ENABLED:
+                # Ingesta incremental: el índice queda al día sin reconstruir (solo si ya lo estaba)
+                in_sync = self._bm25_version == version - 1
+                self.bm25_index.add(doc_id, document, enhanced_metadata)
+                if in_sync:
+                    self._bm25_version = version
+            self._schedule_mirror_export()
 
             self.metrics['documents_added'] += 1
             return True
@@ -1812,15 +1329,22 @@ No entiendo completamente '{original_query}'.
             return []
 
     def query_optimized(self, query_text: str, n_results: int = 3, score_threshold: float = 0.25, 
-                        metadata_filters: Dict = None):
-        """BÚSQUEDA OPTIMIZADA CON METADATA FILTERS (DeepSeek)"""
+                        metadata_filters: Dict = None, retrieval_context: RetrievalContext = None):
+        """BÚSQUEDA OPTIMIZADA CON METADATA FILTERS (DeepSeek)
+
+        Con `retrieval_context`, la normalización y los candidatos de ChromaDB se comparten
+        con las demás etapas del request (una sola consulta vectorial por texto).
+        """
         try:
             # ✅ FIX: Validar query_text no None
             if not query_text or query_text is None:
                 logger.warning("⚠️ query_text None/vacío en query_optimized")
                 return []
             
-            processed_query = self.enhanced_normalize_text(query_text)
+            if retrieval_context is not None:
+                processed_query = retrieval_context.memo('normalize', query_text, self.enhanced_normalize_text)
+            else:
+                processed_query = self.enhanced_normalize_text(query_text)
 
             # Construir where_document para filtrado por metadata
             where_filter = None
@@ -1834,16 +1358,14 @@ No entiendo completamente '{original_query}'.
                     where_filter['content_type'] = metadata_filters['content_type']
 
             # Query con filtros opcionales
-            query_params = {
-                'query_texts': [processed_query],
-                'n_results': n_results * 4,
-                'include': ['distances', 'documents', 'metadatas']
-            }
             if where_filter:
-                query_params['where'] = where_filter
                 logger.info(f"🔍 Aplicando filtros: {where_filter}")
 
-            results = self.collection.query(**query_params)
+            # Vía RetrievalContext: embedding calculado una vez y espejo mmap si está vigente
+            if retrieval_context is None:
+                retrieval_context = RetrievalContext(query_text)
+            results = retrieval_context.fetch(self.collection, processed_query, n_results * 4,
+                                              where_filter, mirror=self.vector_mirror)
 
             filtered_docs = []
             for i, distance in enumerate(results['distances'][0]):
@@ -2001,60 +1523,154 @@ No entiendo completamente '{original_query}'.
             logger.error(f"Error en query con fuentes: {e}")
             return []
 
-    def _build_strict_system_prompt(self, sources: List[Dict], user_query: str) -> str:
-        """Construye un prompt de sistema estricto basado en contexto"""
-        # Formatear fuentes con metadatos enriquecidos
-        sources_text = []
-        for i, source in enumerate(sources, 1):
-            metadata = source.get('metadata', {})
-            section = metadata.get('section', 'Sin sección')
-            source_name = metadata.get('source', 'Desconocido')
-            keywords = metadata.get('keywords', '')
-            
-            formatted = f"""[FUENTE {i}]
-Documento: {source_name}
-Sección: {section}
-Palabras clave: {keywords}
-Contenido:
-{source['document'][:500]}...
-"""
-            sources_text.append(formatted)
-        
-        context = "\n\n".join(sources_text)
-        
-        return f"""Eres un asistente especializado de Duoc UC Plaza Norte.
-
-INSTRUCCIONES OBLIGATORIAS:
-1. Responde ÚNICAMENTE con información del CONTEXTO proporcionado abajo
-2. Si la información NO está en el contexto, responde EXACTAMENTE:
-    "No tengo información actualizada sobre eso. Te recomiendo contactar a Punto Estudiantil al +56 2 2999 3075 o visitar centroayuda.duoc.cl"
-3. Sé CONCISO: Máximo 4-5 líneas + datos de contacto
-4. Incluye información práctica: horarios, ubicaciones, teléfonos, correos
-5. Cita la sección del documento: "Según [sección], ..."
-6. NO inventes información que no esté en el contexto
-7. NO uses frases genéricas como "estamos aquí para ayudarte"
-
-CONTEXTO DISPONIBLE:
-{context}
-
-PREGUNTA DEL ESTUDIANTE:
-{user_query}
+    def rebuild_lexical_index(self) -> Dict:
+        """Reconstruir el índice BM25 desde duoc_knowledge (paginado para no cargar todo de una vez)"""
+        version = get_knowledge_version()
+        ids, documents, metadatas = [], [], []
+        page_size = 1000
+        offset = 0
+        while True:
+            page = self.collection.get(limit=page_size, offset=offset, include=['documents', 'metadatas'])
+            page_ids = page.get('ids') or []
+            if not page_ids:
+                break
+            ids.extend(page_ids)
+            documents.extend(page.get('documents') or [''] * len(page_ids))
+            metadatas.extend(page.get('metadatas') or [{}] * len(page_ids))
+            offset += len(page_ids)
+            if len(page_ids) < page_size:
+                break
+
+        self.bm25_index.build(ids, documents, metadatas)
+        self._bm25_version = version
+        return self.bm25_index.get_stats()
+
+    def _ensure_lexical_index(self) -> bool:
+        """
+        ¿Hay índice BM25 para buscar? Nunca reconstruye en el request: si la versión de
+        conocimiento cambió (o toca revisar el tamaño de la colección) agenda la
+        reconstrucción en segundo plano y se sigue usando el índice anterior.
+        """
+        if not BM25_ENABLED:
+            return False
+        if self._bm25_version != get_knowledge_version() or \
+                time.time() - self._bm25_checked_at >= BM25_REFRESH_SECONDS:
+            self._schedule_lexical_rebuild()
+        return len(self.bm25_index) > 0
+
+    def _schedule_lexical_rebuild(self):
+        """Sincronizar el índice BM25 con la colección en un hilo (uno a la vez)"""
+        with self._bm25_lock:
+            if self._bm25_rebuilding:
+                return
+            self._bm25_rebuilding = True
+            self._bm25_checked_at = time.time()
+
+        def run_rebuild():
+            try:
+                if self._bm25_version != get_knowledge_version() or \
+                        self.collection.count() != len(self.bm25_index):
+                    self.rebuild_lexical_index()
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo sincronizar el índice BM25: {e}")
+            finally:
+                with self._bm25_lock:
+                    self._bm25_rebuilding = False
+                    self._bm25_checked_at = time.time()
+
+        threading.Thread(target=run_rebuild, name='bm25-rebuild', daemon=True).start()
+
+    def export_vector_mirror(self) -> Optional[Dict]:
+        """Exportar ahora el espejo mmap de la colección (los demás workers lo cargan solos)"""
+        manifest = export_vector_mirror(self.collection)
+        if manifest:
+            self.vector_mirror.is_current()  # recargar en este worker sin esperar el intervalo
+        return manifest
+
+    def _schedule_mirror_export(self, delay: float = None):
+        """Re-exportar el espejo tras `delay` segundos sin nuevos add_document (debounce)"""
+        if not VECTOR_MIRROR_ENABLED:
+            return
+
+        def run_export():
+            try:
+                self.export_vector_mirror()
+            except Exception as e:
+                logger.warning(f"⚠️ Error exportando espejo vectorial: {e}")
+
+        with self._mirror_timer_lock:
+            if self._mirror_timer is not None:
+                self._mirror_timer.cancel()
+            self._mirror_timer = threading.Timer(MIRROR_EXPORT_DELAY if delay is None else delay, run_export)
+            self._mirror_timer.daemon = True
+            self._mirror_timer.start()
+
+    @staticmethod
+    def _is_keyword_query(query_text: str) -> bool:
+        """Consultas cortas de palabras clave ('tne', 'biblioteca', 'horario biblioteca')"""
+        return len(query_text.split()) <= 3 and 0 < len(lexical_tokenize(query_text)) <= 2
+
+    def _vector_query_text(self, query_text: str, retrieval_context: RetrievalContext) -> str:
+        """Consulta expandida y normalizada que hybrid_search pasa a query_optimized (memoizada por request)"""
+        expanded_query = retrieval_context.memo(
+            'expand', query_text,
+            lambda text: self._expand_query(text, retrieval_context.analysis_for(text)))
+        return retrieval_context.memo('normalize', expanded_query, self.enhanced_normalize_text)
+
+    def _retrieval_embedding(self, query_text: str, retrieval_context: RetrievalContext):
+        """
+        Embedding del mismo texto que codifica query_optimized en hybrid_search (consulta expandida
+        y normalizada): centroides y búsqueda vectorial comparten un solo encode por request
+        """
+        try:
+            search_text = retrieval_context.memo('normalize', self._vector_query_text(query_text, retrieval_context),
+                                                 self.enhanced_normalize_text)
+            return retrieval_context.embed(self.collection, search_text)
+        except Exception as e:
+            logger.debug(f"Embedding de la pregunta no disponible para centroides: {e}")
+            return None
 
-RESPUESTA (basada SOLO en el contexto):"""
-    
-    def hybrid_search(self, query_text: str, n_results: int = 3) -> List[Dict]:
-        """BÚSQUEDA HÍBRIDA MEJORADA CON MAYOR RECALL"""
+    def hybrid_search(self, query_text: str, n_results: int = 3,
+                      retrieval_context: RetrievalContext = None) -> List[Dict]:
+        """BÚSQUEDA HÍBRIDA: vectorial (ChromaDB) + léxica (BM25) fusionadas por RRF"""
         try:
-            # Expandir query con sinónimos y contexto
-            expanded_query = self._expand_query(query_text)
-            processed_query = self.enhanced_normalize_text(expanded_query)
+            lexical_ready = bool(query_text) and self._ensure_lexical_index()
+
+            # ⚡ KEYWORD CORTA: si el mejor chunk léxico contiene todos los términos, no se consulta ChromaDB
+            if lexical_ready and self._is_keyword_query(query_text):
+                lexical_results = self.bm25_index.search_documents(query_text, n_results * 10)
+                if lexical_results and lexical_results[0]['coverage'] == 1.0:
+                    final_results = [r for r in lexical_results if r['lexical_score'] >= 0.12][:n_results]
+                    self.metrics['lexical_only_searches'] += 1
+                    logger.info(f"⚡ Búsqueda léxica BM25: '{query_text[:50]}' → {len(final_results)} documentos "
+                                f"(mejor score: {lexical_results[0]['bm25_score']:.2f})")
+                    return final_results
+
+            # Expandir query con sinónimos y contexto (memoizado por request si hay contexto)
+            if retrieval_context is not None:
+                processed_query = self._vector_query_text(query_text, retrieval_context)
+            else:
+                expanded_query = self._expand_query(query_text)
+                processed_query = self.enhanced_normalize_text(expanded_query)
             
             # 🔥 MEJORA: Buscar MÁS resultados (10x) con umbral MÁS BAJO para capturar documentos nuevos
-            results = self.query_optimized(processed_query, n_results * 10, score_threshold=0.08)
+            results = self.query_optimized(processed_query, n_results * 10, score_threshold=0.08,
+                                           retrieval_context=retrieval_context)
+
+            # Fusionar con el ranking léxico (términos del usuario, sin la expansión de sinónimos)
+            fused = False
+            if lexical_ready:
+                lexical_results = self.bm25_index.search_documents(query_text, n_results * 10)
+                if lexical_results:
+                    results = reciprocal_rank_fusion([results, lexical_results], k=RRF_K)
+                    fused = True
+                    self.metrics['fused_searches'] += 1
             
-            logger.info(f"🔍 Búsqueda híbrida: '{query_text[:50]}' → {len(results)} resultados")
+            logger.info(f"🔍 Búsqueda híbrida: '{query_text[:50]}' → {len(results)} resultados"
+                        f"{' (vectorial + BM25)' if fused else ''}")
 
             # 🔥 MEJORA: Filtrar con umbral AÚN MÁS PERMISIVO para nuevos documentos
+            # (similarity es siempre la similitud coseno: BM25 solo reordena vía rrf_score)
             filtered_docs = []
             for result in results:
                 if result['similarity'] >= 0.12:  # Reducido de 0.15 a 0.12
@@ -2068,8 +1684,9 @@ RESPUESTA (basada SOLO en el contexto):"""
                         filtered_docs.append(result)
                         logger.debug(f"  ⚡ Fallback doc {result['metadata'].get('category', 'unknown')}: {result['similarity']:.3f}")
 
-            # Ordenar por relevancia
-            filtered_docs.sort(key=lambda x: x['similarity'], reverse=True)
+            # Ordenar por relevancia (ranking fusionado si hubo BM25)
+            sort_key = 'rrf_score' if fused else 'similarity'
+            filtered_docs.sort(key=lambda x: x[sort_key], reverse=True)
             
             # Retornar top resultados
             final_results = filtered_docs[:n_results]
@@ -2088,9 +1705,19 @@ RESPUESTA (basada SOLO en el contexto):"""
         """ESTADÍSTICAS MEJORADAS"""
         stats = {
             'text_cache_size': len(self.text_cache),
-            'semantic_cache_size': len(self.semantic_cache.cache),
+            'semantic_cache_size': len(self.semantic_cache),
+            'semantic_cache': self.semantic_cache.get_stats(),
             'metrics': self.metrics,
             'semantic_cache_enabled': self.semantic_cache.model is not None,
+            'lexical_index': self.bm25_index.get_stats(),
+            'vector_mirror': self.vector_mirror.get_stats(),
+            'centroid_classifier': self.centroid_classifier.get_stats(),
+            'llm_gateway': llm_gateway.get_stats(),
+            'model_manager': model_manager.get_status(check_loaded=False),
+            'model_router': model_router.get_stats(),
+            'response_pipeline': response_pipeline.get_stats(),
+            'prompt_builder': prompt_builder.get_stats(),
+            'knowledge_version': get_knowledge_version(),
             'total_documents': self.collection.count() if hasattr(self.collection, 'count') else 'N/A',
             'duoc_context': self.duoc_context,
             'processing_stats': {
@@ -2160,10 +1787,19 @@ rag_engine = LazyRAGEngine()
 
 
 def get_ai_response(user_message: str, context: list = None, 
-                   conversational_context: str = None, user_profile: dict = None) -> Dict:
-    """VERSIÓN MEJORADA - PROCESAMIENTO INTELIGENTE CON SMART KEYWORD DETECTION"""
+                   conversational_context: str = None, user_profile: dict = None,
+                   stream_callback=None, retrieval_context: RetrievalContext = None) -> Dict:
+    """VERSIÓN MEJORADA - PROCESAMIENTO INTELIGENTE CON SMART KEYWORD DETECTION
+
+    Si se entrega `stream_callback`, se emiten frames a medida que avanza el pipeline:
+    'meta' (estrategia/template), 'sources' (fuentes recuperadas) y 'token' (texto de Ollama
+    a medida que se genera). El dict retornado sigue siendo la respuesta final post-procesada.
+
+    `retrieval_context` (opcional) permite a quien llama inspeccionar la recuperación del request;
+    la pre-búsqueda, la división de consultas múltiples y la generación comparten los mismos
+    candidatos de ChromaDB.
+    """
     import time
-    from app.smart_keyword_detector import smart_keyword_detector
     start_time = time.time()
 
     # 🎯 BANNER INICIAL DE CONSULTA
@@ -2178,9 +1814,19 @@ def get_ai_response(user_message: str, context: list = None,
     logger.info(f"🔍 NUEVA CONSULTA: '{user_message}' (len={len(user_message)})")
     logger.info(f"{'='*80}")
 
+    # 💾 CACHE DE RESPUESTAS: misma pregunta normalizada, idioma y contexto conversacional
+    engine = _get_rag_engine()
+    analysis = QueryAnalysis(user_message, language_detector=engine.detect_language)
+    cache_key = response_cache.make_key(user_message, analysis.language, conversational_context)
+    cached_response = response_cache.get(cache_key)
+    if cached_response is not None:
+        engine.metrics['text_cache_hits'] += 1
+        logger.info(f"💾 Response cache HIT para: '{user_message}'")
+        return _serve_cached_response(cached_response, start_time, stream_callback)
+
     # 🔍 PASO 0: Detección inteligente de palabras clave con priorización
     print(f"📌 PASO 1: DETECCIÓN INTELIGENTE DE KEYWORDS")
-    keyword_analysis = smart_keyword_detector.detect_keywords(user_message)
+    keyword_analysis = analysis.keyword_analysis
     
     if keyword_analysis.get('primary_keyword'):
         print(f"   ✅ Keyword detectada: '{keyword_analysis.get('primary_keyword')}'")
@@ -2211,13 +1857,16 @@ def get_ai_response(user_message: str, context: list = None,
     # Usar la consulta mejorada si es diferente
     query_to_process = enhanced_query if enhanced_query != user_message else user_message
     
-    # Obtener instancia de RAG Engine (lazy loading)
-    engine = _get_rag_engine()
-    
+    if retrieval_context is None:
+        retrieval_context = RetrievalContext(query_to_process, analysis=analysis)
+    elif retrieval_context.analysis.query == analysis.query:
+        retrieval_context.analysis = analysis
+
     processing_info = engine.process_user_query(
         query_to_process, 
         conversational_context=conversational_context,
-        user_profile=user_profile
+        user_profile=user_profile,
+        retrieval_context=retrieval_context
     )
     strategy = processing_info['processing_strategy']
     
@@ -2236,6 +1885,16 @@ def get_ai_response(user_message: str, context: list = None,
     print(f"   🌍 Idioma: {processing_info.get('language', 'N/A')}")
     logger.info(f"📋 Estrategia: {strategy} | Cat: {processing_info.get('category')} | Lang: {processing_info.get('language')}")
 
+    if stream_callback:
+        _emit_stream_frame(stream_callback, {
+            'type': 'meta',
+            'strategy': strategy,
+            'category': processing_info.get('category'),
+            'template_id': processing_info.get('template_id'),
+            'language': processing_info.get('detected_language'),
+            'primary_keyword': keyword_analysis.get('primary_keyword')
+        })
+
     # 🎯 SI ES TEMPLATE, PROCESARLO INMEDIATAMENTE (MÁXIMA PRIORIDAD)
     if strategy == 'template':
         print(f"\n✨ GENERANDO RESPUESTA DESDE TEMPLATE...")
@@ -2243,18 +1902,25 @@ def get_ai_response(user_message: str, context: list = None,
         
         response_data = engine.generate_template_response(processing_info)
         
-        # MEJORAR RESPUESTA DE TEMPLATE
+        # generate_template_response ya aplicó las mejoras (al template o a la clarificación de
+        # fallback); una segunda pasada no cambia el texto, así que no se repite
         if 'response' in response_data:
             category = processing_info.get('category', 'template')
-            enhanced_response = enhance_final_response(response_data['response'], user_message, category)
-            response_data['response'] = enhanced_response
             print(f"✅ Respuesta de template mejorada (categoría: {category})")
             logger.info(f"✅ Template response enhanced for category: {category}")
         
         response_data['response_time'] = time.time() - start_time
         response_data['intelligent_features_applied'] = True
+        _store_cached_response(cache_key, strategy, response_data)
         return response_data
 
+    # 💾 CACHE SEMÁNTICO: una reformulación de una pregunta ya respondida reutiliza la respuesta
+    # sin llamar a Ollama (solo RAG estándar y sin contexto conversacional)
+    if strategy == 'standard_rag' and not conversational_context:
+        semantic_hit = _find_semantic_response(engine, user_message, processing_info, retrieval_context)
+        if semantic_hit is not None:
+            return _serve_cached_response(semantic_hit, start_time, stream_callback, cache_type='semantic_cache')
+
     # 🔥 Inicializar sources para evitar error
     sources = []
     
@@ -2293,7 +1959,8 @@ def get_ai_response(user_message: str, context: list = None,
             sources_biblioteca = engine.query_optimized(
                 query_text=user_message,
                 n_results=5,
-                score_threshold=0.25
+                score_threshold=0.25,
+                retrieval_context=retrieval_context
             )
             if sources_biblioteca:
                 sources = sources_biblioteca
@@ -2397,52 +2064,31 @@ def get_ai_response(user_message: str, context: list = None,
             response_data['response'] = enhanced_response
         response_data['response_time'] = time.time() - start_time
         response_data['intelligent_features_applied'] = True
+        _store_cached_response(cache_key, 'derivation', response_data)
         return response_data
 
     elif strategy == 'multiple_queries':
-        response_data = rag_engine.generate_multiple_queries_response(processing_info)
+        response_data = rag_engine.generate_multiple_queries_response(processing_info, retrieval_context=retrieval_context)
         # MEJORAR RESPUESTA DE MÚLTIPLES CONSULTAS
         if 'response' in response_data:
             enhanced_response = enhance_final_response(response_data['response'], user_message, 'multiple_queries')
             response_data['response'] = enhanced_response
         response_data['response_time'] = time.time() - start_time
         response_data['intelligent_features_applied'] = True
+        _store_cached_response(cache_key, 'multiple_queries', response_data)
         return response_data
 
     elif strategy == 'clarification':
+        # generate_clarification_response ya aplicó las mejoras
         response_data = rag_engine.generate_clarification_response(processing_info)
-        # MEJORAR RESPUESTA DE CLARIFICACIÓN
-        if 'response' in response_data:
-            enhanced_response = enhance_final_response(response_data['response'], user_message, 'clarification')
-            response_data['response'] = enhanced_response
         response_data['response_time'] = time.time() - start_time
         response_data['intelligent_features_applied'] = True
+        _store_cached_response(cache_key, 'clarification', response_data)
         return response_data
 
     # ESTRATEGIA ESTÁNDAR RAG MEJORADA CON CONTEXTO
-    normalized_message = rag_engine.enhanced_normalize_text(user_message)
-    
-    # Generar cache key que incluya contexto conversacional si está presente
-    cache_components = [user_message]
-    if conversational_context:
-        # Usar solo una parte del contexto para el cache key (evitar cache key muy largos)
-        context_summary = conversational_context[-200:] if len(conversational_context) > 200 else conversational_context
-        cache_components.append(context_summary)
-    
-    cache_key = f"rag_{hashlib.md5('|'.join(cache_components).encode()).hexdigest()}"
-
-    # 🔥 CACHE DESHABILITADO TEMPORALMENTE - devolvía respuestas malas
-    # Necesitamos garantizar que SIEMPRE se ejecute Ollama para generar respuestas
-    use_cache = False  # Cambiar a True cuando el sistema funcione correctamente
-    
-    if use_cache and cache_key in rag_engine.text_cache:
-        cached_response = rag_engine.text_cache[cache_key]
-        rag_engine.metrics['text_cache_hits'] += 1
-        logger.info(f"RAG Text Cache HIT para: '{user_message}'")
-        cached_response['response_time'] = time.time() - start_time
-        return cached_response
-
-    logger.info(f"🔥 RAG Cache DESHABILITADO - generando respuesta fresca para: '{user_message}'")
+    # Solo se cachean respuestas generadas por Ollama (no los fallbacks armados si Ollama falla)
+    generated_by_llm = True
 
     try:
         print(f"\n📌 PASO 3: BÚSQUEDA EN CHROMADB")
@@ -2460,15 +2106,17 @@ def get_ai_response(user_message: str, context: list = None,
             n_results = 5  # Ampliado de 3 a 5 - mejor cobertura
         
         print(f"   🔎 Buscando {n_results} resultados en ChromaDB...")
-        sources = rag_engine.hybrid_search(user_message, n_results=n_results)
+        sources = rag_engine.hybrid_search(user_message, n_results=n_results, retrieval_context=retrieval_context)
         
         # 🔥 FIX: Asegurar que sources siempre sea una lista
         if sources is None:
             sources = []
             logger.warning("⚠️ hybrid_search retornó None, usando lista vacía")
         
-        print(f"   ✅ Fuentes recuperadas: {len(sources)}")
-        logger.info(f"📚 Fuentes recuperadas de ChromaDB: {len(sources)}")
+        retrieval_stats = retrieval_context.get_stats()
+        print(f"   ✅ Fuentes recuperadas: {len(sources)} "
+              f"(búsquedas vectoriales en el request: {retrieval_stats['vector_queries']})")
+        logger.info(f"📚 Fuentes recuperadas de ChromaDB: {len(sources)} - {retrieval_stats}")
         
         final_sources = []
         seen_hashes = set()
@@ -2558,90 +2206,102 @@ def get_ai_response(user_message: str, context: list = None,
             print(f"{'='*80}\n")
             logger.error(f"❌ NO HAY FUENTES DISPONIBLES - Verificar ChromaDB")
 
-        system_message = (
-            "Eres InA, asistente del Punto Estudiantil en DUOC UC Plaza Norte.\n\n"
-            "INSTRUCCIONES CRÍTICAS:\n"
-            "1. USA LA INFORMACIÓN proporcionada abajo para responder\n"
-            "2. Sé DIRECTO y ESPECÍFICO - sin saludos ni presentaciones\n"
-            "3. Responde en 2-4 líneas máximo\n"
-            "4. NO inventes información que no esté en las fuentes\n"
-            "5. Si no tienes info suficiente, di 'Para más información consulta en Punto Estudiantil'\n\n"
-        )
-
-        if final_sources:
-            system_message += "=== INFORMACIÓN DE LA BASE DE CONOCIMIENTO ===\n\n"
-            for i, source in enumerate(final_sources):
-                content = source['document']
-                category = source['metadata'].get('category', 'general')
-                # Usar más contenido para dar contexto completo
-                useful_content = content[:500] + "..." if len(content) > 500 else content
-                system_message += f"[{category.upper()}]\n{useful_content}\n\n"
-            
-            system_message += (
-                "RESPONDE usando esta información.\n"
-                "Formato: Directo al punto, sin decoraciones ni emojis innecesarios.\n"
-                "Si hay pasos o requisitos, enuméralos claramente."
-            )
-        else:
-            system_message += "No hay información específica disponible.\n"
+        if not final_sources:
             logger.warning(f"⚠️ NO HAY FUENTES para '{user_message}' - ChromaDB vacío?")
 
-        # NUEVO: Usar prompt estricto mejorado
-        system_message = rag_engine._build_strict_prompt(final_sources, user_message)
+        # Modelo según complejidad de la consulta y carga del gateway
+        route = model_router.route(user_message, final_sources)
+        llm_model = route.model
+        # Prompt estricto: fuentes sin duplicados y oraciones relevantes dentro del presupuesto de tokens
+        prompt = rag_engine._build_prompt(final_sources, user_message, model=llm_model)
+
+        # 📡 STREAMING: enviar las fuentes antes de empezar a generar
+        if stream_callback:
+            _emit_stream_frame(stream_callback, {
+                'type': 'sources',
+                'sources': _format_sources(final_sources)
+            })
         
         # 🔥 LOGGING CRÍTICO ANTES DE OLLAMA
         print(f"\n📌 PASO 6: GENERACIÓN CON OLLAMA")
-        print(f"   🤖 Modelo: {rag_engine.current_model}")
+        print(f"   🤖 Modelo: {llm_model}")
         print(f"   📚 Fuentes para contexto: {len(final_sources)}")
-        print(f"   📝 Tamaño del prompt: {len(system_message)} chars")
+        print(f"   📝 Tamaño del prompt: ~{prompt.prompt_tokens} tokens "
+              f"({prompt.sentences_kept}/{prompt.sentences_total} oraciones, {prompt.duplicates} fuentes duplicadas)")
         print(f"   ⚙️ Parámetros:")
         print(f"      • Temperature: 0.1 (muy determinista)")
         print(f"      • Max tokens: 220 (conciso)")
-        print(f"      • Context window: 4096")
+        print(f"      • Context window: {prompt.num_ctx}")
         print(f"   ⏳ Generando respuesta...")
-        logger.info(f"🤖 LLAMANDO A OLLAMA ({rag_engine.current_model}) para: '{user_message}'")
+        logger.info(f"🤖 LLAMANDO A OLLAMA ({llm_model}) para: '{user_message}'")
         logger.info(f"📚 Fuentes disponibles: {len(final_sources)}")
-        logger.info(f"📝 System message length: {len(system_message)} chars")
+        logger.info(f"📝 Prompt: ~{prompt.prompt_tokens} tokens (contexto {prompt.context_tokens})")
         
         try:
-            logger.info(f"⏱️ Iniciando llamada a Ollama {rag_engine.current_model}...")
+            logger.info(f"⏱️ Iniciando llamada a Ollama {llm_model}...")
             import time as time_module
             ollama_start = time_module.time()
-            response = ollama.chat(
-                model=rag_engine.current_model,
-                messages=[
-                    {'role': 'system', 'content': 'Responde estrictamente en español (Chile). No uses inglés.'},
-                    {'role': 'system', 'content': system_message},
-                    {'role': 'user', 'content': user_message}
-                ],
-                options={
-                    'temperature': 0.1,  # Muy determinista para concisión
-                    'num_predict': 220,  # Reducido para respuestas concisas (350→220)
-                    'top_p': 0.85,  # Más enfocado (0.9→0.85)
-                    'repeat_penalty': 1.4,  # Más penalización a repeticiones (1.3→1.4)
-                    'num_ctx': 4096  # Mayor contexto
-                }
-            )
+            ollama_messages = prompt.messages
+            ollama_options = {
+                'temperature': 0.1,  # Muy determinista para concisión
+                'num_predict': 220,  # Reducido para respuestas concisas (350→220)
+                'top_p': 0.85,  # Más enfocado (0.9→0.85)
+                'repeat_penalty': 1.4,  # Más penalización a repeticiones (1.3→1.4)
+                'seed': GENERATION_SEED,  # Determinista: mismo prompt → misma respuesta (cacheable)
+                'num_ctx': prompt.num_ctx  # Fijo para el presupuesto: cambiarlo obliga a recargar el modelo
+            }
+
+            if stream_callback:
+                # 📡 Reenviar tokens a medida que Ollama los genera
+                streamed_parts = []
+                first_token_time = None
+                response = {}
+                for token in llm_gateway.stream_chat(
+                    model=llm_model,
+                    messages=ollama_messages,
+                    options=ollama_options,
+                    on_done=response.update,
+                    cache_messages=prompt.cache_messages
+                ):
+                    if first_token_time is None:
+                        first_token_time = time_module.time() - ollama_start
+                        logger.info(f"📡 Primer token de Ollama en {first_token_time:.2f}s")
+                    streamed_parts.append(token)
+                    _emit_stream_frame(stream_callback, {'type': 'token', 'text': token})
+                respuesta = ''.join(streamed_parts).strip()
+            else:
+                response = llm_gateway.chat(
+                    model=llm_model,
+                    messages=ollama_messages,
+                    options=ollama_options,
+                    cache_messages=prompt.cache_messages
+                )
+                respuesta = response['message']['content'].strip()
             ollama_time = time_module.time() - ollama_start
-            
-            respuesta = response['message']['content'].strip()
+            if response.get('cached'):
+                logger.info("💾 Generación servida desde el cache de generaciones")
+            else:
+                prompt_builder.record(llm_model, prompt, response, ollama_time)
+            model_router.record(route, ollama_time, cached=bool(response.get('cached')))
             
             print(f"   ✅ Respuesta generada exitosamente")
             print(f"   ⏱️ Tiempo: {ollama_time:.2f}s")
             print(f"   📝 Longitud: {len(respuesta)} caracteres")
             print(f"   📄 Preview: {respuesta[:120]}...")
-            logger.info(f"✅ Ollama ({rag_engine.current_model}) respondió en {ollama_time:.2f}s")
+            logger.info(f"✅ Ollama ({llm_model}) respondió en {ollama_time:.2f}s")
             logger.info(f"📝 Respuesta: {len(respuesta)} chars")
             logger.info(f"📄 Preview: {respuesta[:150]}")
             
         except Exception as ollama_error:
+            generated_by_llm = False
+            model_router.record(route, time_module.time() - ollama_start, ok=False)
             print(f"\n{'='*80}")
             print(f"❌ ERROR EN PASO 6 (OLLAMA)")
             print(f"{'='*80}")
             print(f"🔴 Error: {str(ollama_error)[:200]}")
             print(f"🔧 Tipo: {type(ollama_error).__name__}")
-            print(f"🤖 Modelo: {rag_engine.current_model}")
-            print(f"📝 Prompt length: {len(system_message)} caracteres")
+            print(f"🤖 Modelo: {llm_model}")
+            print(f"📝 Prompt: ~{prompt.prompt_tokens} tokens")
             print(f"🔄 Activando sistema de fallback...")
             print(f"{'='*80}\n")
             
@@ -2742,13 +2402,7 @@ def get_ai_response(user_message: str, context: list = None,
                 elif len(respuesta.strip()) < 20:
                     respuesta = derivation_response['response']
 
-        formatted_sources = []
-        for source in final_sources:
-            formatted_sources.append({
-                'content': source['document'][:80] + '...',
-                'category': source['metadata'].get('category', 'general'),
-                'similarity': round(source.get('similarity', 0.5), 3)
-            })
+        formatted_sources = _format_sources(final_sources)
 
         # 🔍 DIAGNÓSTICO COMPLETO: Verificar calidad de información recuperada
         logger.info(f"")
@@ -2785,7 +2439,7 @@ def get_ai_response(user_message: str, context: list = None,
         # ✅ MEJORA CRÍTICA: Aplicar enhancer correctamente
         if RESPONSE_ENHANCER_AVAILABLE and respuesta and len(respuesta.strip()) > 10:
             try:
-                enhanced_respuesta = enhance_final_response(respuesta, user_message, category)
+                enhanced_respuesta = enhance_final_response(respuesta, user_message, category, kind=RESPONSE_RAG)
                 logger.info(f"✅ Response enhanced: {len(respuesta)} -> {len(enhanced_respuesta)} chars")
             except Exception as e:
                 logger.error(f"❌ Error enhancing response: {e}")
@@ -2807,8 +2461,10 @@ def get_ai_response(user_message: str, context: list = None,
             'has_qr': qr_processed_response['has_qr']
         }
 
-        # 🔥 NO CACHEAR hasta que el sistema funcione correctamente
-        # rag_engine.text_cache[cache_key] = response_data
+        if generated_by_llm and final_sources:
+            _store_cached_response(cache_key, strategy, response_data)
+            if strategy == 'standard_rag' and not conversational_context:
+                _store_semantic_response(rag_engine, user_message, response_data, retrieval_context)
         rag_engine.metrics['successful_responses'] += 1
         
         # 📊 RESUMEN FINAL
@@ -2819,7 +2475,7 @@ def get_ai_response(user_message: str, context: list = None,
         print(f"   • Query: '{user_message}'")
         print(f"   • Estrategia: {strategy.upper()}")
         print(f"   • Fuentes usadas: {len(final_sources)}")
-        print(f"   • Modelo: {rag_engine.current_model}")
+        print(f"   • Modelo: {llm_model}")
         print(f"   • Tiempo total: {response_data['response_time']:.2f}s")
         print(f"   • Longitud respuesta: {len(enhanced_respuesta)} chars")
         if keyword_analysis.get('primary_keyword'):
@@ -2885,64 +2541,85 @@ def get_ai_response(user_message: str, context: list = None,
         }
 
 
-def _optimize_response(respuesta: str, pregunta: str) -> str:
-    """OPTIMIZACIÓN DE RESPUESTA MEJORADA"""
-    if respuesta.startswith(("¡Hola! Soy InA", "Hola, soy el asistente", "Hola, soy InA")):
-        respuesta = re.sub(r'^¡?Hola!?\s*(soy|me llamo)\s*(InA|el asistente)[^.!?]*[.!?]\s*', '', respuesta)
-    
-    optimizations = {
-        "soy el asistente virtual del Punto Estudiantil": "",
-        "estoy aquí para ayudarte con": "Puedo informarte sobre",
-        "te recomiendo que te dirijas": "recomiendo dirigirte",
-        "debes saber que el proceso": "el proceso",
-        "es importante mencionar que": "",
-        "en relación a tu consulta sobre": "Sobre",
-        "respecto a tu pregunta acerca de": "Acerca de",
-        "quiero informarte que": "",
-        "me complace decirte que": "",
-        "como asistente virtual": "",
-        "puedo proporcionarte información": "Información:",
-        "hola, soy ina, el asistente virtual": "",
-        "soy ina, el asistente virtual": "",
-        "duoc uc": "Duoc UC",
-    }
+def _format_sources(sources: List[Dict]) -> List[Dict]:
+    """Formato resumido de fuentes que se devuelve al cliente"""
+    return [{
+        'content': source['document'][:80] + '...',
+        'category': source['metadata'].get('category', 'general'),
+        'similarity': round(source.get('similarity', 0.5), 3)
+    } for source in sources]
 
-    for largo, corto in optimizations.items():
-        respuesta = respuesta.replace(largo, corto)
 
-    respuesta = re.sub(r'\s+', ' ', respuesta)
-    respuesta = respuesta.strip()
-    
-    if len(respuesta) > 500:
-        sentences = respuesta.split('.')
-        if len(sentences) > 2:
-            respuesta = '. '.join(sentences[:2]) + '.'
-    
-    return respuesta
-
-
-class ResponseCache:
-    def __init__(self):
-        self.cache = {}
-        self.ttl = timedelta(hours=1)
+def _store_cached_response(cache_key: str, strategy: str, response_data: Dict):
+    """Guardar la respuesta final en el cache versionado (solo estrategias deterministas)"""
+    if strategy not in CACHEABLE_STRATEGIES or not response_data.get('response'):
+        return
+    response_cache.set(cache_key, dict(response_data), strategy=strategy)
 
-    def get_key(self, query: str) -> str:
-        return hashlib.md5(query.encode()).hexdigest()
 
-    def get(self, query: str):
-        key = self.get_key(query)
-        if key in self.cache:
-            timestamp, response = self.cache[key]
-            if datetime.now() - timestamp < self.ttl:
-                return response
+def _find_semantic_response(engine: 'RAGEngine', user_message: str, processing_info: Dict,
+                            retrieval_context: RetrievalContext) -> Optional[Dict]:
+    """Respuesta guardada para una pregunta parecida en el mismo idioma (None si no hay)"""
+    try:
+        embedding = engine.semantic_cache.get_embedding(user_message, retrieval_context.embeddings)
+        hit = engine.semantic_cache.find_similar(embedding)
+    except Exception as e:
+        logger.warning(f"⚠️ Error consultando el cache semántico: {e}")
         return None
+    if hit is None:
+        return None
+    language = processing_info.get('detected_language')
+    if (hit.get('processing_info') or {}).get('detected_language') != language:
+        return None
+    engine.metrics['semantic_cache_hits'] += 1
+    logger.info(f"💾 Cache semántico HIT para: '{user_message}' (similitud {hit['semantic_similarity']:.3f})")
+    return hit
 
-    def set(self, query: str, response: dict):
-        key = self.get_key(query)
-        self.cache[key] = (datetime.now(), response)
+
+def _store_semantic_response(engine: 'RAGEngine', user_message: str, response_data: Dict,
+                             retrieval_context: RetrievalContext):
+    try:
+        engine.semantic_cache.add_to_cache(user_message, dict(response_data),
+                                           query_embeddings=retrieval_context.embeddings)
+    except Exception as e:
+        logger.warning(f"⚠️ Error guardando en el cache semántico: {e}")
+
+
+def _serve_cached_response(cached_response: Dict, start_time: float, stream_callback=None,
+                           cache_type: str = 'response_cache') -> Dict:
+    """Responder desde el cache; en streaming se emiten los mismos frames que una generación"""
+    response_data = dict(cached_response)
+    response_data['response_time'] = time.time() - start_time
+    response_data['cache_type'] = cache_type
+    response_data['cache_hit'] = True
+
+    if stream_callback:
+        processing_info = response_data.get('processing_info') or {}
+        _emit_stream_frame(stream_callback, {
+            'type': 'meta',
+            'strategy': processing_info.get('processing_strategy', 'cached'),
+            'category': response_data.get('category'),
+            'template_id': processing_info.get('template_id'),
+            'language': processing_info.get('detected_language'),
+            'cached': True
+        })
+        if response_data.get('sources'):
+            _emit_stream_frame(stream_callback, {'type': 'sources', 'sources': response_data['sources']})
+        _emit_stream_frame(stream_callback, {'type': 'token', 'text': response_data['response']})
+    return response_data
+
+
+def _emit_stream_frame(stream_callback, frame: Dict):
+    """Emitir un frame de streaming sin que un cliente caído rompa la generación"""
+    try:
+        stream_callback(frame)
+    except Exception as e:
+        logger.warning(f"⚠️ Error emitiendo frame de streaming ({frame.get('type')}): {e}")
 
 
-response_cache = ResponseCache()
+def _optimize_response(respuesta: str, pregunta: str) -> str:
+    """OPTIMIZACIÓN DE RESPUESTA MEJORADA (etapas de limpieza del pipeline de respuestas)"""
+    return response_pipeline.run(respuesta, ResponseContext(pregunta, kind=RESPONSE_RAG), stages=CLEANUP_STAGES)
 
 
 def get_rag_cache_stats() -> Dict:
@@ -2953,7 +2630,7 @@ def get_rag_cache_stats() -> Dict:
 def clear_caches():
     """LIMPIAR CACHES"""
     rag_engine.text_cache.clear()
-    rag_engine.semantic_cache.cache.clear()
+    rag_engine.semantic_cache.clear()
     logger.info("Todos los caches limpiados")
     
 def get_standard_rag_response(self, question: str, context: List[str]) -> Dict:
@@ -2,6 +2,8 @@
 import os
 import shutil
 
+from app.knowledge_version import bump_knowledge_version
+
 def reset_database():
     """Reset completo de la base de datos"""
     try:
@@ -13,6 +15,7 @@ def reset_database():
         # Eliminar chroma_db
         if os.path.exists("chroma_db"):
             shutil.rmtree("chroma_db")
+            bump_knowledge_version('reset_database')
             print("✅ chroma_db eliminado")
         
         print("✅ Reset completo. Reinicia el servidor.")
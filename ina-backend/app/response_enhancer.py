@@ -12,6 +12,25 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Expresiones precompiladas (se usan en cada respuesta)
+PHONE_PATTERN = re.compile(r'\+56\s?\d{1,2}\s?\d{4}\s?\d{4}')
+PHONE_CAPTURE_PATTERN = re.compile(r'(\+56\s?\d{1,2}\s?\d{4}\s?\d{4})')
+ADDRESS_PATTERN = re.compile(r'(Av\.|Calle|Piso\s+\d+)')
+SCHEDULE_PATTERN = re.compile(r'(Lunes\s+a\s+Viernes|L-V|\d{1,2}:\d{2})')
+STRUCTURE_EMOJI_PATTERN = re.compile(r'[📞📍🕒📧✅❌📋🏢]')
+
+GENERIC_PHRASES = (
+    "consulta en punto estudiantil",
+    "para más información",
+    "contacta con",
+    "dirígete a",
+    "visita la página",
+    "llama al teléfono",
+    "puedes obtener información"
+)
+SCHEDULE_WORDS = ('horario', 'hora', 'cuando', 'abierto')
+
+
 class ResponseEnhancer:
     def __init__(self):
         # Información de contacto específica por área
@@ -76,17 +95,15 @@ class ResponseEnhancer:
             'deportes': r'deport|gimnasio|actividad.*física|ejercicio',
             'ti': r'wifi|computador|sistema|plataforma|acceso.*digital'
         }
+        self._compiled_area_patterns = [(area, re.compile(pattern)) for area, pattern in self.area_patterns.items()]
 
     def enhance_response(self, response: str, query: str, category: str) -> str:
         """Mejorar respuesta agregando contactos específicos y reduciendo genericidad"""
         try:
             # 1. Verificar si hay un template específico mejor para esta consulta
-            if CONTACT_TEMPLATES_AVAILABLE:
-                template_match = get_template_by_keywords(query)
-                if template_match and len(response.strip()) < 200:
-                    # Si la respuesta original es muy básica, usar el template completo
-                    logger.info(f"Usando template específico: {template_match['id']}")
-                    return template_match['content']
+            template_content = self._contact_template(response, query)
+            if template_content is not None:
+                return template_content
             
             # 2. Detectar si la respuesta es muy genérica
             if self._is_generic_response(response):
@@ -107,20 +124,20 @@ class ResponseEnhancer:
             logger.error(f"Error enhancing response: {e}")
             return response  # Retornar respuesta original si falla
     
+    def _contact_template(self, response: str, query: str):
+        """Template de contacto que reemplaza una respuesta muy básica (None si no aplica)"""
+        if CONTACT_TEMPLATES_AVAILABLE:
+            template_match = get_template_by_keywords(query)
+            if template_match and len(response.strip()) < 200:
+                # Si la respuesta original es muy básica, usar el template completo
+                logger.info(f"Usando template específico: {template_match['id']}")
+                return template_match['content']
+        return None
+    
     def _is_generic_response(self, response: str) -> bool:
         """Detectar si la respuesta es muy genérica"""
-        generic_phrases = [
-            "consulta en punto estudiantil",
-            "para más información",
-            "contacta con",
-            "dirígete a",
-            "visita la página",
-            "llama al teléfono",
-            "puedes obtener información"
-        ]
-        
         response_lower = response.lower()
-        generic_count = sum(1 for phrase in generic_phrases if phrase in response_lower)
+        generic_count = sum(1 for phrase in GENERIC_PHRASES if phrase in response_lower)
         
         # Si tiene muchas frases genéricas o es muy corta, necesita mejora
         return generic_count >= 2 or len(response.strip()) < 100
@@ -181,8 +198,9 @@ class ResponseEnhancer:
         contact_added = False
         
         # Detectar área específica de la consulta
-        for area, pattern in self.area_patterns.items():
-            if re.search(pattern, query.lower()):
+        query_lower = query.lower()
+        for area, pattern in self._compiled_area_patterns:
+            if pattern.search(query_lower):
                 contact_info = self._get_contact_for_area(area)
                 if contact_info and not self._has_phone_number(response):
                     response += f"\n\n{contact_info}"
@@ -232,15 +250,14 @@ class ResponseEnhancer:
     
     def _has_phone_number(self, response: str) -> bool:
         """Verificar si la respuesta ya tiene un número de teléfono"""
-        phone_pattern = r'\+56\s?\d{1,2}\s?\d{4}\s?\d{4}'
-        return bool(re.search(phone_pattern, response))
+        return bool(PHONE_PATTERN.search(response))
     
     def _add_practical_info(self, response: str, query: str) -> str:
         """Agregar información práctica como horarios, ubicaciones específicas"""
         query_lower = query.lower()
         
         # Agregar horarios específicos si se pregunta sobre disponibilidad
-        if any(word in query_lower for word in ['horario', 'hora', 'cuando', 'abierto']):
+        if any(word in query_lower for word in SCHEDULE_WORDS):
             if 'biblioteca' in query_lower:
                 if 'biblioteca' not in response.lower():
                     response += "\n\n🕒 **Horarios Biblioteca:** Lunes a Viernes 8:00-21:00, Sábados 9:00-14:00"
@@ -259,20 +276,23 @@ class ResponseEnhancer:
     def _improve_structure(self, response: str) -> str:
         """Mejorar la estructura visual de la respuesta"""
         # Agregar emojis y formato si no los tiene
-        if not re.search(r'[📞📍🕒📧✅❌📋🏢]', response):
+        if not STRUCTURE_EMOJI_PATTERN.search(response):
             # Buscar números de teléfono y agregar emoji
-            response = re.sub(r'(\+56\s?\d{1,2}\s?\d{4}\s?\d{4})', r'📞 \1', response)
+            response = PHONE_CAPTURE_PATTERN.sub(r'📞 \1', response)
             
             # Buscar direcciones y agregar emoji  
-            response = re.sub(r'(Av\.|Calle|Piso\s+\d+)', r'📍 \1', response)
+            response = ADDRESS_PATTERN.sub(r'📍 \1', response)
             
             # Buscar horarios y agregar emoji
-            response = re.sub(r'(Lunes\s+a\s+Viernes|L-V|\d{1,2}:\d{2})', r'🕒 \1', response)
+            response = SCHEDULE_PATTERN.sub(r'🕒 \1', response)
         
         return response
 
+# Instancia global (los patrones se compilan una sola vez)
+response_enhancer = ResponseEnhancer()
+
+
 # Función de utilidad para integrar con el sistema existente
 def enhance_response(response: str, query: str, category: str = "") -> str:
     """Función principal para mejorar respuestas"""
-    enhancer = ResponseEnhancer()
-    return enhancer.enhance_response(response, query, category)
\ No newline at end of file
+    return response_enhancer.enhance_response(response, query, category)
\ No newline at end of file
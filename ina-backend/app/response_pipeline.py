@@ -0,0 +1,231 @@
+# app/response_pipeline.py - Post-procesamiento de respuestas como pipeline de etapas precompiladas
+import logging
+import re
+import time
+from collections import Counter
+from typing import Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    from app.response_enhancer import response_enhancer
+    RESPONSE_ENHANCER_AVAILABLE = True
+except Exception as e:
+    response_enhancer = None
+    RESPONSE_ENHANCER_AVAILABLE = False
+    logger.warning(f"⚠️ Mejoras de respuesta no disponibles en el pipeline: {e}")
+
+try:
+    from app.intelligent_response_optimizer import intelligent_optimizer
+    INTELLIGENT_OPTIMIZER_AVAILABLE = True
+except Exception as e:
+    intelligent_optimizer = None
+    INTELLIGENT_OPTIMIZER_AVAILABLE = False
+    logger.warning(f"⚠️ Optimizador inteligente no disponible en el pipeline: {e}")
+
+# Tipos de respuesta: cada etapa declara a cuáles aplica y las demás se la saltan
+RAG = "rag"              # generada por Ollama en process_user_query (o su fallback desde fuentes)
+OLLAMA = "ollama"        # generada en _process_with_ollama_optimized
+TEMPLATE = "template"    # texto curado de un template
+FIXED = "fixed"          # saludos, emergencias, derivaciones, clarificaciones, múltiples consultas
+
+# Limpieza de respuestas generadas (antes _optimize_response en rag.py)
+INTRO_PREFIXES = ("¡Hola! Soy InA", "Hola, soy el asistente", "Hola, soy InA")
+INTRO_PATTERN = re.compile(r'^¡?Hola!?\s*(soy|me llamo)\s*(InA|el asistente)[^.!?]*[.!?]\s*')
+PHRASE_REPLACEMENTS = {
+    "soy el asistente virtual del Punto Estudiantil": "",
+    "estoy aquí para ayudarte con": "Puedo informarte sobre",
+    "te recomiendo que te dirijas": "recomiendo dirigirte",
+    "debes saber que el proceso": "el proceso",
+    "es importante mencionar que": "",
+    "en relación a tu consulta sobre": "Sobre",
+    "respecto a tu pregunta acerca de": "Acerca de",
+    "quiero informarte que": "",
+    "me complace decirte que": "",
+    "como asistente virtual": "",
+    "puedo proporcionarte información": "Información:",
+    "hola, soy ina, el asistente virtual": "",
+    "soy ina, el asistente virtual": "",
+    "duoc uc": "Duoc UC",
+}
+WHITESPACE_PATTERN = re.compile(r'\s+')
+MAX_CLEAN_LENGTH = 500
+
+CLEANUP_STAGES = ("strip_intro", "phrases", "whitespace", "truncate")
+ENHANCE_STAGES = ("contact_template", "specific", "contact", "practical", "structure")
+
+
+class ResponseContext:
+    """Datos de la consulta que las etapas comparten durante una ejecución"""
+
+    def __init__(self, query: str, category: str = "", kind: str = RAG, sources: Optional[List[Dict]] = None):
+        self.query = query or ""
+        self.category = category or ""
+        self.kind = kind
+        self.sources = sources
+        self.info: Dict = {}     # metadatos que dejan las etapas (p.ej. resultado del optimizador)
+        self.stop = False        # una etapa puede cortar el resto del pipeline
+
+
+class PipelineStage(NamedTuple):
+    name: str
+    apply: Callable[[str, ResponseContext], str]
+    kinds: FrozenSet[str]
+
+
+class ResponsePipeline:
+    """
+    Etapas de post-procesamiento en orden fijo, con contadores de tiempo por etapa.
+
+    - Cada etapa declara los tipos de respuesta a los que aplica; para los demás
+      tipos no se ejecuta (p.ej. los templates no pasan por la limpieza de texto generado).
+    - `run(..., stages=...)` ejecuta solo un subconjunto, manteniendo el orden del pipeline.
+    - Si una etapa falla se devuelve el texto con el que empezó la ejecución.
+    """
+
+    def __init__(self, stages: Iterable[PipelineStage] = ()):
+        self.stages: List[PipelineStage] = []
+        self.stats: Dict[str, Dict] = {}
+        self.runs = Counter()
+        for stage in stages:
+            self.add_stage(stage)
+
+    def add_stage(self, stage: PipelineStage):
+        self.stages.append(stage)
+        self.stats[stage.name] = {'calls': 0, 'skipped': 0, 'changed': 0, 'total_ms': 0.0}
+
+    def has_stage(self, name: str) -> bool:
+        return name in self.stats
+
+    def run(self, text: str, context: ResponseContext, stages: Optional[Iterable[str]] = None) -> str:
+        selected = None if stages is None else set(stages)
+        original = text
+        self.runs[context.kind] += 1
+        stage = None
+        try:
+            for stage in self.stages:
+                if selected is not None and stage.name not in selected:
+                    continue
+                counters = self.stats[stage.name]
+                if context.kind not in stage.kinds:
+                    counters['skipped'] += 1
+                    continue
+                start = time.perf_counter()
+                result = stage.apply(text, context)
+                counters['total_ms'] += (time.perf_counter() - start) * 1000
+                counters['calls'] += 1
+                if result != text:
+                    counters['changed'] += 1
+                text = result
+                if context.stop:
+                    break
+        except Exception as e:
+            logger.warning(f"⚠️ Error en etapa '{stage.name if stage else '?'}' del post-procesamiento: {e}")
+            return original
+        return text
+
+    def reset_stats(self):
+        for counters in self.stats.values():
+            counters.update(calls=0, skipped=0, changed=0, total_ms=0.0)
+        self.runs.clear()
+
+    def get_stats(self) -> Dict:
+        stages = {}
+        for name, counters in self.stats.items():
+            calls = counters['calls']
+            stages[name] = {
+                **counters,
+                'total_ms': round(counters['total_ms'], 3),
+                'avg_us': round(counters['total_ms'] * 1000 / calls, 1) if calls else 0.0,
+            }
+        return {
+            'runs': dict(self.runs),
+            'total_ms': round(sum(counters['total_ms'] for counters in self.stats.values()), 3),
+            'stages': stages,
+        }
+
+
+# ------------------------------------------------------------------ etapas
+
+# str.replace encadenados: para pocas frases cortas son más rápidos que una alternación
+# compilada en una sola pasada (ver scripts/testing/benchmark_response_pipeline.py)
+_PHRASE_ITEMS = tuple((phrase, value) for phrase, value in PHRASE_REPLACEMENTS.items() if phrase)
+
+
+def _strip_intro(text: str, context: ResponseContext) -> str:
+    if text.startswith(INTRO_PREFIXES):
+        return INTRO_PATTERN.sub('', text)
+    return text
+
+
+def _replace_phrases(text: str, context: ResponseContext) -> str:
+    for phrase, value in _PHRASE_ITEMS:
+        text = text.replace(phrase, value)
+    return text
+
+
+def _collapse_whitespace(text: str, context: ResponseContext) -> str:
+    return WHITESPACE_PATTERN.sub(' ', text).strip()
+
+
+def _truncate(text: str, context: ResponseContext) -> str:
+    if len(text) > MAX_CLEAN_LENGTH:
+        sentences = text.split('.')
+        if len(sentences) > 2:
+            return '. '.join(sentences[:2]) + '.'
+    return text
+
+
+def _optimize(text: str, context: ResponseContext) -> str:
+    result = intelligent_optimizer.optimize_response(text, context.query, context.category, context.sources)
+    context.info['optimization'] = result
+    return result['optimized_response'] if result.get('success') else text
+
+
+def _contact_template(text: str, context: ResponseContext) -> str:
+    content = response_enhancer._contact_template(text, context.query)
+    if content is None:
+        return text
+    context.stop = True
+    return content
+
+
+def _make_specific(text: str, context: ResponseContext) -> str:
+    if response_enhancer._is_generic_response(text):
+        return response_enhancer._make_response_specific(text, context.query, context.category)
+    return text
+
+
+def _add_contact(text: str, context: ResponseContext) -> str:
+    return response_enhancer._add_contact_info(text, context.query, context.category)
+
+
+def _add_practical(text: str, context: ResponseContext) -> str:
+    return response_enhancer._add_practical_info(text, context.query)
+
+
+def _improve_structure(text: str, context: ResponseContext) -> str:
+    return response_enhancer._improve_structure(text)
+
+
+def build_default_pipeline() -> ResponsePipeline:
+    """Pipeline en el orden en que rag.py aplicaba cada capa"""
+    generated = frozenset({RAG})
+    enhanced = frozenset({RAG, TEMPLATE, FIXED})
+    pipeline = ResponsePipeline([
+        PipelineStage("strip_intro", _strip_intro, generated),
+        PipelineStage("phrases", _replace_phrases, generated),
+        PipelineStage("whitespace", _collapse_whitespace, generated),
+        PipelineStage("truncate", _truncate, generated),
+    ])
+    if INTELLIGENT_OPTIMIZER_AVAILABLE:
+        pipeline.add_stage(PipelineStage("intelligent_optimizer", _optimize, frozenset({OLLAMA})))
+    if RESPONSE_ENHANCER_AVAILABLE:
+        for name, apply in zip(ENHANCE_STAGES, (_contact_template, _make_specific, _add_contact,
+                                                _add_practical, _improve_structure)):
+            pipeline.add_stage(PipelineStage(name, apply, enhanced))
+    return pipeline
+
+
+# Instancia global
+response_pipeline = build_default_pipeline()
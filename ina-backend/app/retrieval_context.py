@@ -0,0 +1,151 @@
+# app/retrieval_context.py - Contexto de recuperación por request (una consulta = una búsqueda vectorial)
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.query_analysis import QueryAnalysis
+from app.query_embeddings import QueryEmbeddings
+
+logger = logging.getLogger(__name__)
+
+
+class RetrievalContext:
+    """
+    Estado de recuperación compartido por todas las etapas de una misma consulta.
+
+    process_user_query (pre-búsqueda y chequeo de derivación), la división en consultas
+    múltiples, la construcción del prompt y el listado de fuentes leen de aquí en vez de
+    repetir la expansión/normalización y la consulta a ChromaDB.
+
+    - `analysis` (QueryAnalysis) guarda idioma, tokens y detecciones de keywords de la consulta
+    - Memoiza etapas de texto (expansión, normalización, clasificación) por texto de entrada
+    - Guarda el embedding de cada texto buscado; `embeddings` (QueryEmbeddings) es el handle
+      que comparten ChromaDB, la memoria y los caches semánticos del mismo request
+    - Guarda los candidatos crudos de ChromaDB (ordenados por distancia) para el mayor
+      n_results pedido: pedidos con n menor se responden recortando, sin volver a consultar
+    """
+
+    def __init__(self, query: str, embeddings: Optional[QueryEmbeddings] = None,
+                 analysis: Optional[QueryAnalysis] = None):
+        self.query = query
+        self.embeddings = embeddings or QueryEmbeddings()
+        self.analysis = analysis if analysis is not None and analysis.query == query else QueryAnalysis(query)
+        self.created_at = time.time()
+        self._memo: Dict[tuple, Any] = {}
+        self._embeddings: Dict[str, List[float]] = {}
+        self._candidates: Dict[tuple, Dict[str, Any]] = {}
+        self.stats = {
+            'vector_queries': 0,
+            'mirror_queries': 0,
+            'candidate_reuses': 0,
+            'memo_hits': 0
+        }
+
+    # ------------------------------------------------------------------
+    # Etapas de texto
+    # ------------------------------------------------------------------
+    def memo(self, stage: str, text: str, compute: Callable[[str], Any]) -> Any:
+        """Resultado de `compute(text)` calculado una sola vez por etapa y texto"""
+        key = (stage, text)
+        if key in self._memo:
+            self.stats['memo_hits'] += 1
+            return self._memo[key]
+        value = compute(text)
+        self._memo[key] = value
+        return value
+
+    def analysis_for(self, text: str) -> Optional[QueryAnalysis]:
+        """Análisis del request si `text` es la consulta original (las partes de una consulta múltiple no lo comparten)"""
+        return self.analysis if text == self.analysis.query else None
+
+    @property
+    def expanded_query(self) -> Optional[str]:
+        return self._memo.get(('expand', self.query))
+
+    @property
+    def normalized_query(self) -> Optional[str]:
+        expanded = self.expanded_query
+        return self._memo.get(('normalize', expanded)) if expanded is not None else None
+
+    def query_embedding(self, text: Optional[str] = None) -> Optional[List[float]]:
+        """Embedding del texto efectivamente buscado (por defecto, la consulta normalizada)"""
+        return self._embeddings.get(text if text is not None else self.normalized_query)
+
+    # ------------------------------------------------------------------
+    # Búsqueda vectorial
+    # ------------------------------------------------------------------
+    def fetch(self, collection, text: str, n_candidates: int, where: Optional[Dict] = None,
+              mirror=None) -> Dict[str, Any]:
+        """
+        Candidatos de ChromaDB para `text` con el mismo formato de `collection.query`.
+
+        Si ya se consultó este texto con igual o más candidatos, se recorta el resultado
+        guardado (ChromaDB los entrega ordenados por distancia, el recorte es exacto).
+        Con `mirror` (VectorMirror vigente) la búsqueda se resuelve sobre el espejo mmap
+        y ChromaDB solo se usa si el espejo no puede responder.
+        """
+        key = (text, repr(sorted(where.items())) if where else None)
+        cached = self._candidates.get(key)
+        if cached and cached['n'] >= n_candidates:
+            self.stats['candidate_reuses'] += 1
+            return {field: [values[0][:n_candidates]] for field, values in cached['results'].items()}
+
+        query_params = {
+            'n_results': n_candidates,
+            'include': ['distances', 'documents', 'metadatas']
+        }
+        if where:
+            query_params['where'] = where
+
+        embedding = self.embed(collection, text)
+        raw = None
+        if embedding is not None and mirror is not None:
+            raw = mirror.search(embedding, n_candidates, where)
+            if raw is not None:
+                self.stats['mirror_queries'] += 1
+
+        if raw is None:
+            if embedding is not None:
+                query_params['query_embeddings'] = [embedding]
+            else:
+                query_params['query_texts'] = [text]
+            raw = collection.query(**query_params)
+        self.stats['vector_queries'] += 1
+
+        results = {field: [list(raw[field][0]) if raw.get(field) else []]
+                   for field in ('distances', 'documents', 'metadatas')}
+        self._candidates[key] = {'n': n_candidates, 'results': results}
+        return results
+
+    def embed(self, collection, text: str) -> Optional[List[float]]:
+        """
+        Embedding de `text` con la misma función de la colección, calculado una vez por request:
+        lo reutilizan fetch() (si hay que ampliar la búsqueda) y el clasificador por centroides.
+        """
+        if text in self._embeddings:
+            return self._embeddings[text]
+
+        embedding_function = getattr(collection, '_embedding_function', None)
+        if embedding_function is None:
+            return None
+        try:
+            model_name = f"chroma:{type(embedding_function).__name__}"
+            embedding = self.embeddings.get(model_name, text, embedding_function).tolist()
+        except Exception as e:
+            logger.debug(f"Embedding local no disponible, ChromaDB calculará el embedding: {e}")
+            return None
+
+        self._embeddings[text] = embedding
+        return embedding
+
+    def has_candidates(self) -> bool:
+        return any(cached['results']['documents'][0] for cached in self._candidates.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'embeddings': self.embeddings.get_stats(),
+            'analysis': self.analysis.get_stats(),
+            'texts_searched': len({key[0] for key in self._candidates}),
+            'elapsed_ms': round((time.time() - self.created_at) * 1000, 2)
+        }
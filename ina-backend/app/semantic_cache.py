@@ -0,0 +1,301 @@
+# app/semantic_cache.py - Cache semántico de respuestas sobre una matriz de embeddings normalizados
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.embedding_registry import get_encoder
+from app.knowledge_version import get_knowledge_version
+from app.query_embeddings import QueryEmbeddings, encode_query
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2000"))
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+SEMANTIC_CACHE_SNAPSHOT_EVERY = int(os.getenv("SEMANTIC_CACHE_SNAPSHOT_EVERY", "50"))
+# Similitud mínima para responder una paráfrasis con la respuesta guardada (0.65 mezcla
+# "horario biblioteca" con "horario gimnasio"; sobre 0.9 quedan reformulaciones de la misma pregunta)
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SNAPSHOT_PATH = os.getenv(
+    "SEMANTIC_CACHE_SNAPSHOT",
+    os.path.join(os.path.dirname(__file__), '..', 'cache_disk', 'semantic_cache.npz')
+)
+
+
+class SemanticCache:
+    """
+    Cache de respuestas por similitud de la consulta.
+
+    Los embeddings se guardan normalizados en una matriz contigua (capacidad fija), así
+    que buscar es un solo producto matriz-vector + argmax. Las entradas expiran por TTL y,
+    con la matriz llena, se reemplaza la usada hace más tiempo (LRU). El contenido se
+    vuelca a cache_disk/ y se descarta completo cuando cambia la versión de conocimiento.
+    """
+
+    MODEL_NAME = 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2'
+
+    def __init__(self, similarity_threshold: float = 0.65, max_entries: Optional[int] = None,
+                 ttl_seconds: Optional[int] = None, snapshot_path: Optional[str] = SNAPSHOT_PATH,
+                 load_model: bool = True):
+        self.threshold = similarity_threshold
+        self.max_entries = max(1, max_entries or SEMANTIC_CACHE_MAX_ENTRIES)
+        self.ttl = SEMANTIC_CACHE_TTL if ttl_seconds is None else ttl_seconds
+        self.snapshot_path = os.path.abspath(snapshot_path) if snapshot_path else None
+
+        self._lock = threading.RLock()
+        self._matrix: Optional[np.ndarray] = None      # (max_entries, dim) float32, filas normalizadas
+        self._valid = np.zeros(self.max_entries, dtype=bool)
+        self._created = np.zeros(self.max_entries, dtype=np.float64)
+        self._last_used = np.zeros(self.max_entries, dtype=np.int64)
+        self._queries: List[Optional[str]] = [None] * self.max_entries
+        self._responses: List[Optional[Dict]] = [None] * self.max_entries
+        self._slots: Dict[str, int] = {}
+        self._clock = 0
+        self._dirty = 0
+        self._knowledge_version = get_knowledge_version()
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'inserts': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0,
+            'snapshots': 0
+        }
+
+        self.model = None
+        if load_model:
+            try:
+                self.model = get_encoder(self.MODEL_NAME)
+            except Exception as e:
+                logger.error(f"Error inicializando cache semántico: {e}")
+
+        self.load_snapshot()
+        if self.snapshot_path:
+            atexit.register(self.save_snapshot)
+        logger.info(f"Cache semántico inicializado (umbral: {similarity_threshold}, "
+                    f"capacidad: {self.max_entries}, TTL: {self.ttl}s, entradas: {len(self)})")
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def get_embedding(self, text: str, query_embeddings: Optional[QueryEmbeddings] = None) -> Optional[np.ndarray]:
+        if self.model is None:
+            return None
+        try:
+            return encode_query(self.model, self.MODEL_NAME, text, query_embeddings)
+        except Exception as e:
+            logger.error(f"Error generando embedding: {e}")
+            return None
+
+    # ------------------------------------------------------------------
+    # Mantenimiento interno (con self._lock tomado)
+    # ------------------------------------------------------------------
+    def _check_knowledge_version(self):
+        version = get_knowledge_version()
+        if version != self._knowledge_version:
+            if self._slots:
+                logger.info(f"🧹 Cache semántico invalidado: conocimiento v{self._knowledge_version} → v{version}")
+                self.stats['invalidations'] += 1
+            self._reset()
+            self._knowledge_version = version
+
+    def _reset(self):
+        self._valid[:] = False
+        self._queries = [None] * self.max_entries
+        self._responses = [None] * self.max_entries
+        self._slots.clear()
+        self._dirty += 1
+
+    def _free_slot(self, slot: int):
+        self._valid[slot] = False
+        self._slots.pop(self._queries[slot], None)
+        self._queries[slot] = None
+        self._responses[slot] = None
+
+    def _expire(self, now: float):
+        if self.ttl <= 0:
+            return
+        expired = np.flatnonzero(self._valid & (now - self._created > self.ttl))
+        for slot in expired:
+            self._free_slot(int(slot))
+        self.stats['expirations'] += len(expired)
+
+    def _allocate_slot(self) -> int:
+        free = np.flatnonzero(~self._valid)
+        if len(free):
+            return int(free[0])
+        # Matriz llena: reemplazar la entrada menos usada recientemente
+        slot = int(np.argmin(self._last_used))
+        self._free_slot(slot)
+        self.stats['evictions'] += 1
+        return slot
+
+    @staticmethod
+    def _normalize(embedding) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+    def find_similar(self, query_embedding: np.ndarray) -> Optional[Dict]:
+        if query_embedding is None:
+            return None
+        query = self._normalize(query_embedding)
+
+        with self._lock:
+            self._check_knowledge_version()
+            self._expire(time.time())
+            if not self._slots or query is None or self._matrix is None or len(query) != self._matrix.shape[1]:
+                self.stats['misses'] += 1
+                return None
+
+            scores = self._matrix @ query
+            scores[~self._valid] = -np.inf
+            slot = int(np.argmax(scores))
+            similarity = float(scores[slot])
+
+            if similarity <= self.threshold:
+                self.stats['misses'] += 1
+                return None
+
+            self._clock += 1
+            self._last_used[slot] = self._clock
+            self.stats['hits'] += 1
+            response = dict(self._responses[slot])
+
+        logger.info(f"Semantic similarity found: {similarity:.3f}")
+        response['semantic_similarity'] = similarity
+        return response
+
+    def add_to_cache(self, query: str, response_data: Dict, embedding: Optional[np.ndarray] = None,
+                     query_embeddings: Optional[QueryEmbeddings] = None):
+        if embedding is None:
+            embedding = self.get_embedding(query, query_embeddings)
+        vector = self._normalize(embedding) if embedding is not None else None
+        if vector is None:
+            return
+
+        with self._lock:
+            self._check_knowledge_version()
+            if self._matrix is None or self._matrix.shape[1] != len(vector):
+                self._matrix = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+                self._reset()
+
+            slot = self._slots.get(query)
+            if slot is None:
+                self._expire(time.time())
+                slot = self._allocate_slot()
+
+            self._matrix[slot] = vector
+            self._valid[slot] = True
+            self._created[slot] = time.time()
+            self._clock += 1
+            self._last_used[slot] = self._clock
+            self._queries[slot] = query
+            self._responses[slot] = response_data
+            self._slots[query] = slot
+            self.stats['inserts'] += 1
+            self._dirty += 1
+            snapshot_due = SEMANTIC_CACHE_SNAPSHOT_EVERY > 0 and self._dirty >= SEMANTIC_CACHE_SNAPSHOT_EVERY
+
+        logger.info(f"Added to semantic cache: '{query[:50]}...'")
+        if snapshot_due:
+            self.save_snapshot()
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    # ------------------------------------------------------------------
+    # Persistencia en cache_disk/
+    # ------------------------------------------------------------------
+    def save_snapshot(self) -> bool:
+        """Volcar las entradas vigentes a disco (un solo .npz, reemplazo atómico)"""
+        if not self.snapshot_path:
+            return False
+        with self._lock:
+            if not self._dirty:
+                return False
+            slots = np.flatnonzero(self._valid)
+            try:
+                meta = json.dumps({
+                    'model': self.MODEL_NAME,
+                    'knowledge_version': self._knowledge_version,
+                    'queries': [self._queries[s] for s in slots],
+                    'responses': [self._responses[s] for s in slots]
+                }, ensure_ascii=False, default=str)
+                matrix = self._matrix[slots] if self._matrix is not None else np.zeros((0, 0), np.float32)
+
+                os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+                tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    np.savez(f, matrix=matrix, created=self._created[slots], meta=np.array(meta))
+                os.replace(tmp_path, self.snapshot_path)
+            except (OSError, TypeError, ValueError) as e:
+                logger.warning(f"⚠️ No se pudo guardar el cache semántico: {e}")
+                return False
+            self._dirty = 0
+            self.stats['snapshots'] += 1
+        logger.debug(f"💾 Cache semántico guardado: {len(slots)} entradas")
+        return True
+
+    def load_snapshot(self) -> int:
+        """Cargar el volcado si corresponde al mismo modelo y a la versión de conocimiento actual"""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return 0
+        try:
+            with np.load(self.snapshot_path, allow_pickle=False) as data:
+                meta = json.loads(str(data['meta']))
+                matrix = data['matrix']
+                created = data['created']
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"⚠️ Snapshot del cache semántico ilegible: {e}")
+            return 0
+
+        if meta.get('model') != self.MODEL_NAME or meta.get('knowledge_version') != self._knowledge_version:
+            logger.info("🧹 Snapshot del cache semántico descartado (modelo o conocimiento distinto)")
+            return 0
+
+        now = time.time()
+        with self._lock:
+            # Si hay más entradas que capacidad se conservan las más recientes
+            order = np.argsort(created)[::-1][:self.max_entries]
+            for i in order:
+                if self.ttl > 0 and now - created[i] > self.ttl:
+                    continue
+                if self._matrix is None:
+                    self._matrix = np.zeros((self.max_entries, matrix.shape[1]), dtype=np.float32)
+                slot = len(self._slots)
+                query = meta['queries'][i]
+                self._matrix[slot] = matrix[i]
+                self._valid[slot] = True
+                self._created[slot] = created[i]
+                self._queries[slot] = query
+                self._responses[slot] = meta['responses'][i]
+                self._slots[query] = slot
+            loaded = len(self._slots)
+        logger.info(f"📂 Cache semántico restaurado: {loaded} entradas")
+        return loaded
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'size': len(self._slots),
+                'capacity': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'threshold': self.threshold,
+                'hit_rate': round(self.stats['hits'] / lookups, 3) if lookups else 0.0,
+                'knowledge_version': self._knowledge_version,
+                'dimension': int(self._matrix.shape[1]) if self._matrix is not None else None
+            }
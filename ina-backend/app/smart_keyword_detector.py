@@ -4,11 +4,13 @@ Sistema INTELIGENTE de detección de palabras clave con priorización y contexto
 Mejora la precisión para consultas de una sola palabra o frases simples.
 """
 
-import re
-import unicodedata
+import time
 from typing import Dict, List, Tuple, Optional
 import logging
 
+from app.keyword_automaton import (keyword_index, normalize_text, load_table_overrides, table_mtime,
+                                   KEYWORD_TABLES_CHECK_SECONDS)
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,7 +21,13 @@ class SmartKeywordDetector:
     - Detección de contexto
     - Mapeo directo a categorías
     - Soporte para consultas de una palabra
+
+    Las variaciones se normalizan una sola vez y se compilan en el índice compartido de
+    keywords (keyword_index); config/keywords/smart_keywords.json puede reemplazar o
+    agregar keywords y se recarga sin reiniciar (reload() o al detectar cambios).
     """
+
+    TABLE_FILE = 'smart_keywords.json'
     
     def __init__(self):
         # PRIORIDAD ALTA: Palabras que identifican claramente una categoría
@@ -531,20 +539,39 @@ class SmartKeywordDetector:
             "y", "o", "que", "mi", "tu", "su", "me", "te", "se", "como", "sobre",
             "quiero", "necesito", "ayuda", "es", "esta", "son", "hay"
         }
+
+        self._default_keywords = self.high_priority_keywords
+        self._table_mtime = None
+        self._checked_at = 0.0
+        self.reload()
     
     def normalize(self, text: str) -> str:
         """Normaliza texto: minúsculas, sin acentos, espacios limpios"""
-        text = text.lower().strip()
-        # Eliminar acentos
-        text = ''.join(
-            c for c in unicodedata.normalize('NFD', text)
-            if unicodedata.category(c) != 'Mn'
-        )
-        # Limpiar signos de puntuación
-        text = re.sub(r'[^\w\s]', ' ', text)
-        # Normalizar espacios
-        text = ' '.join(text.split())
-        return text
+        return normalize_text(text)
+
+    def reload(self) -> int:
+        """Recompilar la tabla de keywords (por defecto + config/keywords/smart_keywords.json)"""
+        overrides, self._table_mtime = load_table_overrides(self.TABLE_FILE)
+        self._checked_at = time.time()
+        self.high_priority_keywords = {**self._default_keywords, **overrides}
+
+        # Payload: (orden, keyword, variación original, variación normalizada)
+        entries = []
+        for keyword, config in self.high_priority_keywords.items():
+            for variation in config["variations"]:
+                normalized = self.normalize(variation)
+                entries.append((normalized, (len(entries), keyword, variation, normalized)))
+        keyword_index.set_table('smart', entries)
+        return len(entries)
+
+    def _maybe_reload(self):
+        now = time.time()
+        if now - self._checked_at < KEYWORD_TABLES_CHECK_SECONDS:
+            return
+        self._checked_at = now
+        if table_mtime(self.TABLE_FILE) != self._table_mtime:
+            logger.info("🔄 Tabla de keywords inteligentes modificada, recargando")
+            self.reload()
     
     def detect_keywords(self, query: str) -> Dict:
         """
@@ -560,54 +587,40 @@ class SmartKeywordDetector:
                 "all_matches": List[Dict]  # Todas las coincidencias encontradas
             }
         """
-        normalized = self.normalize(query)
-        words = [w for w in normalized.split() if w not in self.stop_words]
+        self._maybe_reload()
+        normalized, hits = keyword_index.scan(query)
+        words = {w for w in normalized.split() if w not in self.stop_words}
         
-        logger.info(f"🔍 Analizando: '{query}' → palabras: {words}")
+        logger.info(f"🔍 Analizando: '{query}' → palabras: {sorted(words)}")
         
-        # Detectar todas las coincidencias
+        # Variaciones presentes en la consulta (una pasada del autómata), en el orden de la tabla
+        found = sorted({payload for _, _, payload in hits.get('smart', ())})
         matches = []
         
-        for keyword, config in self.high_priority_keywords.items():
-            # Verificar si alguna variación está en la consulta
-            for variation in config["variations"]:
-                variation_normalized = self.normalize(variation)
-                
-                # MATCH EXACTO (máxima prioridad)
-                if variation_normalized == normalized:
-                    matches.append({
-                        "keyword": keyword,
-                        "matched_text": variation,
-                        "category": config["category"],
-                        "topic": config["topic"],
-                        "weight": config["weight"] + 20,  # Bonus por match exacto
-                        "match_type": "exact"
-                    })
-                    logger.info(f"✅ Match EXACTO: '{variation}' → {keyword}")
-                
-                # MATCH EN PALABRAS (alta prioridad)
-                elif variation_normalized in words:
-                    matches.append({
-                        "keyword": keyword,
-                        "matched_text": variation,
-                        "category": config["category"],
-                        "topic": config["topic"],
-                        "weight": config["weight"] + 10,  # Bonus por palabra completa
-                        "match_type": "word"
-                    })
-                    logger.info(f"✅ Match PALABRA: '{variation}' → {keyword}")
-                
-                # MATCH PARCIAL (menor prioridad)
-                elif variation_normalized in normalized:
-                    matches.append({
-                        "keyword": keyword,
-                        "matched_text": variation,
-                        "category": config["category"],
-                        "topic": config["topic"],
-                        "weight": config["weight"],
-                        "match_type": "partial"
-                    })
-                    logger.info(f"⚠️ Match PARCIAL: '{variation}' → {keyword}")
+        for _, keyword, variation, variation_normalized in found:
+            config = self.high_priority_keywords[keyword]
+            match = {
+                "keyword": keyword,
+                "matched_text": variation,
+                "category": config["category"],
+                "topic": config["topic"]
+            }
+            
+            # MATCH EXACTO (máxima prioridad)
+            if variation_normalized == normalized:
+                match.update(weight=config["weight"] + 20, match_type="exact")  # Bonus por match exacto
+                logger.info(f"✅ Match EXACTO: '{variation}' → {keyword}")
+            
+            # MATCH EN PALABRAS (alta prioridad)
+            elif variation_normalized in words:
+                match.update(weight=config["weight"] + 10, match_type="word")  # Bonus por palabra completa
+                logger.info(f"✅ Match PALABRA: '{variation}' → {keyword}")
+            
+            # MATCH PARCIAL (menor prioridad)
+            else:
+                match.update(weight=config["weight"], match_type="partial")
+                logger.info(f"⚠️ Match PARCIAL: '{variation}' → {keyword}")
+            matches.append(match)
         
         if not matches:
             logger.warning(f"❌ No se detectaron keywords en: '{query}'")
@@ -627,7 +640,7 @@ class SmartKeywordDetector:
         primary_match = matches[0]
         
         # Detectar contexto (verbo)
-        context = self._detect_context(query)
+        context = self._detect_context(query, normalized)
         
         # Calcular confianza
         confidence = min(100, primary_match["weight"])
@@ -649,9 +662,10 @@ class SmartKeywordDetector:
         
         return result
     
-    def _detect_context(self, query: str) -> Optional[str]:
+    def _detect_context(self, query: str, normalized: Optional[str] = None) -> Optional[str]:
         """Detecta el verbo/contexto de acción"""
-        normalized = self.normalize(query)
+        if normalized is None:
+            normalized = self.normalize(query)
         
         for context, verbs in self.context_verbs.items():
             for verb in verbs:
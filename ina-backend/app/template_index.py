@@ -0,0 +1,267 @@
+# app/template_index.py - Índice único de templates (TemplateManager, templates.py, EnhancedResponseGenerator)
+import importlib
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from app.keyword_automaton import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Paquetes por área en app/template_manager/<area>/templates_<idioma>.py (orden de TemplateManager)
+AREA_LANGUAGES = {
+    "institucionales": ("es", "en", "fr"),
+    "asuntos_estudiantiles": ("es", "en", "fr"),
+    "bienestar_estudiantil": ("es", "en", "fr"),
+    "desarrollo_laboral": ("es", "en", "fr"),
+    "deportes": ("es", "en", "fr"),
+    "pastoral": ("es", "en", "fr"),
+    "academico": ("es",),
+}
+# Orden de la búsqueda en todas las áreas cuando el área detectada no tiene el template
+FALLBACK_AREA_ORDER = (
+    "academico", "institucionales", "asuntos_estudiantiles", "bienestar_estudiantil",
+    "desarrollo_laboral", "deportes", "pastoral",
+)
+AREA_SOURCE = "template_manager"
+DEFAULT_LANGUAGE = "es"
+
+
+class TemplateEntry(NamedTuple):
+    source: str
+    area: Optional[str]
+    template_id: str
+    language: str
+    text: str
+
+
+def _area_pack_module(area: str, language: str) -> Tuple[str, str]:
+    return f"app.template_manager.{area}.templates_{language}", f"TEMPLATES_{language.upper()}"
+
+
+def _legacy_templates() -> Iterable[Tuple[Optional[str], str, str, str]]:
+    """TEMPLATES de app/templates.py: {categoría: {id: texto}} en español"""
+    from app.templates import TEMPLATES
+    for category, templates in TEMPLATES.items():
+        for template_id, text in templates.items():
+            yield category, template_id, DEFAULT_LANGUAGE, text
+
+
+def _multilingual_templates() -> Iterable[Tuple[Optional[str], str, str, str]]:
+    """MULTILINGUAL_TEMPLATES de app/templates.py: {id: {idioma: texto}}"""
+    from app.templates import MULTILINGUAL_TEMPLATES
+    for template_id, languages in MULTILINGUAL_TEMPLATES.items():
+        for language, text in languages.items():
+            yield None, template_id, language, text
+
+
+class TemplateIndex:
+    """
+    Punto único de acceso a los textos de templates.
+
+    - Los paquetes por área e idioma de `app/template_manager` se importan recién
+      cuando se piden (`area_templates`) o cuando se consulta su idioma por primera vez.
+    - Otras fuentes (TEMPLATES/MULTILINGUAL_TEMPLATES de templates.py, respuestas de
+      EnhancedResponseGenerator) se registran como cargadores perezosos.
+    - Toda fuente queda en un diccionario (fuente, id, idioma) → entradas en orden de
+      área, así que resolver un template es una búsqueda O(1) sin recorrer textos.
+    - Por idioma se construye un índice invertido token → entradas (id + texto
+      normalizados) para la búsqueda por palabras clave.
+    """
+
+    def __init__(self, area_languages: Dict[str, Tuple[str, ...]] = AREA_LANGUAGES):
+        self.area_languages = dict(area_languages)
+        self._packs: Dict[Tuple[str, str], Dict[str, str]] = {}
+        self._entries: Dict[Tuple[str, str, str], List[TemplateEntry]] = {}
+        self._indexed_languages: Set[str] = set()
+        # idioma → (entradas en orden canónico, token → posiciones)
+        self._search: Dict[str, Tuple[List[TemplateEntry], Dict[str, Set[int]]]] = {}
+        self._loaders: Dict[str, Callable[[], Iterable[Tuple[Optional[str], str, str, str]]]] = {}
+        self._loaded_sources: Set[str] = set()
+        self._lock = threading.RLock()
+        self.stats = {'lookups': 0, 'hits': 0, 'searches': 0, 'packs_loaded': 0, 'load_ms': 0.0}
+
+        self.register_source("templates", _legacy_templates)
+        self.register_source("multilingual", _multilingual_templates)
+
+    # ------------------------------------------------------------------ carga
+
+    def _add(self, entry: TemplateEntry):
+        self._entries.setdefault((entry.source, entry.template_id, entry.language), []).append(entry)
+
+    def area_templates(self, area: str, language: str = DEFAULT_LANGUAGE) -> Dict[str, str]:
+        """{id: texto} de un área e idioma (importa el paquete en el primer uso)"""
+        key = (area, language)
+        pack = self._packs.get(key)
+        if pack is not None:
+            return pack
+        with self._lock:
+            if key in self._packs:
+                return self._packs[key]
+            pack = {}
+            if language in self.area_languages.get(area, ()):
+                start = time.perf_counter()
+                module_name, attribute = _area_pack_module(area, language)
+                try:
+                    pack = getattr(importlib.import_module(module_name), attribute)
+                except (ImportError, AttributeError) as e:
+                    logger.error(f"❌ No se pudo cargar templates {area}/{language}: {e}")
+                elapsed = (time.perf_counter() - start) * 1000
+                self.stats['packs_loaded'] += 1
+                self.stats['load_ms'] += elapsed
+                logger.debug(f"📦 Templates {area}/{language} cargados: {len(pack)} en {elapsed:.1f}ms")
+            self._packs[key] = pack
+            return pack
+
+    def _ensure_language(self, language: str):
+        """Carga todos los paquetes de un idioma y los indexa (una vez por idioma)"""
+        if language in self._indexed_languages:
+            return
+        with self._lock:
+            if language in self._indexed_languages:
+                return
+            entries: List[TemplateEntry] = []
+            for area in self.area_languages:
+                for template_id, text in self.area_templates(area, language).items():
+                    entry = TemplateEntry(AREA_SOURCE, area, template_id, language, text)
+                    self._add(entry)
+                    entries.append(entry)
+
+            postings: Dict[str, Set[int]] = {}
+            for position, entry in enumerate(entries):
+                document = f"{entry.template_id.replace('_', ' ')} {entry.text}"
+                for token in set(normalize_text(document).split()):
+                    postings.setdefault(token, set()).add(position)
+
+            self._search[language] = (entries, postings)
+            self._indexed_languages.add(language)
+            logger.info(f"✅ Templates '{language}' indexados: {len(entries)} templates, {len(postings)} tokens")
+
+    def register_source(self, name: str, loader: Callable[[], Iterable[Tuple[Optional[str], str, str, str]]]):
+        """Registra una fuente perezosa que entrega tuplas (área, id, idioma, texto)"""
+        with self._lock:
+            self._loaders[name] = loader
+            if name in self._loaded_sources:
+                self._loaded_sources.discard(name)
+                for key in [key for key in self._entries if key[0] == name]:
+                    del self._entries[key]
+
+    def _ensure_source(self, name: str):
+        if name in self._loaded_sources:
+            return
+        with self._lock:
+            if name in self._loaded_sources:
+                return
+            loader = self._loaders.get(name)
+            if loader is not None:
+                try:
+                    for area, template_id, language, text in loader():
+                        self._add(TemplateEntry(name, area, template_id, language, text))
+                except Exception as e:
+                    logger.error(f"❌ Error cargando fuente de templates '{name}': {e}")
+            self._loaded_sources.add(name)
+
+    # -------------------------------------------------------------- consultas
+
+    def get_entries(self, template_id: str, language: str = DEFAULT_LANGUAGE,
+                    source: str = AREA_SOURCE) -> List[TemplateEntry]:
+        """Entradas de (fuente, id, idioma) en el orden de sus áreas"""
+        if source == AREA_SOURCE:
+            self._ensure_language(language)
+        else:
+            self._ensure_source(source)
+        return self._entries.get((source, template_id, language), [])
+
+    def get(self, template_id: str, language: str = DEFAULT_LANGUAGE,
+            area: Optional[str] = None, source: str = AREA_SOURCE) -> Optional[str]:
+        """Texto de un template por (id, idioma); con `area` solo se mira ese paquete"""
+        self.stats['lookups'] += 1
+        if source == AREA_SOURCE and area is not None:
+            text = self.area_templates(area, language).get(template_id)
+        else:
+            entries = self.get_entries(template_id, language, source)
+            if area is not None:
+                entries = [entry for entry in entries if entry.area == area]
+            text = entries[0].text if entries else None
+        if text:
+            self.stats['hits'] += 1
+        return text
+
+    def _first_area_entry(self, template_id: str, language: str) -> Optional[TemplateEntry]:
+        """Primera área de FALLBACK_AREA_ORDER con el template en `language` o en español"""
+        candidates = []
+        for lang in dict.fromkeys((language, DEFAULT_LANGUAGE)):
+            candidates.extend(self.get_entries(template_id, lang))
+        if not candidates:
+            return None
+        rank = {area: position for position, area in enumerate(FALLBACK_AREA_ORDER)}
+        return min(candidates, key=lambda entry: (rank.get(entry.area, len(rank)), entry.language != language))
+
+    def resolve(self, template_id: str, language: str = DEFAULT_LANGUAGE,
+                preferred_area: Optional[str] = None) -> Optional[TemplateEntry]:
+        """
+        Template para responder, con el mismo orden de fallback que usaba el RAG:
+
+        1. área preferida en el idioma pedido, luego en español
+        2. primera área (FALLBACK_AREA_ORDER) que lo tenga en el idioma o en español
+        3. TEMPLATES de templates.py (español)
+        4. MULTILINGUAL_TEMPLATES de templates.py (idioma pedido, luego español)
+        """
+        self.stats['lookups'] += 1
+        entry = None
+        if preferred_area:
+            for lang in dict.fromkeys((language, DEFAULT_LANGUAGE)):
+                text = self.area_templates(preferred_area, lang).get(template_id)
+                if text:
+                    entry = TemplateEntry(AREA_SOURCE, preferred_area, template_id, lang, text)
+                    break
+        if entry is None:
+            entry = self._first_area_entry(template_id, language)
+        if entry is None:
+            legacy = self.get_entries(template_id, DEFAULT_LANGUAGE, "templates")
+            entry = next((candidate for candidate in legacy if candidate.text), None)
+        if entry is None:
+            for lang in dict.fromkeys((language, DEFAULT_LANGUAGE)):
+                multilingual = self.get_entries(template_id, lang, "multilingual")
+                if multilingual and multilingual[0].text:
+                    entry = multilingual[0]
+                    break
+        if entry is not None:
+            self.stats['hits'] += 1
+        return entry
+
+    def search(self, keywords: str, language: str = DEFAULT_LANGUAGE, limit: Optional[int] = None) -> List[TemplateEntry]:
+        """Templates cuyo id o texto contienen todos los tokens de `keywords` (orden de TemplateManager)"""
+        self.stats['searches'] += 1
+        tokens = normalize_text(keywords or '').split()
+        if not tokens:
+            return []
+        self._ensure_language(language)
+        entries, postings = self._search[language]
+
+        matches: Optional[Set[int]] = None
+        for token in sorted(set(tokens), key=lambda t: len(postings.get(t, ()))):
+            found = postings.get(token)
+            if not found:
+                return []
+            matches = set(found) if matches is None else matches & found
+            if not matches:
+                return []
+        ordered = [entries[position] for position in sorted(matches)]
+        return ordered[:limit] if limit else ordered
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            'load_ms': round(self.stats['load_ms'], 1),
+            'packs_cached': sorted(f"{area}/{lang}" for (area, lang) in self._packs),
+            'indexed_languages': sorted(self._indexed_languages),
+            'loaded_sources': sorted(self._loaded_sources),
+            'entries': sum(len(entries) for entries in self._entries.values()),
+            'tokens': {lang: len(postings) for lang, (_, postings) in self._search.items()},
+        }
+
+
+# Instancia global
+template_index = TemplateIndex()
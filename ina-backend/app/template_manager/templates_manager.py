@@ -8,32 +8,7 @@ import logging
 import re
 from typing import Dict, Optional, Union, List
 
-# Importar templates por área e idioma
-from .asuntos_estudiantiles.templates_es import TEMPLATES_ES as ASUNTOS_ES
-from .asuntos_estudiantiles.templates_en import TEMPLATES_EN as ASUNTOS_EN
-from .asuntos_estudiantiles.templates_fr import TEMPLATES_FR as ASUNTOS_FR
-
-from .bienestar_estudiantil.templates_es import TEMPLATES_ES as BIENESTAR_ES
-from .bienestar_estudiantil.templates_en import TEMPLATES_EN as BIENESTAR_EN
-from .bienestar_estudiantil.templates_fr import TEMPLATES_FR as BIENESTAR_FR
-
-from .desarrollo_laboral.templates_es import TEMPLATES_ES as DESARROLLO_ES
-from .desarrollo_laboral.templates_en import TEMPLATES_EN as DESARROLLO_EN
-from .desarrollo_laboral.templates_fr import TEMPLATES_FR as DESARROLLO_FR
-
-from .deportes.templates_es import TEMPLATES_ES as DEPORTES_ES
-from .deportes.templates_en import TEMPLATES_EN as DEPORTES_EN
-from .deportes.templates_fr import TEMPLATES_FR as DEPORTES_FR
-
-from .pastoral.templates_es import TEMPLATES_ES as PASTORAL_ES
-from .pastoral.templates_en import TEMPLATES_EN as PASTORAL_EN
-from .pastoral.templates_fr import TEMPLATES_FR as PASTORAL_FR
-
-from .institucionales.templates_es import TEMPLATES_ES as INSTITUCIONALES_ES
-from .institucionales.templates_en import TEMPLATES_EN as INSTITUCIONALES_EN
-from .institucionales.templates_fr import TEMPLATES_FR as INSTITUCIONALES_FR
-
-from .academico.templates_es import TEMPLATES_ES as ACADEMICO_ES
+from app.template_index import template_index
 
 logger = logging.getLogger(__name__)
 
@@ -56,51 +31,27 @@ class TemplateManager:
     """
     
     def __init__(self):
-        # Estructura organizada: {area: {idioma: templates}}
-        self.templates = {
-            "institucionales": {
-                "es": INSTITUCIONALES_ES,
-                "en": INSTITUCIONALES_EN,
-                "fr": INSTITUCIONALES_FR
-            },
-            "asuntos_estudiantiles": {
-                "es": ASUNTOS_ES,
-                "en": ASUNTOS_EN,
-                "fr": ASUNTOS_FR
-            },
-            "bienestar_estudiantil": {
-                "es": BIENESTAR_ES,
-                "en": BIENESTAR_EN,
-                "fr": BIENESTAR_FR
-            },
-            "desarrollo_laboral": {
-                "es": DESARROLLO_ES,
-                "en": DESARROLLO_EN,
-                "fr": DESARROLLO_FR
-            },
-            "deportes": {
-                "es": DEPORTES_ES,
-                "en": DEPORTES_EN,
-                "fr": DEPORTES_FR
-            },
-            "pastoral": {
-                "es": PASTORAL_ES,
-                "en": PASTORAL_EN,
-                "fr": PASTORAL_FR
-            },
-            "academico": {
-                "es": ACADEMICO_ES,
-                "en": {},
-                "fr": {}
-            }
+        # Los paquetes por área e idioma se importan perezosamente desde el índice único
+        self.index = template_index
+        self._combined_templates = None
+        logger.info(f"TemplateManager inicializado: {len(self.index.area_languages)} áreas (carga perezosa por idioma)")
+
+    @property
+    def templates(self) -> Dict[str, Dict[str, Dict[str, str]]]:
+        """
+        Estructura completa {area: {idioma: templates}}.
+        Carga todos los paquetes; las consultas puntuales deben usar get_template / get_area_templates.
+        """
+        return {
+            area: {lang: self.index.area_templates(area, lang) for lang in self.get_available_languages()}
+            for area in self.index.area_languages
         }
-        
-        # Templates combinados para compatibilidad con código existente
-        self.combined_templates = self._create_combined_templates()
-        
-        # Validar y registrar templates cargados
-        self._validate_templates()
-        logger.info(f"TemplateManager inicializado: {self.get_template_statistics()}")
+
+    @property
+    def combined_templates(self) -> Dict[str, Dict[str, str]]:
+        if self._combined_templates is None:
+            self._combined_templates = self._create_combined_templates()
+        return self._combined_templates
     
     def _create_combined_templates(self) -> Dict[str, Dict[str, str]]:
         """
@@ -109,11 +60,9 @@ class TemplateManager:
         """
         combined = {}
         
-        for area, idiomas in self.templates.items():
-            combined[area] = {}
+        for area in self.index.area_languages:
             # Por defecto usa español, puede extenderse para otros idiomas
-            if "es" in idiomas:
-                combined[area].update(idiomas["es"])
+            combined[area] = dict(self.index.area_templates(area, "es"))
         
         return combined
     
@@ -131,7 +80,7 @@ class TemplateManager:
         """
         try:
             # Intentar obtener en el idioma solicitado
-            template = self.templates.get(area, {}).get(lang, {}).get(template_key)
+            template = self.index.area_templates(area, lang).get(template_key)
             
             if template:
                 logger.debug(f"Template encontrado: {area}.{template_key}.{lang}")
@@ -139,7 +88,7 @@ class TemplateManager:
             
             # Fallback a español si no existe en el idioma solicitado
             if lang != "es":
-                template = self.templates.get(area, {}).get("es", {}).get(template_key)
+                template = self.index.area_templates(area, "es").get(template_key)
                 if template:
                     logger.info(f"Fallback a español: {area}.{template_key} ({lang}→es)")
                     return template
@@ -163,7 +112,7 @@ class TemplateManager:
         Returns:
             Diccionario con todos los templates del área
         """
-        return self.templates.get(area, {}).get(lang, {})
+        return self.index.area_templates(area, lang)
     
     def get_all_templates_by_lang(self, lang: str = "es") -> Dict[str, Dict[str, str]]:
         """
@@ -176,7 +125,7 @@ class TemplateManager:
             Diccionario con estructura {area: {template_key: content}}
         """
         result = {}
-        for area in self.templates:
+        for area in self.index.area_languages:
             result[area] = self.get_area_templates(area, lang)
         return result
     
@@ -184,6 +133,9 @@ class TemplateManager:
         """
         Busca templates que contengan palabras clave específicas.
         
+        Usa el índice invertido de tokens (clave + contenido, sin acentos ni puntuación):
+        un template coincide si contiene todas las palabras de `keywords`.
+        
         Args:
             keywords: Palabras clave a buscar
             lang: Idioma
@@ -191,19 +143,15 @@ class TemplateManager:
         Returns:
             Tupla (area, template_key, content) del primer match encontrado
         """
-        keywords_lower = keywords.lower()
-        
-        for area, idiomas in self.templates.items():
-            if lang in idiomas:
-                for template_key, content in idiomas[lang].items():
-                    if keywords_lower in template_key.lower() or keywords_lower in content.lower():
-                        return (area, template_key, content)
-        
-        return None
+        matches = self.index.search(keywords, lang, limit=1)
+        if not matches:
+            return None
+        entry = matches[0]
+        return (entry.area, entry.template_id, entry.text)
     
     def get_available_areas(self) -> list:
         """Retorna lista de áreas disponibles."""
-        return list(self.templates.keys())
+        return list(self.index.area_languages)
     
     def get_available_languages(self) -> list:
         """Retorna lista de idiomas disponibles."""
@@ -280,11 +228,11 @@ class TemplateManager:
         matches = []
         partial_lower = partial_key.lower()
         
-        areas_to_search = [area] if area else self.templates.keys()
+        areas_to_search = [area] if area else self.index.area_languages
         
         for search_area in areas_to_search:
-            if search_area in self.templates and lang in self.templates[search_area]:
-                for template_key, content in self.templates[search_area][lang].items():
+            if search_area in self.index.area_languages:
+                for template_key, content in self.index.area_templates(search_area, lang).items():
                     if partial_lower in template_key.lower():
                         matches.append((search_area, template_key, content))
         
@@ -301,8 +249,11 @@ def get_templates() -> Dict[str, Dict[str, str]]:
     """
     return template_manager.get_combined_templates()
 
-# Alias para el diccionario TEMPLATES original
-TEMPLATES = template_manager.get_combined_templates()
+# Alias para el diccionario TEMPLATES original (se construye en el primer acceso)
+def __getattr__(name: str):
+    if name == "TEMPLATES":
+        return template_manager.get_combined_templates()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Funciones de utilidad para el nuevo sistema
 def get_template_multilang(area: str, template_key: str, lang: str = "es") -> Optional[str]:
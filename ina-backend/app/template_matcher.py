@@ -0,0 +1,163 @@
+# app/template_matcher.py - Matcher precompilado de templates (prefiltro Aho-Corasick + regex compiladas)
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import re._parser as sre_parse
+    from re._constants import (LITERAL, SUBPATTERN, MAX_REPEAT, MIN_REPEAT, POSSESSIVE_REPEAT)
+except ImportError:  # Python < 3.11
+    import sre_parse
+    from sre_constants import LITERAL, SUBPATTERN, MAX_REPEAT, MIN_REPEAT
+    POSSESSIVE_REPEAT = None
+
+from app.aho_corasick import AhoCorasick
+from app.template_patterns import PRIORITY_TEMPLATE_PATTERNS, TEMPLATE_PATTERNS
+
+logger = logging.getLogger(__name__)
+
+_REPEATS = {MAX_REPEAT, MIN_REPEAT, POSSESSIVE_REPEAT} - {None}
+
+
+def required_literals(pattern: str) -> List[str]:
+    """
+    Fragmentos literales que deben aparecer en cualquier texto que coincida con `pattern`.
+
+    Solo se consideran literales en secuencia obligatoria (fuera de alternativas, clases de
+    caracteres, repeticiones opcionales y lookarounds). Si no se puede asegurar nada
+    (p.ej. flags de mayúsculas) retorna lista vacía y el patrón se evalúa siempre.
+    """
+    parsed = sre_parse.parse(pattern)
+    if getattr(parsed.state, 'flags', 0) & re.IGNORECASE:
+        return []
+
+    runs: List[str] = []
+    current: List[str] = []
+
+    def flush():
+        if current:
+            runs.append(''.join(current))
+            current.clear()
+
+    def walk(items):
+        for op, av in items:
+            if op is LITERAL:
+                current.append(chr(av))
+            elif op is SUBPATTERN:
+                walk(av[-1])
+            elif op in _REPEATS:
+                min_count, _, inner = av
+                flush()
+                if min_count >= 1:
+                    walk(inner)
+                    flush()
+            else:
+                # BRANCH, IN, ANY, AT, ASSERT, ASSERT_NOT, ...: cortan la secuencia literal
+                flush()
+
+    walk(parsed)
+    flush()
+    return runs
+
+
+class TemplateMatcher:
+    """
+    Reglas de templates compiladas una vez, evaluadas en el mismo orden que la lista original.
+
+    Cada regex aporta su literal obligatorio más largo como "ancla"; un autómata
+    Aho-Corasick encuentra en una sola pasada qué anclas aparecen en la consulta y solo
+    esas reglas (más las que no tienen ancla) se evalúan, en su orden de prioridad. Como
+    una regex no puede coincidir sin su ancla, el resultado es idéntico a probarlas todas.
+    """
+
+    def __init__(self, rule_groups: Sequence[Tuple[str, Dict[str, List[str]]]]):
+        start = time.perf_counter()
+        self._rules: List[Tuple[str, str, str, re.Pattern]] = []  # (grupo, template, patrón, regex)
+        self._always: List[int] = []
+        self._by_anchor: Dict[str, List[int]] = {}
+        self._automaton = AhoCorasick()
+        self._lock = threading.Lock()
+
+        for group, templates in rule_groups:
+            for template_id, patterns in templates.items():
+                for pattern in patterns:
+                    try:
+                        compiled = re.compile(pattern)
+                    except re.error as e:
+                        logger.warning(f"⚠️ Patrón de template inválido ({template_id}): {pattern} - {e}")
+                        continue
+                    index = len(self._rules)
+                    self._rules.append((group, template_id, pattern, compiled))
+
+                    literals = required_literals(pattern)
+                    if not literals:
+                        self._always.append(index)
+                        continue
+                    anchor = max(literals, key=len)
+                    if anchor not in self._by_anchor:
+                        self._by_anchor[anchor] = []
+                        self._automaton.add(anchor)
+                    self._by_anchor[anchor].append(index)
+
+        self._automaton.build()
+        self.build_ms = (time.perf_counter() - start) * 1000
+        self.template_counts: Counter = Counter()
+        self.stats = {
+            'lookups': 0,
+            'matches': 0,
+            'regex_evaluations': 0,
+            'lookup_us': 0.0
+        }
+        logger.info(f"✅ Template matcher compilado: {len(self._rules)} patrones, "
+                    f"{len(self._by_anchor)} anclas, {len(self._always)} sin ancla en {self.build_ms:.1f}ms")
+
+    def match(self, text: str) -> Optional[Tuple[str, str, str]]:
+        """Primer (grupo, template_id, patrón) que coincide con `text` según el orden original"""
+        start = time.perf_counter()
+        candidates = set(self._always)
+        for anchor in self._automaton.find_values(text):
+            candidates.update(self._by_anchor[anchor])
+
+        result = None
+        evaluated = 0
+        for index in sorted(candidates):
+            evaluated += 1
+            group, template_id, pattern, compiled = self._rules[index]
+            if compiled.search(text):
+                result = (group, template_id, pattern)
+                break
+
+        elapsed_us = (time.perf_counter() - start) * 1_000_000
+        with self._lock:
+            self.stats['lookups'] += 1
+            self.stats['regex_evaluations'] += evaluated
+            self.stats['lookup_us'] += elapsed_us
+            if result:
+                self.stats['matches'] += 1
+                self.template_counts[result[1]] += 1
+        return result
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self.stats['lookups']
+            return {
+                'patterns': len(self._rules),
+                'anchors': len(self._by_anchor),
+                'patterns_without_anchor': len(self._always),
+                'build_ms': round(self.build_ms, 2),
+                'lookups': lookups,
+                'matches': self.stats['matches'],
+                'avg_regex_evaluations': round(self.stats['regex_evaluations'] / lookups, 2) if lookups else 0.0,
+                'avg_lookup_us': round(self.stats['lookup_us'] / lookups, 1) if lookups else 0.0,
+                'template_matches': dict(self.template_counts.most_common())
+            }
+
+
+# Instancia global: prioritarios primero, luego el resto (mismo orden que antes)
+template_matcher = TemplateMatcher([
+    ('priority', PRIORITY_TEMPLATE_PATTERNS),
+    ('template', TEMPLATE_PATTERNS),
+])
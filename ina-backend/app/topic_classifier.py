@@ -1,9 +1,11 @@
 # topic_classifier.py
 import logging
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import re
 import unicodedata
 from .keyword_extractor import keyword_extractor
+from .category_index import CategoryKeywordIndex
+from .language_id import detect_language, language_identifier
 
 logger = logging.getLogger(__name__)
 
@@ -389,6 +391,12 @@ class TopicClassifier:
         }
         # =======================================================
 
+        # Índice invertido de ambas tablas: una pasada por la consulta en vez de recorrer cada lista
+        self.keyword_index = CategoryKeywordIndex({
+            'allowed': self.allowed_categories,
+            'redirect': self.redirect_categories
+        })
+
     def classify_topic(self, question: str) -> Dict:
         """Clasifica un tópico usando coincidencias de palabras clave con soporte multilingüe"""
         question_lower = question.lower().strip()
@@ -401,12 +409,15 @@ class TopicClassifier:
         if special_match:
             return special_match
         
+        # Keywords presentes en la consulta, agrupadas por (tabla, categoría, idioma)
+        hits = self.keyword_index.lookup(question_lower)
+        
         # Buscar coincidencias por idioma específico
         for category, keywords_data in self.allowed_categories.items():
             if isinstance(keywords_data, dict):  # Estructura multilingüe (bienestar_estudiantil)
                 # Buscar en el idioma detectado primero
                 if detected_language in keywords_data:
-                    matches = self._find_category_match_by_language(question_lower, keywords_data[detected_language])
+                    matches = hits.get(('allowed', category, detected_language))
                     if matches:
                         return {
                             "is_institutional": True,
@@ -418,9 +429,9 @@ class TopicClassifier:
                         }
                 
                 # Si no hay coincidencias en el idioma detectado, buscar en otros idiomas
-                for lang, terms in keywords_data.items():
+                for lang in keywords_data:
                     if lang != detected_language:
-                        matches = self._find_category_match_by_language(question_lower, terms)
+                        matches = hits.get(('allowed', category, lang))
                         if matches:
                             return {
                                 "is_institutional": True,
@@ -431,7 +442,7 @@ class TopicClassifier:
                                 "message": f"Pregunta permitida - {category.replace('_', ' ').title()} ({lang.upper()})"
                             }
             else:  # Estructura simple (lista)
-                matches = self._find_category_match_by_language(question_lower, keywords_data)
+                matches = hits.get(('allowed', category, None))
                 if matches:
                     return {
                         "is_institutional": True,
@@ -443,7 +454,7 @@ class TopicClassifier:
                     }
         
         # Buscar en categorías de redirección
-        redirect_match = self._find_category_match(question_lower, self.redirect_categories)
+        redirect_match = self._best_redirect_match(hits)
         if redirect_match:
             return {
                 "is_institutional": False,
@@ -464,433 +475,8 @@ class TopicClassifier:
         }
     
     def _detect_simple_language(self, question: str) -> str:
-        """Detección corregida de idioma con prioridad correcta para español"""
-        question_lower = question.lower()
-        
-        # ================================================================
-        # PASO 1: DETECCIÓN DIRECTA DE CONSULTAS FRANCESAS INEQUÍVOCAS
-        # ================================================================
-        ultra_specific_french_queries = [
-            'comment fonctionne l\'assurance',
-            'comment fonctionne assurance',
-            'comment renouveler ma tne',
-            'comment obtenir ma tne',
-            'quelles sont les catégories',
-            'programme d\'urgence',
-            'quand puis-je postuler',
-            'informations sur les programmes',
-            'conditions pour postuler',
-            'elle est perdue ou endommagée',
-            'programmes de soutien aux étudiants',
-            'offrez-vous des simulations d\'entretiens d\'embauche',
-            'offrez-vous des simulations d\'entretiens'
-        ]
-        
-        # RETORNO INMEDIATO solo para consultas 100% francesas
-        for direct_query in ultra_specific_french_queries:
-            if direct_query in question_lower:
-                print(f"   🔥 ULTRA-SPECIFIC FRENCH MATCH: '{direct_query}' -> FORCING FRENCH")
-                return 'fr'
-        
-        # PASO 1.1: DETECCIÓN DIRECTA DE CONSULTAS INGLESAS INEQUÍVOCAS
-        # ================================================================
-        ultra_specific_english_queries = [
-            'where can i access the duoc uc job bank',
-            'duoc uc job bank access',
-            'access duoc uc job bank'
-        ]
-        
-        # RETORNO INMEDIATO solo para consultas 100% inglesas específicas
-        for direct_query in ultra_specific_english_queries:
-            if direct_query in question_lower:
-                print(f"   🔥 ULTRA-SPECIFIC ENGLISH MATCH: '{direct_query}' -> FORCING ENGLISH")
-                return 'en'
-        
-        # ================================================================
-        # PASO 2: IDENTIFICADORES ESPAÑOLES FUERTES (PRIORIDAD MÁXIMA)
-        # ================================================================
-        strong_spanish_indicators = {
-            # Signos de puntuación españoles
-            '¿': 50,    # Pregunta española - INDICADOR MÁS FUERTE
-            '¡': 40,    # Exclamación española
-            
-            # Interrogativos españoles específicos
-            'qué': 25,      # Con acento español
-            'cómo': 25,     # Con acento español
-            'cuándo': 25,   # Con acento español
-            'dónde': 25,    # Con acento español
-            'cuáles': 25,   # Con acento español
-            'cuántos': 25,  # Con acento español
-            'cuántas': 25,  # Con acento español
-            
-            # Verbos españoles comunes
-            'puedo': 20,    # Primera persona singular
-            'debo': 20,     # Primera persona singular
-            'tengo': 20,    # Primera persona singular
-            'necesito': 20, # Primera persona singular
-            'quiero': 20,   # Primera persona singular
-            'sé': 15,       # Sé con acento
-            'está': 15,     # Está con acento
-            'estás': 15,    # Estás con acento
-            
-            # Contexto institucional español (PESO REDUCIDO cuando hay inglés)
-            'duoc uc': 15,      # REDUCIDO de 30 a 15 para evitar conflictos con inglés
-            'en duoc': 30,      # En la institución (claramente español)
-            'estudiante': 25,   # Sin s final (vs étudiants)
-            'psicólogo': 25,    # Término académico español
-            'atención': 20,     # Servicio español
-            'sesiones': 20,     # Plural español
-            'apoyo': 20,        # Servicio español
-            'curso': 15,        # Educativo español
-            'embajadores': 20,  # Programa específico
-            
-            # Artículos y conectores españoles
-            ' de la ': 15, ' del ': 15, ' con el ': 15,
-            ' al ': 10, ' para ': 10, ' por ': 10,
-        }
-        
-        # ================================================================
-        # PASO 3: IDENTIFICADORES FRANCESES ESPECÍFICOS
-        # ================================================================
-        specific_french_indicators = {
-            # Interrogativos franceses únicos
-            'comment': 25,  # Cómo en francés
-            'quelles': 25,  # Plural femenino francés
-            'quels': 25,    # Plural masculino francés
-            'quand': 20,    # Cuándo en francés
-            'puis-je': 35,  # Construcción única francesa
-            'combien': 25,  # Cuánto en francés
-            
-            # Verbos franceses específicos
-            'fonctionne': 25, # Funciona en francés
-            'renouveler': 25, # Renovar en francés
-            'obtenir': 25,    # Obtener en francés
-            'postuler': 25,   # Postular en francés
-            'savoir': 20,     # Saber en francés
-            'terminer': 20,   # Terminar en francés
-            'terminé': 25,    # Terminado en francés
-            'commencer': 20,  # Comenzar en francés
-            'commencé': 25,   # Comenzado en francés
-            'passer': 15,     # Pasar en francés
-            'fournir': 25,    # Proporcionar en francés
-            'traverser': 20,  # Atravesar en francés
-            'traverse': 20,   # Atraviesa en francés
-            
-            # Sustantivos franceses únicos
-            'assurance': 25,     # Seguro en francés
-            'programme': 20,     # Sin acento (vs programa)
-            'bourses': 30,       # Becas en francés - ADDED
-            'bourse': 25,        # Beca singular en francés - ADDED
-            'sportives': 25,     # Deportivas en francés - ADDED
-            'urgence': 20,       # Urgencia en francés
-            'informations': 20,  # Plural francés
-            'soutien': 25,       # Apoyo en francés
-            'étudiants': 30,     # Con acento francés y plural
-            'responsabilité': 30, # Responsabilidad francés
-            'supplémentaire': 25, # Adicional francés
-            'ambassadeurs': 30,   # Embajadores francés
-            'cours': 8,          # Curso francés (reducido para evitar conflicto con 'course')
-            'module': 8,         # Módulo francés (reducido porque también existe en inglés)
-            'suivant': 15,        # Siguiente francés
-            'soins': 25,          # Cuidados francés
-            'psychologiques': 30, # Psicológicos francés
-            'psychologue': 25,    # Psicólogo francés
-            'virtuel': 20,        # Virtual francés
-            'présentiel': 25,     # Presencial francés
-            'sessions': 20,       # Sesiones francés
-            'maladie': 25,        # Enfermedad francés
-            'arrêt': 25,          # Detención francés
-            'crise': 25,          # Crisis francés
-            'camarade': 25,       # Compañero francés
-            'moment': 15,         # Momento francés
-            'mauvais': 20,        # Malo francés
-            'campus': 10,         # Campus (común pero en contexto)
-            'aide': 15,           # Ayuda francés
-            'handicapés': 30,     # Discapacitados francés
-            
-            # Construcciones francesas específicas
-            'd\'urgence': 35,    # Ultra-específico francés
-            'l\'assurance': 35,  # Ultra-específico francés
-            'aux étudiants': 35, # A los estudiantes francés
-            'ai-je': 30,         # Tengo yo francés
-            'j\'ai': 25,         # Yo he francés
-            'peut-il': 30,       # Puede él francés
-            'dois-je': 30,       # Debo yo francés
-            'existe-t-il': 35,   # Existe él francés
-            'ne peux pas': 25,   # No puedo francés
-            'ne veut pas': 25,   # No quiere francés
-            'mais je': 20,       # Pero yo francés
-            'si je': 15,         # Si yo francés
-            'que je': 15,        # Que yo francés
-            'me sens': 20,       # Me siento francés
-            'un arrêt': 30,      # Un alto francés
-            'le psychologue': 30, # El psicólogo francés
-            
-            # Artículos y conectores franceses
-            'pour': 8,  # Para en francés (BAJO - puede confundirse)
-            'sur': 8,   # Sobre en francés (BAJO)
-            # 'des': 10,  # ELIMINADO - aparece en palabras españolas como "consejos para mejorar mi habilidades"
-            'sont': 15, # Son/están en francés
-            'avec': 12, # Con en francés
-            'sans': 12, # Sin en francés
-            'dans': 10, # En francés
-            'mais': 15, # Pero francés
-            'après': 15, # Después francés
-            'avoir': 15, # Tener francés (infinitivo)
-        }
-        
-        # ================================================================
-        # PASO 4: IDENTIFICADORES INGLESES (PESO AUMENTADO)
-        # ================================================================
-        english_indicators = {
-            # Interrogativos ingleses
-            'what': 25,
-            'how': 25,
-            'when': 25,
-            'where': 25,
-            'why': 25,
-            'which': 25,
-            'who': 25,
-            
-            # Auxiliares ingleses (CRÍTICOS)
-            # 'do' REMOVIDO - causa falsos positivos con español (puedo, donde, etc.)
-            'does': 25,
-            'did': 25,
-            'will': 25,
-            'would': 20,
-            'could': 20,
-            'should': 20,
-            'must': 20,
-            
-            # Estructuras inglesas
-            'is there': 30,
-            'are there': 30,
-            'can i': 25,
-            'do i': 25,
-            'does': 20,
-            'would': 20,
-            'could': 20,
-            'should': 20,
-            
-            # Palabras específicamente inglesas
-            'support': 20,
-            'supports': 20,
-            'service': 20,
-            'available': 18,
-            'provide': 15,
-            'offer': 15,
-            'help': 12,
-            'information': 12,
-            'mental': 15,
-            'health': 15,
-            'care': 15,
-            'psychological': 18,
-            'responsibility': 15,
-            'additional': 12,
-            'completing': 15,
-            'course': 18,        # Curso inglés (aumentado para dominar sobre 'cours')
-            'module': 12,        # Módulo en inglés
-            'started': 15,       # Comenzado en inglés  
-            'can\'t': 15,        # No puedo en inglés
-            'advance': 15,       # Avanzar en inglés
-            'next': 12,          # Siguiente en inglés
-            'after': 10,
-            'any': 8,
-            'have': 8,
-            'student': 15, 
-            'insurance': 15, 
-            'emergency': 15,
-            'programs': 12, 
-            'categories': 12,
-            'apply': 12, 
-            'obtain': 12, 
-            'renew': 15, 
-            'can': 8,
-            # SPORTS-SPECIFIC ENGLISH WORDS
-            'workshops': 20,     # Talleres en inglés
-            'grades': 18,        # Notas en inglés  
-            'electives': 20,     # Optativos en inglés
-            'unenroll': 25,      # Des-inscribirse en inglés
-            'schedule': 18,      # Horario en inglés
-            'teams': 15,         # Equipos en inglés
-            'team': 15,          # Equipo en inglés
-            'scholarships': 20,  # Becas en inglés
-            'scholarship': 20,   # Beca en inglés
-            'miss': 15,          # Faltar en inglés
-            'gym': 15,           # Gimnasio en inglés
-            'sports': 15,        # Deportes en inglés
-            # CAREER DEVELOPMENT ENGLISH KEYWORDS
-            'career': 20,        # Carrera/desarrollo profesional
-            'resume': 20,        # Currículum en inglés
-            'internship': 25,    # Práctica profesional
-            'internships': 25,   # Prácticas profesionales
-            'interview': 20,     # Entrevista
-            'interviews': 20,    # Entrevistas
-            'simulation': 18,    # Simulación
-            'simulations': 18,   # Simulaciones
-            'employability': 25, # Empleabilidad
-            'job': 15,           # Trabajo
-            'employment': 20,    # Empleo
-            'portal': 18,        # Portal
-            'benefits': 15,      # Beneficios
-            'graduates': 20,     # Graduados/titulados
-            'development': 20,   # Desarrollo
-            'professional': 20,  # Profesional
-            'enroll': 18,        # Inscribirse en inglés
-            'located': 15,       # Ubicado en inglés
-            'sports': 15,        # Deportes en inglés
-            'time': 10,          # Tiempo en inglés
-            'teachers': 12       # Profesores en inglés
-        }
-        
-        # ================================================================
-        # PASO 5: CÁLCULO DE SCORES CORREGIDO
-        # ================================================================
-        spanish_score = 0
-        french_score = 0
-        english_score = 0
-        
-        # Calcular puntuación española
-        for indicator, weight in strong_spanish_indicators.items():
-            if indicator in question_lower:
-                spanish_score += weight
-                print(f"   🇪🇸 SPANISH KEYWORD: '{indicator}' +{weight} points")
-        
-        # Calcular puntuación francesa
-        for indicator, weight in specific_french_indicators.items():
-            if indicator in question_lower:
-                french_score += weight
-                print(f"   🇫🇷 FRENCH KEYWORD: '{indicator}' +{weight} points")
-        
-        # Calcular puntuación inglesa
-        for indicator, weight in english_indicators.items():
-            if indicator in question_lower:
-                english_score += weight
-                print(f"   🇺🇸 ENGLISH KEYWORD: '{indicator}' +{weight} points")
-        
-        # ================================================================
-        # PASO 6: MANEJO ESPECIAL DE ACENTOS (PROBLEMA PRINCIPAL)
-        # ================================================================
-        # Los acentos españoles NO deben dar puntos al francés
-        spanish_accents = ['ó', 'á', 'í', 'ú', 'ñ']  # Acentos típicamente españoles
-        french_accents = ['è', 'ê', 'à', 'ù', 'ç', 'ô', 'î', 'ï', 'ë', 'ü', 'é']  # Acentos típicamente franceses
-        
-        # Detectar patrones específicos de acentos franceses
-        french_accent_patterns = ['é', 'è', 'ê', 'à', 'ù', 'ç', 'ô', 'î', 'ï', 'ë', 'ü']
-        spanish_context_words = ['qué', 'psicólog', 'médi', 'sé', 'está', 'estás']
-        
-        # Solo contar acentos franceses si NO hay contexto español fuerte
-        has_spanish_context = any(word in question_lower for word in spanish_context_words)
-        
-        if not has_spanish_context and spanish_score < 20:  # Solo si no hay contexto español
-            french_accent_count = sum(1 for char in french_accent_patterns if char in question_lower)
-            if french_accent_count > 0:
-                accent_bonus = french_accent_count * 8  # Incrementado para francés
-                french_score += accent_bonus
-                print(f"   ✨ FRENCH ACCENTS: {french_accent_count} accents +{accent_bonus} points")
-        
-        # Bonus por acentos españoles
-        spanish_accent_count = sum(1 for char in spanish_accents if char in question_lower)
-        if spanish_accent_count > 0:
-            spanish_accent_bonus = spanish_accent_count * 10
-            spanish_score += spanish_accent_bonus
-            print(f"   🇪🇸 SPANISH ACCENTS: {spanish_accent_count} accents +{spanish_accent_bonus} points")
-        
-        # ================================================================
-        # PASO 7: PENALIZACIONES POR CONFUSIÓN Y BONIFICACIONES FRANCESAS
-        # ================================================================
-        # Si detectamos "é" en contexto español, penalizar francés
-        if 'é' in question_lower and any(esp_word in question_lower for esp_word in ['qué', 'psicólog', 'médi']):
-            french_penalty = 15
-            french_score -= french_penalty
-            print(f"   ⛔ FRENCH PENALTY FOR SPANISH CONTEXT: -{french_penalty} points")
-        
-        # Si detectamos "est" en contexto español (como "existe"), penalizar francés
-        if 'est' in question_lower and any(esp_word in question_lower for esp_word in ['exist', 'cuest', 'contest']):
-            french_penalty = 10
-            french_score -= french_penalty
-            print(f"   ⛔ FRENCH 'EST' PENALTY IN SPANISH CONTEXT: -{french_penalty} points")
-        
-        # Si detectamos "les" en contexto español (como "disponibles"), penalizar francés
-        if 'les' in question_lower and any(esp_word in question_lower for esp_word in ['disponib', 'posib', 'terrib']):
-            french_penalty = 8
-            french_score -= french_penalty
-            print(f"   ⛔ FRENCH 'LES' PENALTY IN SPANISH CONTEXT: -{french_penalty} points")
-        
-        # BONIFICACIONES ESPECÍFICAS PARA FRANCÉS
-        # Si detectamos construcciones claramente francesas, bonus extra
-        ultra_french_patterns = [
-            'ai-je', 'puis-je', 'dois-je', 'existe-t-il', 'peut-il',
-            'j\'ai', 'ne peux pas', 'ne veut pas', 'mais je',
-            'après avoir', 'responsabilité supplémentaire'
-        ]
-        
-        for pattern in ultra_french_patterns:
-            if pattern in question_lower:
-                french_bonus = 15
-                french_score += french_bonus
-                print(f"   🇫🇷 ULTRA FRENCH PATTERN '{pattern}': +{french_bonus} points")
-        
-        # ================================================================
-        # PASO 8: LOGGING Y DECISIÓN FINAL
-        # ================================================================
-        print(f"🔍 Language detection: ES={spanish_score}, EN={english_score}, FR={french_score} para '{question_lower[:50]}...'")
-        
-        # REGLAS DE DECISIÓN CORREGIDAS - MEJORADAS PARA FRANCÉS
-        
-        # 1. Si hay indicadores españoles MUY fuertes Y domina sobre otros idiomas
-        if spanish_score >= 40 and spanish_score > english_score and spanish_score > french_score:
-            print(f"   🇪🇸 DETECTED: SPANISH (VERY STRONG DOMINANT: {spanish_score} vs EN:{english_score} FR:{french_score})")
-            return 'es'
-        
-        # 2. Si hay indicadores franceses fuertes Y domina
-        if french_score >= 25 and french_score > spanish_score and french_score > english_score:
-            print(f"   🇫🇷 DETECTED: FRENCH (STRONG DOMINANT: {french_score} vs ES:{spanish_score} EN:{english_score})")
-            return 'fr'
-        
-        # 3. Si hay indicadores ingleses fuertes Y domina
-        if english_score >= 25 and english_score > spanish_score and english_score > french_score:
-            print(f"   🇺🇸 DETECTED: ENGLISH (STRONG DOMINANT: {english_score} vs ES:{spanish_score} FR:{french_score})")
-            return 'en'
-        
-        # 4. Si francés domina claramente
-        if french_score > spanish_score and french_score > english_score and french_score >= 15:
-            print(f"   🇫🇷 DETECTED: FRENCH (CLEAR DOMINANT: {french_score} vs ES:{spanish_score} EN:{english_score})")
-            return 'fr'
-        
-        # 5. Si inglés domina claramente (incluso con Duoc UC presente)
-        if english_score > spanish_score and english_score > french_score and english_score >= 15:
-            print(f"   🇺🇸 DETECTED: ENGLISH (CLEAR DOMINANT: {english_score} vs ES:{spanish_score} FR:{french_score})")
-            return 'en'
-        
-        # 6. Si español domina (pero no con Duoc UC solamente)
-        if spanish_score > french_score and spanish_score > english_score and spanish_score >= 20:
-            print(f"   🇪🇸 DETECTED: SPANISH (DOMINANT: {spanish_score} vs FR:{french_score} EN:{english_score})")
-            return 'es'
-        
-        # 5. Si español domina (pero no con Duoc UC solamente)
-        if spanish_score > french_score and spanish_score > english_score and spanish_score >= 20:
-            print(f"   🇪🇸 DETECTED: SPANISH (DOMINANT: {spanish_score} vs FR:{french_score} EN:{english_score})")
-            return 'es'
-        
-        # 6. Si francés tiene puntaje moderado SIN confusión
-        if french_score >= 20 and spanish_score < 10 and english_score < 15:
-            print(f"   🇫🇷 DETECTED: FRENCH (MODERATE CLEAN: {french_score} vs ES:{spanish_score} EN:{english_score})")
-            return 'fr'
-        
-        # 7. Fallback inteligente basado en contexto
-        if french_score > 0 and french_score >= english_score and french_score >= spanish_score:
-            print(f"   🇫🇷 DETECTED: FRENCH (FALLBACK: {french_score})")
-            return 'fr'
-        elif english_score > 0 and spanish_score <= 30:  # No solo por Duoc UC
-            print(f"   🇺🇸 DETECTED: ENGLISH (FALLBACK: {english_score})")
-            return 'en'
-        elif spanish_score > 0:
-            print(f"   🇪🇸 DETECTED: SPANISH (FALLBACK: {spanish_score})")
-            return 'es'
-        else:
-            print(f"   🇪🇸 DETECTED: SPANISH (DEFAULT)")
-            return 'es'
+        """Idioma de la pregunta con el identificador de n-gramas compartido (app/language_id.py)"""
+        return detect_language(question)
     
     def _find_category_match_by_language(self, question: str, terms: List[str]) -> List[str]:
         """Busca coincidencias en una lista de términos específicos de un idioma"""
@@ -993,6 +579,26 @@ class TopicClassifier:
                 }
         return None
 
+    def _best_redirect_match(self, hits: Dict) -> Optional[Tuple[str, List[str]]]:
+        """Igual que _find_category_match sobre redirect_categories, usando las coincidencias del índice"""
+        best_category = None
+        best_score = 0
+        best_keywords = []
+        
+        for category, keywords_data in self.redirect_categories.items():
+            languages = keywords_data.keys() if isinstance(keywords_data, dict) else [None]
+            matched_keywords = [keyword for lang in languages
+                                for keyword in hits.get(('redirect', category, lang), [])]
+            
+            if matched_keywords:
+                score = len(matched_keywords) * 1.5
+                if score > best_score:
+                    best_score = score
+                    best_category = category
+                    best_keywords = matched_keywords
+        
+        return (best_category, best_keywords) if best_category else None
+
     def _find_category_match(self, question: str, categories: Dict) -> Tuple[str, List[str]]:
         """Busca coincidencias en categorías, manejando tanto estructura simple como multilingüe"""
         best_category = None
@@ -1056,6 +662,9 @@ class TopicClassifier:
             "allowed_keywords_count": sum(len(keywords) for keywords in self.allowed_categories.values()),
             "redirect_keywords_count": sum(len(keywords) for keywords in self.redirect_categories.values()),
             "special_patterns": {k: len(v) for k, v in self.special_patterns.items()},
+            "indexed_keywords": self.keyword_index.keywords,
+            "index_build_ms": round(self.keyword_index.build_ms, 2),
+            "language_id": language_identifier.get_stats(),
             "total_categories": len(self.allowed_categories) + len(self.redirect_categories)
         }
     
@@ -0,0 +1,322 @@
+# app/vector_mirror.py - Espejo de solo lectura (mmap) de los embeddings de duoc_knowledge
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.knowledge_version import get_knowledge_version
+
+logger = logging.getLogger(__name__)
+
+MIRROR_DIR = os.getenv(
+    "VECTOR_MIRROR_DIR",
+    os.path.join(os.path.dirname(__file__), '..', 'chroma_db', 'vector_mirror')
+)
+VECTOR_MIRROR_ENABLED = os.getenv("VECTOR_MIRROR_ENABLED", "1") == "1"
+MIRROR_QUANTIZE = os.getenv("VECTOR_MIRROR_QUANTIZE", "0") == "1"
+MIRROR_CHECK_SECONDS = float(os.getenv("VECTOR_MIRROR_CHECK_SECONDS", "2"))
+MIRROR_USE_FAISS = os.getenv("VECTOR_MIRROR_FAISS", "0") == "1"
+EXPORT_LOCK_STALE_SECONDS = 600
+
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+
+def _to_matrix(embeddings) -> np.ndarray:
+    return np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), -1)
+
+
+def export_vector_mirror(collection, directory: str = MIRROR_DIR, quantize: bool = MIRROR_QUANTIZE,
+                         page_size: int = 1000) -> Optional[Dict]:
+    """
+    Exportar los embeddings de la colección a un directorio versionado y publicarlo en CURRENT.
+
+    Archivos: vectors.npy (float32, o int8 + scales.npy), norms.npy, records.json
+    (ids/documentos/metadata) y manifest.json. La publicación es un os.replace del puntero
+    CURRENT, así los workers que están leyendo la versión anterior no se ven afectados.
+    Retorna el manifest, o None si otro proceso ya está exportando.
+    """
+    os.makedirs(directory, exist_ok=True)
+    lock_path = os.path.join(directory, 'export.lock')
+    try:
+        if time.time() - os.stat(lock_path).st_mtime > EXPORT_LOCK_STALE_SECONDS:
+            os.remove(lock_path)
+    except OSError:
+        pass
+    try:
+        lock_fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        logger.info("⏭️ Exportación del espejo vectorial en curso en otro proceso")
+        return None
+
+    try:
+        start = time.perf_counter()
+        version = get_knowledge_version()
+
+        ids: List[str] = []
+        documents: List[str] = []
+        metadatas: List[Dict] = []
+        blocks: List[np.ndarray] = []
+        offset = 0
+        while True:
+            page = collection.get(limit=page_size, offset=offset,
+                                  include=['embeddings', 'documents', 'metadatas'])
+            page_ids = page.get('ids') or []
+            if not page_ids:
+                break
+            ids.extend(page_ids)
+            documents.extend(page.get('documents') or [''] * len(page_ids))
+            metadatas.extend(page.get('metadatas') or [{}] * len(page_ids))
+            blocks.append(_to_matrix(page['embeddings']))
+            offset += len(page_ids)
+            if len(page_ids) < page_size:
+                break
+
+        if not blocks:
+            logger.warning("⚠️ Colección vacía, no se exporta espejo vectorial")
+            return None
+
+        vectors = np.vstack(blocks)
+        space = (getattr(collection, 'metadata', None) or {}).get('hnsw:space', 'l2')
+        name = f"v{version}_{int(time.time() * 1000)}"
+        target = os.path.join(directory, name)
+        os.makedirs(target)
+
+        np.save(os.path.join(target, 'norms.npy'), np.linalg.norm(vectors, axis=1).astype(np.float32))
+        if quantize:
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            np.save(os.path.join(target, 'vectors.npy'), np.round(vectors / scales[:, None]).astype(np.int8))
+            np.save(os.path.join(target, 'scales.npy'), scales.astype(np.float32))
+        else:
+            np.save(os.path.join(target, 'vectors.npy'), vectors)
+
+        with open(os.path.join(target, 'records.json'), 'w', encoding='utf-8') as f:
+            json.dump({'ids': ids, 'documents': documents, 'metadatas': metadatas}, f, ensure_ascii=False)
+
+        manifest = {
+            'name': name,
+            'knowledge_version': version,
+            'count': len(ids),
+            'dimension': int(vectors.shape[1]),
+            'dtype': 'int8' if quantize else 'float32',
+            'space': space,
+            'created_at': time.time(),
+            'export_time_ms': round((time.perf_counter() - start) * 1000, 2)
+        }
+        with open(os.path.join(target, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+
+        tmp_pointer = os.path.join(directory, f"CURRENT.{os.getpid()}.tmp")
+        with open(tmp_pointer, 'w', encoding='utf-8') as f:
+            f.write(name)
+        os.replace(tmp_pointer, os.path.join(directory, 'CURRENT'))
+
+        _prune_old_versions(directory, keep={name})
+        logger.info(f"✅ Espejo vectorial exportado: {len(ids)} vectores {manifest['dtype']} "
+                    f"(versión {version}) en {manifest['export_time_ms']:.0f}ms")
+        return manifest
+    finally:
+        os.close(lock_fd)
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+
+
+def _prune_old_versions(directory: str, keep: set, max_old: int = 1):
+    """Conservar la versión publicada y la anterior (puede estar en uso por otro worker)"""
+    versions = sorted(
+        (entry for entry in os.listdir(directory)
+         if entry.startswith('v') and os.path.isdir(os.path.join(directory, entry)) and entry not in keep),
+        key=lambda entry: os.stat(os.path.join(directory, entry)).st_mtime,
+        reverse=True
+    )
+    for old in versions[max_old:]:
+        shutil.rmtree(os.path.join(directory, old), ignore_errors=True)
+
+
+class _MirrorState:
+    """Una versión cargada del espejo (inmutable: el hot-swap reemplaza el objeto completo)"""
+
+    def __init__(self, path: str, manifest: Dict):
+        self.manifest = manifest
+        self.vectors = np.load(os.path.join(path, 'vectors.npy'), mmap_mode='r')
+        self.norms = np.load(os.path.join(path, 'norms.npy'), mmap_mode='r')
+        scales_path = os.path.join(path, 'scales.npy')
+        self.scales = np.load(scales_path, mmap_mode='r') if manifest['dtype'] == 'int8' else None
+        with open(os.path.join(path, 'records.json'), 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        self.ids = records['ids']
+        self.documents = records['documents']
+        self.metadatas = records['metadatas']
+        self.faiss_index = self._build_faiss() if MIRROR_USE_FAISS and FAISS_AVAILABLE else None
+
+    def _build_faiss(self):
+        """Índice FAISS exacto opcional (copia los vectores a RAM: se pierde el compartir por page cache)"""
+        if self.scales is not None:
+            return None
+        vectors = np.ascontiguousarray(self.vectors, dtype=np.float32)
+        if self.manifest['space'] == 'l2':
+            index = faiss.IndexFlatL2(vectors.shape[1])
+        else:
+            index = faiss.IndexFlatIP(vectors.shape[1])
+            if self.manifest['space'] == 'cosine':
+                vectors = vectors / np.maximum(np.asarray(self.norms)[:, None], 1e-12)
+        index.add(vectors)
+        return index
+
+    def distances(self, query: np.ndarray) -> np.ndarray:
+        """Distancias a todos los vectores con la misma semántica que ChromaDB (l2 = L2 al cuadrado)"""
+        dots = self.vectors @ query
+        if self.scales is not None:
+            dots = dots * self.scales
+        space = self.manifest['space']
+        if space == 'cosine':
+            return 1.0 - dots / np.maximum(self.norms * np.linalg.norm(query), 1e-12)
+        if space == 'ip':
+            return 1.0 - dots
+        return np.maximum(self.norms ** 2 + float(query @ query) - 2.0 * dots, 0.0)
+
+    def top_k(self, query: np.ndarray, k: int, candidates: Optional[np.ndarray] = None):
+        if self.faiss_index is not None and candidates is None:
+            q = query / max(np.linalg.norm(query), 1e-12) if self.manifest['space'] == 'cosine' else query
+            scores, indices = self.faiss_index.search(q.reshape(1, -1).astype(np.float32), k)
+            pairs = [(int(i), float(s)) for i, s in zip(indices[0], scores[0]) if i >= 0]
+            if self.manifest['space'] != 'l2':
+                pairs = [(i, 1.0 - s) for i, s in pairs]
+            return pairs
+
+        distances = self.distances(query)
+        if candidates is not None:
+            distances = distances[candidates]
+        k = min(k, len(distances))
+        if k <= 0:
+            return []
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        if candidates is not None:
+            return [(int(candidates[i]), float(distances[i])) for i in top]
+        return [(int(i), float(distances[i])) for i in top]
+
+
+class VectorMirror:
+    """
+    Búsqueda top-k sobre el espejo mmap con un solo producto matriz-vector.
+
+    Varios workers de uvicorn mapean los mismos archivos, por lo que comparten una sola
+    copia de los vectores a través del page cache. Si la versión de conocimiento cambió
+    desde la exportación, search() retorna None y quien llama usa ChromaDB.
+    """
+
+    def __init__(self, directory: str = MIRROR_DIR):
+        self.directory = os.path.abspath(directory)
+        self._state: Optional[_MirrorState] = None
+        self._pointer_mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.stats = {
+            'searches': 0,
+            'stale_skips': 0,
+            'unsupported_filters': 0,
+            'reloads': 0,
+            'total_search_ms': 0.0
+        }
+
+    def _maybe_reload(self):
+        if time.time() - self._checked_at < MIRROR_CHECK_SECONDS:
+            return
+        with self._lock:
+            if time.time() - self._checked_at < MIRROR_CHECK_SECONDS:
+                return
+            self._checked_at = time.time()
+            pointer = os.path.join(self.directory, 'CURRENT')
+            try:
+                mtime = os.stat(pointer).st_mtime_ns
+                if mtime == self._pointer_mtime:
+                    return
+                with open(pointer, 'r', encoding='utf-8') as f:
+                    name = f.read().strip()
+                path = os.path.join(self.directory, name)
+                with open(os.path.join(path, 'manifest.json'), 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                self._state = _MirrorState(path, manifest)
+                self._pointer_mtime = mtime
+                self.stats['reloads'] += 1
+                logger.info(f"🔄 Espejo vectorial cargado: {manifest['count']} vectores "
+                            f"(versión {manifest['knowledge_version']}, {manifest['dtype']})")
+            except FileNotFoundError:
+                return
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo cargar el espejo vectorial: {e}")
+
+    def is_current(self) -> bool:
+        """Hay un espejo cargado y corresponde a la versión actual de la base de conocimiento"""
+        self._maybe_reload()
+        state = self._state
+        return state is not None and state.manifest['knowledge_version'] == get_knowledge_version()
+
+    @staticmethod
+    def _where_mask(state: _MirrorState, where: Dict) -> Optional[np.ndarray]:
+        """Soporta solo filtros de igualdad simples ({'campo': valor}); otros → None"""
+        if any(key.startswith('$') or isinstance(value, dict) for key, value in where.items()):
+            return None
+        return np.array([i for i, meta in enumerate(state.metadatas)
+                         if all((meta or {}).get(key) == value for key, value in where.items())], dtype=np.int64)
+
+    def search(self, query_embedding, n_results: int, where: Optional[Dict] = None) -> Optional[Dict[str, Any]]:
+        """Top-k en el formato de collection.query, o None si el espejo no puede responder"""
+        if not VECTOR_MIRROR_ENABLED:
+            return None
+        if not self.is_current():
+            if self._state is not None:
+                self.stats['stale_skips'] += 1
+            return None
+
+        state = self._state
+        candidates = None
+        if where:
+            candidates = self._where_mask(state, where)
+            if candidates is None:
+                self.stats['unsupported_filters'] += 1
+                return None
+
+        start = time.perf_counter()
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        if query.shape[0] != state.manifest['dimension']:
+            return None
+        pairs = state.top_k(query, n_results, candidates)
+        self.stats['searches'] += 1
+        self.stats['total_search_ms'] += (time.perf_counter() - start) * 1000
+
+        return {
+            'ids': [[state.ids[i] for i, _ in pairs]],
+            'distances': [[d for _, d in pairs]],
+            'documents': [[state.documents[i] for i, _ in pairs]],
+            'metadatas': [[state.metadatas[i] for i, _ in pairs]]
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        state = self._state
+        searches = self.stats['searches']
+        return {
+            'enabled': VECTOR_MIRROR_ENABLED,
+            'loaded': state is not None,
+            'current': self.is_current(),
+            'manifest': state.manifest if state else None,
+            'faiss': state is not None and state.faiss_index is not None,
+            'avg_search_ms': round(self.stats['total_search_ms'] / searches, 3) if searches else 0.0,
+            **self.stats
+        }
+
+
+# Instancia global (cada worker mapea los mismos archivos)
+vector_mirror = VectorMirror()
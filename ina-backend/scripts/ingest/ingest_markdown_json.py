@@ -35,6 +35,7 @@ sys.path.insert(0, str(project_root))
 
 from app.intelligent_chunker import semantic_chunker
 from app.rag import rag_engine
+from app.knowledge_version import bump_knowledge_version
 
 # Configurar logging detallado - FORZAR CONSOLA
 logging.basicConfig(
@@ -91,6 +92,7 @@ class MarkdownJsonIngester:
             # Verificar y eliminar la colección
             if 'duoc_knowledge' in [col.name for col in self.client.list_collections()]:
                 self.client.delete_collection('duoc_knowledge')
+                bump_knowledge_version('force_delete_collection')
                 print("✅ Colección 'duoc_knowledge' eliminada forzosamente.")
         except Exception as e:
             print(f"❌ Error eliminando la colección 'duoc_knowledge': {e}")
@@ -106,6 +108,7 @@ class MarkdownJsonIngester:
             # Verificar si la carpeta existe y eliminarla
             if os.path.exists(chroma_db_path):
                 shutil.rmtree(chroma_db_path)
+                bump_knowledge_version('reset_chromadb')
                 print("✅ Base de datos persistente de ChromaDB eliminada completamente.")
             else:
                 print("ℹ️ No se encontró la base de datos persistente de ChromaDB.")
@@ -157,6 +160,7 @@ class MarkdownJsonIngester:
                     collection.delete(ids=batch_ids)
                 
                 logger.info(f"✅ ChromaDB limpiado exitosamente ({total_ids} documentos eliminados)")
+                bump_knowledge_version('clean_chromadb')
             else:
                 logger.info("ℹ️  ChromaDB ya estaba vacío")
                 
@@ -460,6 +464,15 @@ def main():
         if args.verify and not args.dry_run:
             ingester.verify_ingestion()
         
+        # Publicar el espejo vectorial mmap para que los workers lo carguen sin reiniciar
+        if not args.dry_run:
+            try:
+                manifest = rag_engine.export_vector_mirror()
+                if manifest:
+                    logger.info(f"🧭 Espejo vectorial publicado: {manifest['count']} vectores ({manifest['name']})")
+            except Exception as e:
+                logger.warning(f"⚠️  No se pudo exportar el espejo vectorial: {e}")
+        
         # Imprimir resumen
         ingester.print_summary()
         
@@ -0,0 +1,122 @@
+# benchmark_language_id.py - PRECISIÓN Y LATENCIA DEL IDENTIFICADOR DE IDIOMA
+"""
+Evalúa app/language_id.py contra las consultas etiquetadas de tests_multiidioma/.
+
+Las consultas se extraen de los archivos de test (sin ejecutarlos):
+  - diccionarios {"es": [...], "en": [...], "fr": [...]}
+  - diccionarios con texto ("query", "texto", ...) e idioma ("expected_lang", "lang_code", ...)
+  - tuplas (consulta, "español" | "inglés" | "francés", ...)
+
+El identificador se entrena solo con los templates, así que estas consultas no se vieron
+en el entrenamiento. Si `langdetect` está instalado se muestra también como referencia.
+
+Uso: python scripts/testing/benchmark_language_id.py [-v]
+"""
+import ast
+import glob
+import os
+import sys
+import time
+from collections import Counter
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.language_id import LANGUAGES, LanguageIdentifier  # noqa: E402
+
+LANGUAGE_NAMES = {'es': 'es', 'en': 'en', 'fr': 'fr', 'español': 'es', 'inglés': 'en', 'francés': 'fr'}
+TEXT_KEYS = ('query', 'texto', 'question', 'pregunta', 'text')
+LANGUAGE_KEYS = ('expected_lang', 'lang_code', 'lang', 'language', 'idioma')
+
+
+def _constant(node):
+    return node.value if isinstance(node, ast.Constant) else None
+
+
+def extract_labeled_queries(paths):
+    samples = set()
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Dict):
+                entries = {_constant(k): v for k, v in zip(node.keys, node.values) if k is not None}
+                # {"es": [...], "en": [...], "fr": [...]}
+                if entries and set(entries) <= set(LANGUAGES):
+                    for lang, value in entries.items():
+                        texts = value.elts if isinstance(value, (ast.List, ast.Tuple)) else [value]
+                        samples.update((_constant(t), lang) for t in texts if isinstance(_constant(t), str))
+                    continue
+                # {"query": "...", "expected_lang": "en"}
+                text = next((_constant(entries[k]) for k in TEXT_KEYS if k in entries), None)
+                lang = next((_constant(entries[k]) for k in LANGUAGE_KEYS if k in entries), None)
+                if isinstance(text, str) and LANGUAGE_NAMES.get(lang):
+                    samples.add((text, LANGUAGE_NAMES[lang]))
+            elif isinstance(node, ast.Tuple) and len(node.elts) >= 2:
+                # ("¿Cómo saco mi TNE?", "español", True)
+                text, lang = _constant(node.elts[0]), _constant(node.elts[1])
+                if isinstance(text, str) and isinstance(lang, str) and lang in LANGUAGE_NAMES:
+                    samples.add((text, LANGUAGE_NAMES[lang]))
+    # Descartar valores sin letras (p.ej. banderas {"es": "🇪🇸", ...})
+    return sorted((text, lang) for text, lang in samples if any(c.isalpha() for c in text))
+
+
+def evaluate(name, detect, samples, verbose=False):
+    correct = Counter()
+    totals = Counter(lang for _, lang in samples)
+    errors = []
+    start = time.perf_counter()
+    predictions = [detect(text) for text, _ in samples]
+    elapsed_us = (time.perf_counter() - start) * 1_000_000 / max(1, len(samples))
+
+    for (text, expected), predicted in zip(samples, predictions):
+        if predicted == expected:
+            correct[expected] += 1
+        else:
+            errors.append((text, expected, predicted))
+
+    accuracy = sum(correct.values()) / max(1, len(samples))
+    per_language = ' | '.join(f"{lang}: {correct[lang]}/{totals[lang]}" for lang in LANGUAGES)
+    print(f"   {name:<22} precisión {accuracy:6.1%}  ({per_language})  {elapsed_us:8.1f} µs/consulta")
+    if verbose:
+        for text, expected, predicted in errors:
+            print(f"      ❌ esperado={expected} detectado={predicted}: {text[:80]!r}")
+    return accuracy
+
+
+def main():
+    verbose = '-v' in sys.argv
+    paths = sorted(glob.glob(os.path.join(BACKEND_DIR, 'tests_multiidioma', '*.py')))
+    samples = extract_labeled_queries(paths)
+    print(f"🌍 BENCHMARK IDENTIFICACIÓN DE IDIOMA - {len(samples)} consultas de {len(paths)} archivos")
+    print("=" * 80)
+
+    identifier = LanguageIdentifier(cache_size=0)
+    start = time.perf_counter()
+    identifier.scores("entrenamiento")
+    print(f"   Entrenamiento con templates: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    evaluate("n-gramas (sin cache)", identifier.detect, samples, verbose)
+
+    cached = LanguageIdentifier()
+    cached.scores("entrenamiento")
+    for text, _ in samples:
+        cached.detect(text)
+    evaluate("n-gramas (cache LRU)", cached.detect, samples)
+
+    try:
+        from langdetect import DetectorFactory, detect as langdetect_detect
+        DetectorFactory.seed = 0
+
+        def langdetect_safe(text):
+            try:
+                return langdetect_detect(text)
+            except Exception:
+                return 'es'
+        evaluate("langdetect", langdetect_safe, samples, verbose)
+    except ImportError:
+        print("   langdetect no instalado (se omite la comparación)")
+
+
+if __name__ == "__main__":
+    main()
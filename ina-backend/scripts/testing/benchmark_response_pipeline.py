@@ -0,0 +1,162 @@
+# benchmark_response_pipeline.py - COSTO DEL POST-PROCESAMIENTO DE RESPUESTAS
+"""
+Mide app/response_pipeline.py sobre respuestas grabadas, etapa por etapa.
+
+Las respuestas se leen de un archivo JSONL con objetos
+{"query": ..., "response": ..., "kind": "rag" | "ollama" | "template" | "fixed", "category": ...}.
+Sin archivo se arma un corpus con el repositorio:
+  - template: textos de app/template_manager (todas las áreas e idiomas)
+  - rag / ollama: párrafos de data/markdown (como texto que devolvería el modelo)
+y se emparejan con las preguntas de data/json/faqs_structured.json.
+
+Cada respuesta recorre las mismas etapas que en rag.py:
+  rag → limpieza + mejoras, ollama → optimizador inteligente, template/fixed → mejoras.
+
+Uso: python scripts/testing/benchmark_response_pipeline.py [respuestas.jsonl] [-n repeticiones]
+"""
+import glob
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.response_pipeline import (  # noqa: E402
+    CLEANUP_STAGES, ENHANCE_STAGES, FIXED, OLLAMA, PHRASE_REPLACEMENTS, RAG, TEMPLATE,
+    ResponseContext, build_default_pipeline, _replace_phrases
+)
+from app.template_index import AREA_LANGUAGES, template_index  # noqa: E402
+
+STAGES_BY_KIND = {
+    RAG: (CLEANUP_STAGES, ENHANCE_STAGES),
+    OLLAMA: (('intelligent_optimizer',),),
+    TEMPLATE: (ENHANCE_STAGES,),
+    FIXED: (ENHANCE_STAGES,),
+}
+
+
+def trie_pattern(phrases):
+    """Alternación con los prefijos comunes factorizados (alternativa de una sola pasada)"""
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        terminal = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 and not terminal else '(?:' + '|'.join(branches) + ')'
+        # Cuantificador codicioso: si una frase es prefijo de otra, gana la más larga
+        return body + '?' if terminal else body
+
+    return build(trie)
+
+
+def load_recorded(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def build_corpus():
+    with open(os.path.join(BACKEND_DIR, 'data', 'json', 'faqs_structured.json'), encoding='utf-8') as f:
+        faqs = json.load(f)
+    questions = [faq['pregunta'] for category in faqs['categorias'].values() for faq in category['faqs']]
+
+    samples = []
+    for area, languages in AREA_LANGUAGES.items():
+        for language in languages:
+            for text in template_index.area_templates(area, language).values():
+                samples.append({'response': text, 'kind': TEMPLATE, 'category': area})
+
+    paragraphs = []
+    for path in sorted(glob.glob(os.path.join(BACKEND_DIR, 'data', 'markdown', '**', '*.md'), recursive=True)):
+        with open(path, encoding='utf-8') as f:
+            paragraphs.extend(p.strip() for p in f.read().split('\n\n') if len(p.strip()) > 30)
+    for position, paragraph in enumerate(paragraphs):
+        samples.append({'response': paragraph, 'kind': RAG if position % 2 else OLLAMA, 'category': 'general'})
+
+    for position, sample in enumerate(samples):
+        sample['query'] = questions[position % len(questions)]
+    return samples
+
+
+def run_sample(pipeline, sample):
+    text = sample['response']
+    for stages in STAGES_BY_KIND.get(sample.get('kind', RAG), (ENHANCE_STAGES,)):
+        context = ResponseContext(sample.get('query', ''), sample.get('category', ''), sample.get('kind', RAG))
+        text = pipeline.run(text, context, stages=stages)
+    return text
+
+
+def main():
+    args = [arg for arg in sys.argv[1:]]
+    repetitions = 5
+    if '-n' in args:
+        position = args.index('-n')
+        repetitions = int(args[position + 1])
+        del args[position:position + 2]
+
+    logging.disable(logging.WARNING)
+    samples = load_recorded(args[0]) if args else build_corpus()
+    kinds = defaultdict(int)
+    for sample in samples:
+        kinds[sample.get('kind', RAG)] += 1
+    print(f"🧪 BENCHMARK POST-PROCESAMIENTO - {len(samples)} respuestas "
+          f"({', '.join(f'{kind}: {count}' for kind, count in sorted(kinds.items()))}) x {repetitions}")
+    print("=" * 80)
+
+    pipeline = build_default_pipeline()
+    for sample in samples:  # calentamiento
+        run_sample(pipeline, sample)
+    pipeline.reset_stats()
+
+    per_kind = defaultdict(float)
+    for _ in range(repetitions):
+        for sample in samples:
+            start = time.perf_counter()
+            run_sample(pipeline, sample)
+            per_kind[sample.get('kind', RAG)] += time.perf_counter() - start
+
+    stats = pipeline.get_stats()
+    print(f"   {'etapa':<22}{'llamadas':>10}{'saltadas':>10}{'cambios':>10}{'total ms':>12}{'µs/llamada':>12}")
+    for name, counters in stats['stages'].items():
+        print(f"   {name:<22}{counters['calls']:>10}{counters['skipped']:>10}{counters['changed']:>10}"
+              f"{counters['total_ms']:>12.1f}{counters['avg_us']:>12.1f}")
+    print("-" * 80)
+    for kind, seconds in sorted(per_kind.items()):
+        runs = kinds[kind] * repetitions
+        print(f"   {kind:<10} {seconds * 1000:10.1f} ms en total  {seconds * 1_000_000 / max(1, runs):8.1f} µs/respuesta")
+    total_runs = len(samples) * repetitions
+    total_seconds = sum(per_kind.values())
+    print(f"   {'todas':<10} {total_seconds * 1000:10.1f} ms en total  "
+          f"{total_seconds * 1_000_000 / max(1, total_runs):8.1f} µs/respuesta")
+
+    # Etapa de frases (str.replace encadenados) vs una alternación regex de una sola pasada
+    texts = [sample['response'] for sample in samples]
+    context = ResponseContext('')
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        for text in texts:
+            _replace_phrases(text, context)
+    sequential_us = (time.perf_counter() - start) * 1_000_000 / max(1, total_runs)
+    pattern = re.compile(trie_pattern(PHRASE_REPLACEMENTS))
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        for text in texts:
+            pattern.sub(lambda match: PHRASE_REPLACEMENTS[match.group(0)], text)
+    combined_us = (time.perf_counter() - start) * 1_000_000 / max(1, total_runs)
+    print(f"\n   Frases ({len(PHRASE_REPLACEMENTS)}): str.replace encadenados (etapa) {sequential_us:.1f} µs vs "
+          f"regex de una pasada {combined_us:.1f} µs por respuesta")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,7 @@ import logging
 from datetime import datetime
 from app.rag import rag_engine
 from app.intelligent_chunker import semantic_chunker
+from app.knowledge_version import bump_knowledge_version
 
 logging.basicConfig(
     level=logging.INFO,
@@ -98,6 +99,10 @@ def enrich_existing_chunks():
                 if (i + 1) % 100 == 0:
                     print(f"   Procesados: {i + 1}/{total_chunks} ({(i+1)/total_chunks*100:.1f}%)")
         
+        if chunks_actualizados:
+            # Metadata nueva: BM25, espejo vectorial y caches de respuestas se refrescan solos
+            bump_knowledge_version('enrich_existing_chunks')
+        
         # Resumen final
         print(f"\n{'='*80}")
         print(f"✅ ENRIQUECIMIENTO COMPLETADO")
@@ -0,0 +1,47 @@
+"""
+Exportar el espejo vectorial mmap de duoc_knowledge (chroma_db/vector_mirror/)
+
+Los workers en ejecución detectan el nuevo CURRENT y cambian de versión sin reiniciar.
+
+Uso:
+    python scripts/utilities/export_vector_mirror.py [--int8] [--stats]
+"""
+import sys
+import json
+import argparse
+from pathlib import Path
+
+# Agregar el directorio raíz al path (2 niveles arriba desde scripts/utilities/)
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exportar espejo vectorial mmap de ChromaDB')
+    parser.add_argument('--int8', action='store_true', help='Cuantizar vectores a int8 (4x menos disco/RAM)')
+    parser.add_argument('--stats', action='store_true', help='Solo mostrar el estado del espejo actual')
+    args = parser.parse_args()
+
+    from app.vector_mirror import vector_mirror, export_vector_mirror
+
+    if args.stats:
+        print(json.dumps(vector_mirror.get_stats(), indent=2, ensure_ascii=False, default=str))
+        return 0
+
+    from app.rag import rag_engine
+
+    print("=" * 70)
+    print("🧭 EXPORTANDO ESPEJO VECTORIAL")
+    print("=" * 70)
+    manifest = export_vector_mirror(rag_engine.collection, quantize=args.int8)
+    if not manifest:
+        print("⚠️  No se exportó (colección vacía o exportación en curso en otro proceso)")
+        return 1
+
+    print(f"✅ {manifest['count']} vectores {manifest['dtype']} (dim {manifest['dimension']}, "
+          f"espacio {manifest['space']}) en {manifest['export_time_ms']:.0f}ms")
+    print(f"📁 Versión publicada: {manifest['name']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
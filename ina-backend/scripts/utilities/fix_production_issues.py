@@ -4,12 +4,18 @@ Script para Arreglar ChromaDB - Error de Esquema Corrupto
 Soluciona: sqlite3.OperationalError: no such column: collections.topic
 """
 import os
+import sys
 import shutil
 from pathlib import Path
 import logging
 import json
 from datetime import datetime
 
+# Agregar el directorio raíz al path (2 niveles arriba desde scripts/utilities/)
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from app.knowledge_version import bump_knowledge_version
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -92,6 +98,7 @@ class ChromaDBFixer:
             if self.chroma_db_path.exists():
                 logger.info("🗑️ Removiendo base de datos corrupta...")
                 shutil.rmtree(self.chroma_db_path)
+                bump_knowledge_version('remove_corrupted_db')
                 logger.info("✅ Base de datos corrupta removida")
             return True
         except Exception as e:
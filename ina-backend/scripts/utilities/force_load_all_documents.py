@@ -28,6 +28,7 @@ def force_load_all_documents():
     import time
     from app.training_data_loader import training_loader
     from app.rag import _get_rag_engine
+    from app.knowledge_version import bump_knowledge_version
     
     print("=" * 70)
     print("  🚀 CARGA COMPLETA DE DOCUMENTOS")
@@ -80,6 +81,7 @@ def force_load_all_documents():
                 all_data = rag_engine.collection.get()
                 if all_data['ids']:
                     rag_engine.collection.delete(ids=all_data['ids'])
+                    bump_knowledge_version('force_load_all_documents')
                     print(f"   ✅ ChromaDB limpiado ({len(all_data['ids'])} chunks eliminados)")
                 else:
                     print(f"   ℹ️  ChromaDB ya estaba vacío")
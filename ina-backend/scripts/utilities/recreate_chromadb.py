@@ -17,6 +17,8 @@ if sys.platform == 'win32':
 # Agregar el directorio raíz al path (2 niveles arriba desde scripts/utilities/)
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
+from app.knowledge_version import bump_knowledge_version
+
 def recreate_chromadb():
     """Recrear ChromaDB desde cero"""
     chroma_path = Path("./chroma_db")
@@ -50,6 +52,7 @@ def recreate_chromadb():
         for attempt in range(max_attempts):
             try:
                 shutil.rmtree(chroma_path)
+                bump_knowledge_version('recreate_chromadb')
                 print("✅ Base de datos eliminada correctamente")
                 break
             except PermissionError:
@@ -20,6 +20,7 @@ from app import chroma_config  # Desactivar telemetría ANTES de importar chroma
 
 # Ahora importar el resto
 from app.rag import rag_engine
+from app.knowledge_version import bump_knowledge_version
 from app.training_data_loader import training_loader
 
 logging.basicConfig(
@@ -45,6 +46,7 @@ def clear_chromadb():
         
         # Eliminar colección
         rag_engine.client.delete_collection("duoc_knowledge")
+        bump_knowledge_version('reprocess_documents')
         logger.info("✅ ChromaDB limpiada")
         
         # Recrear colección vacía
@@ -0,0 +1,109 @@
+import os
+import sys
+
+# Asegurar que el paquete app esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from app.batch_encoder import BatchEncoder
+
+
+class FakeModel:
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts):
+        self.batches.append(list(texts))
+        return np.array([[float(len(t)), 1.0] for t in texts])
+
+
+def test_pedidos_concurrentes_se_resuelven_en_un_lote():
+    model = FakeModel()
+    encoder = BatchEncoder(model.encode, max_batch_size=16, max_wait_ms=100)
+    barrier = threading.Barrier(6)
+    results = {}
+
+    def worker(i):
+        text = "x" * (i + 1)
+        barrier.wait()
+        results[text] = encoder.encode([text])[0]
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(model.batches) < 6
+    assert all(results[text][0] == len(text) for text in results)
+    stats = encoder.get_stats()
+    assert stats['requests'] == 6
+    assert stats['batch_size_histogram']['samples'] == len(model.batches)
+    assert stats['wait_ms_histogram']['samples'] == 6
+
+
+def test_respeta_el_tamano_maximo_de_lote():
+    model = FakeModel()
+    encoder = BatchEncoder(model.encode, max_batch_size=2, max_wait_ms=50)
+
+    vectors = encoder.encode(["a", "bb", "ccc", "dddd", "eeeee"])
+
+    assert vectors[:, 0].tolist() == [1, 2, 3, 4, 5]
+    assert all(len(batch) <= 2 for batch in model.batches)
+
+
+def test_encode_async_y_errores():
+    def failing(texts):
+        raise RuntimeError("modelo no disponible")
+
+    ok = BatchEncoder(FakeModel().encode, max_wait_ms=1)
+    assert asyncio.run(ok.encode_async(["tne"]))[0].tolist() == [3.0, 1.0]
+
+    broken = BatchEncoder(failing, max_wait_ms=1)
+    with pytest.raises(RuntimeError):
+        broken.encode(["tne"])
+    assert broken.get_stats()['errors'] == 1
+
+
+def test_pedido_cancelado_no_detiene_el_worker():
+    started = threading.Event()
+    release = threading.Event()
+    model = FakeModel()
+
+    def slow_encode(texts):
+        started.set()
+        release.wait(2)
+        return model.encode(texts)
+
+    encoder = BatchEncoder(slow_encode, max_wait_ms=1)
+    first = encoder.submit("ocupa el worker")
+    assert started.wait(2)
+
+    # Se cancela mientras espera en la cola (p.ej. wait_for vencido en encode_async)
+    cancelled = encoder.submit("cancelado")
+    assert cancelled.cancel()
+    release.set()
+    assert first.result(timeout=2)[0] == len("ocupa el worker")
+
+    assert encoder.encode(["sigue"])[0].tolist() == [5.0, 1.0]
+    assert encoder._worker.is_alive()
+    assert encoder.get_stats()['cancelled'] == 1
+    assert ["cancelado"] not in model.batches
+
+    # Cancelación desde asyncio: el await se cancela y el encoder sigue respondiendo
+    async def cancel_async():
+        release.clear()
+        task = asyncio.ensure_future(encoder.encode_async(["async"]))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        release.set()
+
+    asyncio.run(cancel_async())
+    assert encoder.encode(["otra vez"])[0].tolist() == [8.0, 1.0]
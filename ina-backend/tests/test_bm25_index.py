@@ -0,0 +1,96 @@
+import os
+import sys
+import threading
+
+# Asegurar que el paquete app esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+DOCS = [
+    ("d1", "La TNE se valida en el Punto Estudiantil del primer piso.", {'category': 'tne', 'keywords': 'tne, pase escolar'}),
+    ("d2", "La biblioteca atiende de lunes a viernes de 8:00 a 21:00.", {'category': 'biblioteca'}),
+    ("d3", "Horario del gimnasio y talleres deportivos de la sede.", {'category': 'deportes'}),
+]
+
+
+def _index():
+    index = BM25Index()
+    index.build(*zip(*DOCS))
+    return index
+
+
+def test_tokenize_quita_tildes_y_palabras_vacias():
+    assert tokenize("¿Dónde está la Biblioteca del piso 2?") == ['biblioteca', 'piso']
+
+
+def test_keyword_corta_encuentra_el_chunk_correcto():
+    results = _index().search_documents("tne", 3)
+
+    assert results[0]['id'] == "d1"
+    assert results[0]['coverage'] == 1.0
+    assert results[0]['lexical_score'] == 1.0
+    assert 'similarity' not in results[0]
+
+
+def test_agregar_documento_actualiza_postings_e_idf():
+    index = _index()
+    assert index.search_documents("estacionamiento") == []
+
+    index.add("d4", "El estacionamiento de la sede es gratuito para estudiantes.", {})
+
+    assert index.search_documents("estacionamiento")[0]['id'] == "d4"
+    assert index.get_stats()['documents'] == 4
+
+
+def test_reconstruccion_sigue_sirviendo_el_indice_anterior():
+    index = _index()
+    reading = threading.Event()
+    release = threading.Event()
+
+    def slow_documents():
+        reading.set()
+        release.wait(5)
+        yield "La biblioteca nueva abre los sábados."
+
+    builder = threading.Thread(target=index.build, args=(["n1"], slow_documents(), [{}]))
+    builder.start()
+    assert reading.wait(5)
+    # Mientras se arma el índice nuevo las búsquedas no esperan y usan el anterior
+    assert index.search_documents("tne")[0]['id'] == "d1"
+    index.add("d4", "El estacionamiento de la sede es gratuito para estudiantes.", {})
+    release.set()
+    builder.join(5)
+
+    assert index.search_documents("tne") == []
+    assert index.search_documents("sabados")[0]['id'] == "n1"
+    # Lo agregado durante la reconstrucción no se pierde con el intercambio
+    assert index.search_documents("estacionamiento")[0]['id'] == "d4"
+    assert len(index) == 2
+
+
+def test_rrf_premia_documentos_en_ambos_rankings():
+    vector = [{'document': 'a', 'similarity': 0.5}, {'document': 'b', 'similarity': 0.4}]
+    lexical = [{'document': 'b', 'lexical_score': 0.9}, {'document': 'c', 'lexical_score': 0.3}]
+
+    fused = reciprocal_rank_fusion([vector, lexical])
+
+    assert [item['document'] for item in fused] == ['b', 'a', 'c']
+    # similarity sigue siendo la coseno; el puntaje léxico va en su propio campo
+    assert fused[0]['similarity'] == 0.4
+    assert fused[0]['lexical_score'] == 0.9
+    assert fused[2]['similarity'] == 0.0
+
+
+def test_consulta_fuera_de_tema_no_supera_el_umbral_de_la_pre_busqueda():
+    index = _index()
+    index.add("d4", "Hoy la sede abre el casino a las 8:00.", {'category': 'servicios'})
+    vector = [{'document': DOCS[2][1], 'similarity': 0.11}]
+
+    lexical = index.search_documents("¿cómo está el clima hoy?")
+    fused = reciprocal_rank_fusion([vector, lexical])
+
+    # El mejor BM25 cubre la mitad de los términos, pero eso no vuelve relevante la consulta:
+    # la pre-búsqueda (umbral 0.20) usa solo la coseno y la consulta se sigue derivando
+    assert lexical[0]['id'] == "d4" and lexical[0]['lexical_score'] == 0.5
+    assert max(item['similarity'] for item in fused) < 0.20
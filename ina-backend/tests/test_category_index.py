@@ -0,0 +1,49 @@
+import os
+import sys
+
+# Asegurar que el paquete app esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.category_index import CategoryKeywordIndex
+from app.topic_classifier import TopicClassifier
+
+
+def test_lookup_respeta_reglas_de_flexible_match_y_orden():
+    index = CategoryKeywordIndex({
+        'allowed': {
+            'deportes': ['natación', 'gym', 'taller deportivo', 'natación'],
+            'bienestar': {'es': ['psicólogo'], 'en': ['psychologist']},
+        },
+        'redirect': {'biblioteca': ['biblioteca', 'libros']},
+    })
+    hits = index.lookup("¿hay taller deportivo de natacion y gym? necesito un psicologo")
+    # Keywords largas sin acentos; duplicados y orden de la lista original se conservan
+    assert hits[('allowed', 'deportes', None)] == ['natación', 'gym', 'taller deportivo', 'natación']
+    assert hits[('allowed', 'bienestar', 'es')] == ['psicólogo']
+    assert ('redirect', 'biblioteca', None) not in hits
+
+    # Keywords cortas: subcadena exacta (con acentos)
+    assert index.lookup("gimnasio") == {}
+
+
+def _reference_matches(classifier, question_lower, terms):
+    return [term for term in terms if classifier._flexible_match(term, question_lower)]
+
+
+def test_clasificacion_igual_al_recorrido_de_listas():
+    classifier = TopicClassifier()
+    questions = [
+        "¿Cómo renuevo mi TNE?", "necesito hablar con un psicólogo", "where is the library",
+        "problema con el proyector de la sala", "horario de la biblioteca y préstamo de libros",
+        "quiero convalidar asignaturas", "receta de cocina",
+    ]
+    for question in questions:
+        question_lower = question.lower().strip()
+        hits = classifier.keyword_index.lookup(question_lower)
+        for category, keywords_data in classifier.allowed_categories.items():
+            term_lists = keywords_data.items() if isinstance(keywords_data, dict) else [(None, keywords_data)]
+            for lang, terms in term_lists:
+                expected = _reference_matches(classifier, question_lower, terms)
+                assert hits.get(('allowed', category, lang), []) == expected, (question, category, lang)
+        assert classifier._best_redirect_match(hits) == classifier._find_category_match(
+            question_lower, classifier.redirect_categories)
@@ -0,0 +1,148 @@
+import json
+import os
+import sys
+
+import numpy as np
+
+# Asegurar que el paquete app esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import classifier as classifier_module
+from app.cache_manager import ClassificationCache
+from app.centroid_classifier import CentroidClassifier, resolve_category
+from app.classifier import QuestionClassifier
+from app.retrieval_context import RetrievalContext
+
+AXES = {'deportes': 0, 'bienestar_estudiantil': 1, 'asuntos_estudiantiles': 2}
+
+
+def _vector(axis, noise=0.05, seed=0):
+    rng = np.random.default_rng(seed)
+    vector = rng.normal(0, noise, 4)
+    vector[axis] += 1.0
+    return vector
+
+
+class FakeCollection:
+    """Colección mínima: get() paginado con embeddings/metadata y función de embeddings"""
+
+    def __init__(self):
+        self.records = []
+        for seed in range(30):
+            category = list(AXES)[seed % 2]
+            self.records.append((_vector(AXES[category], seed=seed), {'category': category}))
+        self.records.append((_vector(3, seed=99), {'category': 'general'}))  # sin categoría del clasificador
+        self.embed_calls = 0
+        self._embedding_function = self._embed
+
+    def _embed(self, texts):
+        self.embed_calls += 1
+        return [_vector(AXES['asuntos_estudiantiles'], seed=len(text)) for text in texts]
+
+    def get(self, limit, offset, include):
+        page = self.records[offset:offset + limit]
+        return {
+            'ids': [f"id{offset + i}" for i in range(len(page))],
+            'embeddings': [vector for vector, _ in page],
+            'metadatas': [metadata for _, metadata in page]
+        }
+
+    def query(self, **params):
+        return {'distances': [[0.1]], 'documents': [["doc"]], 'metadatas': [[{}]]}
+
+
+def test_resolve_category_usa_departamento_y_alias():
+    assert resolve_category({'departamento': 'deportes_recreacion', 'category': 'general'}) == 'deportes'
+    assert resolve_category({'category': 'tne'}) == 'asuntos_estudiantiles'
+    assert resolve_category({'category': 'bienestar_estudiantil'}) == 'bienestar_estudiantil'
+    assert resolve_category({'category': 'general'}) is None
+
+
+def test_build_desde_coleccion_y_faqs(tmp_path):
+    faqs = {'categorias': {'tne': {'faqs': [
+        {'pregunta': '¿Dónde renuevo la TNE?', 'categoria': 'tne', 'departamento': 'asuntos_estudiantiles'},
+        {'pregunta': '¿Cuánto cuesta la TNE?', 'categoria': 'tne', 'departamento': 'asuntos_estudiantiles'},
+    ]}}}
+    faqs_path = tmp_path / 'faqs.json'
+    faqs_path.write_text(json.dumps(faqs), encoding='utf-8')
+
+    centroids = CentroidClassifier(samples_per_cluster=5)
+    info = centroids.build_from_collection(FakeCollection(), faqs_path=str(faqs_path), page_size=7)
+    assert info['samples'] == {'deportes': 15, 'bienestar_estudiantil': 15, 'asuntos_estudiantiles': 2}
+    # Varias categorías con más de un centroide, cada una con al menos uno
+    assert info['centroids'] > 3
+
+    result = centroids.classify(_vector(AXES['deportes'], seed=123))
+    assert result['category'] == 'deportes'
+    assert result['confident'] and result['confidence'] > 0.9
+    assert centroids.classify(_vector(AXES['asuntos_estudiantiles'], seed=7))['category'] == 'asuntos_estudiantiles'
+
+    # Consulta ambigua (entre dos categorías) no es concluyente
+    ambiguous = centroids.classify(_vector(0, noise=0.0) + _vector(1, noise=0.0))
+    assert not ambiguous['confident']
+
+    # Dimensión distinta o sin centroides → None
+    assert centroids.classify([1.0, 0.0]) is None
+    assert CentroidClassifier().classify(_vector(0)) is None
+
+
+def test_classify_question_salta_reglas_con_centroide_concluyente(monkeypatch):
+    centroids = CentroidClassifier()
+    centroids.build([_vector(AXES['deportes'], seed=s) for s in range(5)] +
+                    [_vector(AXES['bienestar_estudiantil'], seed=s) for s in range(5)],
+                    ['deportes'] * 5 + ['bienestar_estudiantil'] * 5)
+    monkeypatch.setattr(classifier_module, 'centroid_classifier', centroids)
+
+    question_classifier = QuestionClassifier(cache=ClassificationCache())
+
+    def fail(*args, **kwargs):
+        raise AssertionError("la cadena de reglas no debe ejecutarse")
+    monkeypatch.setattr(question_classifier, '_keyword_classification', fail)
+
+    category = question_classifier.classify_question("consulta sin keywords", query_embedding=_vector(1, seed=42))
+    assert category == 'bienestar_estudiantil'
+    assert question_classifier.stats['centroid_matches'] == 1
+
+    info = question_classifier.get_classification_info("otra consulta sin keywords", topic_result={},
+                                                       query_embedding=_vector(0, seed=43))
+    assert info['category'] == 'deportes'
+    assert info['source'] == 'centroid_classifier_with_language'
+    assert info['confidence'] == info['centroid']['confidence']
+
+
+def test_reglas_solo_corren_si_el_centroide_no_es_concluyente(monkeypatch):
+    centroids = CentroidClassifier()
+    centroids.build([_vector(AXES['deportes'], seed=s) for s in range(5)] +
+                    [_vector(AXES['bienestar_estudiantil'], seed=s) for s in range(5)],
+                    ['deportes'] * 5 + ['bienestar_estudiantil'] * 5)
+    monkeypatch.setattr(classifier_module, 'centroid_classifier', centroids)
+    question_classifier = QuestionClassifier(cache=ClassificationCache())
+    rule_calls = []
+
+    def rules(question):
+        rule_calls.append(question)
+        return 'otros', 0.3
+    monkeypatch.setattr(question_classifier, '_keyword_classification', rules)
+
+    # Antes de la recuperación solo se detectan idioma y tópico
+    info = question_classifier.get_classification_info("consulta sin keywords", topic_result={},
+                                                       include_category=False)
+    assert info['category'] is None and info['language']
+    assert rule_calls == []
+
+    # En la recuperación: centroide concluyente con el embedding de la búsqueda → sin reglas
+    assert question_classifier.classify_question("consulta sin keywords", query_embedding=_vector(0, seed=42)) == 'deportes'
+    assert rule_calls == []
+
+    ambiguous = _vector(0, noise=0.0) + _vector(1, noise=0.0)
+    assert question_classifier.classify_question("otra consulta", query_embedding=ambiguous) == 'otros'
+    assert rule_calls == ["otra consulta"]
+
+
+def test_embedding_de_clasificacion_lo_reutiliza_la_busqueda():
+    collection = FakeCollection()
+    ctx = RetrievalContext("renovar tne")
+    embedding = ctx.embed(collection, "renovar tne")
+    ctx.fetch(collection, "renovar tne", 10)
+    assert collection.embed_calls == 1
+    assert ctx.query_embedding("renovar tne") == embedding
@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+
+# Asegurar que el paquete app esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from app.chat_executor import ChatExecutor, ChatQueueFullError
+
+
+def test_rechaza_cuando_la_cola_esta_llena():
+    """Con 1 worker y cola 0, una segunda consulta concurrente se rechaza de inmediato."""
+    executor = ChatExecutor(max_workers=1, max_queue=0, retry_after=3)
+    release = threading.Event()
+
+    async def scenario():
+        slow = asyncio.ensure_future(executor.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ChatQueueFullError) as exc_info:
+            await executor.run(lambda: "nunca")
+        release.set()
+        await slow
+        return exc_info.value
+
+    error = asyncio.run(scenario())
+    stats = executor.get_stats()
+
+    assert error.retry_after >= 1
+    assert stats['rejected'] == 1
+    assert stats['completed'] == 1
+    assert stats['queue_depth'] == 0 and stats['in_flight'] == 0
+    executor.shutdown()
+
+
+def test_carril_rapido_atiende_con_el_pool_principal_saturado():
+    """Una respuesta sin Ollama no espera ni se rechaza por las generaciones en curso."""
+    llm_lane = ChatExecutor(max_workers=1, max_queue=0)
+    fast_lane = ChatExecutor(max_workers=1, max_queue=1, name="chat-fast")
+    release = threading.Event()
+
+    async def scenario():
+        generation = asyncio.ensure_future(llm_lane.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ChatQueueFullError):
+            await llm_lane.run(lambda: "template")
+        answer = await asyncio.wait_for(fast_lane.run(lambda: "template"), 1)
+        release.set()
+        await generation
+        return answer
+
+    assert asyncio.run(scenario()) == "template"
+    assert fast_lane.get_stats()['completed'] == 1
+    llm_lane.shutdown()
+    fast_lane.shutdown()
+
+
+def test_no_bloquea_el_event_loop():
+    """Mientras el pool procesa una tarea lenta, el loop sigue atendiendo corrutinas."""
+    executor = ChatExecutor(max_workers=2, max_queue=4)
+
+    async def scenario():
+        slow = asyncio.ensure_future(executor.run(time.sleep, 0.3))
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        await slow
+        return elapsed
+
+    assert asyncio.run(scenario()) < 0.2
+    assert executor.get_stats()['wait_time_ms']['samples'] == 1
+    executor.shutdown()
+
+
+def test_stream_reenvia_frames_y_resultado_final():
+    """Los frames emitidos desde el worker llegan en orden y el resultado cierra el stream."""
+    executor = ChatExecutor(max_workers=1, max_queue=1)
+
+    def pipeline(question, emit=None):
+        emit({'type': 'meta', 'strategy': 'standard_rag'})
+        for token in ("Hola", " mundo"):
+            emit({'type': 'token', 'text': token})
+        return {'response': f"{question}: Hola mundo"}
+
+    async def scenario():
+        return [item async for item in executor.stream(pipeline, "tne")]
+
+    items = asyncio.run(scenario())
+
+    assert [kind for kind, _ in items] == ['frame', 'frame', 'frame', 'result']
+    assert ''.join(p['text'] for k, p in items if k == 'frame' and p['type'] == 'token') == "Hola mundo"
+    assert items[-1][1] == {'response': "tne: Hola mundo"}
+    assert executor.get_stats()['completed'] == 1
+    executor.shutdown()
@@ -0,0 +1,95 @@
+import os
+import sys
+import threading
+import time
+
+# Asegurar que el paquete app esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.cache_manager import ClassificationCache
+from app.classifier import QuestionClassifier
+
+
+def test_lru_expulsa_el_menos_usado_recientemente():
+    cache = ClassificationCache(max_size=2)
+    cache.set("a", "deportes")
+    cache.set("b", "pastoral")
+    assert cache.get("a") == "deportes"  # "a" pasa a ser el más reciente
+    cache.set("c", "institucionales")
+    assert cache.get("b") is None
+    assert cache.get("a") == "deportes" and cache.get("c") == "institucionales"
+    stats = cache.get_stats()
+    assert stats['evictions'] == 1
+    assert stats['local_hits'] == 3 and stats['misses'] == 1
+
+
+def test_ttl():
+    cache = ClassificationCache()
+    cache.set("a", "deportes", ttl=0.05)
+    time.sleep(0.1)
+    assert cache.get("a") is None
+
+
+def test_almacen_compartido_entre_workers(tmp_path):
+    path = str(tmp_path / "classification.sqlite3")
+    worker_1 = ClassificationCache(shared_path=path)
+    worker_2 = ClassificationCache(shared_path=path)
+
+    worker_1.set("como renuevo tne", "asuntos_estudiantiles")
+    assert worker_2.get("como renuevo tne") == "asuntos_estudiantiles"
+    # Promovido al LRU local: el segundo acceso no vuelve a SQLite
+    assert worker_2.get("como renuevo tne") == "asuntos_estudiantiles"
+    stats = worker_2.get_stats()
+    assert stats['shared_hits'] == 1 and stats['local_hits'] == 1 and stats['hit_rate'] == 1.0
+    assert stats['shared_store']['entries'] == 1
+
+
+def test_cambio_de_tablas_invalida_local_y_compartido(tmp_path):
+    path = str(tmp_path / "classification.sqlite3")
+    version = {'value': 'v1'}
+    worker_1 = ClassificationCache(shared_path=path, version_check_seconds=0)
+    worker_2 = ClassificationCache(shared_path=path, version_check_seconds=0)
+    for cache in (worker_1, worker_2):
+        cache.set_version_source(lambda: version['value'])
+
+    worker_1.set("gimnasio", "deportes")
+    assert worker_2.get("gimnasio") == "deportes"
+
+    version['value'] = 'v2'
+    assert worker_1.get("gimnasio") is None
+    assert worker_2.get("gimnasio") is None
+    assert worker_1.get_stats()['invalidations'] == 1
+    assert worker_1.store.count('v1') == 0
+
+
+def test_accesos_concurrentes():
+    cache = ClassificationCache(max_size=50)
+    errors = []
+
+    def work(offset):
+        try:
+            for i in range(500):
+                cache.set(f"q{(i + offset) % 80}", "otros")
+                cache.get(f"q{(i * 7) % 80}")
+        except Exception as e:  # pragma: no cover - solo si hay condición de carrera
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert len(cache) <= 50
+
+
+def test_clasificador_usa_el_cache_y_lo_invalida_con_los_patrones():
+    question_classifier = QuestionClassifier(cache=ClassificationCache(version_check_seconds=0))
+    category = question_classifier.classify_question("¿Cómo saco mi certificado de alumno regular?")
+    assert question_classifier.classify_question("¿cómo saco mi certificado de alumno regular") == category
+    assert question_classifier.stats['semantic_cache_hits'] == 1
+
+    question_classifier.keyword_patterns['pastoral'] = question_classifier.keyword_patterns['pastoral'] + [r'\bnuevo\b']
+    question_classifier.classify_question("¿Cómo saco mi certificado de alumno regular?")
+    assert question_classifier.stats['semantic_cache_hits'] == 1
+    assert question_classifier.get_classification_stats()['semantic_cache']['invalidations'] == 1
@@ -0,0 +1,50 @@
+import os
+import sys
+
+# Asegurar que el paquete app esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.content_filter import ContentFilter
+
+
+def test_prioridades_del_filtro_compilado():
+    content_filter = ContentFilter()
+    assert content_filter.validate_question("¿Cómo renuevo mi TNE?")["allowed"]
+    assert content_filter.validate_question("hoy")["allowed"]
+
+    off_topic = content_filter.validate_question("dónde compro cerveza para la fiesta")
+    # Primer término de la lista off_topic_keywords presente (no el primero del texto)
+    assert off_topic["block_reason"] == "off_topic"
+    assert "cerveza" in off_topic["reason"]
+
+    assert content_filter.validate_question("qué piensas del clima")["block_reason"] == "opinion_request"
+    assert content_filter.validate_question("ab")["block_reason"] == "too_short"
+    # Una categoría conocida del clasificador tiene prioridad sobre cualquier bloqueo
+    assert content_filter.validate_question("quiero cerveza", category="deportes")["allowed"]
+
+
+def test_lote_con_estadisticas_por_regla():
+    content_filter = ContentFilter()
+    questions = ["¿Cómo renuevo mi TNE?", "dónde compro cerveza", "quiero ver porno", "ab", "receta de pizza"]
+    batch = content_filter.validate_batch(questions)
+
+    assert batch["total"] == 5
+    assert [r["rule"] for r in batch["results"]] == [
+        "strong_institutional", "off_topic", "blocked_keyword", "too_short", "default"
+    ]
+    assert batch["blocked"] == 3
+    assert batch["rule_hits"]["off_topic"] == 1
+    assert batch["term_hits"] == {"off_topic: cerveza": 1, "blocked_keyword: porno": 1}
+    # El lote entrega lo mismo que validar una por una
+    for question, result in zip(questions, batch["results"]):
+        single = content_filter.validate_question(question)
+        assert {k: v for k, v in result.items() if k != "rule"} == single
+    assert content_filter.get_filter_stats()["rule_hits"]["off_topic"] == 2
+
+
+def test_recompilar_tras_modificar_listas():
+    content_filter = ContentFilter()
+    assert content_filter.validate_question("me gusta el ajedrez")["allowed"]
+    content_filter.off_topic_keywords.append("ajedrez")
+    content_filter.compile()
+    assert content_filter.validate_question("me gusta el ajedrez")["block_reason"] == "off_topic"
@@ -0,0 +1,85 @@
+import os
+import sys
+
+# Asegurar que el paquete app esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import threading
+
+from app.embedding_registry import EmbeddingRegistry
+
+
+class FakeModel:
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, sentences, **kwargs):
+        self.calls += 1
+        return [[1.0, 0.0] for _ in sentences]
+
+    def get_sentence_embedding_dimension(self):
+        return 2
+
+
+def make_registry(monkeypatch):
+    registry = EmbeddingRegistry()
+    loads = []
+
+    def fake_load(model_name):
+        # Sustituye la carga de SentenceTransformer (no disponible en tests)
+        with registry._load_locks[model_name]:
+            if model_name not in registry._models:
+                loads.append(model_name)
+                registry._models[model_name] = FakeModel()
+        return registry._models[model_name]
+
+    monkeypatch.setattr(registry, '_load', fake_load)
+    return registry, loads
+
+
+def test_mismo_modelo_se_comparte_entre_componentes(monkeypatch):
+    registry, loads = make_registry(monkeypatch)
+
+    memoria = registry.get_encoder('e5-small')
+    grafo = registry.get_encoder('e5-small')
+    assert memoria is grafo
+    assert loads == []  # carga diferida hasta el primer encode
+
+    memoria.encode(["tne"])
+    grafo.encode(["biblioteca", "horario"])
+
+    stats = registry.get_stats()['models']['e5-small']
+    assert loads == ['e5-small']
+    assert stats['consumers'] == 2
+    assert stats['sentences'] == 3
+    assert grafo.get_sentence_embedding_dimension() == 2
+
+
+def test_modelos_distintos_se_cargan_por_separado(monkeypatch):
+    registry, loads = make_registry(monkeypatch)
+
+    registry.get_encoder('e5-small', preload=True)
+    registry.get_encoder('e5-large')
+
+    stats = registry.get_stats()
+    assert loads == ['e5-small']
+    assert stats['loaded_models'] == 1
+    assert stats['models']['e5-large']['loaded'] is False
+
+
+def test_encodes_concurrentes_se_agrupan_en_lotes(monkeypatch):
+    registry, loads = make_registry(monkeypatch)
+    encoder = registry.get_encoder('e5-small')
+    encoder.batcher.max_wait = 0.05
+
+    threads = [threading.Thread(target=encoder.encode, args=(["consulta"],)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    batching = registry.get_stats()['models']['e5-small']['batching']
+    assert loads == ['e5-small']
+    assert registry._models['e5-small'].calls < 8
+    assert batching['requests'] == 8
+    assert batching['duplicates_merged'] > 0
@@ -0,0 +1,104 @@
+import json
+import os
+import sys
+import time
+
+import httpx
+
+# Asegurar que el paquete app esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.generation_cache import GenerationCache
+from app.llm_gateway import LLMGateway
+from app.prompt_builder import PromptBuilder
+
+MESSAGES = [{'role': 'system', 'content': 'Instrucciones'}, {'role': 'user', 'content': '¿Cómo renuevo la TNE?'}]
+DETERMINISTIC = {'temperature': 0.0, 'num_predict': 120}
+
+
+def _ollama(calls):
+    def handler(request):
+        calls.append(json.loads(request.content))
+        lines = [{'message': {'content': 'Renuévala en '}, 'done': False},
+                 {'message': {'content': 'el portal JUNAEB.'}, 'done': False},
+                 {'message': {'content': ''}, 'done': True, 'eval_count': 8, 'total_duration': int(2e9)}]
+        return httpx.Response(200, content=''.join(json.dumps(line) + '\n' for line in lines).encode('utf-8'))
+    return handler
+
+
+def _wait_for_store(cache, expected=1):
+    for _ in range(100):
+        if cache.get_stats()['stores'] >= expected:
+            return
+        time.sleep(0.01)
+
+
+def test_generacion_determinista_se_sirve_desde_cache(tmp_path):
+    calls = []
+    cache = GenerationCache(disk_path=str(tmp_path / 'generaciones.sqlite3'))
+    gateway = LLMGateway(base_url='http://ollama.test', transport=httpx.MockTransport(_ollama(calls)), cache=cache)
+    try:
+        first = gateway.chat('modelo', MESSAGES, options=DETERMINISTIC)
+        _wait_for_store(cache)
+        second = gateway.chat('modelo', [dict(message) for message in MESSAGES], options=dict(DETERMINISTIC))
+        assert second['message']['content'] == first['message']['content'] == 'Renuévala en el portal JUNAEB.'
+        assert second['cached'] is True and 'cached' not in first
+        assert len(calls) == 1
+
+        # En streaming el texto cacheado llega como un solo token
+        assert list(gateway.stream_chat('modelo', MESSAGES, options=DETERMINISTIC)) == [first['message']['content']]
+
+        # Otras opciones, otro modelo o una generación no determinista van a Ollama
+        gateway.chat('modelo', MESSAGES, options={**DETERMINISTIC, 'num_predict': 60})
+        gateway.chat('otro', MESSAGES, options=DETERMINISTIC)
+        gateway.chat('modelo', MESSAGES, options={'temperature': 0.7})
+        gateway.chat('modelo', MESSAGES, options={'temperature': 0.7})
+        assert len(calls) == 5
+
+        stats = gateway.get_stats()
+        assert stats['cache_hits'] == 2
+        cache_stats = stats['generation_cache']
+        assert cache_stats['hits'] == 2 and cache_stats['uncacheable'] == 2
+        assert cache_stats['bytes_saved'] == 2 * len('Renuévala en el portal JUNAEB.'.encode('utf-8'))
+        assert cache_stats['tokens_saved'] == 16 and cache_stats['seconds_saved'] == 4.0
+    finally:
+        gateway.shutdown()
+
+
+def test_cache_en_disco_sobrevive_reinicio_y_respeta_version_del_modelo(tmp_path):
+    path = str(tmp_path / 'generaciones.sqlite3')
+    cache = GenerationCache(disk_path=path)
+    key = cache.make_key('modelo', MESSAGES, {'temperature': 0.1, 'seed': 42})
+    assert key is not None and cache.make_key('modelo', MESSAGES, {'temperature': 0.1}) is None
+    cache.set(key, {'message': {'role': 'assistant', 'content': 'Respuesta'}, 'eval_count': 3})
+
+    restarted = GenerationCache(disk_path=path)
+    assert restarted.get(key)['message']['content'] == 'Respuesta'
+    stats = restarted.get_stats()
+    assert stats['disk_hits'] == 1 and stats['misses'] == 0 and stats['disk']['entries'] == 1
+    assert restarted.get(key) is not None and restarted.get_stats()['memory_hits'] == 1
+
+    # Un modelo actualizado (otro digest) no reutiliza salidas anteriores
+    restarted.set_model_version_source(lambda model: 'sha256:nuevo')
+    assert restarted.make_key('modelo', MESSAGES, {'temperature': 0.1, 'seed': 42}) != key
+
+
+def test_variantes_de_la_pregunta_comparten_la_generacion(tmp_path):
+    calls = []
+    cache = GenerationCache(disk_path=str(tmp_path / 'generaciones.sqlite3'))
+    gateway = LLMGateway(base_url='http://ollama.test', transport=httpx.MockTransport(_ollama(calls)), cache=cache)
+    sources = [{'document': 'La TNE se renueva pagando el valor anual en el portal de JUNAEB.', 'metadata': {}}]
+    builder = PromptBuilder()
+    try:
+        first = builder.build(sources, "¿Cómo renuevo la TNE?")
+        second = builder.build(sources, "como renuevo la tne")
+        # El prompt conserva la pregunta original; solo la clave se normaliza
+        assert "PREGUNTA: ¿Cómo renuevo la TNE?" in first.messages[1]['content']
+        assert first.messages != second.messages and first.cache_messages == second.cache_messages
+
+        gateway.chat('modelo', first.messages, options=DETERMINISTIC, cache_messages=first.cache_messages)
+        _wait_for_store(cache)
+        reply = gateway.chat('modelo', second.messages, options=DETERMINISTIC, cache_messages=second.cache_messages)
+        assert reply['cached'] is True and len(calls) == 1
+    finally:
+        gateway.shutdown()
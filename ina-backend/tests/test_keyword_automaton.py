@@ -0,0 +1,85 @@
+import os
+import sys
+
+# Asegurar que el paquete app esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+
+from app import keyword_automaton
+from app.keyword_automaton import expand_word_pattern, keyword_index
+from app.priority_keyword_system import PriorityKeywordSystem
+from app.smart_keyword_detector import SmartKeywordDetector
+
+
+def test_expandir_patrones_de_palabras():
+    phrases, left, right = expand_word_pattern(r'\bm[ée]dico\b')
+    assert sorted(phrases) == ['medico', 'médico']
+    assert left and right
+
+    phrases, left, right = expand_word_pattern(r'pase\s+escolar\b')
+    assert phrases == ['pase escolar']
+    assert not left and right
+
+    # Alternativas o comodines no se expanden (quedan como regex)
+    assert expand_word_pattern(r'\b(tne|pase)\b') is None
+    assert expand_word_pattern(r'beca.*alimentaci[oó]n') is None
+
+
+def _old_matches(detector, query):
+    """Semántica anterior: recorrer todas las keywords y variaciones en cada consulta"""
+    query_normalized = detector.normalize(query)
+    query_words = [w for w in query_normalized.split() if w not in detector.stop_words]
+    matches = []
+    for keyword, config in detector.high_priority_keywords.items():
+        for variation in config['variations']:
+            variation_normalized = detector.normalize(variation)
+            if variation_normalized == query_normalized:
+                matches.append((keyword, variation, config['weight'] + 20, 'exact'))
+            elif variation_normalized in query_words:
+                matches.append((keyword, variation, config['weight'] + 10, 'word'))
+            elif variation_normalized in query_normalized:
+                matches.append((keyword, variation, config['weight'], 'partial'))
+    matches.sort(key=lambda m: m[2], reverse=True)
+    return matches[:3]
+
+
+def test_smart_detector_equivale_al_recorrido_anterior():
+    detector = SmartKeywordDetector()
+    queries = [
+        "tne", "¿Cómo saco mi TNE?", "necesito un certificado de alumno regular",
+        "horario del gimnasio", "quiero hablar con la psicóloga", "beca de alimentación",
+        "pase escolar perdido", "hola", "",
+    ]
+    for query in queries:
+        result = detector.detect_keywords(query)
+        got = [(m['keyword'], m['matched_text'], m['weight'], m['match_type']) for m in result['all_matches']]
+        assert got == _old_matches(detector, query), query
+
+
+def test_priority_detecta_palabra_completa_sin_acentos():
+    system = PriorityKeywordSystem()
+    assert system.detect_absolute_keyword("¿cómo saco mi TNE?")['keyword'] == 'tne'
+    assert system.detect_absolute_keyword("informacion de la TNÉ")['keyword'] == 'tne'
+    # "tne" dentro de otra palabra no cuenta
+    assert system.detect_absolute_keyword("contnetido raro") is None
+
+
+def test_recarga_de_tabla_desde_config(tmp_path, monkeypatch):
+    table = {"robotica": {"patterns": [r"\brob[oó]tica\b"], "category": "deportes",
+                          "topic": "taller_robotica", "priority": 200,
+                          "avoid_expansion": False, "specific_expansion": []}}
+    (tmp_path / PriorityKeywordSystem.TABLE_FILE).write_text(json.dumps(table), encoding='utf-8')
+
+    system = PriorityKeywordSystem()
+    assert system.detect_absolute_keyword("taller de robótica") is None
+    try:
+        monkeypatch.setattr(keyword_automaton, 'KEYWORD_TABLES_DIR', str(tmp_path))
+        system.reload()
+        result = system.detect_absolute_keyword("taller de robótica")
+        assert result['keyword'] == 'robotica'
+        assert keyword_index.get_stats()['tables']['priority'] > 0
+    finally:
+        monkeypatch.undo()
+        system.reload()
+    assert system.detect_absolute_keyword("taller de robótica") is None
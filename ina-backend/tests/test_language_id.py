@@ -0,0 +1,72 @@
+import os
+import sys
+
+# Asegurar que el paquete app esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.language_id import LanguageIdentifier, extract_ngrams, language_identifier
+from app.template_index import TemplateIndex
+
+
+def test_ngramas_con_bordes_de_palabra():
+    grams = extract_ngrams("TNE 2024 https://duoc.cl")
+    assert grams[:4] == [' ', 't', 'n', 'e']
+    assert ' tne' in grams and 'tne ' in grams
+    assert not any('2' in gram or 'duoc' in gram for gram in grams)
+
+
+def test_identificador_entrenado_con_muestras_propias():
+    identifier = LanguageIdentifier(samples={
+        'es': ["¿cómo puedo solicitar mi certificado de alumno regular?", "necesito información del seguro"],
+        'en': ["how can i request my student certificate?", "i need information about the insurance"],
+        'fr': ["comment puis-je demander mon certificat d'étudiant ?", "j'ai besoin d'informations sur l'assurance"],
+    }, min_margin=0.05)
+    assert identifier.detect("¿Dónde solicito el certificado?") == 'es'
+    assert identifier.detect("Where can I request the certificate?") == 'en'
+    assert identifier.detect("Où puis-je demander le certificat ?") == 'fr'
+    # Sin señal suficiente se asume español
+    assert identifier.detect("TNE") == 'es'
+    assert identifier.detect("") == 'es'
+
+
+def test_templates_multiidioma_y_cache():
+    queries = {
+        "¿Cómo saco mi TNE?": 'es',
+        "¿Cuáles son los requisitos del programa de emergencia?": 'es',
+        "How do I renew my TNE?": 'en',
+        "What are the emergency program requirements?": 'en',
+        "Comment fonctionne l'assurance ?": 'fr',
+        "J'ai besoin de suivi sur mon TNE": 'fr',
+    }
+    for query, expected in queries.items():
+        assert language_identifier.detect(query) == expected, query
+
+    hits = language_identifier.get_stats()['cache_hits']
+    language_identifier.detect("How do I renew my TNE?")
+    assert language_identifier.get_stats()['cache_hits'] == hits + 1
+
+
+def test_consultas_cortas_en_espanol_no_cambian_de_idioma():
+    for query in ("hola", "holi", "holaa", "hola!", "chao", "wifi", "wifi gratis"):
+        assert language_identifier.detect_with_confidence(query)[0] == 'es', query
+    # Palabras propias de otro idioma sí alcanzan aunque la consulta sea corta
+    assert language_identifier.detect("hello") == 'en'
+    assert language_identifier.detect("thank you") == 'en'
+    assert language_identifier.detect("bonjour") == 'fr'
+
+
+def test_perfil_precalculado_no_carga_paquetes_de_templates(tmp_path):
+    profile_path = str(tmp_path / 'perfiles.json')
+    building_index = TemplateIndex()
+    builder = LanguageIdentifier(profile_path=profile_path, index=building_index)
+    assert builder.detect("How do I renew my TNE?") == 'en'
+    assert builder.get_stats()['profile_source'] == 'templates' and os.path.exists(profile_path)
+
+    # Otro proceso: detectar usa los perfiles guardados sin importar paquetes de otros idiomas
+    index = TemplateIndex()
+    identifier = LanguageIdentifier(profile_path=profile_path, index=index)
+    assert identifier.detect("Comment fonctionne l'assurance ?") == 'fr'
+    assert identifier.detect("How do I renew my TNE?") == 'en'
+    assert identifier.get_stats()['profile_source'] == 'profile'
+    assert index.stats['packs_loaded'] == 0
+    assert identifier.scores("seguro de accidentes") == builder.scores("seguro de accidentes")
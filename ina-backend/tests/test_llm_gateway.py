@@ -0,0 +1,160 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+
+import httpx
+import pytest
+
+# Asegurar que el paquete app esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.llm_gateway import LLMDeadlineExceeded, LLMGateway, LLMGatewayError
+
+
+def _ndjson(tokens, model='modelo', eval_count=None):
+    lines = [{'model': model, 'message': {'role': 'assistant', 'content': token}, 'done': False} for token in tokens]
+    final = {'model': model, 'message': {'role': 'assistant', 'content': ''}, 'done': True}
+    if eval_count:
+        final.update(eval_count=eval_count, eval_duration=int(0.5e9))
+    lines.append(final)
+    return ''.join(json.dumps(line) + '\n' for line in lines).encode('utf-8')
+
+
+class SlowStream(httpx.AsyncByteStream):
+    def __init__(self, body: bytes, delay: float):
+        self.body = body
+        self.delay = delay
+
+    async def __aiter__(self):
+        await asyncio.sleep(self.delay)
+        yield self.body
+
+
+def _gateway(handler, **kwargs):
+    kwargs.setdefault('retry_backoff', 0.01)
+    return LLMGateway(base_url='http://ollama.test', transport=httpx.MockTransport(handler), **kwargs)
+
+
+def test_chat_y_stream_entregan_tokens_y_metricas():
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, content=_ndjson(['Hola', ', ', 'mundo'], eval_count=10))
+
+    gateway = _gateway(handler)
+    try:
+        result = gateway.chat('modelo', [{'role': 'user', 'content': 'hola'}], options={'num_predict': 5})
+        assert result['message']['content'] == 'Hola, mundo'
+        assert requests[0]['stream'] is True and requests[0]['options'] == {'num_predict': 5}
+
+        assert list(gateway.stream_chat('modelo', [{'role': 'user', 'content': 'hola'}])) == ['Hola', ', ', 'mundo']
+
+        stats = gateway.get_stats()
+        assert stats['completed'] == 2 and stats['in_flight'] == 0 and stats['queued'] == 0
+        assert stats['tokens_per_second'] == 20.0  # 10 tokens en 0.5s según Ollama
+        assert stats['first_token_latency_ms']['samples'] == 2
+        assert gateway.load('modelo') == {'queued': 0, 'in_flight': 0,
+                                          'latency_ms': stats['models']['modelo']['latency_ms']}
+        assert stats['models']['modelo']['latency_ms']['samples'] == 2
+    finally:
+        gateway.shutdown()
+
+
+def test_limite_de_concurrencia_por_modelo():
+    active = {'now': 0, 'max': 0}
+    lock = threading.Lock()
+
+    async def handler(request):
+        with lock:
+            active['now'] += 1
+            active['max'] = max(active['max'], active['now'])
+        await asyncio.sleep(0.05)
+        with lock:
+            active['now'] -= 1
+        return httpx.Response(200, content=_ndjson(['ok']))
+
+    gateway = _gateway(handler, default_concurrency=1, model_concurrency={'grande': 2})
+    try:
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            gateway.chat('chico', [{'role': 'user', 'content': 'x'}]))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(results) == 4 and active['max'] == 1
+        assert gateway.get_stats()['queue_wait_ms']['max'] >= 40
+
+        active['max'] = 0
+        threads = [threading.Thread(target=gateway.chat, args=('grande', [{'role': 'user', 'content': 'x'}]))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert active['max'] == 2
+        assert gateway.get_stats()['models']['grande']['limit'] == 2
+    finally:
+        gateway.shutdown()
+
+
+def test_reintento_ante_error_transitorio():
+    calls = {'n': 0}
+
+    def handler(request):
+        calls['n'] += 1
+        if calls['n'] == 1:
+            return httpx.Response(503, text='cargando modelo')
+        if calls['n'] == 2:
+            raise httpx.ConnectError('conexión rechazada')
+        return httpx.Response(200, content=_ndjson(['listo']))
+
+    gateway = _gateway(handler, max_retries=2)
+    try:
+        assert gateway.chat('modelo', [])['message']['content'] == 'listo'
+        assert gateway.get_stats()['retries'] == 2
+
+        calls['n'] = 0
+        gateway.max_retries = 0
+        with pytest.raises(LLMGatewayError):
+            gateway.chat('modelo', [])
+        assert gateway.get_stats()['failed'] == 1
+    finally:
+        gateway.shutdown()
+
+
+def test_error_no_transitorio_no_se_reintenta():
+    calls = {'n': 0}
+
+    def handler(request):
+        calls['n'] += 1
+        return httpx.Response(404, json={'error': 'model not found'})
+
+    gateway = _gateway(handler, max_retries=3)
+    try:
+        with pytest.raises(LLMGatewayError, match='404'):
+            gateway.chat('inexistente', [])
+        assert calls['n'] == 1
+    finally:
+        gateway.shutdown()
+
+
+def test_deadline_cancela_la_generacion():
+    def handler(request):
+        return httpx.Response(200, stream=SlowStream(_ndjson(['tarde']), delay=1.0))
+
+    gateway = _gateway(handler)
+    try:
+        with pytest.raises(LLMDeadlineExceeded):
+            gateway.chat('modelo', [], timeout=0.1)
+        stats = gateway.get_stats()
+        assert stats['deadline_exceeded'] == 1 and stats['in_flight'] == 0
+
+        # Desde otro event loop (p.ej. FastAPI)
+        with pytest.raises(LLMDeadlineExceeded):
+            asyncio.run(gateway.achat('modelo', [], timeout=0.1))
+    finally:
+        gateway.shutdown()
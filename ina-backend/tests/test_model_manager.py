@@ -0,0 +1,108 @@
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+import httpx
+
+# Asegurar que el paquete app esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.llm_gateway import LLMGateway
+from app.model_manager import MODEL_WARMUP_LEAD_MINUTES, ModelManager, parse_campus_hours
+
+
+class FakeOllama:
+    def __init__(self, installed):
+        self.installed = installed
+        self.loaded = []
+        self.calls = []
+
+    def handler(self, request):
+        self.calls.append((request.method, request.url.path))
+        if request.url.path == '/api/tags':
+            return httpx.Response(200, json={'models': [{'name': name} for name in self.installed]})
+        if request.url.path == '/api/ps':
+            return httpx.Response(200, json={'models': [{'name': name, 'expires_at': 'x'} for name in self.loaded]})
+        payload = json.loads(request.content)
+        self.calls[-1] += (payload.get('keep_alive'),)
+        self.loaded.append(payload['model'])
+        body = json.dumps({'message': {'content': '¡'}, 'done': False}) + '\n' + json.dumps({'done': True}) + '\n'
+        return httpx.Response(200, content=body.encode('utf-8'))
+
+
+def _manager(fake, **kwargs):
+    gateway = LLMGateway(base_url='http://ollama.test', transport=httpx.MockTransport(fake.handler))
+    return ModelManager(gateway=gateway, preferred_models=['llama3.2:1b-instruct-q4_K_M', 'llama3.2:3b'],
+                        campus_hours="0-4@08:00-22:30,5@08:00-14:00", off_hours_keep_alive=300, **kwargs)
+
+
+def test_descubrimiento_con_ttl_y_seleccion():
+    fake = FakeOllama(['gemma3:4b', 'llama3.2:3b'])
+    manager = _manager(fake, discovery_ttl=60)
+    try:
+        assert manager.select_model() == 'llama3.2:3b'
+        manager.select_model()
+        assert fake.calls.count(('GET', '/api/tags')) == 1  # dentro del TTL no se vuelve a consultar
+
+        fake.installed = ['mistral:7b']
+        assert manager.select_model(force=True) == 'mistral:7b'
+    finally:
+        manager.gateway.shutdown()
+
+
+def test_ollama_caido_usa_modelo_preferido():
+    def handler(request):
+        raise httpx.ConnectError('sin ollama')
+
+    gateway = LLMGateway(base_url='http://ollama.test', transport=httpx.MockTransport(handler), max_retries=0)
+    manager = ModelManager(gateway=gateway, preferred_models=['llama3.2:1b-instruct-q4_K_M'])
+    try:
+        assert manager.select_model() == 'llama3.2:1b-instruct-q4_K_M'
+        assert manager.get_status()['discovery_error']
+        assert manager.warm_up() is False and manager.warmup['state'] == 'error'
+    finally:
+        gateway.shutdown()
+
+
+def test_keep_alive_cubre_el_horario_de_la_sede():
+    manager = _manager(FakeOllama([]))
+    monday_morning = datetime(2025, 11, 24, 9, 0, 0)
+    assert manager.keep_alive(now=monday_morning) == (22 * 60 + 30 - 9 * 60) * 60
+    assert manager.keep_alive(now=datetime(2025, 11, 24, 23, 0)) == 300     # cerrado
+    assert manager.keep_alive(now=datetime(2025, 11, 30, 10, 0)) == 300     # domingo
+    assert manager.keep_alive(now=datetime(2025, 11, 29, 13, 59)) == 300    # sábado, un minuto antes del cierre
+    assert manager.next_opening(datetime(2025, 11, 29, 15, 0)) == datetime(2025, 12, 1, 8, 0)
+    assert parse_campus_hours("0-4@08:30-22:30,x") == {day: (510, 1350) for day in range(5)}
+
+    # Solo el modelo principal queda residente hasta el cierre; el grande del router no
+    manager.current_model = 'llama3.2:1b-instruct-q4_K_M'
+    assert manager.keep_alive('llama3.2:1b-instruct-q4_K_M', now=monday_morning) == (22 * 60 + 30 - 9 * 60) * 60
+    assert manager.keep_alive('llama3.2:3b', now=monday_morning) == 300
+    manager.gateway.shutdown()
+
+
+def test_precarga_antes_de_la_apertura_mantiene_el_modelo_hasta_el_cierre():
+    manager = _manager(FakeOllama([]))
+    opening = datetime(2025, 11, 24, 8, 0)
+    warmup_at = opening - timedelta(minutes=MODEL_WARMUP_LEAD_MINUTES)   # lunes 07:45
+    assert manager.keep_alive(now=warmup_at) == (datetime(2025, 11, 24, 22, 30) - warmup_at).seconds
+    assert manager.keep_alive(now=warmup_at - timedelta(minutes=1)) == 300
+    assert manager.seconds_until_close(warmup_at) is None   # la sede sigue cerrada
+    manager.gateway.shutdown()
+
+
+def test_precarga_envia_keep_alive_y_reporta_estado():
+    fake = FakeOllama(['llama3.2:1b-instruct-q4_K_M'])
+    manager = _manager(fake)
+    try:
+        assert manager.warm_up() is True
+        method, path, keep_alive = fake.calls[-1]
+        assert path == '/api/chat' and keep_alive == manager.keep_alive()
+
+        status = manager.get_status()
+        assert status['model'] == 'llama3.2:1b-instruct-q4_K_M'
+        assert status['warmup']['state'] == 'ready' and status['warmup']['load_ms'] is not None
+        assert status['loaded'] is True
+    finally:
+        manager.gateway.shutdown()
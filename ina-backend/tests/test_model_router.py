@@ -0,0 +1,113 @@
+import json
+import os
+import sys
+
+import httpx
+
+# Asegurar que el paquete app esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.llm_gateway import LLMGateway
+from app.model_manager import ModelManager
+from app.model_router import COMPLEX, IDLE_UPGRADE, LOAD, SIMPLE, SINGLE_MODEL, ModelRouter
+
+SMALL = 'llama3.2:1b-instruct-q4_K_M'
+LARGE = 'llama3.2:3b'
+
+
+class FakeLoad:
+    """Carga del gateway controlada por el test"""
+
+    def __init__(self):
+        self.queued = 0
+        self.in_flight = 0
+        self.p95_ms = 0.0
+        self.samples = 0
+
+    def load(self, model=None):
+        load = {'queued': self.queued, 'in_flight': self.in_flight}
+        if model is not None:
+            load['latency_ms'] = {'p95': self.p95_ms, 'samples': self.samples}
+        return load
+
+
+def _router(installed, tmp_path, **kwargs):
+    def handler(request):
+        return httpx.Response(200, json={'models': [{'name': name, 'digest': name[::-1]} for name in installed]})
+
+    gateway = LLMGateway(base_url='http://ollama.test', transport=httpx.MockTransport(handler))
+    manager = ModelManager(gateway=gateway, preferred_models=[SMALL, LARGE, 'gemma3:4b'])
+    manager.select_model()
+    load = FakeLoad()
+    return ModelRouter(gateway=load, manager=manager, log_path=str(tmp_path / 'ruteo.jsonl'), **kwargs), load
+
+
+CONFIDENT = [{'document': 'TNE', 'similarity': 0.8}]
+COMPLEX_QUERY = "¿Cómo renuevo la TNE? ¿Y qué pasa si perdí mi tarjeta y necesito viajar mañana a la sede?"
+
+
+def test_complejidad_y_carga_deciden_el_modelo(tmp_path):
+    router, load = _router([SMALL, LARGE], tmp_path)
+    try:
+        assert router.tiers() == (SMALL, LARGE)
+
+        load.in_flight = 1
+        assert router.route("¿Dónde está la biblioteca?", CONFIDENT).reason == SIMPLE
+        # Con otras solicitudes en curso una sola señal no alcanza
+        decision = router.route("¿Dónde está la biblioteca?", [{'similarity': 0.1}])
+        assert decision.model == SMALL and decision.signals['low_confidence']
+        decision = router.route(COMPLEX_QUERY, [{'similarity': 0.1}])
+        assert (decision.model, decision.reason) == (LARGE, COMPLEX)
+        assert decision.signals == {'multi_part': True, 'long': True, 'low_confidence': True}
+
+        # Ocioso: una señal basta para subir al modelo grande
+        load.in_flight = 0
+        assert router.route("¿Dónde está la biblioteca?", [{'similarity': 0.1}]).reason == IDLE_UPGRADE
+        assert router.route("Horario", CONFIDENT).model == SMALL
+
+        # Bajo carga siempre el modelo chico
+        load.queued = 2
+        assert router.route(COMPLEX_QUERY, []).reason == LOAD
+        load.queued, load.p95_ms, load.samples = 0, 45000.0, 10
+        decision = router.route(COMPLEX_QUERY, [])
+        assert (decision.model, decision.reason) == (SMALL, LOAD)
+    finally:
+        router.manager.gateway.shutdown()
+
+
+def test_un_solo_modelo_instalado_no_rutea(tmp_path):
+    router, _ = _router([SMALL], tmp_path)
+    try:
+        decision = router.route(COMPLEX_QUERY, [])
+        assert (decision.model, decision.reason) == (SMALL, SINGLE_MODEL)
+    finally:
+        router.manager.gateway.shutdown()
+
+    disabled, _ = _router([SMALL, LARGE], tmp_path, enabled=False)
+    try:
+        assert disabled.route(COMPLEX_QUERY, []).model == SMALL
+    finally:
+        disabled.manager.gateway.shutdown()
+
+
+def test_resultados_se_registran_para_evaluar_la_politica(tmp_path):
+    router, _ = _router([SMALL, LARGE], tmp_path)
+    try:
+        decision = router.route(COMPLEX_QUERY, [])
+        router.record(decision, 2.5)
+        router.record(decision, 0.01, cached=True)
+        router.record(router.route("Horario", CONFIDENT), 1.0, ok=False)
+
+        with open(tmp_path / 'ruteo.jsonl', encoding='utf-8') as log_file:
+            entries = [json.loads(line) for line in log_file]
+        assert [entry['model'] for entry in entries] == [LARGE, LARGE, SMALL]
+        assert entries[0]['latency_ms'] == 2500.0 and entries[0]['signals']['multi_part'] is True
+        assert entries[1]['cached'] is True and entries[2]['ok'] is False
+
+        stats = router.get_stats()
+        assert stats['decisions'] == {COMPLEX: 1, SIMPLE: 1}
+        assert stats['latency_ms'][f"{LARGE}|{decision.reason}"]['samples'] == 1  # sin el hit de cache
+        assert stats['failures'] == {SMALL: 1}
+        assert stats['tiers'] == {'small': SMALL, 'large': LARGE}
+    finally:
+        router.manager.gateway.shutdown()
@@ -0,0 +1,75 @@
+import os
+import sys
+
+# Asegurar que el paquete app esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.prompt_builder import SYSTEM_INSTRUCTIONS, PromptBuilder, TokenCounter, split_sentences
+
+TNE = ("La TNE se solicita en el Punto Estudiantil del piso 2. Para renovarla debes pagar el valor anual "
+       "en el portal de JUNAEB. El retiro se hace presentando tu carnet de identidad.")
+BIBLIOTECA = ("La biblioteca atiende de lunes a viernes de 08:00 a 21:00. Ofrece salas de estudio grupales "
+              "y préstamo de notebooks. Los libros se piden con la credencial de estudiante.")
+
+
+def _source(text, category='general'):
+    return {'document': text, 'metadata': {'category': category}}
+
+
+def test_fuentes_casi_duplicadas_se_descartan():
+    builder = PromptBuilder()
+    overlapping = _source("Información TNE. " + TNE + " Consultas al +56 2 2999 3075.")
+    unique, duplicates = builder.deduplicate([_source(TNE), overlapping, _source(BIBLIOTECA)])
+    assert [source['document'] for source in unique] == [TNE, BIBLIOTECA]
+    assert duplicates == 1
+
+    prompt = builder.build([_source(TNE), _source(TNE), _source(BIBLIOTECA)], "¿Cómo renuevo la TNE?")
+    assert prompt.duplicates == 1 and len(prompt.sources) == 2
+
+
+def test_presupuesto_prioriza_oraciones_relevantes():
+    builder = PromptBuilder(context_tokens=45)
+    prompt = builder.build([_source(BIBLIOTECA), _source(TNE)], "¿Dónde renuevo la TNE en JUNAEB?")
+    user_content = prompt.messages[1]['content']
+    assert "portal de JUNAEB" in user_content
+    assert "salas de estudio" not in user_content
+    assert prompt.context_tokens <= 45
+    assert prompt.sentences_kept < prompt.sentences_total == 6
+
+    # Una oración que no cabe completa se recorta en vez de dejar el prompt sin datos
+    tight = PromptBuilder(context_tokens=6).build([_source(TNE)], "TNE")
+    assert tight.sentences_kept == 1 and "[1] La TNE" in tight.messages[1]['content']
+
+
+def test_instrucciones_fijas_y_num_ctx_estable():
+    builder = PromptBuilder()
+    first = builder.build([_source(TNE)], "¿Cómo renuevo la TNE?")
+    second = builder.build([_source(BIBLIOTECA)], "¿A qué hora abre la biblioteca?")
+    assert first.messages[0] == second.messages[0] == {'role': 'system', 'content': SYSTEM_INSTRUCTIONS}
+    assert first.num_ctx == second.num_ctx == builder.num_ctx
+    assert builder.num_ctx % 512 == 0 and builder.num_ctx <= 4096
+    assert first.prompt_tokens + 256 <= builder.num_ctx
+
+    empty = builder.build([], "¿Hay estacionamiento?")
+    assert "no tienes información sobre '¿Hay estacionamiento?'" in empty.messages[1]['content']
+    assert split_sentences("## Título\n- Paso uno. Paso dos!\n\n") == ["Título", "Paso uno.", "Paso dos!"]
+
+
+def test_calibracion_y_registro_de_latencia():
+    counter = TokenCounter(default_ratio=1.0)
+    builder = PromptBuilder(counter=counter)
+    prompt = builder.build([_source(TNE)], "¿Cómo renuevo la TNE?", model='modelo')
+
+    builder.record('modelo', prompt, {'prompt_eval_count': prompt.prompt_tokens * 2,
+                                      'prompt_eval_duration': int(0.4e9)}, elapsed=1.5)
+    assert counter.ratio('modelo') > 1.0 and counter.ratio('otro') == 1.0
+
+    # Un conteo bajo (prefijo reutilizado del cache de Ollama) no altera la calibración
+    ratio = counter.ratio('modelo')
+    builder.record('modelo', prompt, {'prompt_eval_count': 20}, elapsed=0.3)
+    assert counter.ratio('modelo') == ratio
+
+    stats = builder.get_stats()
+    assert stats['recorded'] == 2 and stats['built'] == 1
+    assert stats['prompt_eval_ms']['samples'] == 1 and stats['ms_per_prompt_token'] > 0
+    assert sum(bucket['samples'] for bucket in stats['latency_by_prompt_tokens'].values()) == 2
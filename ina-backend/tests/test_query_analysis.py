@@ -0,0 +1,53 @@
+import os
+import sys
+
+# Asegurar que el paquete app esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import query_analysis
+from app.query_analysis import QueryAnalysis
+from app.retrieval_context import RetrievalContext
+
+
+def test_forma_en_minusculas():
+    analysis = QueryAnalysis("  ¿Cómo saco mi TNE?  ")
+    assert analysis.lower == "¿cómo saco mi tne?"
+
+
+def test_cada_deteccion_se_calcula_una_vez(monkeypatch):
+    calls = {'smart': 0, 'language': 0}
+
+    def fake_detect_keywords(query):
+        calls['smart'] += 1
+        return {'primary_keyword': 'tne', 'confidence': 100}
+
+    def fake_language(query):
+        calls['language'] += 1
+        return 'es'
+
+    monkeypatch.setattr(query_analysis.smart_keyword_detector, 'detect_keywords', fake_detect_keywords)
+    analysis = QueryAnalysis("tne", language_detector=fake_language)
+
+    for _ in range(3):
+        assert analysis.keyword_analysis['primary_keyword'] == 'tne'
+        assert analysis.language == 'es'
+    assert calls == {'smart': 1, 'language': 1}
+    assert analysis.get_stats()['reuses'] == 4
+
+
+def test_priority_detection_real():
+    analysis = QueryAnalysis("¿Cómo saco mi TNE?")
+    assert analysis.priority_detection['keyword'] == 'tne'
+
+
+def test_retrieval_context_comparte_el_analisis_solo_con_la_consulta_original():
+    analysis = QueryAnalysis("horario del gimnasio")
+    context = RetrievalContext("horario del gimnasio", analysis=analysis)
+    assert context.analysis is analysis
+    assert context.analysis_for("horario del gimnasio") is analysis
+    assert context.analysis_for("horario") is None
+
+    # Un análisis de otra consulta no se reutiliza
+    other = RetrievalContext("biblioteca", analysis=analysis)
+    assert other.analysis is not analysis
+    assert other.analysis.query == "biblioteca"
@@ -0,0 +1,79 @@
+import os
+import subprocess
+import sys
+
+# Asegurar que el paquete app esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+import app.cache_manager as cm
+import app.knowledge_version as kv
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+@pytest.fixture
+def versions(monkeypatch):
+    state = {'knowledge': 1, 'templates': 'a1'}
+    monkeypatch.setattr(cm, 'get_knowledge_version', lambda: state['knowledge'])
+    monkeypatch.setattr(cm, 'get_template_version', lambda: state['templates'])
+    return state
+
+
+def test_clave_normaliza_pregunta_e_incluye_idioma_y_contexto():
+    key = cm.VersionedResponseCache.make_key
+    assert key("¿Dónde está la biblioteca?", 'es') == key("donde esta la BIBLIOTECA", 'es')
+    assert key("¿Dónde está la biblioteca?", 'es') != key("¿Dónde está la biblioteca?", 'en')
+    assert key("biblioteca", 'es', "usuario: hola") != key("biblioteca", 'es')
+
+
+def test_invalida_al_cambiar_conocimiento_o_templates(versions):
+    cache = cm.VersionedResponseCache(max_size=10, default_ttl=60)
+    cache.set('k', {'response': 'piso 2'}, strategy='standard_rag')
+    assert cache.get('k') == {'response': 'piso 2'}
+
+    # contains() anticipa el hit sin contarlo (elige el carril del chat)
+    assert cache.contains('k') and not cache.contains('otra')
+    versions['knowledge'] += 1
+    assert not cache.contains('k')
+    assert cache.get('k') is None
+
+    cache.set('k', {'response': 'piso 3'}, strategy='template')
+    versions['templates'] = 'b2'
+    assert cache.get('k') is None
+    assert cache.get_stats()['invalidations'] == 2
+
+
+def test_estadisticas_por_estrategia(versions):
+    cache = cm.VersionedResponseCache(max_size=2, default_ttl=60)
+    cache.set('a', {'response': 'a'}, strategy='template')
+    cache.get('a')
+    cache.get('a')
+    cache.set('b', {'response': 'b'}, strategy='standard_rag')
+    cache.set('c', {'response': 'c'}, strategy='standard_rag')
+
+    stats = cache.get_stats()
+    assert stats['strategies']['template'] == {'hits': 2, 'stores': 1, 'hit_rate': 0.667}
+    assert stats['strategies']['standard_rag']['hit_rate'] == 0.0
+    assert stats['current_size'] == 2 and stats['evictions'] == 1
+
+
+def test_scripts_de_ingesta_invalidan_el_cache_del_servidor(tmp_path, monkeypatch):
+    # Los scripts (enrich_existing_chunks, ingest_markdown_json, ...) corren en otro proceso
+    path = str(tmp_path / 'knowledge_version.json')
+    server_version = kv.KnowledgeVersion(path)
+    monkeypatch.setattr(kv, 'CHECK_SECONDS', 0)
+    monkeypatch.setattr(cm, 'get_knowledge_version', server_version.get)
+    monkeypatch.setattr(cm, 'get_template_version', lambda: 'a1')
+
+    cache = cm.VersionedResponseCache(max_size=10, default_ttl=60)
+    cache.set('k', {'response': 'piso 2'}, strategy='standard_rag')
+    assert cache.get('k') == {'response': 'piso 2'}
+
+    script = ("import sys; from app.knowledge_version import KnowledgeVersion; "
+              "KnowledgeVersion(sys.argv[1]).bump('enrich_existing_chunks')")
+    subprocess.run([sys.executable, '-c', script, path], cwd=BACKEND_DIR, check=True)
+
+    assert cache.get('k') is None
+    assert cache.get_stats()['invalidations'] == 1
@@ -0,0 +1,90 @@
+import os
+import sys
+
+# Asegurar que el paquete app esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.response_pipeline import (
+    CLEANUP_STAGES, ENHANCE_STAGES, FIXED, PHRASE_REPLACEMENTS, RAG, TEMPLATE,
+    PipelineStage, ResponseContext, ResponsePipeline, build_default_pipeline
+)
+
+
+def _sequential(text, replacements):
+    for phrase, value in replacements.items():
+        text = text.replace(phrase, value)
+    return text
+
+
+def test_reemplazo_de_frases():
+    pipeline = build_default_pipeline()
+    samples = [
+        "hola, soy ina, el asistente virtual de duoc uc. quiero informarte que la TNE se renueva en marzo.",
+        "soy ina, el asistente virtual. estoy aquí para ayudarte con certificados de duoc uc",
+        "respecto a tu pregunta acerca de becas: es importante mencionar que hay plazos.",
+        "Texto sin frases que reemplazar.",
+    ]
+    for text in samples:
+        assert pipeline.run(text, ResponseContext("", kind=RAG), stages=("phrases",)) == \
+            _sequential(text, PHRASE_REPLACEMENTS)
+
+
+def test_limpieza_de_respuesta_generada():
+    pipeline = build_default_pipeline()
+    text = "  quiero informarte que   la TNE\n\nse retira en duoc uc."
+    cleaned = pipeline.run(text, ResponseContext("tne", kind=RAG), stages=CLEANUP_STAGES)
+    assert cleaned == "la TNE se retira en Duoc UC."
+
+    long_text = "Primera oración. Segunda oración. " + "x" * 600 + ". Cuarta."
+    truncated = pipeline.run(long_text, ResponseContext("tne", kind=RAG), stages=CLEANUP_STAGES)
+    assert truncated == "Primera oración.  Segunda oración."
+
+
+def test_etapas_que_no_aplican_se_saltan():
+    pipeline = build_default_pipeline()
+    template_text = "Texto   curado de un template sobre duoc uc con suficiente contenido para mejorarlo."
+    result = pipeline.run(template_text, ResponseContext("consulta", kind=TEMPLATE))
+    # Los templates no pasan por la limpieza de texto generado
+    assert "Texto   curado" in result and "duoc uc" in result
+    stats = pipeline.get_stats()['stages']
+    for name in CLEANUP_STAGES:
+        assert stats[name]['calls'] == 0 and stats[name]['skipped'] == 1
+    assert stats['contact']['calls'] == 1
+    assert pipeline.get_stats()['runs'] == {TEMPLATE: 1}
+
+
+def test_error_en_etapa_devuelve_texto_original_y_corte_del_pipeline():
+    def upper(text, context):
+        return text.upper()
+
+    def fail(text, context):
+        raise ValueError("falla")
+
+    def stop(text, context):
+        context.stop = True
+        return "fin"
+
+    kinds = frozenset({FIXED})
+    pipeline = ResponsePipeline([PipelineStage("upper", upper, kinds), PipelineStage("fail", fail, kinds)])
+    assert pipeline.run("hola", ResponseContext("q", kind=FIXED)) == "hola"
+    assert pipeline.run("hola", ResponseContext("q", kind=FIXED), stages=("upper",)) == "HOLA"
+
+    pipeline = ResponsePipeline([PipelineStage("stop", stop, kinds), PipelineStage("fail", fail, kinds)])
+    assert pipeline.run("hola", ResponseContext("q", kind=FIXED)) == "fin"
+    assert pipeline.get_stats()['stages']['fail']['calls'] == 0
+
+
+def test_mejoras_agregan_contacto_y_miden_tiempos():
+    pipeline = build_default_pipeline()
+    text = "La biblioteca ofrece salas de estudio grupales y préstamo de libros para todos los estudiantes."
+    enhanced = pipeline.run(text, ResponseContext("¿Cómo pido un libro?", kind=RAG), stages=ENHANCE_STAGES)
+    assert enhanced.startswith(text)
+    assert "biblioteca.plazanorte@duoc.cl" in enhanced
+    stats = pipeline.get_stats()
+    assert stats['stages']['contact']['changed'] == 1
+    assert stats['total_ms'] >= 0 and stats['stages']['contact']['avg_us'] >= 0
+
+    # Una respuesta corta con template de contacto se reemplaza y corta las demás etapas
+    replaced = pipeline.run(text, ResponseContext("¿Hay salas para estudiar en grupo?", kind=RAG), stages=ENHANCE_STAGES)
+    assert replaced.startswith("**📚 Servicios de Biblioteca:**")
+    assert pipeline.get_stats()['stages']['contact']['calls'] == 1
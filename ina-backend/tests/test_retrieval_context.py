@@ -0,0 +1,96 @@
+import os
+import sys
+
+# Asegurar que el paquete app esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.retrieval_context import RetrievalContext
+
+
+class FakeCollection:
+    """Colección mínima con la interfaz de ChromaDB usada por RetrievalContext"""
+
+    def __init__(self, size=50):
+        self.calls = []
+        self.embed_calls = 0
+        self.size = size
+        self._embedding_function = self._embed
+
+    def _embed(self, texts):
+        self.embed_calls += 1
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def query(self, **params):
+        self.calls.append(params)
+        n = min(params['n_results'], self.size)
+        return {
+            'distances': [[i / 100 for i in range(n)]],
+            'documents': [[f"doc {i}" for i in range(n)]],
+            'metadatas': [[{'category': 'tne'} for _ in range(n)]]
+        }
+
+
+def test_pedidos_menores_reutilizan_los_candidatos():
+    """La pre-búsqueda (n grande) cubre la búsqueda de generación (n menor) sin otra consulta."""
+    collection = FakeCollection()
+    ctx = RetrievalContext("¿cómo renuevo mi tne?")
+
+    first = ctx.fetch(collection, "renovar tne", 40)
+    second = ctx.fetch(collection, "renovar tne", 20)
+
+    assert len(collection.calls) == 1
+    assert 'query_embeddings' in collection.calls[0]
+    assert second['documents'][0] == first['documents'][0][:20]
+    assert ctx.get_stats()['candidate_reuses'] == 1
+
+
+def test_ampliar_la_busqueda_reutiliza_el_embedding():
+    collection = FakeCollection()
+    ctx = RetrievalContext("biblioteca")
+
+    ctx.fetch(collection, "biblioteca", 10)
+    ctx.fetch(collection, "biblioteca", 30)
+
+    assert len(collection.calls) == 2
+    assert collection.embed_calls == 1
+    assert ctx.query_embedding("biblioteca") == [10.0, 1.0]
+
+
+def test_memo_calcula_cada_etapa_una_vez():
+    ctx = RetrievalContext("tne")
+    calls = []
+
+    def expand(text):
+        calls.append(text)
+        return text + " tarjeta nacional estudiantil"
+
+    assert ctx.memo('expand', "tne", expand) == ctx.memo('expand', "tne", expand)
+    assert calls == ["tne"]
+    assert ctx.expanded_query == "tne tarjeta nacional estudiantil"
+
+
+def test_embeddings_compartidos_por_modelo_y_texto():
+    """Componentes con el mismo modelo reutilizan el vector; la colección usa su propio modelo."""
+    from app.query_embeddings import QueryEmbeddings, encode_query
+
+    class FakeModel:
+        def __init__(self):
+            self.calls = 0
+
+        def encode(self, texts):
+            self.calls += 1
+            return [[1.0, float(len(t))] for t in texts]
+
+    e5 = FakeModel()
+    handle = QueryEmbeddings()
+    collection = FakeCollection()
+    ctx = RetrievalContext("horario biblioteca", embeddings=handle)
+
+    memoria = encode_query(e5, 'e5-small', "horario biblioteca", handle)
+    grafo = encode_query(e5, 'e5-small', "horario biblioteca", handle)
+    ctx.fetch(collection, "horario biblioteca", 5)
+
+    assert e5.calls == 1 and collection.embed_calls == 1
+    assert (memoria == grafo).all()
+    assert handle.get_stats()['encodes'] == 2
+    assert handle.get_stats()['reuses'] == 1
@@ -0,0 +1,65 @@
+import os
+import sys
+
+# Asegurar que el paquete app esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pytest
+
+import app.semantic_cache as sc
+
+
+@pytest.fixture
+def version(monkeypatch):
+    state = {'version': 3}
+    monkeypatch.setattr(sc, 'get_knowledge_version', lambda: state['version'])
+    return state
+
+
+def make_cache(tmp_path, **kwargs):
+    return sc.SemanticCache(similarity_threshold=0.9, snapshot_path=str(tmp_path / 'semantic.npz'),
+                            load_model=False, **kwargs)
+
+
+def test_busqueda_por_producto_matricial(tmp_path, version):
+    cache = make_cache(tmp_path)
+    cache.add_to_cache("renovar tne", {'response': 'tne'}, embedding=np.array([1.0, 0.0, 0.0]))
+    cache.add_to_cache("horario biblioteca", {'response': 'biblio'}, embedding=np.array([0.0, 3.0, 0.0]))
+
+    hit = cache.find_similar(np.array([0.1, 2.0, 0.0]))
+    assert hit['response'] == 'biblio'
+    assert hit['semantic_similarity'] > 0.99
+    assert cache.find_similar(np.array([0.0, 0.0, 1.0])) is None
+    assert cache.get_stats()['hits'] == 1 and cache.get_stats()['misses'] == 1
+
+
+def test_capacidad_con_desalojo_lru_y_ttl(tmp_path, version, monkeypatch):
+    cache = make_cache(tmp_path, max_entries=2, ttl_seconds=60)
+    cache.add_to_cache("a", {'response': 'a'}, embedding=np.array([1.0, 0.0, 0.0]))
+    cache.add_to_cache("b", {'response': 'b'}, embedding=np.array([0.0, 1.0, 0.0]))
+    cache.find_similar(np.array([1.0, 0.0, 0.0]))  # "a" pasa a ser la más reciente
+    cache.add_to_cache("c", {'response': 'c'}, embedding=np.array([0.0, 0.0, 1.0]))
+
+    assert len(cache) == 2
+    assert cache.find_similar(np.array([0.0, 1.0, 0.0])) is None
+    assert cache.get_stats()['evictions'] == 1
+
+    now = sc.time.time()
+    monkeypatch.setattr(sc.time, 'time', lambda: now + 120)
+    assert cache.find_similar(np.array([1.0, 0.0, 0.0])) is None
+    assert cache.get_stats()['expirations'] == 2
+
+
+def test_snapshot_y_cambio_de_conocimiento(tmp_path, version):
+    cache = make_cache(tmp_path)
+    cache.add_to_cache("renovar tne", {'response': 'tne'}, embedding=np.array([1.0, 0.0]))
+    assert cache.save_snapshot()
+
+    restored = make_cache(tmp_path)
+    assert restored.find_similar(np.array([1.0, 0.0]))['response'] == 'tne'
+
+    version['version'] += 1
+    assert restored.find_similar(np.array([1.0, 0.0])) is None
+    assert restored.get_stats()['invalidations'] == 1
+    assert len(make_cache(tmp_path)) == 0
@@ -0,0 +1,87 @@
+import os
+import sys
+
+# Asegurar que el paquete app esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.template_index import TemplateIndex
+from app.templates import TEMPLATES
+
+
+def test_paquetes_se_cargan_solo_al_usarse():
+    index = TemplateIndex()
+    assert index.get_stats()['packs_loaded'] == 0
+
+    assert index.get('tne_primera_vez', 'en', area='asuntos_estudiantiles')
+    assert index.get_stats()['packs_cached'] == ['asuntos_estudiantiles/en']
+
+    # Buscar por id sin área indexa todo el idioma, pero no los demás
+    assert index.get('tne_primera_vez', 'fr')
+    assert 'fr' in index.get_stats()['indexed_languages']
+    assert 'es' not in index.get_stats()['indexed_languages']
+
+
+def test_resolve_respeta_orden_de_fallback():
+    index = TemplateIndex()
+    # Área preferida en el idioma pedido
+    entry = index.resolve('tne_primera_vez', 'en', 'asuntos_estudiantiles')
+    assert (entry.area, entry.language) == ('asuntos_estudiantiles', 'en')
+    assert entry.text == index.area_templates('asuntos_estudiantiles', 'en')['tne_primera_vez']
+
+    # Área equivocada: se busca en las demás
+    entry = index.resolve('tne_primera_vez', 'en', 'deportes')
+    assert entry.area == 'asuntos_estudiantiles'
+
+    # Template que solo existe en español dentro de un área sin inglés
+    academico_id = next(iter(index.area_templates('academico', 'es')))
+    entry = index.resolve(academico_id, 'en', 'academico')
+    assert entry.language == 'es'
+
+    # Solo en TEMPLATES de templates.py
+    legacy = {tid: category for category, templates in TEMPLATES.items() for tid in templates}
+    only_legacy = next((tid for tid in legacy if not index.get_entries(tid, 'es')
+                        and not index.get_entries(tid, 'en')), None)
+    if only_legacy:
+        entry = index.resolve(only_legacy, 'en')
+        assert (entry.source, entry.area) == ('templates', legacy[only_legacy])
+
+    assert index.resolve('no_existe', 'es') is None
+
+
+def test_busqueda_por_tokens():
+    index = TemplateIndex()
+    results = index.search('TNE', 'es')
+    assert results and all('tne' in (r.template_id + r.text).lower() for r in results)
+
+    # Todas las palabras deben estar presentes (sin importar acentos ni orden)
+    for entry in index.search('tarjeta estudiantil', 'es'):
+        text = entry.text.lower()
+        assert 'tarjeta' in text and 'estudiantil' in text
+    assert index.search('palabrainexistentexyz tne', 'es') == []
+    assert index.search('   ', 'es') == []
+
+
+def test_fuente_registrada_es_perezosa():
+    calls = []
+
+    def loader():
+        calls.append(1)
+        yield None, 'saludo', 'es', 'Hola'
+
+    index = TemplateIndex()
+    index.register_source('extra', loader)
+    assert calls == []
+    assert index.get('saludo', source='extra') == 'Hola'
+    assert index.get('saludo', source='extra') == 'Hola'
+    assert calls == [1]
+
+
+def test_respuesta_mejorada_no_reemplaza_respuestas_rag_con_use_template():
+    from app.enhanced_response_generator import enhanced_generator
+
+    # Los patrones amplios ("servicios", "becas duoc") apuntan a entradas "use_template":
+    # no deben sustituir la respuesta RAG ya generada
+    for question in ("¿Qué servicios ofrece la biblioteca?", "¿qué becas duoc existen?"):
+        assert not enhanced_generator.generate_enhanced_response(question)["is_enhanced"]
+
+    assert enhanced_generator.generate_enhanced_response("necesito un certificado de alumno regular")["is_enhanced"]
@@ -0,0 +1,52 @@
+import os
+import sys
+
+# Asegurar que el paquete app esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import re
+
+from app.aho_corasick import AhoCorasick
+from app.template_matcher import TemplateMatcher, required_literals, template_matcher
+from app.template_patterns import PRIORITY_TEMPLATE_PATTERNS, TEMPLATE_PATTERNS
+
+
+def test_aho_corasick_encuentra_palabras_superpuestas():
+    automaton = AhoCorasick.from_words(["he", "she", "hers", "tne"])
+    matches = [(start, end, word) for start, end, word in automaton.iter_matches("ushers tne")]
+    assert matches == [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers"), (7, 10, "tne")]
+
+
+def test_literales_obligatorios_de_una_regex():
+    assert required_literals(r'c[óo]mo.*saco.*tne(?!.*(pierde|perdida))') == ['c', 'mo', 'saco', 'tne']
+    assert required_literals(r'mental.*health.*supports?.*exist') == ['mental', 'health', 'support', 'exist']
+    assert required_literals(r'(wifi|red)') == []
+
+
+def test_respeta_el_orden_de_prioridad():
+    matcher = TemplateMatcher([
+        ('priority', {'tne_perdida': [r'tne.*perdida']}),
+        ('template', {'tne_general': [r'tne'], 'sin_ancla': [r'(wifi|red)']}),
+    ])
+    assert matcher.match("mi tne perdida")[1] == 'tne_perdida'
+    assert matcher.match("mi tne")[1] == 'tne_general'
+    assert matcher.match("la red no funciona")[1] == 'sin_ancla'
+    assert matcher.match("horario biblioteca") is None
+    assert matcher.get_stats()['template_matches'] == {'tne_perdida': 1, 'tne_general': 1, 'sin_ancla': 1}
+
+
+def test_mismo_resultado_que_evaluar_todas_las_reglas():
+    rules = [(tid, re.compile(p)) for group in (PRIORITY_TEMPLATE_PATTERNS, TEMPLATE_PATTERNS)
+             for tid, patterns in group.items() for p in patterns]
+
+    def reference(text):
+        return next((tid for tid, regex in rules if regex.search(text)), None)
+
+    queries = [
+        "¿cómo saco la tne?", "se me perdió la tne, está dañada", "how do i renew my tne",
+        "comment fonctionne l'assurance", "¿dónde está la biblioteca?", "quiero hablar con un psicólogo",
+        "horario punto estudiantil", "requisitos programa emergencia", "hola", "xyz sin coincidencias"
+    ]
+    for query in queries:
+        match = template_matcher.match(query.lower())
+        assert (match[1] if match else None) == reference(query.lower()), query
@@ -0,0 +1,84 @@
+import os
+import sys
+
+# Asegurar que el paquete app esté en sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pytest
+
+import app.vector_mirror as vm
+from app.knowledge_version import KnowledgeVersion
+
+
+class FakeCollection:
+    """Colección con embeddings al estilo ChromaDB (espacio l2 por defecto)"""
+
+    def __init__(self, vectors, metadata=None):
+        self.vectors = vectors
+        self.metadata = metadata
+        self.ids = [f"doc_{i}" for i in range(len(vectors))]
+
+    def get(self, limit, offset, include):
+        sl = slice(offset, offset + limit)
+        return {
+            'ids': self.ids[sl],
+            'embeddings': self.vectors[sl],
+            'documents': [f"texto {i}" for i in range(len(self.vectors))][sl],
+            'metadatas': [{'category': 'tne' if i % 2 else 'biblioteca'} for i in range(len(self.vectors))][sl]
+        }
+
+
+@pytest.fixture
+def version(monkeypatch):
+    state = {'version': 7}
+    monkeypatch.setattr(vm, 'get_knowledge_version', lambda: state['version'])
+    monkeypatch.setattr(vm, 'MIRROR_CHECK_SECONDS', 0)
+    return state
+
+
+def test_top_k_coincide_con_distancia_l2_de_chroma(tmp_path, version):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(25, 8)).astype(np.float32)
+    vm.export_vector_mirror(FakeCollection(vectors), directory=str(tmp_path), page_size=10)
+
+    mirror = vm.VectorMirror(str(tmp_path))
+    query = rng.normal(size=8).astype(np.float32)
+    result = mirror.search(query, 5)
+
+    expected = np.argsort(((vectors - query) ** 2).sum(axis=1))[:5]
+    assert result['ids'][0] == [f"doc_{i}" for i in expected]
+    assert result['distances'][0][0] == pytest.approx(float(((vectors[expected[0]] - query) ** 2).sum()), rel=1e-4)
+
+
+def test_int8_y_filtros_de_igualdad(tmp_path, version):
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(40, 16)).astype(np.float32)
+    vm.export_vector_mirror(FakeCollection(vectors, {'hnsw:space': 'cosine'}), directory=str(tmp_path),
+                            quantize=True)
+
+    mirror = vm.VectorMirror(str(tmp_path))
+    result = mirror.search(vectors[3], 3, where={'category': 'tne'})
+
+    assert result['ids'][0][0] == "doc_3"
+    assert all(meta['category'] == 'tne' for meta in result['metadatas'][0])
+    assert mirror.search(vectors[3], 3, where={'$or': []}) is None
+
+
+def test_espejo_obsoleto_no_responde(tmp_path, version):
+    vectors = np.eye(4, dtype=np.float32)
+    vm.export_vector_mirror(FakeCollection(vectors), directory=str(tmp_path))
+    mirror = vm.VectorMirror(str(tmp_path))
+    assert mirror.search(vectors[0], 1) is not None
+
+    version['version'] += 1
+    assert mirror.search(vectors[0], 1) is None
+    assert mirror.get_stats()['stale_skips'] == 1
+
+
+def test_knowledge_version_persistente(tmp_path):
+    path = str(tmp_path / 'knowledge_version.json')
+    writer = KnowledgeVersion(path)
+    assert writer.bump('test') == 1
+
+    assert KnowledgeVersion(path).get() == 1